@@ -2,26 +2,49 @@
 """
 Daemon del sistema de transferencia nRF24L01+
 Se ejecuta automáticamente en segundo plano
+
+Arranque en frío: solo se importa lo necesario para dejar la radio en RX;
+transmisor, receptor, códecs, FEC y métricas se cargan después en un hilo
+de precarga (o en el primer uso, si se pulsa el botón antes).
+
+Sin sondeo: el botón y las señales encolan trabajos en el Dispatcher, que
+los ejecuta en el hilo principal uno tras otro y deja la radio escuchando
+entre trabajos. En reposo el proceso duerme bloqueado en la cola.
 """
 
+import os
 import sys
 import time
 import signal
 import pathlib
 import logging
+import threading
 from logging.handlers import RotatingFileHandler
 
-# Importar módulos del proyecto
-from radio_config import initialize_radio
+from startup_report import StartupTimer
+STARTUP = StartupTimer()
+
+# Importar módulos del proyecto (solo la ruta crítica hasta RX)
+from radio_config import initialize_radio, arm_receiver
 from hardware import LEDController, ButtonController, SystemState, GPIO
-from transmitter import transmit_file, transmit_multiple_files
-from receiver import receive_file
+from dispatcher import Dispatcher
+from spool import SpoolWatcher
+import tracing
+from progress import ACTIVE
+from constants import (
+    METRICS_PORT, METRICS_ADDR, METRICS_TEXTFILE, RESULT_DISPLAY_TIME, SPOOL_DIR,
+    CONTROL_SOCKET, STATE_DIR
+)
+
+STARTUP.mark("imports")
 
 # Configuración de rutas
 BASE_DIR = pathlib.Path(__file__).parent.absolute()
 TEXTOS_DIR = BASE_DIR / "Textos"
 RECIBIDOS_DIR = BASE_DIR / "recibidos"
 DEFAULT_FILE = BASE_DIR / "default.txt"
+SPOOL_PATH = pathlib.Path(STATE_DIR) / SPOOL_DIR if SPOOL_DIR else None
+CONTROL_PATH = pathlib.Path(STATE_DIR) / CONTROL_SOCKET if CONTROL_SOCKET else None
 LOG_FILE = BASE_DIR / "nrf24_daemon.log"
 
 # Configurar logging
@@ -59,7 +82,20 @@ class NRF24Daemon:
     
     def __init__(self):
         self.running = True
-        self.mode = 'idle'
+        self.dispatcher = Dispatcher(
+            {
+                'tx': self.run_tx_mode,
+                'tx-multi': self.run_tx_multi_mode,
+                'rx': self.run_rx_mode,
+                'spool': self.run_spool_job,
+                'send': self.run_send_job,
+            },
+            on_idle=self._on_idle,
+            log=logger.info
+        )
+        self.spool = None
+        self.control = None
+        self.finalizer = None
         self.led_controller = None
         self.button_controller = None
         self.radio = None
@@ -95,24 +131,22 @@ class NRF24Daemon:
         """Maneja señales de terminación"""
         logger.info(f"Señal recibida: {signum}, cerrando daemon...")
         self.running = False
+        self.dispatcher.stop()
     
     def short_press(self):
         """Callback para pulsación corta -> TX"""
-        if self.mode == 'idle':
-            self.mode = 'tx'
-            logger.info("🔘 BOTÓN CORTO → Iniciando TRANSMISIÓN (TX)")
+        logger.info("🔘 BOTÓN CORTO → TRANSMISIÓN (TX)")
+        self.dispatcher.submit('tx', source='botón')
     
     def medium_press(self):
         """Callback para pulsación media -> RX"""
-        if self.mode == 'idle':
-            self.mode = 'rx'
-            logger.info("🔘 BOTÓN MEDIO → Iniciando RECEPCIÓN (RX)")
+        logger.info("🔘 BOTÓN MEDIO → RECEPCIÓN (RX)")
+        self.dispatcher.submit('rx', source='botón')
     
     def long_press(self):
         """Callback para pulsación larga -> TX-MULTI"""
-        if self.mode == 'idle':
-            self.mode = 'tx-multi'
-            logger.info("🔘 BOTÓN LARGO → Iniciando TRANSMISIÓN MÚLTIPLE (TX-MULTI)")
+        logger.info("🔘 BOTÓN LARGO → TRANSMISIÓN MÚLTIPLE (TX-MULTI)")
+        self.dispatcher.submit('tx-multi', source='botón')
     
     def initialize(self):
         """Inicializa todos los componentes del sistema"""
@@ -121,10 +155,13 @@ class NRF24Daemon:
             logger.info("INICIANDO DAEMON nRF24L01+")
             logger.info("="*70)
             
-            # Inicializar radio
+            # Inicializar radio y dejarla escuchando antes que todo lo demás
             logger.info("Inicializando radio nRF24L01+...")
             self.radio = initialize_radio()
-            logger.info("✓ Radio inicializado correctamente")
+            STARTUP.mark("radio")
+            arm_receiver(self.radio)
+            STARTUP.mark("rx_ready")
+            logger.info("✓ Radio inicializado y escuchando")
             
             # Inicializar LEDs
             logger.info("Inicializando LEDs...")
@@ -140,7 +177,17 @@ class NRF24Daemon:
                 self.long_press
             )
             logger.info("✓ Botón inicializado")
+            STARTUP.mark("button")
             
+            # Spool: archivos que dejan otros servicios salen solos
+            if SPOOL_PATH:
+                self.spool = SpoolWatcher(SPOOL_PATH, self.dispatcher, log=logger.info)
+                self.spool.start()
+            
+            # Módulos pesados y métricas en segundo plano
+            threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+            
+            logger.info(f"⏱ Arranque: {STARTUP.summary()}")
             logger.info("✓ Sistema inicializado y listo")
             logger.info("💤 Esperando pulsación de botón...")
             logger.info("="*70)
@@ -153,13 +200,77 @@ class NRF24Daemon:
             logger.error(traceback.format_exc())
             return False
     
-    def run_tx_mode(self):
+    def _warm_up(self):
+        """
+        Carga transmisor, receptor, códecs y FEC, y expone las métricas.
+        
+        Si un modo arranca antes de que termine, su import espera al de
+        este hilo (el lock de importación de Python lo serializa).
+        """
+        try:
+            # API de control primero: es liviana y habilita a otros procesos
+            if CONTROL_PATH:
+                from control import ControlServer
+                try:
+                    self.control = ControlServer(CONTROL_PATH, self.dispatcher, log=logger.info)
+                    self.control.start()
+                except OSError as e:
+                    logger.warning(f"⚠ No se pudo abrir el socket de control: {e}")
+                    self.control = None
+            
+            import transmitter
+            import receiver
+            import compression
+            import fec
+            compression.warm_up()
+            fec.warm_up()
+            
+            # Exponer métricas (un fallo aquí no impide operar)
+            if METRICS_PORT:
+                from metrics import start_http_server
+                try:
+                    start_http_server(METRICS_PORT, METRICS_ADDR)
+                    logger.info(f"✓ Métricas en http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
+                except OSError as e:
+                    logger.warning(f"⚠ No se pudo iniciar el endpoint de métricas: {e}")
+            
+            STARTUP.mark("warm")
+            logger.info(f"⏱ Precarga completa: {STARTUP.summary()}")
+        except Exception as e:
+            logger.error(f"✗ Error en la precarga: {e}")
+    
+    def _export_metrics(self):
+        """Actualiza el archivo de métricas para node-exporter, si está configurado"""
+        if not METRICS_TEXTFILE:
+            return
+        from metrics import write_textfile
+        try:
+            write_textfile(METRICS_TEXTFILE)
+        except OSError as e:
+            logger.warning(f"⚠ No se pudo escribir {METRICS_TEXTFILE}: {e}")
+    
+    def _finish_job(self):
+        """Tras cada trabajo: métricas y radio de vuelta en escucha (sin esperas)"""
+        ACTIVE.clear_cancel()
+        self._export_metrics()
+        try:
+            arm_receiver(self.radio)
+        except Exception as e:
+            logger.error(f"✗ No se pudo volver a escuchar: {e}")
+    
+    def _on_idle(self):
+        """Cola vacía: los LEDs muestran el resultado un momento y vuelven a Idle"""
+        self.led_controller.idle_after(RESULT_DISPLAY_TIME)
+        logger.info("💤 Cola vacía, esperando trabajos\n")
+    
+    def run_tx_mode(self, job=None):
         """Ejecuta modo transmisor"""
         try:
             logger.info("\n" + "▶"*35)
             logger.info("MODO TRANSMISOR ACTIVADO")
             logger.info("▶"*35 + "\n")
             
+            from transmitter import transmit_file
             success = transmit_file(self.radio, DEFAULT_FILE, self.led_controller)
             
             if success:
@@ -174,18 +285,16 @@ class NRF24Daemon:
             self.led_controller.set_state(SystemState.ERROR)
         
         finally:
-            time.sleep(3)
-            self.mode = 'idle'
-            self.led_controller.set_state(SystemState.IDLE)
-            logger.info("💤 Volviendo a modo Idle\n")
+            self._finish_job()
     
-    def run_tx_multi_mode(self):
+    def run_tx_multi_mode(self, job=None):
         """Ejecuta modo transmisión múltiple"""
         try:
             logger.info("\n" + "▶"*35)
             logger.info("MODO TRANSMISIÓN MÚLTIPLE ACTIVADO")
             logger.info("▶"*35 + "\n")
             
+            from transmitter import transmit_multiple_files
             stats = transmit_multiple_files(self.radio, TEXTOS_DIR, self.led_controller)
             
             if stats['fallidos'] == 0:
@@ -200,24 +309,28 @@ class NRF24Daemon:
             self.led_controller.set_state(SystemState.ERROR)
         
         finally:
-            time.sleep(3)
-            self.mode = 'idle'
-            self.led_controller.set_state(SystemState.IDLE)
-            logger.info("💤 Volviendo a modo Idle\n")
+            self._finish_job()
     
-    def run_rx_mode(self):
+    def run_rx_mode(self, job=None):
         """Ejecuta modo receptor"""
         try:
             logger.info("\n" + "◀"*35)
             logger.info("MODO RECEPTOR ACTIVADO")
             logger.info("◀"*35 + "\n")
             
-            success = receive_file(self.radio, RECIBIDOS_DIR, self.led_controller)
+            from receiver import receive_session, finalize_reception
+            if self.finalizer is None:
+                from finalizer import FinalizePool
+                self.finalizer = FinalizePool(finalize_reception, log=logger.info)
+            # Sigue escuchando mientras el transmisor mande archivos
+            stats = receive_session(self.radio, RECIBIDOS_DIR, self.led_controller,
+                                    finalizer=self.finalizer)
             
-            if success:
-                logger.info("✓ Recepción completada exitosamente")
+            if not stats['fallidos']:
+                logger.info(f"✓ Sesión de recepción completada: {stats['exitosos']} archivo(s)")
             else:
-                logger.warning("✗ Recepción finalizó con errores")
+                logger.warning(f"✗ Sesión de recepción con errores: "
+                               f"{stats['fallidos']}/{stats['total']} fallidos")
             
         except Exception as e:
             logger.error(f"✗ Error en modo RX: {e}")
@@ -226,10 +339,65 @@ class NRF24Daemon:
             self.led_controller.set_state(SystemState.ERROR)
         
         finally:
-            time.sleep(3)
-            self.mode = 'idle'
-            self.led_controller.set_state(SystemState.IDLE)
-            logger.info("💤 Volviendo a modo Idle\n")
+            self._finish_job()
+    
+    def run_spool_job(self, job):
+        """Transmite un archivo del spool y lo mueve a enviados si llegó"""
+        path = job.params['path']
+        success = False
+        try:
+            if not path.is_file():
+                logger.warning(f"⚠ {path.name} ya no está en el spool")
+                return False
+            logger.info(f"📤 Spool: {path.name}")
+            
+            from transmitter import transmit_file
+            success = transmit_file(self.radio, path, self.led_controller)
+            
+            if success:
+                logger.info(f"✓ {path.name} enviado")
+            else:
+                logger.warning(f"✗ {path.name} no se pudo enviar")
+            return success
+            
+        except Exception as e:
+            logger.error(f"✗ Error enviando {path.name}: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            self.led_controller.set_state(SystemState.ERROR)
+            return False
+        
+        finally:
+            self.spool.finish(path, success)
+            self._finish_job()
+    
+    def run_send_job(self, job):
+        """Transmite un archivo pedido por la API de control"""
+        path = job.params['path']
+        try:
+            if not path.is_file():
+                logger.warning(f"⚠ {path} ya no existe")
+                return False
+            logger.info(f"📤 API: {path}")
+            
+            from transmitter import transmit_file
+            success = transmit_file(self.radio, path, self.led_controller)
+            
+            if success:
+                logger.info(f"✓ {path.name} enviado")
+            else:
+                logger.warning(f"✗ {path.name} no se pudo enviar")
+            return success
+            
+        except Exception as e:
+            logger.error(f"✗ Error enviando {path.name}: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            self.led_controller.set_state(SystemState.ERROR)
+            return False
+        
+        finally:
+            self._finish_job()
     
     def run(self):
         """Bucle principal del daemon"""
@@ -242,22 +410,11 @@ class NRF24Daemon:
             logger.error("Fallo en la inicialización, terminando daemon")
             return 1
         
-        # Bucle principal
+        # Worker en el hilo principal: bloquea hasta que haya trabajos o llegue
+        # una señal (el perfilado con cProfile sigue viendo las transferencias)
         try:
-            while self.running:
-                if self.mode == 'tx':
-                    self.run_tx_mode()
-                    
-                elif self.mode == 'tx-multi':
-                    self.run_tx_multi_mode()
-                    
-                elif self.mode == 'rx':
-                    self.run_rx_mode()
-                    
-                else:
-                    # Modo idle: solo esperar
-                    time.sleep(0.1)
-                    
+            self.dispatcher.run()
+            
         except KeyboardInterrupt:
             logger.info("⏹ Interrupción manual detectada")
         
@@ -269,6 +426,13 @@ class NRF24Daemon:
         finally:
             # Limpieza
             logger.info("\n🧹 Limpiando recursos...")
+            if self.spool:
+                self.spool.stop()
+            if self.control:
+                self.control.stop()
+            if self.finalizer:
+                # No perder archivos recibidos que todavía no se escribieron
+                self.finalizer.close()
             if self.led_controller:
                 self.led_controller.cleanup()
             if GPIO:
@@ -283,8 +447,24 @@ class NRF24Daemon:
 
 def main():
     """Función principal"""
-    daemon = NRF24Daemon()
-    return daemon.run()
+    # Perfilado opcional (NRF24_TRACE se activa al importar tracing)
+    profilers = []
+    if os.environ.get(tracing.PROFILE_ENV):
+        profilers.append((tracing.CProfiler(), os.environ[tracing.PROFILE_ENV]))
+    if os.environ.get(tracing.SAMPLE_ENV):
+        profilers.append((tracing.SamplingProfiler(), os.environ[tracing.SAMPLE_ENV]))
+    for profiler, _ in profilers:
+        profiler.start()
+    
+    try:
+        daemon = NRF24Daemon()
+        return daemon.run()
+    finally:
+        for profiler, output in profilers:
+            profiler.stop(output)
+        trace_path = tracing.save()
+        if trace_path:
+            logger.info(f"📈 Traza guardada en {trace_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+"""
+Difusión de un archivo a varios receptores (uno a muchos)
+
+Enviar el mismo archivo a N nodos con transmit_file cuesta N veces el aire.
+broadcast_file lo envía una sola vez a ADDR_A sin auto-ACK (todos los nodos
+escuchan esa dirección en el pipe 1 y ninguno responde, así no chocan los
+ACKs) y después repara:
+
+  1. Cada nodo se consulta en su dirección propia (node_address, pipe
+     NODE_PIPE) con tramas CTRL_POLL: responde sus faltantes en ACKs de
+     control, de a POLL_BITMAP_BYTES * 8 + 1 secuencias por respuesta.
+  2. Se difunde una sola vez la unión de los faltantes de todos los nodos.
+  3. Un nodo sin faltantes recibe el trailer en su dirección y confirma el
+     hash; desde ahí queda fuera de las consultas.
+
+Un nodo que no responde se sigue consultando en las rondas siguientes (pudo
+estar ocupado o fuera de alcance un momento); se da por perdido recién
+tras POLL_MISSED_ROUNDS rondas seguidas sin respuesta.
+
+El aire total es el de una transferencia más las tramas que alguno perdió
+y unas pocas consultas por nodo. Los receptores corren receive_file con
+node_id (NODE_ID o --node-id); el anuncio y el nombre también se difunden,
+y a un nodo que no los recibió se le envían en su dirección.
+"""
+
+import time
+import pathlib
+import itertools
+from pyrf24 import RF24
+from constants import (
+    ADDR_A, ADDR_B, MAX_ROUNDS, DATA_BYTES, EFFECTIVE_DATA_BYTES, MAX_SEQ_PACKETS,
+    CTRL_TRAILER, CTRL_ANNOUNCE, CTRL_NAME, CTRL_POLL, NAME_CHUNK_BYTES, MAX_NAME_BYTES,
+    BROADCAST_REPEATS, BROADCAST_GAP, POLL_ANNOUNCED, POLL_VERIFIED, POLL_ATTEMPTS,
+    POLL_INTERVAL, POLL_MISSED_ROUNDS, COMPRESS_NAMES, COMPRESS_CODEC_MASK
+)
+from frame_handler import (
+    build_frame, build_control_frame, build_trailer_payload, build_announce_payload,
+    parse_poll_payload, calculate_file_hash, transfer_id, node_address
+)
+from transmitter import split_file, request_control, send_announce, confirm_integrity
+from tracing import span
+from metrics import FRAMES_SENT, TRANSFERS, TRANSFER_SECONDS, GOODPUT_KIBPS
+from history import record_transfer
+from fec import is_fec_available
+from hardware import LEDController, SystemState
+from progress import ACTIVE
+
+_poll_ids = itertools.count()
+
+
+def parse_nodes(text: str) -> list:
+    """
+    Lista de nodos de la línea de comandos: "3,5,7" o rangos "3-6,9".
+
+    Raises:
+        ValueError: Si algún ID no es válido (ver node_address)
+    """
+    nodes = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        for node in range(int(low), int(high or low) + 1):
+            node_address(node)
+            nodes.add(node)
+    if not nodes:
+        raise ValueError("no se indicó ningún nodo")
+    return sorted(nodes)
+
+
+def send_unacked(radio: RF24, frames) -> int:
+    """
+    Difunde tramas sin auto-ACK (W_TX_PAYLOAD_NOACK).
+
+    Ningún receptor responde, así que write_fast() solo espera lugar en la
+    FIFO TX: las tramas salen a la velocidad del aire.
+
+    Returns:
+        int: Tramas enviadas
+    """
+    count = 0
+    for frame in frames:
+        radio.write_fast(frame, True)
+        count += 1
+        if BROADCAST_GAP:
+            time.sleep(BROADCAST_GAP)
+    radio.tx_standby()
+    FRAMES_SENT.inc(count)
+    return count
+
+
+def poll_node(radio: RF24, file_id: int, use_fec: bool = True) -> tuple:
+    """
+    Consulta los faltantes de un nodo (la dirección TX ya apunta a él).
+
+    Returns:
+        tuple: (state, faltantes, consultas) con state de POLL_*, o None si
+               el nodo no respondió
+    """
+    missing = []
+    polls = 0
+    start = 0
+    while start is not None:
+        response = request_control(radio, file_id, CTRL_POLL, next(_poll_ids) & 0xFFFF,
+                                   start.to_bytes(4, 'big'), use_fec,
+                                   POLL_ATTEMPTS, POLL_INTERVAL)
+        polls += 1
+        if response is None:
+            return None
+        state, found, start = parse_poll_payload(response)
+        missing.extend(found)
+        if not state & POLL_ANNOUNCED:
+            break
+    return state, missing, polls
+
+
+def broadcast_file(radio: RF24, file_path: pathlib.Path, nodes: list,
+                   led_controller: LEDController) -> dict:
+    """
+    Difunde un archivo a varios nodos y repara lo que cada uno perdió.
+
+    Args:
+        radio: Objeto RF24 inicializado
+        file_path: Ruta al archivo a transmitir
+        nodes: IDs de los nodos receptores
+        led_controller: Controlador de LEDs
+
+    Returns:
+        dict: {exitosos, fallidos, total, nodos: {id: bool}}
+    """
+    print("\n[ MODO DIFUSIÓN ]")
+    led_controller.set_state(SystemState.TX_ACTIVE)
+    ACTIVE.begin('tx', file_path.name)
+    results = {node: False for node in nodes}
+
+    try:
+        radio.open_rx_pipe(1, ADDR_B)
+        radio.stop_listening()
+        radio.enable_dynamic_ack()
+
+        use_fec = is_fec_available()
+        chunk_size = EFFECTIVE_DATA_BYTES if use_fec else DATA_BYTES
+        start_prep = time.time()
+        chunks, compress_mode, original_size, final_size, file_hash = split_file(
+            file_path, use_fec=use_fec
+        )
+        total_packets = len(chunks)
+        if total_packets > MAX_SEQ_PACKETS:
+            raise ValueError(f"archivo demasiado grande: {total_packets} paquetes "
+                             f"(máximo {MAX_SEQ_PACKETS})")
+        file_id = transfer_id(file_hash)
+        with span("hash_stream"):
+            stream_hash = calculate_file_hash(b"".join(chunks))
+        trailer_frame = build_control_frame(
+            file_id, CTRL_TRAILER, 0,
+            build_trailer_payload(stream_hash, file_hash, original_size, final_size), use_fec
+        )
+        name = file_path.name.encode('utf-8')[:MAX_NAME_BYTES]
+        announce = build_announce_payload(total_packets, chunk_size, compress_mode,
+                                          final_size, original_size, len(name),
+                                          id_hash=file_hash)
+        data_frames = [
+            build_frame(file_id, seq, chunk, seq == total_packets - 1, compress_mode, use_fec)
+            for seq, chunk in enumerate(chunks)
+        ]
+
+        print(f"\n{'='*50}")
+        print("MODO DIFUSIÓN (UNO A MUCHOS)")
+        print(f"{'='*50}")
+        print(f"Archivo: {file_path.name}")
+        print(f"Tamaño: {original_size} → {final_size} bytes "
+              f"({COMPRESS_NAMES.get(compress_mode & COMPRESS_CODEC_MASK, 'unknown')})")
+        print(f"Total paquetes: {total_packets}")
+        print(f"Nodos: {', '.join(str(n) for n in nodes)}")
+        print(f"File ID: {file_id}")
+        print(f"Tiempo preparación: {time.time() - start_prep:.3f}s")
+
+        stats = {'data': 0, 'repair': 0, 'polls': 0, 'rounds': 0}
+        start_time = time.time()
+        ACTIVE.begin('tx', file_path.name, total_packets, chunk_size)
+
+        # Anuncio, nombre y datos: una sola vez en el aire para todos los nodos
+        radio.open_tx_pipe(ADDR_A)
+        control = [build_control_frame(file_id, CTRL_ANNOUNCE, 0, announce, use_fec)]
+        control += [
+            build_control_frame(file_id, CTRL_NAME, index,
+                                name[start:start + NAME_CHUNK_BYTES], use_fec)
+            for index, start in enumerate(range(0, len(name), NAME_CHUNK_BYTES))
+        ]
+        with span("broadcast", frames=total_packets):
+            send_unacked(radio, control * BROADCAST_REPEATS)
+            stats['data'] = send_unacked(radio, data_frames)
+        print(f"📡 Difundidas {stats['data']} tramas en {time.time() - start_time:.2f}s")
+
+        remaining = list(nodes)
+        misses = {node: 0 for node in nodes}
+        for round_num in range(MAX_ROUNDS):
+            if not remaining or ACTIVE.cancelled:
+                break
+            stats['rounds'] += 1
+            print(f"\n--- Reparación {round_num + 1} | Nodos pendientes: {len(remaining)} ---")
+            union = set()
+            for node in list(remaining):
+                radio.open_tx_pipe(node_address(node))
+                radio.flush_rx()   # ACKs del nodo anterior
+                with span("poll", node=node):
+                    report = poll_node(radio, file_id, use_fec)
+                    if report is not None and not report[0] & POLL_ANNOUNCED:
+                        # No oyó el anuncio difundido: enviárselo a él
+                        stats['polls'] += report[2]
+                        send_announce(radio, file_id, announce, name, use_fec)
+                        report = poll_node(radio, file_id, use_fec)
+                if report is None:
+                    misses[node] += 1
+                    if misses[node] >= POLL_MISSED_ROUNDS:
+                        print(f"  ✗ Nodo {node}: sin respuesta en {misses[node]} rondas")
+                        remaining.remove(node)
+                    else:
+                        print(f"  ? Nodo {node}: sin respuesta "
+                              f"({misses[node]}/{POLL_MISSED_ROUNDS})")
+                    continue
+                misses[node] = 0
+                state, missing, polls = report
+                stats['polls'] += polls
+                if missing:
+                    print(f"  · Nodo {node}: {len(missing)} faltantes")
+                    union.update(missing)
+                    continue
+                verified = bool(state & POLL_VERIFIED) or confirm_integrity(
+                    radio, file_id, trailer_frame, set(),
+                    {'below': total_packets, 'total': total_packets}
+                )
+                if verified:
+                    print(f"  ✓ Nodo {node}: completo y verificado")
+                    results[node] = True
+                    remaining.remove(node)
+                else:
+                    print(f"  ⚠ Nodo {node}: trailer sin confirmar")
+
+            if union:
+                radio.open_tx_pipe(ADDR_A)
+                with span("broadcast_repair", frames=len(union)):
+                    stats['repair'] += send_unacked(
+                        radio, (data_frames[seq] for seq in sorted(union) if seq < total_packets)
+                    )
+                print(f"📡 Redifundidas {len(union)} tramas (unión de faltantes)")
+            ACTIVE.update(total_packets - len(union), total_packets)
+
+        total_time = time.time() - start_time
+        TRANSFER_SECONDS.labels('tx').observe(total_time)
+        ok = sum(results.values())
+        goodput = original_size / max(total_time, 1e-9) / 1024
+        sent = stats['data'] + stats['repair']
+        for node in nodes:
+            result = 'ok' if results[node] else 'incomplete'
+            TRANSFERS.labels('tx', result).inc()
+            record_transfer(
+                'tx', result, peer=f"nodo {node}", file=file_path.name, size=original_size,
+                stream_size=final_size, packets=total_packets,
+                codec=COMPRESS_NAMES.get(compress_mode & COMPRESS_CODEC_MASK, 'unknown'),
+                seconds=total_time, goodput_kibps=goodput if results[node] else None,
+                rounds=stats['rounds'], frames_sent=sent, channel=radio.channel,
+                params={'broadcast': len(nodes), 'polls': stats['polls'], 'fec': use_fec}
+            )
+        if ok:
+            GOODPUT_KIBPS.labels('tx').observe(goodput)
+
+        print(f"\n{'='*50}")
+        print(f"{'✓' if ok == len(nodes) else '✗'} DIFUSIÓN: {ok}/{len(nodes)} nodos completos")
+        print(f"{'='*50}")
+        print(f"Tiempo total: {total_time:.2f}s")
+        print(f"Tramas de datos: {sent} ({stats['data']} + {stats['repair']} reparadas) | "
+              f"Consultas: {stats['polls']} | Rondas: {stats['rounds']}")
+        print(f"Aire: {sent / (total_packets * len(nodes)):.0%} de las "
+              f"{total_packets * len(nodes)} tramas de {len(nodes)} envíos unicast")
+        failed = [str(node) for node in nodes if not results[node]]
+        if failed:
+            print(f"Nodos incompletos: {', '.join(failed)}")
+        print(f"{'='*50}\n")
+
+        ACTIVE.update(total_packets)
+        ACTIVE.end(ok == len(nodes))
+        led_controller.set_state(SystemState.COMPLETED if ok == len(nodes) else SystemState.ERROR)
+
+    except Exception as e:
+        TRANSFERS.labels('tx', 'error').inc()
+        record_transfer('tx', 'error', peer="difusión", file=file_path.name, error=str(e))
+        print(f"\n✗ Error en difusión: {e}")
+        import traceback
+        traceback.print_exc()
+        ACTIVE.end(False)
+        led_controller.set_state(SystemState.ERROR)
+
+    ok = sum(results.values())
+    return {'exitosos': ok, 'fallidos': len(nodes) - ok, 'total': len(nodes), 'nodos': results}
@@ -0,0 +1,81 @@
+"""
+Control adaptativo del tamaño de ráfaga y del pacing (AIMD)
+
+Las escrituras fallidas (MAX_RT: el receptor no dio auto-ACK, típicamente
+por FIFO RX llena o ruido) reducen la ráfaga a la mitad y agregan pausa
+entre tramas; cada ráfaga limpia la agranda en una trama y recorta la
+pausa. Si el receptor deja de cargar payloads de ACK, la ráfaga no crece:
+no está procesando al ritmo de llegada.
+"""
+
+from constants import (
+    BURST_SIZE, INTER_PACKET_DELAY, ACK_FIFO_DEPTH,
+    BURST_MIN, BURST_MAX, AIMD_INCREASE, AIMD_DECREASE,
+    PACING_STEP, PACING_MAX
+)
+
+
+class AIMDController:
+    """
+    Tamaño de ráfaga y pausa entre tramas ajustados por ráfaga.
+
+    Con adaptive=False mantiene los valores estáticos (BURST_SIZE,
+    INTER_PACKET_DELAY) y solo registra estadísticas.
+    """
+
+    def __init__(self, adaptive: bool = True, burst_size: int = BURST_SIZE,
+                 gap: float = INTER_PACKET_DELAY):
+        self.adaptive = adaptive
+        self.burst_size = burst_size
+        self.gap = gap
+        self.stats = {
+            'bursts': 0, 'increases': 0, 'decreases': 0, 'holds': 0,
+            'min_burst': burst_size, 'max_burst': burst_size,
+            'burst_total': 0, 'gap_total': 0.0,
+        }
+
+    def update(self, sent: int, failed: int, acks: int):
+        """
+        Ajusta los parámetros con el resultado de una ráfaga.
+
+        Args:
+            sent: Tramas confirmadas por el hardware
+            failed: Tramas que agotaron los reintentos
+            acks: Payloads de ACK leídos durante la ráfaga
+        """
+        self.stats['bursts'] += 1
+        self.stats['burst_total'] += self.burst_size
+        self.stats['gap_total'] += self.gap
+        if not self.adaptive:
+            return
+
+        if failed:
+            # Decremento multiplicativo
+            self.burst_size = max(BURST_MIN, int(self.burst_size * AIMD_DECREASE))
+            self.gap = min(PACING_MAX, max(self.gap * 2, PACING_STEP))
+            self.stats['decreases'] += 1
+        elif sent >= 2 * ACK_FIFO_DEPTH and not acks:
+            # Sin ACKs: el receptor va atrasado, no acelerar
+            self.stats['holds'] += 1
+        else:
+            # Incremento aditivo
+            self.burst_size = min(BURST_MAX, self.burst_size + AIMD_INCREASE)
+            self.gap = max(0.0, self.gap - PACING_STEP)
+            self.stats['increases'] += 1
+
+        self.stats['min_burst'] = min(self.stats['min_burst'], self.burst_size)
+        self.stats['max_burst'] = max(self.stats['max_burst'], self.burst_size)
+
+    def summary(self) -> str:
+        """Parámetros elegidos comparados con los estáticos"""
+        bursts = max(self.stats['bursts'], 1)
+        mode = "AIMD" if self.adaptive else "estático"
+        return (
+            f"Ráfaga ({mode}): final {self.burst_size}, promedio "
+            f"{self.stats['burst_total'] / bursts:.1f}, rango "
+            f"{self.stats['min_burst']}-{self.stats['max_burst']} "
+            f"(estático {BURST_SIZE}) | Pausa: final {self.gap * 1000:.2f} ms, promedio "
+            f"{self.stats['gap_total'] / bursts * 1000:.2f} ms "
+            f"(estático {INTER_PACKET_DELAY * 1000:.2f} ms) | "
+            f"+{self.stats['increases']} -{self.stats['decreases']} ={self.stats['holds']}"
+        )
@@ -0,0 +1,163 @@
+"""
+Selección automática de canal RF por escaneo de ruido
+
+Cada extremo mide la ocupación de los canales con el detector de potencia
+recibida (RPD: True si hay una señal > -64 dBm en el canal). El transmisor
+propone sus mejores canales al receptor en el canal de encuentro
+(RF_CHANNEL); el receptor combina la propuesta con su propio escaneo y
+responde con el elegido. Ambos cambian de canal y verifican el enlace; si
+falla, vuelven al canal anterior.
+"""
+
+import time
+from pyrf24 import RF24
+from constants import (
+    SCAN_CHANNELS, SCAN_SAMPLES, SCAN_DWELL, CHANNEL_CANDIDATES,
+    RESCAN_WINDOW, RESCAN_RETRY_THRESHOLD
+)
+
+# Una trama fallida agotó todos los reintentos del hardware (ARC máximo + 1)
+FAILED_WRITE_RETRIES = 16
+
+
+def survey_channels(radio: RF24, channels: tuple = SCAN_CHANNELS,
+                    samples: int = SCAN_SAMPLES, dwell: float = SCAN_DWELL) -> dict:
+    """
+    Mide la ocupación de cada canal con el RPD.
+
+    El radio queda en el canal y el modo (RX/TX) en que estaba.
+
+    Args:
+        radio: Objeto RF24 inicializado
+        channels: Canales a medir
+        samples: Lecturas de RPD por canal
+        dwell: Segundos de escucha antes de cada lectura
+
+    Returns:
+        dict: {canal: fracción de lecturas con portadora (0.0-1.0)}
+    """
+    previous_channel = radio.channel
+    was_listening = radio.listen
+    busy = {}
+    try:
+        for channel in channels:
+            radio.channel = channel
+            hits = 0
+            for _ in range(samples):
+                # RPD se latchea mientras el radio está en RX
+                radio.start_listening()
+                time.sleep(dwell)
+                radio.stop_listening()
+                if radio.rpd:
+                    hits += 1
+            busy[channel] = hits / samples
+    finally:
+        radio.channel = previous_channel
+        if was_listening:
+            radio.start_listening()
+    return busy
+
+
+def rank_channels(busy: dict) -> list:
+    """
+    Ordena los canales del más limpio al más ocupado.
+
+    A 2 Mbps la señal ocupa 2 MHz, así que un vecino ocupado también
+    penaliza al canal.
+
+    Returns:
+        list: [(canal, puntaje)] con puntaje creciente
+    """
+    scored = []
+    for channel, ratio in busy.items():
+        neighbors = max(busy.get(channel - 1, 0.0), busy.get(channel + 1, 0.0))
+        scored.append((channel, ratio + 0.5 * neighbors))
+    scored.sort(key=lambda item: item[1])
+    return scored
+
+
+def encode_candidates(ranked: list, exclude: int = None,
+                      count: int = CHANNEL_CANDIDATES) -> bytes:
+    """
+    Codifica los mejores canales para la trama CTRL_CHANNEL.
+
+    Args:
+        ranked: Salida de rank_channels
+        exclude: Canal a no proponer (el actual, si es el que falla)
+        count: Cantidad de candidatos
+
+    Returns:
+        bytes: Pares canal(1) + puntaje(1), puntaje en centésimas (máx 255)
+    """
+    payload = bytearray()
+    for channel, score in ranked:
+        if channel == exclude:
+            continue
+        payload += bytes([channel, min(255, int(score * 100))])
+        if len(payload) >= count * 2:
+            break
+    return bytes(payload)
+
+
+def decode_candidates(payload: bytes) -> list:
+    """Decodifica los pares (canal, puntaje) de una propuesta"""
+    return [
+        (payload[i], payload[i + 1] / 100)
+        for i in range(0, len(payload) - 1, 2)
+    ]
+
+
+def choose_channel(candidates: list, own_busy: dict) -> int:
+    """
+    Elige el canal con menor ruido combinado entre ambos extremos.
+
+    Args:
+        candidates: Propuesta del transmisor [(canal, puntaje)]
+        own_busy: Escaneo propio (survey_channels)
+
+    Returns:
+        int: Canal elegido, o None si no hay candidatos
+    """
+    if not candidates:
+        return None
+    own_scores = dict(rank_channels(own_busy)) if own_busy else {}
+    return min(candidates, key=lambda c: c[1] + own_scores.get(c[0], 0.0))[0]
+
+
+class RetransmitMonitor:
+    """
+    Promedio de reintentos de hardware por trama en ventanas fijas.
+
+    Cuando una ventana completa supera el umbral, el canal actual se
+    considera ruidoso y conviene escanear de nuevo.
+    """
+
+    def __init__(self, window: int = RESCAN_WINDOW,
+                 threshold: float = RESCAN_RETRY_THRESHOLD):
+        self.window = window
+        self.threshold = threshold
+        self.frames = 0
+        self.retries = 0
+        self.total_frames = 0
+        self.total_retries = 0
+        self.window_rate = 0.0
+
+    def record(self, retries: int, frames: int = 1):
+        """Registra los reintentos (ARC) de `frames` tramas"""
+        self.frames += frames
+        self.retries += retries
+        self.total_frames += frames
+        self.total_retries += retries
+
+    def should_rescan(self) -> bool:
+        """True si la ventana está completa y supera el umbral"""
+        if self.frames < self.window:
+            return False
+        self.window_rate = self.retries / self.frames
+        self.frames = 0
+        self.retries = 0
+        return self.window_rate > self.threshold
+
+    def average(self) -> float:
+        """Reintentos por trama desde el inicio de la transferencia"""
+        return self.total_retries / self.total_frames if self.total_frames else 0.0
@@ -0,0 +1,151 @@
+"""
+Checkpoints persistentes de recepción para reanudar transferencias
+
+Cada transferencia parcial se guarda en <dest_dir>/.parciales/<file_id>.part
+como un log de solo-anexado. Los registros se escriben en bloque cada
+CHECKPOINT_INTERVAL segundos, así que el costo es proporcional a los datos
+nuevos y un corte de energía solo puede truncar el último registro.
+
+Registros:
+    b'D' + seq(4) + len(1) + data   Chunk recibido
+    b'M' + compress_mode(1) + identidad(12)   Metadatos del archivo
+    b'L' + last_seq(4)              Secuencia del último paquete
+
+La identidad (hash de 4 bytes + tamaño del flujo + total de paquetes, del
+anuncio) distingue dos archivos cuyo file_id de 16 bits coincide: un
+checkpoint solo se reanuda si es la misma.
+"""
+
+import os
+import pathlib
+from constants import CHECKPOINT_DIRNAME, COMPRESS_NONE
+
+REC_DATA = b"D"
+REC_META = b"M"
+REC_LAST = b"L"
+IDENTITY_SIZE = 12
+NO_IDENTITY = bytes(IDENTITY_SIZE)   # Transferencia sin anuncio: nunca se reanuda
+
+
+def checkpoint_path(dest_dir: pathlib.Path, file_id: int) -> pathlib.Path:
+    """Ruta del checkpoint de una transferencia"""
+    return dest_dir / CHECKPOINT_DIRNAME / f"{file_id:05d}.part"
+
+
+def checkpoint_identity(id_hash: bytes, stream_size: int, total_packets: int) -> bytes:
+    """
+    Identidad de una transferencia para validar su checkpoint.
+
+    Args:
+        id_hash: Hash de 4 bytes del que se deriva el file_id
+        stream_size: Bytes del flujo transmitido (0 = desconocido)
+        total_packets: Paquetes de datos (0 = desconocido)
+
+    Returns:
+        bytes: 12 bytes, o NO_IDENTITY si falta algún dato
+    """
+    if id_hash is None or not stream_size or not total_packets:
+        return NO_IDENTITY
+    return bytes(id_hash[:4]) + int(stream_size).to_bytes(4, 'big') + int(total_packets).to_bytes(4, 'big')
+
+
+def load_checkpoint(dest_dir: pathlib.Path, file_id: int) -> dict:
+    """
+    Carga el estado guardado de una transferencia parcial.
+
+    Args:
+        dest_dir: Directorio de recepción
+        file_id: ID de la transferencia (derivado del hash del contenido)
+
+    Returns:
+        dict: {chunks, last_seq, compress_mode, identity} o None si no hay checkpoint
+    """
+    path = checkpoint_path(dest_dir, file_id)
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+    chunks = {}
+    last_seq = None
+    compress_mode = COMPRESS_NONE
+    identity = NO_IDENTITY
+    pos = 0
+
+    # Un registro incompleto al final (corte de energía) se descarta
+    while pos < len(raw):
+        kind = raw[pos:pos + 1]
+        if kind == REC_DATA:
+            if pos + 6 > len(raw):
+                break
+            seq = int.from_bytes(raw[pos + 1:pos + 5], 'big')
+            length = raw[pos + 5]
+            end = pos + 6 + length
+            if end > len(raw):
+                break
+            chunks[seq] = raw[pos + 6:end]
+            pos = end
+        elif kind == REC_META:
+            if pos + 2 + IDENTITY_SIZE > len(raw):
+                break
+            compress_mode = raw[pos + 1]
+            identity = raw[pos + 2:pos + 2 + IDENTITY_SIZE]
+            pos += 2 + IDENTITY_SIZE
+        elif kind == REC_LAST:
+            if pos + 5 > len(raw):
+                break
+            last_seq = int.from_bytes(raw[pos + 1:pos + 5], 'big')
+            pos += 5
+        else:
+            break
+
+    return {'chunks': chunks, 'last_seq': last_seq, 'compress_mode': compress_mode,
+            'identity': identity}
+
+
+def delete_checkpoint(dest_dir: pathlib.Path, file_id: int):
+    """Elimina el checkpoint de una transferencia ya completada"""
+    try:
+        checkpoint_path(dest_dir, file_id).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def prune_checkpoint_dir(dest_dir: pathlib.Path):
+    """Borra <dest_dir>/.parciales si quedó vacío (no deja rastros tras recibir)"""
+    try:
+        (dest_dir / CHECKPOINT_DIRNAME).rmdir()
+    except OSError:
+        pass   # Quedan otras transferencias, o ya no existe
+
+
+class CheckpointWriter:
+    """Acumula chunks nuevos y los anexa al checkpoint en bloque"""
+
+    def __init__(self, dest_dir: pathlib.Path, file_id: int, compress_mode: int,
+                 identity: bytes = NO_IDENTITY):
+        self.path = checkpoint_path(dest_dir, file_id)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer = bytearray()
+        if not self.path.exists():
+            self.buffer += REC_META + bytes([compress_mode]) + identity
+
+    def add_chunk(self, seq_id: int, data: bytes):
+        """Registra un chunk recibido (se escribe en el próximo flush)"""
+        self.buffer += REC_DATA + seq_id.to_bytes(4, 'big') + bytes([len(data)]) + data
+
+    def set_last(self, last_seq: int):
+        """Registra la secuencia del último paquete"""
+        self.buffer += REC_LAST + last_seq.to_bytes(4, 'big')
+
+    def flush(self):
+        """Anexa los registros pendientes y fuerza su escritura a disco"""
+        if not self.buffer:
+            return
+        # Otra recepción pudo borrar el directorio vacío al terminar
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(self.buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        self.buffer.clear()
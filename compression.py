@@ -1,53 +1,278 @@
 """
 Compresión y descompresión adaptativa de datos
+
+bz2 y lzma se importan al primer uso: la mayoría de los archivos no llega
+a los umbrales de tamaño y el daemon arranca sin cargarlos.
+
+Antes de comprimir se estima la entropía de una muestra: con datos ya
+comprimidos o cifrados (JPEG, zip, .bin) se elige COMPRESS_NONE sin
+gastar CPU en códecs que no van a ahorrar nada. El histograma usa NumPy
+si está instalado y Python puro si no.
+
+Con COMPRESS_COST_MODEL el códec y el nivel no salen del mejor ratio sino
+del menor tiempo total esperado (compresión + aire, ver cost_model): los
+candidatos se prueban sobre una muestra y el archivo se comprime una vez.
 """
 
+import math
 import time
 import zlib
-import bz2
-import lzma
-from constants import COMPRESS_NONE, COMPRESS_ZLIB, COMPRESS_BZ2, COMPRESS_LZMA
+from collections import Counter
+from importlib.util import find_spec
+from constants import (
+    COMPRESS_NONE, COMPRESS_ZLIB, COMPRESS_BZ2, COMPRESS_LZMA, COMPRESS_NAMES,
+    STREAM_OUTPUT_BLOCK, ENTROPY_PRECHECK, ENTROPY_SAMPLE_SIZE, ENTROPY_SAMPLE_SLICES,
+    ENTROPY_MIN_SIZE, ENTROPY_SKIP_BITS, ENTROPY_TRIAL_RATIO, COMPRESS_COST_MODEL, COST_CANDIDATES, DATA_BYTES
+)
+from metrics import COMPRESS_SKIPPED, COMPRESS_SAVED_SECONDS
+from cost_model import get_model, candidate_key
+
+NUMPY_AVAILABLE = find_spec("numpy") is not None
+
+# Niveles de la compresión adaptativa por ratio (y del pre-chequeo)
+DEFAULT_LEVELS = {COMPRESS_ZLIB: 6, COMPRESS_BZ2: 5, COMPRESS_LZMA: 3}
+
+# Pre-chequeo de entropía: acumulados y la última decisión (para el informe de TX)
+PRECHECK_STATS = {'checked': 0, 'skipped': 0, 'check_seconds': 0.0,
+                  'saved_seconds': 0.0, 'last': None}
+
+
+def compress_with(data: bytes, mode: int, level: int) -> bytes:
+    """
+    Comprime de una vez con un códec y nivel dados.
+    
+    Raises:
+        ValueError: Si el modo es desconocido
+    """
+    if mode == COMPRESS_NONE:
+        return data
+    elif mode == COMPRESS_ZLIB:
+        return zlib.compress(data, level=level)
+    elif mode == COMPRESS_BZ2:
+        import bz2
+        return bz2.compress(data, compresslevel=level)
+    elif mode == COMPRESS_LZMA:
+        import lzma
+        return lzma.compress(data, preset=level)
+    else:
+        raise ValueError(f"Modo de compresión desconocido: {mode}")
+
+
+def _codecs_for(size: int) -> list:
+    """Códecs que adaptive_compress probaría para un archivo de este tamaño"""
+    codecs = [COMPRESS_ZLIB]
+    if size > 5000:
+        codecs.append(COMPRESS_BZ2)
+    if size > 10000:
+        codecs.append(COMPRESS_LZMA)
+    return codecs
+
+
+def entropy_sample(data: bytes) -> bytes:
+    """Muestra de ENTROPY_SAMPLE_SIZE bytes repartida a lo largo de los datos"""
+    if len(data) <= ENTROPY_SAMPLE_SIZE:
+        return data
+    piece = ENTROPY_SAMPLE_SIZE // ENTROPY_SAMPLE_SLICES
+    step = (len(data) - piece) // (ENTROPY_SAMPLE_SLICES - 1)
+    return b"".join(data[i * step:i * step + piece] for i in range(ENTROPY_SAMPLE_SLICES))
+
+
+def byte_entropy(sample: bytes) -> float:
+    """
+    Entropía de Shannon de los bytes de la muestra.
+    
+    Returns:
+        float: Bits por byte (0 = constante, 8 = uniforme)
+    """
+    if not sample:
+        return 0.0
+    if NUMPY_AVAILABLE:
+        import numpy as np
+        counts = np.bincount(np.frombuffer(sample, dtype=np.uint8), minlength=256)
+        p = counts[counts > 0] / len(sample)
+        return float(-(p * np.log2(p)).sum())
+    total = len(sample)
+    return -sum(c / total * math.log2(c / total) for c in Counter(sample).values())
+
+
+def precheck_entropy(data: bytes) -> bool:
+    """
+    Decide si vale la pena intentar comprimir.
+    
+    La entropía de bytes no ve la redundancia entre bloques (bloques
+    aleatorios repetidos dan ~8 bits/byte y zlib los reduce a casi nada),
+    así que con entropía alta se prueba zlib nivel 1 sobre la misma
+    muestra y solo se omite la compresión si tampoco la achica.
+    
+    Registra la decisión en PRECHECK_STATS['last'] con la entropía, el
+    ratio de la prueba (None si no hizo falta), el costo del chequeo y el
+    tiempo de compresión ahorrado (estimado con la velocidad de los códecs
+    en esta CPU; en un nodo nuevo se calibra aquí, una sola vez).
+    
+    Returns:
+        bool: False si los datos son claramente incompresibles
+    """
+    PRECHECK_STATS['last'] = None
+    if not ENTROPY_PRECHECK or len(data) < ENTROPY_MIN_SIZE:
+        return True
+    
+    t0 = time.perf_counter()
+    sample = entropy_sample(data)
+    entropy = byte_entropy(sample)
+    trial_ratio = None
+    if entropy >= ENTROPY_SKIP_BITS:
+        trial_ratio = len(zlib.compress(sample, 1)) / len(sample)
+    check_seconds = time.perf_counter() - t0
+    skip = trial_ratio is not None and trial_ratio >= ENTROPY_TRIAL_RATIO
+    
+    saved = None
+    if skip:
+        # Lo que habría costado probar los códecs (velocidades del modelo de costo)
+        model = get_model()
+        model.ensure_calibrated()
+        known = [model.compress_seconds(m, DEFAULT_LEVELS[m], len(data))
+                 for m in _codecs_for(len(data))]
+        known = [seconds for seconds in known if seconds is not None]
+        if known:
+            saved = sum(known)
+    
+    PRECHECK_STATS['checked'] += 1
+    PRECHECK_STATS['check_seconds'] += check_seconds
+    PRECHECK_STATS['last'] = {'entropy': entropy, 'trial_ratio': trial_ratio, 'skipped': skip,
+                              'check_seconds': check_seconds, 'saved_seconds': saved}
+    if skip:
+        PRECHECK_STATS['skipped'] += 1
+        COMPRESS_SKIPPED.inc()
+        if saved:
+            PRECHECK_STATS['saved_seconds'] += saved
+            COMPRESS_SAVED_SECONDS.inc(saved)
+    return not skip
+
+
+def precheck_summary() -> str:
+    """Línea para las estadísticas de preparación, o None si no hubo chequeo"""
+    last = PRECHECK_STATS['last']
+    if last is None:
+        return None
+    line = f"Entropía: {last['entropy']:.2f} bits/byte"
+    if last['trial_ratio'] is not None:
+        line += f", prueba zlib {last['trial_ratio']:.0%}"
+    line += f" ({last['check_seconds'] * 1000:.1f} ms"
+    if not last['skipped']:
+        return line + ")"
+    saved = last['saved_seconds']
+    estimate = f"~{saved:.3f}s ahorrados" if saved else "ahorro sin estimar"
+    return line + f") → sin compresión, {estimate}"
 
 
-def adaptive_compress(data: bytes) -> tuple[bytes, int, float]:
+def adaptive_compress(data: bytes, chunk_size: int = DATA_BYTES) -> tuple[bytes, int, float]:
     """
-    Comprime datos usando el algoritmo que mejor ratio logre.
+    Comprime datos con el códec que termine antes la transferencia.
     
     Args:
         data: Datos a comprimir
+        chunk_size: Bytes de datos por paquete (para estimar el aire)
         
     Returns:
         tuple: (datos_comprimidos, modo_compresion, ratio)
     """
+    PRECHECK_STATS['last'] = None
+    
     # Para archivos pequeños, no vale la pena comprimir
     if len(data) < 512:
         return data, COMPRESS_NONE, 1.0
     
-    results = []
+    # Datos ya comprimidos o cifrados: ningún códec va a ahorrar
+    if not precheck_entropy(data):
+        print(f"  ○ Sin compresión (entropía {PRECHECK_STATS['last']['entropy']:.2f} bits/byte)")
+        return data, COMPRESS_NONE, 1.0
     
-    # Probar zlib (rápido, balanceado)
-    try:
-        t0 = time.time()
-        c = zlib.compress(data, level=6)
-        results.append((c, COMPRESS_ZLIB, len(c)/len(data), time.time()-t0, "zlib"))
-    except Exception:
-        pass
+    if COMPRESS_COST_MODEL:
+        return _cost_compress(data, chunk_size)
+    return _best_ratio_compress(data)
+
+
+def _sample_ratios(sample: bytes, total_size: int, chunk_size: int) -> dict:
+    """
+    Comprime la muestra con cada candidato que todavía pueda ganar.
     
-    # Probar bz2 (mejor compresión, más lento) - solo para archivos > 5KB
-    if len(data) > 5000:
+    Un candidato cuya compresión sola ya tarda más que enviar el archivo
+    sin comprimir no se prueba.
+    
+    Returns:
+        dict: {(modo, nivel): (ratio, datos comprimidos, segundos)}
+    """
+    model = get_model()
+    uncompressed = model.airtime(total_size, chunk_size)
+    trials = {}
+    for mode, level in COST_CANDIDATES:
+        estimate = model.compress_seconds(mode, level, total_size)
+        if estimate is not None and estimate >= uncompressed:
+            continue
         try:
-            t0 = time.time()
-            c = bz2.compress(data, compresslevel=5)
-            results.append((c, COMPRESS_BZ2, len(c)/len(data), time.time()-t0, "bz2"))
+            t0 = time.perf_counter()
+            c = compress_with(sample, mode, level)
+            elapsed = time.perf_counter() - t0
+            model.record_compression(mode, level, len(sample), elapsed)
+            trials[(mode, level)] = (len(c) / len(sample), c, elapsed)
         except Exception:
             pass
+    return trials
+
+
+def _describe_choice(choice: tuple, estimates: dict, overlap: bool = False) -> str:
+    """'lzma:3 (est. 0.120s CPU + 1.300s aire; sin comprimir 4.000s)'"""
+    cpu, air = estimates[choice]
+    name = candidate_key(*choice) if choice[0] != COMPRESS_NONE else "none"
+    join = "‖" if overlap else "+"
+    return (f"{name} (est. {cpu:.3f}s CPU {join} {air:.3f}s aire; "
+            f"sin comprimir {estimates[(COMPRESS_NONE, 0)][1]:.3f}s)")
+
+
+def _cost_compress(data: bytes, chunk_size: int) -> tuple[bytes, int, float]:
+    """Elige códec y nivel con el modelo de costo y comprime el archivo una vez"""
+    model = get_model()
+    model.ensure_calibrated()
+    
+    sample = entropy_sample(data)
+    trials = _sample_ratios(sample, len(data), chunk_size)
+    choice, estimates = model.choose(
+        {key: trial[0] for key, trial in trials.items()}, len(data), chunk_size
+    )
+    if choice[0] == COMPRESS_NONE:
+        print(f"  ○ Sin compresión: {_describe_choice(choice, estimates)}")
+        return data, COMPRESS_NONE, 1.0
+    
+    mode, level = choice
+    if sample is data:
+        _, compressed, elapsed = trials[choice]   # La muestra era el archivo entero
+    else:
+        t0 = time.perf_counter()
+        compressed = compress_with(data, mode, level)
+        elapsed = time.perf_counter() - t0
+        model.record_compression(mode, level, len(data), elapsed)
+    
+    ratio = len(compressed) / len(data)
+    if ratio >= 1.0:
+        print(f"  ○ Sin compresión ({candidate_key(mode, level)} no redujo el tamaño)")
+        return data, COMPRESS_NONE, 1.0
+    print(f"  ✓ Compresión: {_describe_choice(choice, estimates)}")
+    print(f"    {len(data)} → {len(compressed)} bytes (ratio: {ratio:.2%}, tiempo: {elapsed:.3f}s)")
+    return compressed, mode, ratio
+
+
+def _best_ratio_compress(data: bytes) -> tuple[bytes, int, float]:
+    """Prueba los códecs sobre el archivo entero y se queda con el mejor ratio"""
+    model = get_model()
+    results = []
     
-    # Probar lzma (excelente compresión, muy lento) - solo para archivos > 10KB
-    if len(data) > 10000:
+    for mode in _codecs_for(len(data)):
         try:
             t0 = time.time()
-            c = lzma.compress(data, preset=3)
-            results.append((c, COMPRESS_LZMA, len(c)/len(data), time.time()-t0, "lzma"))
+            c = compress_with(data, mode, DEFAULT_LEVELS[mode])
+            elapsed = time.time() - t0
+            model.record_compression(mode, DEFAULT_LEVELS[mode], len(data), elapsed)
+            results.append((c, mode, len(c)/len(data), elapsed, COMPRESS_NAMES[mode]))
         except Exception:
             pass
     
@@ -86,8 +311,183 @@ def adaptive_decompress(data: bytes, mode: int) -> bytes:
     elif mode == COMPRESS_ZLIB:
         return zlib.decompress(data)
     elif mode == COMPRESS_BZ2:
+        import bz2
         return bz2.decompress(data)
     elif mode == COMPRESS_LZMA:
+        import lzma
         return lzma.decompress(data)
     else:
-        raise ValueError(f"Modo de compresión desconocido: {mode}")
\ No newline at end of file
+        raise ValueError(f"Modo de compresión desconocido: {mode}")
+
+
+def select_codec(sample: bytes, total_size: int, chunk_size: int = DATA_BYTES) -> tuple:
+    """
+    Elige códec y nivel para compresión en streaming a partir de una muestra.
+    
+    Con el modelo de costo la compresión se superpone con el aire, así que
+    cuenta el mayor de los dos; sin él se aplican los mismos umbrales y el
+    mismo ahorro mínimo (10%) que adaptive_compress.
+    
+    Args:
+        sample: Primeros bytes del archivo
+        total_size: Tamaño total del archivo
+        chunk_size: Bytes de datos por paquete
+        
+    Returns:
+        tuple: (modo COMPRESS_*, nivel)
+    """
+    if total_size < 512 or not sample:
+        return COMPRESS_NONE, 0
+    
+    if COMPRESS_COST_MODEL:
+        model = get_model()
+        model.ensure_calibrated()
+        trials = _sample_ratios(sample, total_size, chunk_size)
+        choice, estimates = model.choose(
+            {key: trial[0] for key, trial in trials.items()}, total_size, chunk_size,
+            overlap=True
+        )
+        mark = "✓ Compresión en streaming" if choice[0] != COMPRESS_NONE else "○ Sin compresión"
+        print(f"  {mark}: {_describe_choice(choice, estimates, overlap=True)}")
+        return choice
+    
+    results = []
+    for mode in _codecs_for(total_size):
+        try:
+            size = len(compress_with(sample, mode, DEFAULT_LEVELS[mode]))
+            results.append((size / len(sample), mode))
+        except Exception:
+            pass
+    
+    ratio, mode = min(results, default=(1.0, COMPRESS_NONE))
+    if ratio < 0.90:
+        print(f"  ✓ Compresión en streaming: {COMPRESS_NAMES[mode]} "
+              f"(ratio en muestra de {len(sample)} bytes: {ratio:.2%})")
+        return mode, DEFAULT_LEVELS[mode]
+    print(f"  ○ Sin compresión (mejor ratio en muestra: {ratio:.2%})")
+    return COMPRESS_NONE, 0
+
+
+class StreamCompressor:
+    """
+    Compresión incremental con el códec ya elegido.
+    
+    Produce el mismo formato que compress_with, así el receptor no
+    distingue un flujo comprimido de una sola vez.
+    """
+    
+    def __init__(self, mode: int, level: int = None):
+        """
+        Args:
+            mode: Modo de compresión (COMPRESS_*)
+            level: Nivel del códec (None = DEFAULT_LEVELS)
+            
+        Raises:
+            ValueError: Si el modo es desconocido
+        """
+        self.mode = mode
+        if level is None:
+            level = DEFAULT_LEVELS.get(mode, 0)
+        if mode == COMPRESS_NONE:
+            self._codec = None
+        elif mode == COMPRESS_ZLIB:
+            self._codec = zlib.compressobj(level)
+        elif mode == COMPRESS_BZ2:
+            import bz2
+            self._codec = bz2.BZ2Compressor(level)
+        elif mode == COMPRESS_LZMA:
+            import lzma
+            self._codec = lzma.LZMACompressor(preset=level)
+        else:
+            raise ValueError(f"Modo de compresión desconocido: {mode}")
+    
+    def compress(self, data: bytes) -> bytes:
+        """Comprime un bloque; puede devolver b"" si el códec acumula"""
+        return data if self._codec is None else self._codec.compress(data)
+    
+    def flush(self) -> bytes:
+        """Cierra el flujo y devuelve lo que el códec tenía acumulado"""
+        return b"" if self._codec is None else self._codec.flush()
+
+
+class StreamDecompressor:
+    """
+    Descompresión incremental con salida acotada.
+    
+    feed() y finish() devuelven bloques de a lo sumo STREAM_OUTPUT_BLOCK
+    bytes, así un flujo muy compresible no se expande entero en memoria.
+    """
+    
+    def __init__(self, mode: int):
+        """
+        Args:
+            mode: Modo de compresión (COMPRESS_*)
+            
+        Raises:
+            ValueError: Si el modo es desconocido
+        """
+        self.mode = mode
+        if mode == COMPRESS_NONE:
+            self._codec = None
+        elif mode == COMPRESS_ZLIB:
+            self._codec = zlib.decompressobj()
+        elif mode == COMPRESS_BZ2:
+            import bz2
+            self._codec = bz2.BZ2Decompressor()
+        elif mode == COMPRESS_LZMA:
+            import lzma
+            self._codec = lzma.LZMADecompressor()
+        else:
+            raise ValueError(f"Modo de compresión desconocido: {mode}")
+    
+    def feed(self, data: bytes):
+        """Entrega datos comprimidos; genera los bloques descomprimidos"""
+        codec = self._codec
+        if codec is None:
+            if data:
+                yield data
+            return
+        if self.mode == COMPRESS_ZLIB:
+            block = codec.decompress(data, STREAM_OUTPUT_BLOCK)
+            while True:
+                if block:
+                    yield block
+                if not codec.unconsumed_tail:
+                    return
+                block = codec.decompress(codec.unconsumed_tail, STREAM_OUTPUT_BLOCK)
+        else:
+            block = codec.decompress(data, max_length=STREAM_OUTPUT_BLOCK)
+            while True:
+                if block:
+                    yield block
+                if codec.eof or codec.needs_input:
+                    return
+                block = codec.decompress(b"", max_length=STREAM_OUTPUT_BLOCK)
+    
+    def finish(self):
+        """
+        Vacía el códec; genera los últimos bloques.
+        
+        Raises:
+            EOFError: Si el flujo comprimido quedó truncado
+        """
+        codec = self._codec
+        if codec is None:
+            return
+        if self.mode == COMPRESS_ZLIB:
+            tail = codec.flush()
+            if tail:
+                yield tail
+        if not codec.eof:
+            raise EOFError("flujo comprimido incompleto")
+
+
+def warm_up():
+    """
+    Importa bz2 y lzma por adelantado y calibra el modelo de costo si hace
+    falta (hilo de precarga del daemon), así la primera TX no lo paga.
+    """
+    import bz2
+    import lzma
+    if COMPRESS_COST_MODEL:
+        get_model().ensure_calibrated()
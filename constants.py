@@ -2,6 +2,7 @@
 Constantes y configuración del sistema de transferencia nRF24L01+
 """
 
+import os
 from pyrf24 import RF24_DRIVER
 
 # ============= GPIO PINES =============
@@ -9,6 +10,7 @@ BUTTON_PIN = 17
 LED_GREEN = 23
 LED_YELLOW = 24
 LED_RED = 25
+RESULT_DISPLAY_TIME = 3.0   # Segundos que los LEDs muestran el resultado antes de volver a Idle
 
 # ============= nRF24L01+ CONFIGURACIÓN =============
 CSN_PIN = 0
@@ -25,9 +27,16 @@ else:
 ADDR_A = b"\xE7\xE7\xE7\xE7\xE7"
 ADDR_B = b"\xD7\xD7\xD7\xD7\xD7"
 
+RF_CHANNEL = 90                # Canal por defecto y de encuentro (evita WiFi)
+HW_RETRY_DELAY = 5             # Auto-retransmit delay: (n + 1) * 250 µs
+HW_RETRY_COUNT = 15            # Auto-retransmit count (máximo del hardware)
+
 # ============= PARÁMETROS DE TRAMA =============
 FRAME_SIZE = 32                # Límite duro de nRF24L01+
 HEADER_SIZE = 6                # file_id(2) + seq_id(2) + len(1) + flags(1)
+LEN_MASK = 0x1F                # data_len ocupa 5 bits (máx 26)
+SEQ_HIGH_SHIFT = 5             # Los 3 bits altos de len/flags de ACK extienden seq_id
+MAX_SEQ_PACKETS = 1 << 19      # Paquetes por transferencia (~11.5 MB con FEC)
 
 # Sin FEC: 6 + 26 = 32
 DATA_BYTES = 26
@@ -43,25 +52,181 @@ ACK_TIMEOUT = 1.5
 MAX_ROUNDS = 20
 BURST_SIZE = 15
 INTER_PACKET_DELAY = 0  # Optimizado: 0ms (hardware buffers manejan el flujo)
+TX_FAST_MODE = False    # Streaming con write_fast() manteniendo llena la FIFO TX
+TX_FIFO_DEPTH = 3       # Niveles de la FIFO TX del nRF24L01+
+TX_ADAPTIVE_BURST = True  # Ajustar ráfaga y pausa en tiempo de ejecución (burst_control)
+BURST_MIN = 4             # Límites del control AIMD
+BURST_MAX = 64
+AIMD_INCREASE = 1         # Tramas que se suman tras una ráfaga sin fallos
+AIMD_DECREASE = 0.5       # Factor de la ráfaga tras un fallo de escritura
+PACING_STEP = 0.0002      # Segundos de pausa entre tramas que se suman/restan
+PACING_MAX = 0.005        # Pausa máxima entre tramas
 
 # ============= RX TIEMPOS =============
 GLOBAL_TIMEOUT = 120  # 2 minutos para dar tiempo de configurar ambas Pis
 IDLE_TIMEOUT = 10     # 10 segundos entre paquetes antes de rendirse
+STALL_TIMEOUT = 120   # Sin tramas antes de la última: el transmisor abandonó (no limita la duración)
+RX_SESSION_IDLE = 30  # Sesión RX: segundos sin transmisiones tras un archivo antes de terminar
+RX_POLL_INTERVAL = 0.0002  # Espera del hilo de radio cuando la FIFO RX está vacía
+FINALIZE_WORKERS = 1       # Hilos que descomprimen, verifican y escriben en segundo plano
+FINALIZE_QUEUE_SIZE = 2    # Archivos esperando finalización (acota la memoria)
+
+# ============= REANUDACIÓN =============
+CHECKPOINT_DIRNAME = ".parciales"  # Subdirectorio de recepción con transferencias parciales
+CHECKPOINT_INTERVAL = 2.0          # Segundos entre escrituras del checkpoint
+ACK_BITMAP_BYTES = 8               # Bitmap selectivo tras el primer faltante (64 secuencias)
 
 # ============= FLAGS =============
 FLAG_LAST = 0x01
 FLAG_COMPRESSED = 0x02
+FLAG_CONTROL = 0x04    # Trama de control: nibble alto = tipo, seq_id = índice
 FLAG_FEC = 0x08
 
+# ============= TRAMAS DE CONTROL =============
+CTRL_DELTA_REQ = 1     # Solicitar firmas de la versión previa (name_key + block_size)
+CTRL_SIG_REQ = 2       # Solicitar el grupo de firmas número `índice`
+CTRL_TRAILER = 3       # Hash del flujo y del archivo + tamaños, al final de los datos
+CTRL_ANNOUNCE = 4      # Metadatos de la transferencia, antes de los datos
+CTRL_NAME = 5          # Fragmento `índice` del nombre del archivo
+CTRL_CHANNEL = 6       # Propuesta de canales (vacío = confirmación en el canal nuevo)
+CTRL_TUNE = 7          # Sesión de auto-ajuste del enlace (link_tuner)
+CTRL_POLL = 8          # Difusión: pedir a un nodo sus faltantes desde una secuencia
+CTRL_MANIFEST = 9      # Sincronización: índice 0 = cantidad de entradas, n = grupo n-1
+CTRL_DELETE = 10       # Sincronización: borrar un archivo (name_key + hash)
+CTRL_SYNC_END = 11     # Sincronización terminada sin archivos que enviar
+CTRL_PEER = 12         # Nombre de estación del transmisor; responde el del receptor
+CTRL_RESUME = 13       # Reanudación: grupo `índice` del mapa de paquetes ya recibidos
+ACK_CONTROL = 0xFFFD   # missing_seq de un ACK que responde a una trama de control
+CONTROL_ATTEMPTS = 10  # Escrituras máximas esperando la respuesta de control
+ANNOUNCE_ATTEMPTS = 50 # Escrituras máximas del anuncio antes de enviar sin él
+NAME_CHUNK_BYTES = 20  # Bytes del nombre por trama CTRL_NAME
+RESUME_BITMAP_BYTES = 24  # Mapa de recibidos por respuesta CTRL_RESUME (192 secuencias)
+MAX_NAME_BYTES = 255   # Longitud máxima del nombre (UTF-8)
+
+# ============= FLAGS DE ACK =============
+ACK_COMPLETE = 0x01       # Todos los paquetes recibidos
+ACK_VERIFIED = 0x02       # Hash del flujo verificado contra el trailer
+ACK_VERIFY_FAILED = 0x04  # Hash incorrecto: el receptor descartó los datos
+ACK_FLAGS_MASK = 0x1F     # Bits 5-7: bits altos de missing_seq
+MAX_VERIFY_RETRIES = 2    # Reenvíos completos ante un hash incorrecto
+VERIFY_ATTEMPTS = 50      # Escrituras del trailer esperando el resultado de la verificación
+VERIFY_INTERVAL = 0.01    # Espera entre escrituras: el ACK publicado llega una trama después
+FINAL_ACK_LINGER = 1.0    # Segundos que el receptor espera para entregar el ACK final
+ACK_FIFO_DEPTH = 3        # Payloads de ACK en cola en el receptor
+
+# ============= DIFUSIÓN =============
+NODE_ID = None                # ID de este receptor en difusiones (1-254; None = no participa)
+NODE_PIPE = 2                 # Pipe con la dirección propia del nodo (reparaciones)
+BROADCAST_REPEATS = 3         # Envíos sin ACK del anuncio y el nombre
+BROADCAST_GAP = 0.0           # Pausa entre tramas difundidas (receptores lentos pierden menos)
+POLL_BITMAP_BYTES = 20        # Faltantes por respuesta tras el primero (160 secuencias)
+POLL_ATTEMPTS = 100           # Escrituras de una consulta antes de dar el nodo por ausente
+POLL_INTERVAL = 0.005         # Pausa entre escrituras (el nodo puede estar procesando la ráfaga)
+POLL_MISSED_ROUNDS = 3        # Rondas seguidas sin respuesta antes de abandonar un nodo
+POLL_ANNOUNCED = 0x01         # Estado del nodo: recibió el anuncio
+POLL_VERIFIED = 0x02          # Estado del nodo: archivo completo y verificado
+
+# ============= DELTA =============
+TX_DELTA_MODE = False         # Enviar solo diferencias respecto a la versión del receptor
+DELTA_BLOCK_SIZE = 256        # Bytes por bloque firmado
+DELTA_BASE_DIRNAME = ".base"  # Subdirectorio de recepción con las versiones previas
+SIGS_PER_ACK = 3              # Firmas de 8 bytes por ACK de control
+
+# ============= SINCRONIZACIÓN =============
+TX_SYNC_MODE = False          # TX-MULTI envía solo lo que el receptor no tiene igual
+SYNC_DELETE = False           # Borrar en el receptor lo que ya no está en el directorio
+MANIFEST_ENTRIES_PER_ACK = 3  # Entradas de 8 bytes por ACK de control
+MANIFEST_ATTEMPTS = 300       # Escrituras esperando el manifiesto (el receptor hashea sus archivos)
+MANIFEST_INTERVAL = 0.01      # Pausa entre esas escrituras
+ANNOUNCE_REPLACE = 0x01       # Flag del anuncio: reemplazar el archivo del mismo nombre
+ANNOUNCE_OPEN = 0x02          # Flag del anuncio: total desconocido, el final lo marca FLAG_LAST
+RX_SYNC_PATTERN = "*.txt"     # Archivos que el receptor expone en su manifiesto (y puede borrar)
+RX_SYNC_ALLOW_DELETE = False  # El receptor acepta CTRL_DELETE (si no, los ignora)
+
+# ============= SELECCIÓN DE CANAL =============
+AUTO_CHANNEL = False          # Negociar el canal menos ruidoso antes de transmitir
+SCAN_CHANNELS = tuple(range(0, 126))
+SCAN_SAMPLES = 10             # Lecturas de RPD por canal
+SCAN_DWELL = 0.0002           # Segundos entre lecturas (RPD necesita ~170 µs en RX)
+CHANNEL_CANDIDATES = 8        # Canales propuestos al receptor
+SWITCH_QUIET = 0.05           # Silencio que espera el receptor antes de cambiar de canal
+RENDEZVOUS_TIMEOUT = 1.0      # Sin tramas en el canal nuevo: volver al anterior
+RESCAN_WINDOW = 100           # Tramas por ventana de medición de reintentos
+RESCAN_RETRY_THRESHOLD = 3.0  # Reintentos promedio por trama que disparan un nuevo escaneo
+
+# ============= ESTADO =============
+# Archivos que el sistema genera al correr (perfiles, historial...): fuera del
+# checkout, en NRF24_STATE_DIR o en $XDG_STATE_HOME/nrf24 (~/.local/state/nrf24)
+STATE_DIR = os.environ.get("NRF24_STATE_DIR") or os.path.join(
+    os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "nrf24"
+)
+
+# ============= AUTO-AJUSTE DEL ENLACE =============
+LINK_PROFILES_FILE = "link_profiles.json"  # Perfiles por dirección, en STATE_DIR
+TUNE_DATA_RATES = ("2M", "1M")
+TUNE_PA_LEVELS = ("MIN", "LOW", "HIGH", "MAX")
+TUNE_RETRY_OPTIONS = ((1, 15), (3, 15), (5, 15), (5, 5), (10, 15))  # (delay, count)
+TUNE_PROBE_FRAMES = 200       # Tramas por combinación probada
+TUNE_ABORT_FAILURES = 10      # Fallos consecutivos que descartan una combinación
+TUNE_TOLERANCE = 0.05         # Goodput relativo dentro del cual se prefiere menos potencia
+
+# ============= SPOOL =============
+SPOOL_DIR = "spool"           # Directorio vigilado por el daemon, en STATE_DIR (None = deshabilitado)
+SPOOL_DONE_DIR = "enviados"   # Subdirectorio adonde se mueven los archivos enviados
+SPOOL_SETTLE = 0.5            # Segundos sin escrituras para dar un archivo por terminado
+SPOOL_POLL_INTERVAL = 1.0     # Intervalo de escaneo cuando no hay inotify
+SPOOL_RETRY_DELAY = 30.0      # Espera antes de reintentar un envío fallido
+
+# ============= API DE CONTROL =============
+CONTROL_SOCKET = "nrf24.sock"  # Socket Unix del daemon, en STATE_DIR (None = deshabilitado)
+CONTROL_SOCKET_MODE = 0o660    # Permisos: dueño y grupo pueden encolar transferencias
+
+# ============= HISTORIAL =============
+HISTORY_DB = "historial.db"   # SQLite con cada transferencia, en STATE_DIR (None = deshabilitado)
+HISTORY_QUEUE_SIZE = 256      # Filas en espera de escritura antes de descartar
+STATION_NAME = None           # Nombre de este equipo en el historial del otro extremo (None = hostname)
+STATION_NAME_BYTES = 20       # Longitud máxima del nombre intercambiado (UTF-8)
+
+# ============= TELEMETRÍA =============
+TELEMETRY_CAPACITY = 65536    # Tramas del buffer circular por trama (~27 bytes c/u; ver telemetry.py)
+
+# ============= MÉTRICAS =============
+METRICS_PORT = 9124           # Puerto HTTP de /metrics en el daemon (0 = deshabilitado)
+METRICS_ADDR = "127.0.0.1"    # Interfaz donde escuchar
+METRICS_TEXTFILE = None       # Ruta .prom para el textfile collector de node-exporter
+
 # ============= COMPRESIÓN =============
 COMPRESS_NONE = 0
 COMPRESS_ZLIB = 1
 COMPRESS_BZ2 = 2
 COMPRESS_LZMA = 3
+COMPRESS_DELTA = 0x08      # Bit del modo: el flujo es un delta (delta_sync)
+COMPRESS_CODEC_MASK = 0x07
+ENTROPY_PRECHECK = True    # Estimar la entropía de una muestra antes de comprimir
+ENTROPY_SAMPLE_SIZE = 64 * 1024  # Bytes muestreados (repartidos en ENTROPY_SAMPLE_SLICES tramos)
+ENTROPY_SAMPLE_SLICES = 4
+ENTROPY_MIN_SIZE = 8 * 1024      # Por debajo la muestra es chica para estimar (y comprimir es barato)
+ENTROPY_SKIP_BITS = 7.95   # Bits/byte desde los cuales no se intenta comprimir
+ENTROPY_TRIAL_RATIO = 0.97 # Con entropía alta, zlib nivel 1 sobre la muestra debe ahorrar más que esto
+TX_STREAM_MODE = False     # Comprimir en un hilo mientras la radio ya transmite
+TX_STREAM_MIN_SIZE = 64 * 1024   # Archivos menores se comprimen enteros antes de enviar
+STREAM_SAMPLE_SIZE = 64 * 1024   # Muestra con la que se elige el códec en modo streaming
+STREAM_INPUT_BLOCK = 16 * 1024   # Bytes del archivo por llamada al compresor
+STREAM_WAIT = 0.05         # Espera máxima por chunks nuevos antes de volver a leer ACKs
+RX_STREAM_DECOMPRESS = True  # Descomprimir el prefijo contiguo mientras se recibe
+STREAM_OUTPUT_BLOCK = 64 * 1024  # Máximo de bytes descomprimidos por llamada (acota la memoria)
 
 COMPRESS_NAMES = {
     0: "none",
     1: "zlib",
     2: "bz2",
     3: "lzma"
-}
\ No newline at end of file
+}
+# ============= MODELO DE COSTO DE COMPRESIÓN =============
+COMPRESS_COST_MODEL = True    # Elegir códec/nivel por tiempo total esperado (False = mejor ratio)
+CODEC_PROFILE_FILE = "codec_profile.json"  # Velocidades calibradas y enlace medido, en STATE_DIR
+COST_CANDIDATES = ((1, 1), (1, 6), (1, 9), (2, 5), (3, 0), (3, 3))  # (COMPRESS_*, nivel)
+COST_CALIBRATION_SIZE = 128 * 1024  # Bytes del texto sintético de calibración
+COST_MIN_RECORD_SIZE = 16 * 1024    # Compresiones menores no actualizan la velocidad (mucho ruido)
+COST_PACKET_SECONDS = 0.0008  # Segundos por paquete hasta medir el enlace (~32 KiB/s)
+COST_EWMA_ALPHA = 0.3         # Peso de cada medición nueva
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+API de control local del daemon (socket Unix)
+
+El daemon atiende pedidos JSON, uno por línea, en CONTROL_SOCKET; cada
+respuesta también es una línea JSON con 'ok'. Así otros procesos de la
+Pi comparten la radio sin reiniciar el daemon ni tocar el botón:
+
+    {"cmd": "send", "path": "/abs/archivo", "priority": "alta"}
+    {"cmd": "rx"}
+    {"cmd": "status"}
+    {"cmd": "cancel", "id": 3}        # sin id: la transferencia en curso
+    {"cmd": "wait", "id": 3, "timeout": 60}
+
+Un directorio se encola como un trabajo por archivo (orden alfabético).
+
+Cliente de línea de comandos:
+    python3 control.py send informe.pdf --priority alta --wait
+    python3 control.py send ./lote/
+    python3 control.py rx
+    python3 control.py status --watch
+    python3 control.py cancel [ID]
+"""
+
+import os
+import sys
+import json
+import time
+import pathlib
+import threading
+
+from dispatcher import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from progress import ACTIVE
+from constants import STATE_DIR, CONTROL_SOCKET, CONTROL_SOCKET_MODE
+
+DEFAULT_SOCKET = pathlib.Path(STATE_DIR) / (CONTROL_SOCKET or "nrf24.sock")
+PRIORITY_NAMES = {"alta": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "baja": PRIORITY_LOW}
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class ControlServer:
+    """
+    Servidor del socket de control.
+
+    Args:
+        path: Ruta del socket Unix
+        dispatcher: Cola de trabajos del daemon; 'send' recibe
+                    job.params['path'] y 'rx' no lleva parámetros
+        log: Función de log
+    """
+
+    def __init__(self, path: pathlib.Path, dispatcher, log=print):
+        self.path = pathlib.Path(path)
+        self.dispatcher = dispatcher
+        self.log = log
+        self._server = None
+
+    def start(self):
+        """Crea el socket (reemplaza uno viejo) y atiende en un hilo propio"""
+        import socketserver
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if len(line) > MAX_REQUEST_BYTES:
+                        response = {'ok': False, 'error': "pedido demasiado grande"}
+                    else:
+                        response = server.handle_line(line)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.is_socket():
+            self.path.unlink()
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.path), Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.path, CONTROL_SOCKET_MODE)
+        threading.Thread(target=self._server.serve_forever, name="control", daemon=True).start()
+        self.log(f"✓ API de control en {self.path}")
+
+    def stop(self):
+        """Cierra el socket"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def handle_line(self, line: bytes) -> dict:
+        """Decodifica un pedido, lo ejecuta y arma la respuesta"""
+        try:
+            request = json.loads(line)
+            command = getattr(self, f"cmd_{request.get('cmd')}", None)
+            if command is None:
+                return {'ok': False, 'error': f"comando desconocido: {request.get('cmd')}"}
+            return command(request)
+        except KeyError as e:
+            return {'ok': False, 'error': f"falta el campo {e}"}
+        except (ValueError, TypeError, AttributeError) as e:
+            return {'ok': False, 'error': str(e)}
+
+    def cmd_send(self, request: dict) -> dict:
+        path = pathlib.Path(request['path'])
+        if not path.is_absolute():
+            return {'ok': False, 'error': "la ruta debe ser absoluta"}
+        priority = request.get('priority', PRIORITY_NORMAL)
+        priority = PRIORITY_NAMES.get(priority, priority)
+        if path.is_dir():
+            files = sorted(p for p in path.iterdir() if p.is_file() and not p.name.startswith("."))
+        elif path.is_file():
+            files = [path]
+        else:
+            return {'ok': False, 'error': f"no existe: {path}"}
+        jobs = [self.dispatcher.submit('send', priority=int(priority), source="api", path=f)
+                for f in files]
+        return {'ok': True, 'jobs': [job.describe() for job in jobs]}
+
+    def cmd_rx(self, request: dict) -> dict:
+        job = self.dispatcher.submit('rx', priority=int(request.get('priority', PRIORITY_NORMAL)),
+                                     source="api")
+        return {'ok': True, 'jobs': [job.describe()]}
+
+    def cmd_status(self, request: dict) -> dict:
+        current = self.dispatcher.current
+        return {
+            'ok': True,
+            'current': current.describe() if current else None,
+            'progress': ACTIVE.snapshot(),
+            'queue': [job.describe() for job in self.dispatcher.pending()],
+            'recent': [job.describe() for job in self.dispatcher.history()[-10:]],
+        }
+
+    def cmd_cancel(self, request: dict) -> dict:
+        job_id = request.get('id')
+        current = self.dispatcher.current
+        if job_id is None or (current is not None and current.id == job_id):
+            if current is None:
+                return {'ok': False, 'error': "no hay ningún trabajo en curso"}
+            if not ACTIVE.request_cancel():
+                return {'ok': False, 'error': "el trabajo en curso no se puede cancelar"}
+            self.log(f"⏹ Cancelación pedida para el trabajo #{current.id}")
+            return {'ok': True, 'cancelled': current.id}
+        if self.dispatcher.cancel(int(job_id)):
+            self.log(f"⏹ Trabajo #{job_id} quitado de la cola")
+            return {'ok': True, 'cancelled': job_id}
+        return {'ok': False, 'error': f"el trabajo #{job_id} no está en cola"}
+
+    def cmd_wait(self, request: dict) -> dict:
+        job = self.dispatcher.get(int(request['id']))
+        if job is None:
+            return {'ok': False, 'error': f"trabajo desconocido: #{request['id']}"}
+        job.done.wait(request.get('timeout'))
+        return {'ok': True, 'job': job.describe()}
+
+
+class ControlClient:
+    """Conexión al socket de control; un pedido por llamada a request()"""
+
+    def __init__(self, path: pathlib.Path = DEFAULT_SOCKET):
+        import socket
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(path))
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, cmd: str, **fields) -> dict:
+        self.file.write(json.dumps({'cmd': cmd, **fields}).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("el daemon cerró la conexión")
+        return json.loads(line)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def format_progress(progress: dict) -> str:
+    """Una línea de progreso: '📊 TX informe.pdf 45.0% | 120/267 | 12.3 KiB/s | ETA 10 s'"""
+    total = progress['total'] if progress['total'] is not None else "?"
+    percent = f"{progress['percent']:.1f}% | " if progress['percent'] is not None else ""
+    eta = f" | ETA {progress['eta']:.0f} s" if progress['eta'] is not None else ""
+    return (f"📊 {(progress['direction'] or '').upper()} {progress['name'] or '(sin nombre)'} "
+            f"[{progress['state']}] {percent}{progress['packets']}/{total} | "
+            f"{progress['goodput_kibs']:.1f} KiB/s{eta}")
+
+
+def print_status(status: dict):
+    current = status['current']
+    if current:
+        print(f"▶ #{current['id']} {current['kind']} ({current['source']})")
+        print(f"  {format_progress(status['progress'])}")
+    else:
+        print("💤 Sin trabajos en curso")
+    for job in status['queue']:
+        target = job['params'].get('path', '')
+        print(f"  · #{job['id']} {job['kind']} {target} ({job['source']}, "
+              f"{job['waited']:.0f} s en cola)")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cliente de la API de control del daemon nRF24')
+    parser.add_argument('--socket', default=str(DEFAULT_SOCKET), help='Socket del daemon')
+    parser.add_argument('--json', action='store_true', help='Mostrar la respuesta JSON sin formato')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    send = sub.add_parser('send', help='Encolar un archivo o un directorio para TX')
+    send.add_argument('path')
+    send.add_argument('--priority', choices=list(PRIORITY_NAMES), default='normal')
+    send.add_argument('--wait', action='store_true', help='Esperar a que terminen y mostrar el progreso')
+    rx = sub.add_parser('rx', help='Encolar una sesión de recepción')
+    rx.add_argument('--wait', action='store_true')
+    status = sub.add_parser('status', help='Transferencia en curso, cola y progreso')
+    status.add_argument('--watch', action='store_true', help='Actualizar cada segundo')
+    cancel = sub.add_parser('cancel', help='Cancelar un trabajo (sin ID: el que está en curso)')
+    cancel.add_argument('id', type=int, nargs='?')
+    args = parser.parse_args()
+
+    try:
+        client = ControlClient(args.socket)
+    except OSError as e:
+        print(f"✗ No se pudo conectar a {args.socket}: {e}")
+        return 1
+
+    try:
+        if args.cmd == 'send':
+            response = client.request('send', path=str(pathlib.Path(args.path).absolute()),
+                                      priority=args.priority)
+        elif args.cmd == 'rx':
+            response = client.request('rx')
+        elif args.cmd == 'cancel':
+            response = client.request('cancel', id=args.id)
+        else:
+            response = client.request('status')
+
+        if args.json:
+            print(json.dumps(response, indent=2, ensure_ascii=False))
+        elif not response['ok']:
+            print(f"✗ {response['error']}")
+        elif args.cmd in ('send', 'rx'):
+            for job in response['jobs']:
+                print(f"📥 #{job['id']} {job['kind']} {job['params'].get('path', '')}")
+        elif args.cmd == 'cancel':
+            print(f"⏹ Trabajo #{response['cancelled']} cancelado")
+        else:
+            print_status(response)
+        if not response['ok']:
+            return 1
+
+        if getattr(args, 'watch', False) or getattr(args, 'wait', False):
+            waiting = {job['id'] for job in response.get('jobs', [])}
+            while True:
+                status = client.request('status')
+                if status['current']:
+                    print(f"\r{format_progress(status['progress'])}\033[K", end="", flush=True)
+                if waiting:
+                    busy = {job['id'] for job in status['queue']}
+                    if status['current']:
+                        busy.add(status['current']['id'])
+                    if not waiting & busy:
+                        break
+                time.sleep(1)
+            print()
+            failed = 0
+            for job_id in sorted(waiting):
+                job = client.request('wait', id=job_id)['job']
+                ok = job['state'] == 'done' and job['result'] != 'False'
+                failed += not ok
+                print(f"{'✓' if ok else '✗'} #{job['id']} {job['kind']} "
+                      f"{job['params'].get('path', '')} → {job['error'] or job['result']}")
+            return 1 if failed else 0
+        return 0
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Modelo de costo para elegir códec y nivel de compresión
+
+El mejor ratio no siempre termina antes: en un archivo chico lzma puede
+tardar más en comprimir que el aire que ahorra. El modelo estima
+
+    tiempo = compresión (tamaño / velocidad del códec en esta CPU)
+           + aire (paquetes resultantes × segundos por paquete del enlace)
+
+y elige el candidato de COST_CANDIDATES con menor tiempo, comparado con
+enviar sin comprimir. En modo streaming la compresión se superpone con el
+aire y cuenta el mayor de los dos.
+
+Las velocidades se calibran la primera vez con un texto sintético y se
+refinan con cada compresión real; los segundos por paquete salen de las
+transmisiones exitosas. Todo se guarda en CODEC_PROFILE_FILE; si cambia la
+máquina (arquitectura, CPUs o versión de Python) se vuelve a calibrar.
+"""
+
+import os
+import json
+import time
+import random
+import platform
+import pathlib
+import threading
+
+from constants import (
+    STATE_DIR, CODEC_PROFILE_FILE, COST_CANDIDATES, COST_CALIBRATION_SIZE,
+    COST_MIN_RECORD_SIZE, COST_PACKET_SECONDS, COST_EWMA_ALPHA, COMPRESS_NONE, COMPRESS_NAMES
+)
+
+PROFILE_PATH = pathlib.Path(STATE_DIR) / CODEC_PROFILE_FILE
+
+
+def machine_key() -> str:
+    """Identifica la CPU y el intérprete para los que valen las velocidades"""
+    return f"{platform.machine()}-{os.cpu_count()}-py{platform.python_version()}"
+
+
+def candidate_key(mode: int, level: int) -> str:
+    """Clave de un candidato: 'lzma:3'"""
+    return f"{COMPRESS_NAMES[mode]}:{level}"
+
+
+def calibration_text(size: int = COST_CALIBRATION_SIZE) -> bytes:
+    """Texto sintético reproducible, con la redundancia típica de un log o documento"""
+    rng = random.Random(0)
+    words = ["".join(rng.choice("etaoinshrdlucmfwypvbgkqjxz") for _ in range(rng.randint(2, 9)))
+             for _ in range(2000)]
+    out = []
+    length = 0
+    while length < size:
+        line = " ".join(words[min(int(rng.paretovariate(1.2)) - 1, 1999)]
+                        for _ in range(rng.randint(4, 14)))
+        line += f" {rng.randint(0, 99999)}\n"
+        out.append(line)
+        length += len(line)
+    return "".join(out).encode()[:size]
+
+
+class CostModel:
+    """
+    Velocidades de compresión por candidato y segundos por paquete del enlace.
+    
+    Args:
+        path: Archivo JSON donde se guarda el perfil
+    """
+    
+    def __init__(self, path: pathlib.Path = PROFILE_PATH):
+        self.path = pathlib.Path(path)
+        self.speeds = {}            # {'zlib:6': bytes/s}
+        self.packet_seconds = None  # Medido en transmisiones exitosas
+        self.transfers = 0
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        try:
+            stored = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return
+        if stored.get('machine') == machine_key():
+            self.speeds = dict(stored.get('speeds', {}))
+        self.packet_seconds = stored.get('packet_seconds')
+        self.transfers = stored.get('transfers', 0)
+    
+    def save(self):
+        """Guarda el perfil (escritura atómica: temporal + rename)"""
+        with self._lock:
+            profile = {
+                'machine': machine_key(),
+                'speeds': self.speeds,
+                'packet_seconds': self.packet_seconds,
+                'transfers': self.transfers,
+                'updated': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(profile, indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠ No se pudo guardar {self.path.name}: {e}")
+    
+    @property
+    def calibrated(self) -> bool:
+        return all(candidate_key(m, l) in self.speeds for m, l in COST_CANDIDATES)
+    
+    def calibrate(self):
+        """Mide la velocidad de cada candidato con el texto de calibración"""
+        from compression import compress_with
+        
+        print("⚙ Calibrando velocidad de compresión...")
+        data = calibration_text()
+        for mode, level in COST_CANDIDATES:
+            t0 = time.perf_counter()
+            compress_with(data, mode, level)
+            seconds = time.perf_counter() - t0
+            self.speeds[candidate_key(mode, level)] = len(data) / max(seconds, 1e-6)
+        self.save()
+        print("  " + " | ".join(f"{key} {speed / 1e6:.1f} MB/s"
+                                for key, speed in self.speeds.items()))
+    
+    def ensure_calibrated(self):
+        if not self.calibrated:
+            self.calibrate()
+    
+    def compress_seconds(self, mode: int, level: int, size: int) -> float:
+        """Tiempo estimado de compresión; None si el candidato no está calibrado"""
+        if mode == COMPRESS_NONE:
+            return 0.0
+        speed = self.speeds.get(candidate_key(mode, level))
+        return size / speed if speed else None
+    
+    def airtime(self, size: int, chunk_size: int) -> float:
+        """Tiempo estimado en el aire para `size` bytes de flujo"""
+        packets = -(-size // chunk_size)
+        return packets * (self.packet_seconds or COST_PACKET_SECONDS)
+    
+    def record_compression(self, mode: int, level: int, size: int, seconds: float):
+        """Refina la velocidad de un candidato con una compresión real"""
+        if mode == COMPRESS_NONE or size < COST_MIN_RECORD_SIZE or seconds <= 0:
+            return
+        key = candidate_key(mode, level)
+        speed = size / seconds
+        with self._lock:
+            old = self.speeds.get(key)
+            self.speeds[key] = speed if old is None else old + COST_EWMA_ALPHA * (speed - old)
+    
+    def record_transfer(self, packets: int, seconds: float):
+        """Actualiza los segundos por paquete con una transmisión exitosa y guarda"""
+        if packets <= 0 or seconds <= 0:
+            return
+        measured = seconds / packets
+        with self._lock:
+            old = self.packet_seconds
+            self.packet_seconds = (measured if old is None
+                                   else old + COST_EWMA_ALPHA * (measured - old))
+            self.transfers += 1
+        self.save()
+    
+    def choose(self, ratios: dict, size: int, chunk_size: int, overlap: bool = False) -> tuple:
+        """
+        Elige el candidato con menor tiempo total esperado.
+        
+        Args:
+            ratios: {(modo, nivel): ratio medido en una muestra}
+            size: Tamaño del archivo
+            chunk_size: Bytes de datos por paquete
+            overlap: La compresión corre en paralelo con el aire (streaming)
+            
+        Returns:
+            tuple: ((modo, nivel), {(modo, nivel): (compresión, aire)}) con
+                   (COMPRESS_NONE, 0) si ningún códec termina antes
+        """
+        estimates = {(COMPRESS_NONE, 0): (0.0, self.airtime(size, chunk_size))}
+        for (mode, level), ratio in ratios.items():
+            cpu = self.compress_seconds(mode, level, size)
+            if cpu is not None:
+                estimates[(mode, level)] = (cpu, self.airtime(int(size * ratio), chunk_size))
+        
+        def total(item):
+            cpu, air = item[1]
+            return max(cpu, air) if overlap else cpu + air
+        
+        best = min(estimates.items(), key=lambda item: (total(item), item[0]))
+        return best[0], estimates
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> CostModel:
+    """Modelo compartido, cargado del disco la primera vez"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = CostModel()
+    return _model
@@ -0,0 +1,245 @@
+"""
+Sincronización delta por bloques (estilo rsync)
+
+El receptor calcula firmas de bloques de su versión previa del archivo
+(checksum rodante débil + hash fuerte) y las envía al transmisor. El
+transmisor recorre la versión nueva con el checksum rodante y emite solo
+datos literales y referencias a bloques que el receptor ya tiene.
+
+Formato del flujo delta:
+    DELTA_MAGIC + name_key(4) + block_size(2)
+    0x00 + varint(len) + bytes        Literal
+    0x01 + varint(bloque) + varint(n) Copiar n bloques consecutivos de la base
+"""
+
+import os
+import hashlib
+import pathlib
+from constants import DELTA_BASE_DIRNAME
+
+DELTA_MAGIC = b"NRFD"
+DELTA_HEADER_SIZE = len(DELTA_MAGIC) + 6
+SIGNATURE_SIZE = 8     # weak(4) + strong(4)
+
+OP_LITERAL = 0x00
+OP_COPY = 0x01
+
+_MOD = 1 << 16
+
+
+def weak_checksum(block: bytes) -> tuple:
+    """
+    Checksum rodante de rsync sobre un bloque.
+
+    Returns:
+        tuple: (a, b) componentes del checksum
+    """
+    length = len(block)
+    a = sum(block) % _MOD
+    b = sum((length - i) * x for i, x in enumerate(block)) % _MOD
+    return a, b
+
+
+def strong_hash(block: bytes) -> bytes:
+    """Hash fuerte de 4 bytes de un bloque"""
+    return hashlib.sha256(block).digest()[:4]
+
+
+def compute_signatures(data: bytes, block_size: int) -> bytes:
+    """
+    Calcula las firmas de todos los bloques completos de `data`.
+
+    El último bloque parcial no se firma: si cambió o no, se envía como
+    literal.
+
+    Returns:
+        bytes: SIGNATURE_SIZE bytes por bloque, en orden
+    """
+    sigs = bytearray()
+    for start in range(0, len(data) - block_size + 1, block_size):
+        block = data[start:start + block_size]
+        a, b = weak_checksum(block)
+        sigs += (a | (b << 16)).to_bytes(4, 'big') + strong_hash(block)
+    return bytes(sigs)
+
+
+def _encode_varint(value: int) -> bytes:
+    """Codifica un entero no negativo en 7 bits por byte"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _decode_varint(data: bytes, pos: int) -> tuple:
+    """Decodifica un varint; retorna (valor, nueva_posición)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def compute_delta(new_data: bytes, signatures: bytes, block_size: int,
+                  name_key: bytes) -> bytes:
+    """
+    Codifica `new_data` como literales y referencias a bloques de la base.
+
+    Args:
+        new_data: Versión nueva del archivo
+        signatures: Firmas de la base (compute_signatures)
+        block_size: Tamaño de bloque usado en las firmas
+        name_key: Clave de 4 bytes que identifica la base en el receptor
+
+    Returns:
+        bytes: Flujo delta (empieza con DELTA_MAGIC)
+    """
+    table = {}
+    for idx in range(len(signatures) // SIGNATURE_SIZE):
+        sig = signatures[idx * SIGNATURE_SIZE:(idx + 1) * SIGNATURE_SIZE]
+        table.setdefault(int.from_bytes(sig[:4], 'big'), []).append((idx, sig[4:]))
+
+    out = bytearray(DELTA_MAGIC + name_key + block_size.to_bytes(2, 'big'))
+    copy_start = None
+    copy_count = 0
+
+    def flush_copy():
+        nonlocal copy_start, copy_count
+        if copy_start is not None:
+            out.append(OP_COPY)
+            out.extend(_encode_varint(copy_start))
+            out.extend(_encode_varint(copy_count))
+            copy_start = None
+            copy_count = 0
+
+    def emit_literal(literal: bytes):
+        if literal:
+            flush_copy()
+            out.append(OP_LITERAL)
+            out.extend(_encode_varint(len(literal)))
+            out.extend(literal)
+
+    length = len(new_data)
+    lit_start = 0
+    i = 0
+    if table and length >= block_size:
+        a, b = weak_checksum(new_data[0:block_size])
+
+    while table and i + block_size <= length:
+        match = None
+        candidates = table.get(a | (b << 16))
+        if candidates:
+            strong = strong_hash(new_data[i:i + block_size])
+            for idx, candidate in candidates:
+                if candidate == strong:
+                    match = idx
+                    break
+
+        if match is not None:
+            emit_literal(new_data[lit_start:i])
+            if copy_start is not None and copy_start + copy_count == match:
+                copy_count += 1
+            else:
+                flush_copy()
+                copy_start = match
+                copy_count = 1
+            i += block_size
+            lit_start = i
+            if i + block_size <= length:
+                a, b = weak_checksum(new_data[i:i + block_size])
+            continue
+
+        # Rodar la ventana un byte
+        if i + block_size < length:
+            out_byte = new_data[i]
+            in_byte = new_data[i + block_size]
+            a = (a - out_byte + in_byte) % _MOD
+            b = (b - block_size * out_byte + a) % _MOD
+        i += 1
+
+    emit_literal(new_data[lit_start:])
+    flush_copy()
+    return bytes(out)
+
+
+def parse_delta_header(delta: bytes) -> tuple:
+    """
+    Lee el encabezado de un flujo delta.
+
+    Returns:
+        tuple: (name_key, block_size)
+
+    Raises:
+        ValueError: Si el flujo no es un delta
+    """
+    if len(delta) < DELTA_HEADER_SIZE or delta[:len(DELTA_MAGIC)] != DELTA_MAGIC:
+        raise ValueError("Flujo delta sin encabezado")
+    pos = len(DELTA_MAGIC)
+    return bytes(delta[pos:pos + 4]), int.from_bytes(delta[pos + 4:pos + 6], 'big')
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    Reconstruye la versión nueva a partir de la base y el flujo delta.
+
+    Raises:
+        ValueError: Si el delta está corrupto o referencia bloques inexistentes
+    """
+    _, block_size = parse_delta_header(delta)
+
+    out = bytearray()
+    pos = DELTA_HEADER_SIZE
+    try:
+        while pos < len(delta):
+            op = delta[pos]
+            pos += 1
+            if op == OP_LITERAL:
+                length, pos = _decode_varint(delta, pos)
+                if pos + length > len(delta):
+                    raise ValueError("Literal truncado")
+                out += delta[pos:pos + length]
+                pos += length
+            elif op == OP_COPY:
+                start, pos = _decode_varint(delta, pos)
+                count, pos = _decode_varint(delta, pos)
+                end = (start + count) * block_size
+                if end > len(base):
+                    raise ValueError(f"Bloque fuera de la base: {start + count - 1}")
+                out += base[start * block_size:end]
+            else:
+                raise ValueError(f"Operación delta desconocida: {op}")
+    except IndexError:
+        raise ValueError("Flujo delta truncado")
+
+    return bytes(out)
+
+
+def base_path(dest_dir: pathlib.Path, name_key: bytes) -> pathlib.Path:
+    """Ruta de la versión previa guardada para una clave de nombre"""
+    return dest_dir / DELTA_BASE_DIRNAME / name_key.hex()
+
+
+def load_base(dest_dir: pathlib.Path, name_key: bytes) -> bytes:
+    """Versión previa del archivo (b"" si el receptor no la tiene)"""
+    try:
+        return base_path(dest_dir, name_key).read_bytes()
+    except FileNotFoundError:
+        return b""
+
+
+def store_base(dest_dir: pathlib.Path, name_key: bytes, data: bytes):
+    """Guarda de forma atómica la nueva versión como base del próximo delta"""
+    path = base_path(dest_dir, name_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
@@ -0,0 +1,199 @@
+"""
+Cola de trabajos del daemon
+
+Los productores (botón, señales, spool, API de control) encolan trabajos
+con submit(); un único worker los ejecuta uno tras otro, así la radio
+nunca se comparte entre operaciones. El worker bloquea en la cola: sin
+trabajos no consume CPU, y un trabajo nuevo empieza en cuanto se encola.
+
+Los trabajos esperan en un heap (prioridad, orden de llegada); el worker
+se despierta con una SimpleQueue, cuyo put() es reentrante, así stop()
+se puede llamar desde un manejador de señales.
+"""
+
+import time
+import heapq
+import queue
+import itertools
+import threading
+
+# Prioridades (menor = antes); a igual prioridad, orden de llegada
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+
+class Job:
+    """Trabajo encolado: tipo ('tx', 'rx', ...), parámetros y resultado"""
+
+    __slots__ = ('id', 'kind', 'params', 'priority', 'source', 'submitted',
+                 'started', 'finished', 'result', 'error', 'done')
+
+    def __init__(self, job_id: int, kind: str, params: dict, priority: int, source: str):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.priority = priority
+        self.source = source
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout: float = None):
+        """Espera a que el trabajo termine; retorna su resultado"""
+        self.done.wait(timeout)
+        return self.result
+
+    def describe(self) -> dict:
+        """Estado del trabajo como dict (para logs y la API de control)"""
+        now = time.monotonic()
+        if self.finished is not None:
+            state = "error" if self.error else "done"
+        elif self.started is not None:
+            state = "running"
+        else:
+            state = "queued"
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': {k: str(v) for k, v in self.params.items()},
+            'source': self.source,
+            'state': state,
+            'waited': round(((self.started or now) - self.submitted), 3),
+            'result': None if self.result is None else str(self.result),
+            'error': self.error,
+        }
+
+
+class Dispatcher:
+    """
+    Ejecuta trabajos en orden de prioridad en un hilo dedicado.
+
+    Args:
+        handlers: {tipo: función(job) -> resultado}
+        on_idle: Llamada cuando la cola queda vacía tras un trabajo
+        log: Función de log (print o logger.info)
+    """
+
+    def __init__(self, handlers: dict, on_idle=None, log=print):
+        self.handlers = dict(handlers)
+        self.on_idle = on_idle
+        self.log = log
+        self.current = None
+        self._heap = []
+        self._wake = queue.SimpleQueue()
+        self._stopping = False
+        self._pending = {}
+        self._history = []
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, kind: str, handler):
+        """Agrega o reemplaza el handler de un tipo de trabajo"""
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, priority: int = PRIORITY_NORMAL,
+               source: str = "", **params) -> Job:
+        """
+        Encola un trabajo.
+
+        Raises:
+            ValueError: Si no hay handler para el tipo
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        with self._lock:
+            job = Job(next(self._ids), kind, params, priority, source)
+            self._pending[job.id] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+        self._wake.put(None)
+        ahead = len(self._pending) - 1 + (1 if self.current else 0)
+        if ahead:
+            self.log(f"📥 Trabajo #{job.id} {kind} encolado ({source or 'sin origen'}), "
+                     f"{ahead} antes")
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Quita un trabajo que todavía no empezó"""
+        with self._lock:
+            job = self._pending.pop(job_id, None)
+            if job is None:
+                return False
+            self._heap = [item for item in self._heap if item[2] is not job]
+            heapq.heapify(self._heap)
+        job.error = "cancelado"
+        job.finished = time.monotonic()
+        job.done.set()
+        return True
+
+    def get(self, job_id: int):
+        """Busca un trabajo en cola, en curso o reciente; None si no existe"""
+        with self._lock:
+            if job_id in self._pending:
+                return self._pending[job_id]
+            if self.current is not None and self.current.id == job_id:
+                return self.current
+            for job in self._history:
+                if job.id == job_id:
+                    return job
+        return None
+
+    def pending(self) -> list:
+        """Trabajos en cola, en el orden en que se ejecutarán"""
+        with self._lock:
+            return sorted(self._pending.values(), key=lambda j: (j.priority, j.id))
+
+    def history(self) -> list:
+        """Últimos trabajos terminados (más reciente al final)"""
+        with self._lock:
+            return list(self._history)
+
+    def start(self):
+        """Ejecuta el worker en un hilo propio"""
+        self._thread = threading.Thread(target=self.run, name="dispatcher")
+        self._thread.start()
+
+    def stop(self, wait: bool = False):
+        """
+        Detiene el worker después del trabajo en curso.
+
+        Seguro desde un manejador de señales con wait=False.
+        """
+        self._stopping = True
+        self._wake.put(None)
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def run(self):
+        """Worker: ejecuta trabajos hasta stop() (bloquea el hilo que llama)"""
+        while not self._stopping:
+            self._wake.get()
+            if self._stopping:
+                break
+            with self._lock:
+                if not self._heap:
+                    continue   # Cancelado mientras esperaba
+                _, _, job = heapq.heappop(self._heap)
+                del self._pending[job.id]
+                self.current = job
+            job.started = time.monotonic()
+            self.log(f"▶ Trabajo #{job.id} {job.kind} ({job.source or 'sin origen'}) "
+                     f"tras {(job.started - job.submitted) * 1000:.0f} ms en cola")
+            try:
+                job.result = self.handlers[job.kind](job)
+            except Exception as e:
+                job.error = str(e)
+                self.log(f"✗ Trabajo #{job.id} {job.kind} falló: {e}")
+            finally:
+                job.finished = time.monotonic()
+                with self._lock:
+                    self.current = None
+                    self._history = (self._history + [job])[-50:]
+                job.done.set()
+            if not self._heap and self.on_idle:
+                self.on_idle()
@@ -1,18 +1,38 @@
 """
 Forward Error Correction usando Reed-Solomon
+
+reedsolo construye sus tablas de Galois al crear el codec, así que el
+codec se crea en el primer uso (o en warm_up()) y no al importar.
 """
 
+import threading
+from importlib.util import find_spec
 from constants import FEC_SYMBOLS
 
-try:
-    from reedsolo import RSCodec
-    RS_AVAILABLE = True
-    rs_codec = RSCodec(FEC_SYMBOLS)
-except ImportError:
+RS_AVAILABLE = find_spec("reedsolo") is not None
+if not RS_AVAILABLE:
     print("⚠ Advertencia: reedsolo no disponible. FEC deshabilitado.")
     print("  Instalar con: pip install reedsolo")
-    RS_AVAILABLE = False
-    rs_codec = None
+
+rs_codec = None
+_codec_lock = threading.Lock()
+
+
+def _get_codec():
+    """Codec Reed-Solomon, creado la primera vez que se necesita"""
+    global rs_codec
+    if rs_codec is None:
+        with _codec_lock:
+            if rs_codec is None:
+                from reedsolo import RSCodec
+                rs_codec = RSCodec(FEC_SYMBOLS)
+    return rs_codec
+
+
+def warm_up():
+    """Crea el codec por adelantado (hilo de precarga del daemon)"""
+    if RS_AVAILABLE:
+        _get_codec()
 
 
 def apply_fec(payload_wo_rs: bytes) -> bytes:
@@ -29,7 +49,7 @@ def apply_fec(payload_wo_rs: bytes) -> bytes:
         return payload_wo_rs
     
     # RS agrega exactamente FEC_SYMBOLS bytes de paridad
-    encoded = rs_codec.encode(payload_wo_rs)
+    encoded = _get_codec().encode(payload_wo_rs)
     return encoded
 
 
@@ -48,7 +68,7 @@ def decode_fec(encoded_payload: bytes) -> tuple[bytes, int]:
         return encoded_payload, 0
     
     try:
-        corrected, _, errors = rs_codec.decode(encoded_payload, return_stats=True)
+        corrected, _, errors = _get_codec().decode(encoded_payload, return_stats=True)
         return bytes(corrected), errors
     except Exception:
         # Fallo en la corrección (demasiados errores)
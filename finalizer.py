@@ -0,0 +1,83 @@
+"""
+Finalización de recepciones en segundo plano
+
+receive_file entrega cada transferencia terminada a un FinalizePool y
+vuelve enseguida: la radio queda libre para la siguiente mientras un hilo
+reconstruye, descomprime, verifica y escribe el archivo. La cola es
+acotada (FINALIZE_QUEUE_SIZE): si se llena, submit() espera, así la
+memoria de los chunks pendientes tiene un techo.
+
+Se usan hilos y no procesos: zlib, bz2 y lzma liberan el GIL mientras
+descomprimen, y el RxWorker (con sus chunks) no se puede serializar.
+"""
+
+import queue
+import threading
+
+from constants import FINALIZE_WORKERS, FINALIZE_QUEUE_SIZE
+
+
+class FinalizePool:
+    """
+    Hilos que ejecutan func(*args) para cada tarea encolada.
+
+    Args:
+        func: Función de finalización; su resultado (bool) alimenta stats
+        workers: Cantidad de hilos
+        maxsize: Tareas en espera antes de que submit() bloquee
+        log: Función de log
+    """
+
+    def __init__(self, func, workers: int = FINALIZE_WORKERS,
+                 maxsize: int = FINALIZE_QUEUE_SIZE, log=print):
+        self.func = func
+        self.log = log
+        self.stats = {'submitted': 0, 'ok': 0, 'failed': 0, 'waited_full': 0}
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"finalize-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, *args):
+        """Encola una tarea; bloquea si la cola está llena"""
+        self.stats['submitted'] += 1
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            self.stats['waited_full'] += 1
+            self.log(f"⏳ Cola de finalización llena ({self._queue.maxsize}), esperando...")
+            self._queue.put(args)
+
+    def pending(self) -> int:
+        """Tareas en espera (sin contar las que se están ejecutando)"""
+        return self._queue.qsize()
+
+    def join(self):
+        """Espera a que terminen todas las tareas encoladas"""
+        self._queue.join()
+
+    def close(self):
+        """Termina las tareas pendientes y detiene los hilos"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            args = self._queue.get()
+            try:
+                if args is None:
+                    return
+                if self.func(*args):
+                    self.stats['ok'] += 1
+                else:
+                    self.stats['failed'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                self.log(f"✗ Error en la finalización: {e}")
+            finally:
+                self._queue.task_done()
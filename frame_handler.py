@@ -5,8 +5,10 @@ Manejo de tramas: construcción, parseo y ACKs
 import hashlib
 from constants import (
     FRAME_SIZE, HEADER_SIZE, DATA_BYTES, EFFECTIVE_DATA_BYTES,
-    FLAG_LAST, FLAG_COMPRESSED, FLAG_FEC,
-    COMPRESS_NONE
+    FLAG_LAST, FLAG_COMPRESSED, FLAG_CONTROL, FLAG_FEC, ACK_BITMAP_BYTES,
+    ACK_CONTROL, ACK_COMPLETE, ACK_FLAGS_MASK, COMPRESS_NONE, LEN_MASK,
+    SEQ_HIGH_SHIFT, MAX_SEQ_PACKETS, ADDR_A, POLL_BITMAP_BYTES, ANNOUNCE_REPLACE,
+    ANNOUNCE_OPEN, RESUME_BITMAP_BYTES
 )
 from fec import apply_fec, decode_fec, is_fec_available
 
@@ -16,15 +18,43 @@ def calculate_file_hash(data: bytes) -> bytes:
     return hashlib.sha256(data).digest()[:4]
 
 
+def transfer_id(file_hash: bytes) -> int:
+    """
+    Deriva el file_id de 16 bits a partir del hash del contenido.
+    
+    El mismo archivo produce siempre el mismo ID, lo que permite al
+    receptor asociar una retransmisión con su checkpoint parcial.
+    """
+    return int.from_bytes(file_hash[:2], 'big')
+
+
+def node_address(node_id: int) -> bytes:
+    """
+    Dirección propia de un nodo receptor para el modo difusión.
+    
+    Los pipes 2-5 comparten los 4 bytes altos con el pipe 1 (ADDR_A) y solo
+    cambian el byte bajo, que aquí es el ID del nodo.
+    
+    Raises:
+        ValueError: Si el ID no entra en un byte o coincide con ADDR_A
+    """
+    if not 0 < node_id < 255 or node_id == ADDR_A[0]:
+        raise ValueError(f"ID de nodo inválido: {node_id} (1-254, distinto de {ADDR_A[0]})")
+    return bytes([node_id]) + ADDR_A[1:]
+
+
 def build_frame(file_id: int, seq_id: int, data_bytes: bytes, 
                 is_last: bool = False, compress_mode: int = 0, 
                 use_fec: bool = True) -> bytes:
     """
     Construye una trama de 32 bytes exactos.
     
+    seq_id tiene 19 bits: los 16 bajos van en su campo y los 3 altos en
+    los bits libres de data_len (que nunca pasa de 26).
+    
     Args:
         file_id: ID del archivo (0-65535)
-        seq_id: Número de secuencia del paquete
+        seq_id: Número de secuencia del paquete (menor que MAX_SEQ_PACKETS)
         data_bytes: Datos a enviar (máx 22 o 26 bytes según FEC)
         is_last: Si es el último paquete
         compress_mode: Modo de compresión usado
@@ -34,7 +64,7 @@ def build_frame(file_id: int, seq_id: int, data_bytes: bytes,
         bytes: Trama de 32 bytes lista para transmitir
         
     Raises:
-        ValueError: Si los datos exceden el tamaño máximo
+        ValueError: Si los datos exceden el tamaño máximo o seq_id no entra
     """
     # Determinar tamaño máximo de datos según FEC
     if use_fec and is_fec_available():
@@ -44,6 +74,8 @@ def build_frame(file_id: int, seq_id: int, data_bytes: bytes,
 
     if len(data_bytes) > max_data:
         raise ValueError(f"Data excede {max_data} bytes (len={len(data_bytes)})")
+    if not 0 <= seq_id < MAX_SEQ_PACKETS:
+        raise ValueError(f"seq_id fuera de rango (máx {MAX_SEQ_PACKETS - 1}): {seq_id}")
 
     # Construir flags
     flags = 0
@@ -58,8 +90,8 @@ def build_frame(file_id: int, seq_id: int, data_bytes: bytes,
     # Construir header (6 bytes)
     header = (
         int(file_id).to_bytes(2, 'big') +
-        int(seq_id).to_bytes(2, 'big') +
-        bytes([len(data_bytes)]) +
+        (seq_id & 0xFFFF).to_bytes(2, 'big') +
+        bytes([len(data_bytes) | (seq_id >> 16) << SEQ_HIGH_SHIFT]) +
         bytes([flags])
     )
 
@@ -80,6 +112,46 @@ def build_frame(file_id: int, seq_id: int, data_bytes: bytes,
         return payload
 
 
+def build_control_frame(file_id: int, ctrl_type: int, index: int,
+                        payload: bytes = b"", use_fec: bool = True) -> bytes:
+    """
+    Construye una trama de control de 32 bytes.
+    
+    Usa el mismo header que las tramas de datos, con FLAG_CONTROL activo,
+    el tipo de control en el nibble alto de flags y el índice en seq_id.
+    
+    Args:
+        file_id: ID de la transferencia a la que se refiere
+        ctrl_type: Tipo de control (CTRL_*)
+        index: Índice dentro del tipo (0-65535)
+        payload: Datos del control (máx 22 o 26 bytes según FEC)
+        use_fec: Si usar Forward Error Correction
+        
+    Returns:
+        bytes: Trama de 32 bytes lista para transmitir
+    """
+    fec = use_fec and is_fec_available()
+    max_data = EFFECTIVE_DATA_BYTES if fec else DATA_BYTES
+    if len(payload) > max_data:
+        raise ValueError(f"Payload de control excede {max_data} bytes (len={len(payload)})")
+    
+    flags = FLAG_CONTROL | ((ctrl_type & 0x0F) << 4)
+    if fec:
+        flags |= FLAG_FEC
+    
+    header = (
+        int(file_id).to_bytes(2, 'big') +
+        int(index).to_bytes(2, 'big') +
+        bytes([len(payload)]) +
+        bytes([flags])
+    )
+    data = payload + b"\x00" * (max_data - len(payload))
+    
+    if fec:
+        return apply_fec(header + data)
+    return header + data
+
+
 def parse_frame(pkt: bytes) -> tuple:
     """
     Parsea una trama de 32 bytes, decodifica FEC si está presente.
@@ -88,8 +160,9 @@ def parse_frame(pkt: bytes) -> tuple:
         pkt: Paquete recibido de 32 bytes
         
     Returns:
-        tuple: (file_id, seq_id, data, is_last, compress_mode, errors_corrected)
-               o None si el paquete es inválido
+        tuple: (file_id, seq_id, data, is_last, compress_mode, errors_corrected,
+                ctrl_type) o None si el paquete es inválido. ctrl_type es None
+               en tramas de datos; en tramas de control seq_id es el índice
     """
     if len(pkt) != FRAME_SIZE:
         return None
@@ -115,7 +188,7 @@ def parse_frame(pkt: bytes) -> tuple:
     # Parsear header
     file_id = int.from_bytes(raw[0:2], 'big')
     seq_id = int.from_bytes(raw[2:4], 'big')
-    data_len = raw[4]
+    data_len = raw[4] & LEN_MASK
     flags = raw[5]
 
     # Determinar tamaño de datos según flags
@@ -127,18 +200,35 @@ def parse_frame(pkt: bytes) -> tuple:
     if data_len > max_data:
         return None
 
+    if flags & FLAG_CONTROL:
+        ctrl_type = (flags >> 4) & 0x0F
+        return file_id, seq_id, data[:data_len], False, COMPRESS_NONE, errors_corrected, ctrl_type
+    seq_id |= (raw[4] >> SEQ_HIGH_SHIFT) << 16
+
     # Extraer flags
     is_last = bool(flags & FLAG_LAST)
     is_compressed = bool(flags & FLAG_COMPRESSED)
     compress_mode = ((flags >> 4) & 0x0F) if is_compressed else COMPRESS_NONE
 
-    return file_id, seq_id, data[:data_len], is_last, compress_mode, errors_corrected
+    return file_id, seq_id, data[:data_len], is_last, compress_mode, errors_corrected, None
 
 
 def build_ack_payload(file_id: int, chunks: dict, last_seq: int, 
-                      last_seen: bool, compress_mode: int = 0) -> bytes:
+                      last_seen: bool, compress_mode: int = 0,
+                      first_missing_hint: int = 0, extra_flags: int = 0) -> bytes:
     """
-    Construye un payload de ACK de 6 bytes.
+    Construye un payload de ACK.
+    
+    Los 6 bytes base indican el primer paquete faltante (todos los
+    anteriores están recibidos). Si hay un hueco, se agrega un bitmap de
+    ACK_BITMAP_BYTES con los paquetes ya recibidos después del faltante,
+    para que el transmisor no reenvíe datos confirmados.
+    
+    Los 3 bits altos del faltante van en los bits 5-7 de flags. Un
+    faltante cuyos 16 bits bajos coincidirían con un valor especial
+    (0xFFFD-0xFFFF, también con bits altos: 0x1FFFD...) se reporta con
+    0xFFFC abajo: confirmar de menos es seguro, y un receptor viejo que
+    compara solo 16 bits no lo confunde con un ACK de control.
     
     Args:
         file_id: ID del archivo actual (None si no hay archivo)
@@ -146,43 +236,56 @@ def build_ack_payload(file_id: int, chunks: dict, last_seq: int,
         last_seq: Número del último paquete esperado
         last_seen: Si se recibió el paquete marcado como último
         compress_mode: Modo de compresión del archivo
+        first_missing_hint: Secuencia desde la que buscar faltantes (todas
+                            las anteriores ya están recibidas)
+        extra_flags: Flags adicionales (ACK_VERIFIED, ACK_VERIFY_FAILED)
         
     Returns:
-        bytes: Payload de ACK (6 bytes)
+        bytes: Payload de ACK (6 bytes + bitmap opcional)
     """
     if file_id is None:
         # ACK genérico cuando no hay transferencia activa
         return b"\x00\x00\xFF\xFE\x00\x00"
     
-    COMPLETE = 1 << 0
+    # Buscar el primer paquete faltante
+    missing = first_missing_hint
+    while missing in chunks:
+        missing += 1
     
-    if last_seq is None:
-        missing_seq = 0xFFFE
-        flags = 0
+    bitmap = b""
+    if last_seq is not None and missing > last_seq:
+        # No hay faltantes
+        missing_seq = 0xFFFF
+        flags = ACK_COMPLETE if last_seen else 0
     else:
-        # Buscar el primer paquete faltante
-        missing = None
-        for seq in range(0, last_seq + 1):
-            if seq not in chunks:
-                missing = seq
-                break
+        if missing & 0xFFFF >= ACK_CONTROL:
+            # No confundirlo con un valor especial
+            missing = (missing & ~0xFFFF) | (ACK_CONTROL - 1)
+        missing_seq = missing
+        flags = (missing >> 16) << SEQ_HIGH_SHIFT
         
-        if missing is None:
-            # No hay faltantes
-            missing_seq = 0xFFFF
-            flags = COMPLETE if last_seen else 0
-        else:
-            missing_seq = missing
-            flags = 0
+        # Bitmap de recibidos a partir de missing+1
+        bits = 0
+        for i in range(ACK_BITMAP_BYTES * 8):
+            if missing + 1 + i in chunks:
+                bits |= 1 << i
+        if bits:
+            bitmap = bits.to_bytes(ACK_BITMAP_BYTES, 'little')
     
     return (
         int(file_id).to_bytes(2, 'big') +
-        int(missing_seq).to_bytes(2, 'big') +
-        bytes([flags]) +
-        bytes([compress_mode])
+        (missing_seq & 0xFFFF).to_bytes(2, 'big') +
+        bytes([flags | extra_flags]) +
+        bytes([compress_mode]) +
+        bitmap
     )
 
 
+def _ack_seq(ack_data: bytes) -> int:
+    """missing_seq completo de un ACK (16 bits + 3 bits altos en flags)"""
+    return int.from_bytes(ack_data[2:4], 'big') | (ack_data[4] >> SEQ_HIGH_SHIFT) << 16
+
+
 def parse_ack(ack_data: bytes) -> tuple:
     """
     Parsea un payload de ACK.
@@ -198,14 +301,277 @@ def parse_ack(ack_data: bytes) -> tuple:
         return None, None, False, 0
     
     file_id = int.from_bytes(ack_data[0:2], 'big')
-    missing_seq = int.from_bytes(ack_data[2:4], 'big')
+    missing_seq = _ack_seq(ack_data)
     flags = ack_data[4]
     compress_mode = ack_data[5] if len(ack_data) > 5 else 0
     
-    is_complete = bool(flags & 0x01)
-    
-    # Valores especiales
-    if missing_seq in (0xFFFF, 0xFFFE):
+    # Valores especiales (en un ACK de control el byte de flags es el tipo)
+    is_complete = bool(flags & ACK_COMPLETE) and missing_seq != ACK_CONTROL
+    if missing_seq in (0xFFFF, 0xFFFE, ACK_CONTROL):
         missing_seq = None
     
-    return file_id, missing_seq, is_complete, compress_mode
\ No newline at end of file
+    return file_id, missing_seq, is_complete, compress_mode
+
+
+def ack_flags(ack_data: bytes) -> int:
+    """Flags de un ACK de datos (ACK_*), 0 si es genérico o de control"""
+    if len(ack_data) < 5 or _ack_seq(ack_data) in (0xFFFE, ACK_CONTROL):
+        return 0
+    return ack_data[4] & ACK_FLAGS_MASK
+
+
+def ack_confirmed_seqs(ack_data: bytes) -> tuple:
+    """
+    Extrae las secuencias que un ACK confirma como recibidas.
+    
+    Args:
+        ack_data: Datos del ACK recibido
+        
+    Returns:
+        tuple: (below, extra) donde toda secuencia < below está confirmada
+               y extra es el conjunto de confirmadas por el bitmap
+    """
+    if len(ack_data) < 6:
+        return 0, set()
+    
+    missing_seq = _ack_seq(ack_data)
+    if missing_seq in (0xFFFE, ACK_CONTROL):
+        return 0, set()
+    if missing_seq == 0xFFFF:
+        return MAX_SEQ_PACKETS, set()
+    
+    extra = set()
+    bits = int.from_bytes(ack_data[6:6 + ACK_BITMAP_BYTES], 'little')
+    i = 0
+    while bits:
+        if bits & 1:
+            extra.add(missing_seq + 1 + i)
+        bits >>= 1
+        i += 1
+    return missing_seq, extra
+
+
+
+def build_trailer_payload(stream_hash: bytes, file_hash: bytes,
+                          original_size: int, stream_size: int) -> bytes:
+    """
+    Construye el payload de la trama CTRL_TRAILER (16 bytes).
+    
+    Args:
+        stream_hash: Hash de 4 bytes de los datos transmitidos (comprimidos)
+        file_hash: Hash de 4 bytes del archivo final
+        original_size: Tamaño del archivo final
+        stream_size: Tamaño de los datos transmitidos
+    """
+    return (
+        stream_hash + file_hash +
+        int(original_size).to_bytes(4, 'big') +
+        int(stream_size).to_bytes(4, 'big')
+    )
+
+
+def parse_trailer_payload(payload: bytes) -> dict:
+    """
+    Parsea el payload de CTRL_TRAILER.
+    
+    Returns:
+        dict: {stream_hash, file_hash, original_size, stream_size} o None
+    """
+    if len(payload) < 16:
+        return None
+    return {
+        'stream_hash': bytes(payload[0:4]),
+        'file_hash': bytes(payload[4:8]),
+        'original_size': int.from_bytes(payload[8:12], 'big'),
+        'stream_size': int.from_bytes(payload[12:16], 'big'),
+    }
+
+
+def build_announce_payload(total_packets: int, chunk_size: int, compress_mode: int,
+                           stream_size: int, original_size: int,
+                           name_len: int = 0, replace: bool = False,
+                           id_hash: bytes = b"", open_length: bool = False) -> bytes:
+    """
+    Construye el payload de la trama CTRL_ANNOUNCE (19 bytes).
+    
+    Args:
+        total_packets: Cantidad de paquetes de datos (el byte 14 lleva los
+                       bits altos; un receptor viejo lee solo 13)
+        chunk_size: Bytes de datos por paquete (todos salvo el último)
+        compress_mode: Modo de compresión del flujo
+        stream_size: Tamaño de los datos transmitidos
+        original_size: Tamaño del archivo final
+        name_len: Longitud del nombre enviado en tramas CTRL_NAME (0 = sin nombre)
+        replace: El receptor reemplaza el archivo del mismo nombre en lugar
+                 de guardar uno nuevo con timestamp (sincronización)
+        id_hash: Hash de 4 bytes del que sale el file_id; el receptor lo
+                 guarda en el checkpoint para no reanudar otro archivo
+        open_length: El total todavía no se conoce (compresión en paralelo):
+                     el receptor espera FLAG_LAST. Sin este flag,
+                     total_packets = 0 es un archivo vacío
+    """
+    flags = (ANNOUNCE_REPLACE if replace else 0) | (ANNOUNCE_OPEN if open_length else 0)
+    return (
+        (total_packets & 0xFFFF).to_bytes(2, 'big') +
+        bytes([chunk_size, compress_mode]) +
+        int(stream_size).to_bytes(4, 'big') +
+        int(original_size).to_bytes(4, 'big') +
+        bytes([name_len, total_packets >> 16, flags]) +
+        bytes(id_hash[:4]).ljust(4, b"\x00")
+    )
+
+
+def parse_announce_payload(payload: bytes) -> dict:
+    """
+    Parsea el payload de CTRL_ANNOUNCE.
+    
+    Returns:
+        dict: {total_packets, chunk_size, compress_mode, stream_size,
+               original_size, name_len, replace, open_length, id_hash} o
+               None (id_hash es None si el transmisor no lo envía; sin el
+               byte de flags, total_packets = 0 es tamaño abierto)
+    """
+    if len(payload) < 13:
+        return None
+    high = payload[13] << 16 if len(payload) > 13 else 0
+    return {
+        'total_packets': int.from_bytes(payload[0:2], 'big') | high,
+        'chunk_size': payload[2],
+        'compress_mode': payload[3],
+        'stream_size': int.from_bytes(payload[4:8], 'big'),
+        'original_size': int.from_bytes(payload[8:12], 'big'),
+        'name_len': payload[12],
+        'replace': len(payload) > 14 and bool(payload[14] & ANNOUNCE_REPLACE),
+        'open_length': (bool(payload[14] & ANNOUNCE_OPEN) if len(payload) > 14
+                        else not int.from_bytes(payload[0:2], 'big') | high),
+        'id_hash': bytes(payload[15:19]) if len(payload) >= 19 else None,
+    }
+
+
+def build_control_ack(file_id: int, ctrl_type: int, index: int,
+                      payload: bytes = b"") -> bytes:
+    """
+    Construye un ACK que responde a una trama de control.
+    
+    Formato: file_id(2) + ACK_CONTROL(2) + ctrl_type(1) + index(2) + payload
+    
+    Args:
+        file_id: ID de la transferencia
+        ctrl_type: Tipo de control al que se responde
+        index: Índice de la trama de control respondida
+        payload: Datos de respuesta (máx 25 bytes)
+        
+    Returns:
+        bytes: Payload de ACK (máx 32 bytes)
+    """
+    return (
+        int(file_id).to_bytes(2, 'big') +
+        ACK_CONTROL.to_bytes(2, 'big') +
+        bytes([ctrl_type]) +
+        int(index).to_bytes(2, 'big') +
+        payload
+    )
+
+
+def parse_control_ack(ack_data: bytes) -> tuple:
+    """
+    Parsea un ACK de respuesta a una trama de control.
+    
+    Se compara el missing_seq completo (19 bits): ctrl_type ocupa el byte
+    de flags y, al ser menor que 32, deja los bits altos en 0, mientras que
+    un ACK de datos con faltante 0x1FFFD no.
+    
+    Returns:
+        tuple: (file_id, ctrl_type, index, payload) o None si no es de control
+    """
+    if len(ack_data) < 7 or _ack_seq(ack_data) != ACK_CONTROL:
+        return None
+    
+    file_id = int.from_bytes(ack_data[0:2], 'big')
+    ctrl_type = ack_data[4]
+    index = int.from_bytes(ack_data[5:7], 'big')
+    return file_id, ctrl_type, index, bytes(ack_data[7:])
+
+
+def build_poll_payload(state: int, first_missing: int = None, missing: set = ()) -> bytes:
+    """
+    Construye la respuesta de un nodo a CTRL_POLL (25 bytes).
+    
+    Formato: state(1) + first_missing(4) + bitmap(POLL_BITMAP_BYTES), donde
+    el bit i indica que falta first_missing + 1 + i.
+    
+    Args:
+        state: Flags POLL_*
+        first_missing: Primer faltante desde la secuencia pedida (None = ninguno)
+        missing: Otros faltantes dentro de la ventana del bitmap
+    """
+    if first_missing is None:
+        return bytes([state]) + b"\xFF" * 4
+    bits = 0
+    for seq in missing:
+        bits |= 1 << (seq - first_missing - 1)
+    return (
+        bytes([state]) +
+        int(first_missing).to_bytes(4, 'big') +
+        bits.to_bytes(POLL_BITMAP_BYTES, 'little')
+    )
+
+
+def build_resume_reply(chunks: dict, prefix: int) -> bytes:
+    """
+    Construye la respuesta del receptor al anuncio (12 bytes).
+    
+    Formato: recibidos(4) + prefijo(4) + fin(4): tiene todas las secuencias
+    menores que el prefijo, y las de [prefijo, fin) según el mapa CTRL_RESUME.
+    """
+    end = max(chunks, default=-1) + 1
+    return (
+        len(chunks).to_bytes(4, 'big') +
+        int(prefix).to_bytes(4, 'big') +
+        max(end, prefix).to_bytes(4, 'big')
+    )
+
+
+def build_resume_bitmap(chunks: dict, prefix: int, index: int) -> bytes:
+    """
+    Construye el grupo `index` del mapa de recibidos: el bit i indica que
+    llegó prefix + index * RESUME_BITMAP_BYTES * 8 + i.
+    """
+    start = prefix + index * RESUME_BITMAP_BYTES * 8
+    bits = 0
+    for i in range(RESUME_BITMAP_BYTES * 8):
+        if start + i in chunks:
+            bits |= 1 << i
+    return bits.to_bytes(RESUME_BITMAP_BYTES, 'little')
+
+
+def parse_resume_bitmap(payload: bytes, prefix: int, index: int) -> set:
+    """Secuencias recibidas según un grupo de build_resume_bitmap"""
+    start = prefix + index * RESUME_BITMAP_BYTES * 8
+    bits = int.from_bytes(payload[:RESUME_BITMAP_BYTES], 'little')
+    return {start + i for i in range(RESUME_BITMAP_BYTES * 8) if bits >> i & 1}
+
+
+def parse_poll_payload(payload: bytes) -> tuple:
+    """
+    Parsea la respuesta a CTRL_POLL.
+    
+    Returns:
+        tuple: (state, faltantes en orden, siguiente secuencia a pedir)
+               siguiente es None si no quedan faltantes desde la pedida
+    """
+    if len(payload) < 5:
+        return 0, [], None
+    state = payload[0]
+    first = int.from_bytes(payload[1:5], 'big')
+    if first == 0xFFFFFFFF:
+        return state, [], None
+    missing = [first]
+    bits = int.from_bytes(payload[5:5 + POLL_BITMAP_BYTES], 'little')
+    i = 0
+    while bits:
+        if bits & 1:
+            missing.append(first + 1 + i)
+        bits >>= 1
+        i += 1
+    return state, missing, first + 1 + POLL_BITMAP_BYTES * 8
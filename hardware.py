@@ -32,6 +32,8 @@ class LEDController:
         self.state = SystemState.IDLE
         self.running = True
         self.blink_thread = None
+        self._changed = threading.Event()   # Despierta el parpadeo al cambiar de estado
+        self._lock = threading.Lock()
         
         if GPIO_AVAILABLE:
             GPIO.setmode(GPIO.BCM)
@@ -45,18 +47,26 @@ class LEDController:
     def _blink_loop(self):
         """Loop de parpadeo para estados IDLE y COMPLETED"""
         while self.running:
-            if self.state == SystemState.IDLE:
-                GPIO.output(LED_GREEN, GPIO.HIGH)
-                time.sleep(0.5)
-                GPIO.output(LED_GREEN, GPIO.LOW)
-                time.sleep(0.5)
-            elif self.state == SystemState.COMPLETED:
-                GPIO.output(LED_RED, GPIO.HIGH)
-                time.sleep(0.3)
-                GPIO.output(LED_RED, GPIO.LOW)
-                time.sleep(0.3)
+            self._changed.clear()
+            state = self.state
+            if state == SystemState.IDLE:
+                led, period = LED_GREEN, 0.5
+            elif state == SystemState.COMPLETED:
+                led, period = LED_RED, 0.3
             else:
-                time.sleep(0.1)
+                # Estados fijos: dormir hasta el próximo cambio
+                self._changed.wait()
+                continue
+            with self._lock:
+                if self.state != state:
+                    continue
+                GPIO.output(led, GPIO.HIGH)
+            interrupted = self._changed.wait(period)
+            with self._lock:
+                if self.state == state:
+                    GPIO.output(led, GPIO.LOW)
+            if not interrupted:
+                self._changed.wait(period)
 
     def set_state(self, state: SystemState):
         """Cambia el estado visual del sistema"""
@@ -64,23 +74,42 @@ class LEDController:
             self.state = state
             return
             
-        self.state = state
+        with self._lock:
+            self.state = state
+            
+            # Apagar todos los LEDs primero
+            GPIO.output(LED_GREEN, GPIO.LOW)
+            GPIO.output(LED_YELLOW, GPIO.LOW)
+            GPIO.output(LED_RED, GPIO.LOW)
+            
+            # Configurar según el estado
+            if state in (SystemState.TX_ACTIVE, SystemState.RX_ACTIVE):
+                GPIO.output(LED_YELLOW, GPIO.HIGH)
+            elif state == SystemState.ERROR:
+                GPIO.output(LED_YELLOW, GPIO.HIGH)
+                GPIO.output(LED_RED, GPIO.HIGH)
+        self._changed.set()
+
+    def idle_after(self, delay: float):
+        """
+        Vuelve a IDLE tras `delay` segundos sin bloquear al llamador.
+        
+        Si otro estado se fija antes (p. ej. empieza otro trabajo), no hace nada.
+        """
+        shown = self.state
         
-        # Apagar todos los LEDs primero
-        GPIO.output(LED_GREEN, GPIO.LOW)
-        GPIO.output(LED_YELLOW, GPIO.LOW)
-        GPIO.output(LED_RED, GPIO.LOW)
+        def _to_idle():
+            if self.running and self.state == shown:
+                self.set_state(SystemState.IDLE)
         
-        # Configurar según el estado
-        if state in (SystemState.TX_ACTIVE, SystemState.RX_ACTIVE):
-            GPIO.output(LED_YELLOW, GPIO.HIGH)
-        elif state == SystemState.ERROR:
-            GPIO.output(LED_YELLOW, GPIO.HIGH)
-            GPIO.output(LED_RED, GPIO.HIGH)
+        timer = threading.Timer(delay, _to_idle)
+        timer.daemon = True
+        timer.start()
 
     def cleanup(self):
         """Limpia recursos y apaga LEDs"""
         self.running = False
+        self._changed.set()
         if self.blink_thread:
             self.blink_thread.join(timeout=1)
         if GPIO_AVAILABLE:
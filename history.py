@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Historial persistente de transferencias (SQLite)
+
+Cada transferencia terminada en TX o RX, exitosa o no, queda como una fila
+en HISTORY_DB, con sus parámetros y resultados: goodput, rondas, ratio de
+compresión, correcciones FEC, faltantes. Así se ven tendencias que los
+prints de cada transferencia pierden (un enlace que se degrada en una
+semana, un códec que no rinde en archivos grandes).
+
+record_transfer() solo encola la fila: un hilo propio abre la base y la
+escribe, de modo que ni la TX ni el hilo de radio esperan al disco. Si la
+cola se llena (tarjeta SD trabada) la fila se descarta y se cuenta.
+
+Consultas desde la línea de comandos:
+    python3 history.py                        # últimos 7 días, por dirección
+    python3 history.py --since 24h --by codec
+    python3 history.py --since 30d --by day --by peer --direction tx
+    python3 history.py --by size --codec lzma
+    python3 history.py --list 20              # últimas transferencias
+"""
+
+import json
+import socket
+import time
+import queue
+import atexit
+import pathlib
+import threading
+
+from constants import STATE_DIR, HISTORY_DB, HISTORY_QUEUE_SIZE, STATION_NAME, STATION_NAME_BYTES
+
+DEFAULT_DB = pathlib.Path(STATE_DIR) / (HISTORY_DB or "historial.db")
+
+COLUMNS = (
+    'ts', 'direction', 'peer', 'file', 'result', 'error', 'size', 'stream_size',
+    'packets', 'codec', 'seconds', 'goodput_kibps', 'rounds', 'frames_sent',
+    'retries_per_frame', 'fec_corrected', 'missing', 'channel', 'params',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,              -- Fin de la transferencia (epoch)
+    direction TEXT NOT NULL,       -- 'tx' o 'rx'
+    peer TEXT,                     -- Otro extremo (su STATION_NAME, dirección o nodo)
+    file TEXT,
+    result TEXT NOT NULL,          -- 'ok', 'incomplete' o 'error'
+    error TEXT,
+    size INTEGER,                  -- Bytes del archivo original
+    stream_size INTEGER,           -- Bytes transmitidos (comprimidos)
+    packets INTEGER,
+    codec TEXT,
+    seconds REAL,
+    goodput_kibps REAL,
+    rounds INTEGER,
+    frames_sent INTEGER,
+    retries_per_frame REAL,
+    fec_corrected INTEGER,
+    missing INTEGER,
+    channel INTEGER,
+    params TEXT                    -- JSON: modo rápido, delta, streaming, ...
+);
+CREATE INDEX IF NOT EXISTS transfers_ts ON transfers (ts);
+"""
+
+# Límites de las clases de tamaño de --by size
+SIZE_CLASSES = ((16 * 1024, "<16K"), (256 * 1024, "16K-256K"), (4 * 1024 * 1024, "256K-4M"))
+
+
+def station_name() -> bytes:
+    """Nombre de este equipo para el otro extremo: STATION_NAME o el hostname"""
+    name = (STATION_NAME or socket.gethostname() or "?").encode('utf-8')
+    return name[:STATION_NAME_BYTES]
+
+
+def decode_station(payload: bytes) -> str:
+    """Nombre de estación recibido por radio (sin caracteres de control), o None"""
+    name = "".join(c for c in bytes(payload).decode('utf-8', errors='replace') if c.isprintable())
+    return name.strip() or None
+
+
+def peer_name(address: bytes, name: str = None) -> str:
+    """
+    Nombre del otro extremo en el historial.
+
+    Args:
+        address: Dirección de radio del enlace
+        name: Nombre de estación intercambiado con CTRL_PEER (None si el otro
+              extremo no lo envió)
+
+    Returns:
+        str: El nombre de estación, o la dirección de radio en hex
+    """
+    return name or bytes(address).hex()
+
+
+class HistoryStore:
+    """
+    Escritor del historial en un hilo propio.
+
+    Args:
+        path: Archivo SQLite (se crea con el esquema si no existe)
+        maxsize: Filas en espera antes de empezar a descartar
+        log: Función de log
+    """
+
+    def __init__(self, path: pathlib.Path = DEFAULT_DB, maxsize: int = HISTORY_QUEUE_SIZE,
+                 log=print):
+        self.path = pathlib.Path(path)
+        self.log = log
+        self.stats = {'recorded': 0, 'dropped': 0, 'failed': 0}
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="history", daemon=True)
+        self._thread.start()
+
+    def record(self, direction: str, result: str, **fields):
+        """
+        Encola una transferencia; nunca bloquea.
+
+        Args:
+            direction: 'tx' o 'rx'
+            result: 'ok', 'incomplete' o 'error'
+            **fields: Columnas de COLUMNS (params puede ser un dict)
+        """
+        fields.update(ts=time.time(), direction=direction, result=result)
+        if isinstance(fields.get('params'), dict):
+            fields['params'] = json.dumps(fields['params'], sort_keys=True)
+        try:
+            self._queue.put_nowait(tuple(fields.get(column) for column in COLUMNS))
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def flush(self, timeout: float = None):
+        """Espera a que se escriban las filas encoladas"""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: float = 2.0):
+        """Escribe lo pendiente y detiene el hilo"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        import sqlite3
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path))
+            db.execute("PRAGMA journal_mode=WAL")   # Las consultas no frenan la escritura
+            db.executescript(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            self.log(f"⚠ Historial deshabilitado ({self.path}): {e}")
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+
+        insert = (f"INSERT INTO transfers ({', '.join(COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(COLUMNS))})")
+        while True:
+            # Un commit por tanda: lo que se acumuló mientras se escribía la anterior
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in items if isinstance(item, tuple)]
+            if rows:
+                try:
+                    db.executemany(insert, rows)
+                    db.commit()
+                    self.stats['recorded'] += len(rows)
+                except sqlite3.Error as e:
+                    self.stats['failed'] += len(rows)
+                    self.log(f"⚠ No se pudo escribir el historial: {e}")
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in items:
+                db.close()
+                return
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history() -> HistoryStore:
+    """Historial compartido (None si HISTORY_DB está deshabilitado)"""
+    global _store
+    if _store is None and HISTORY_DB:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+                atexit.register(_store.close)
+    return _store
+
+
+def record_transfer(direction: str, result: str, **fields):
+    """Agrega una transferencia al historial compartido, si está habilitado"""
+    store = get_history()
+    if store is not None:
+        store.record(direction, result, **fields)
+
+
+# ============= CONSULTAS =============
+
+def parse_window(text: str) -> float:
+    """
+    Duración de la línea de comandos en segundos: '90s', '15m', '24h', '7d', '2w'.
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def size_class(size) -> str:
+    """Clase de tamaño de --by size"""
+    if size is None:
+        return "?"
+    for limit, label in SIZE_CLASSES:
+        if size < limit:
+            return label
+    return f">{SIZE_CLASSES[-1][1].split('-')[-1]}"
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Percentil por interpolación lineal (values ya ordenados); None si no hay valores"""
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+GROUP_KEYS = {
+    'direction': lambda row: row['direction'],
+    'peer': lambda row: row['peer'] or "?",
+    'codec': lambda row: row['codec'] or "?",
+    'result': lambda row: row['result'],
+    'size': lambda row: size_class(row['size']),
+    'hour': lambda row: time.strftime("%Y-%m-%d %H:00", time.localtime(row['ts'])),
+    'day': lambda row: time.strftime("%Y-%m-%d", time.localtime(row['ts'])),
+    'week': lambda row: time.strftime("%G-W%V", time.localtime(row['ts'])),
+}
+
+
+def query(db, since: float = None, direction: str = None, peer: str = None,
+          codec: str = None) -> list:
+    """Filas (sqlite3.Row) que cumplen los filtros, de la más vieja a la más nueva"""
+    clauses, args = [], []
+    for column, value in (('direction', direction), ('peer', peer), ('codec', codec)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            args.append(value)
+    if since is not None:
+        clauses.append("ts >= ?")
+        args.append(time.time() - since)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return db.execute(f"SELECT * FROM transfers{where} ORDER BY ts", args).fetchall()
+
+
+def aggregate(rows: list, by: list) -> list:
+    """
+    Agrupa las filas y calcula agregados por grupo.
+
+    Returns:
+        list: dicts {grupo, n, ok, goodput_mean/p50/p90/min, seconds_p50,
+              ratio, rounds, retries, fec, missing}, ordenados por grupo
+    """
+    groups = {}
+    for row in rows:
+        key = tuple(GROUP_KEYS[name](row) for name in by)
+        groups.setdefault(key, []).append(row)
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    out = []
+    for key in sorted(groups):
+        members = groups[key]
+        ok = [row for row in members if row['result'] == 'ok']
+        goodput = sorted(row['goodput_kibps'] for row in ok if row['goodput_kibps'] is not None)
+        seconds = sorted(row['seconds'] for row in ok if row['seconds'] is not None)
+        out.append({
+            'grupo': dict(zip(by, key)),
+            'n': len(members),
+            'ok': len(ok) / len(members),
+            'goodput_mean': mean(goodput),
+            'goodput_p50': percentile(goodput, 0.5),
+            'goodput_p90': percentile(goodput, 0.9),
+            'goodput_min': goodput[0] if goodput else None,
+            'seconds_p50': percentile(seconds, 0.5),
+            'ratio': mean([row['stream_size'] / row['size'] for row in members
+                           if row['size'] and row['stream_size'] is not None]),
+            'rounds': mean([row['rounds'] for row in members]),
+            'retries': mean([row['retries_per_frame'] for row in members]),
+            'fec': sum(row['fec_corrected'] or 0 for row in members),
+            'missing': sum(row['missing'] or 0 for row in members),
+        })
+    return out
+
+
+def _fmt(value, spec: str = ".1f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_table(groups: list, by: list):
+    """Una línea por grupo con los agregados"""
+    header = (" | ".join(f"{name:<13}" for name in by) +
+              " |     n |   ok% | KiB/s media |     p50 |     p90 |     mín | s p50 | ratio | rondas | reint | FEC | falt")
+    print(header)
+    print("-" * len(header))
+    for g in groups:
+        print(" | ".join(f"{str(g['grupo'][name]):<13}" for name in by) +
+              f" | {g['n']:5d} | {g['ok'] * 100:5.1f} | {_fmt(g['goodput_mean']):>11} | "
+              f"{_fmt(g['goodput_p50']):>7} | {_fmt(g['goodput_p90']):>7} | "
+              f"{_fmt(g['goodput_min']):>7} | {_fmt(g['seconds_p50'], '.2f'):>5} | "
+              f"{_fmt(g['ratio'], '.0%'):>5} | {_fmt(g['rounds']):>6} | "
+              f"{_fmt(g['retries'], '.2f'):>5} | {g['fec']:3d} | {g['missing']:4d}")
+
+
+def print_rows(rows: list):
+    """Transferencias individuales, la más reciente al final"""
+    for row in rows:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row['ts']))
+        mark = {'ok': "✓", 'incomplete': "⚠"}.get(row['result'], "✗")
+        print(f"{stamp} {mark} {row['direction'].upper()} {row['file'] or '(sin nombre)'} "
+              f"[{row['peer'] or '?'}] {row['size'] or 0} B {row['codec'] or '?'} "
+              f"{_fmt(row['goodput_kibps'])} KiB/s {_fmt(row['seconds'], '.2f')} s"
+              + (f" rondas {row['rounds']}" if row['rounds'] is not None else "")
+              + (f" — {row['error']}" if row['error'] else ""))
+
+
+def main():
+    import sqlite3
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Consultas al historial de transferencias nRF24')
+    parser.add_argument('--db', default=str(DEFAULT_DB), help='Base SQLite del historial')
+    parser.add_argument('--since', default='7d',
+                        help="Ventana hacia atrás: 90s, 15m, 24h, 7d, 2w ('all' = todo)")
+    parser.add_argument('--by', action='append', choices=list(GROUP_KEYS),
+                        help='Agrupar por (repetible); default: direction')
+    parser.add_argument('--direction', choices=['tx', 'rx'], help='Solo TX o solo RX')
+    parser.add_argument('--peer', help='Solo este extremo')
+    parser.add_argument('--codec', help='Solo este códec (none, zlib, bz2, lzma)')
+    parser.add_argument('--list', type=int, metavar='N', help='Mostrar las últimas N transferencias')
+    parser.add_argument('--json', action='store_true', help='Salida JSON')
+    args = parser.parse_args()
+
+    try:
+        since = None if args.since == 'all' else parse_window(args.since)
+    except ValueError:
+        parser.error(f"ventana inválida: {args.since}")
+    if not pathlib.Path(args.db).exists():
+        print(f"✗ No existe el historial: {args.db}")
+        return 1
+
+    db = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    db.row_factory = sqlite3.Row
+    rows = query(db, since, args.direction, args.peer, args.codec)
+
+    if args.list is not None:
+        rows = rows[-args.list:] if args.list else []
+        if args.json:
+            print(json.dumps([dict(row) for row in rows], indent=2, ensure_ascii=False))
+        else:
+            print_rows(rows)
+        return 0
+
+    by = args.by or ['direction']
+    groups = aggregate(rows, by)
+    if args.json:
+        print(json.dumps(groups, indent=2, ensure_ascii=False))
+    elif not groups:
+        print(f"💤 Sin transferencias en la ventana ({args.since})")
+    else:
+        print(f"📚 {len(rows)} transferencias ({'todo' if since is None else args.since})\n")
+        print_table(groups, by)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -154,6 +154,9 @@ fi
 echo -e "${YELLOW}  ℹ Instalando dependencias en el entorno virtual...${NC}"
 su - $USER -c "cd $INSTALL_DIR && source .venv/bin/activate && pip install --upgrade pip > /dev/null 2>&1"
 su - $USER -c "cd $INSTALL_DIR && source .venv/bin/activate && pip install pyrf24 reedsolo RPi.GPIO" 2>&1 | grep -E "(Successfully|already satisfied)" || true
+# Opcional: solo acelera el pre-chequeo de entropía (sin él se usa collections.Counter)
+su - $USER -c "cd $INSTALL_DIR && source .venv/bin/activate && pip install numpy" 2>&1 | grep -E "(Successfully|already satisfied)" || \
+    echo -e "${YELLOW}  ℹ numpy no instalado (opcional)${NC}"
 
 echo -e "${GREEN}  ✓ Dependencias instaladas en entorno virtual${NC}"
 
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Auto-ajuste de los parámetros del enlace nRF24L01+
+
+El transmisor prueba combinaciones de auto-retransmit (delay, count), data
+rate (1 o 2 Mbps) y nivel de PA enviando ráfagas de tramas de prueba al
+otro extremo, que corre tune_responder(). Por cada combinación mide el
+goodput y el ARC promedio; el mejor perfil se guarda por dirección del
+enlace y initialize_radio() lo aplica al arrancar.
+
+El data rate debe coincidir en ambos extremos: el transmisor lo cambia con
+tramas CTRL_TUNE y verifica el enlace en la nueva velocidad; si no hay
+respuesta, ambos vuelven a la anterior (el receptor tras RENDEZVOUS_TIMEOUT
+sin tramas).
+
+Prueba contra el enlace simulado:
+    python3 link_tuner.py --sim
+"""
+
+import os
+import json
+import time
+import pathlib
+from pyrf24 import (
+    RF24, RF24_1MBPS, RF24_2MBPS,
+    RF24_PA_MIN, RF24_PA_LOW, RF24_PA_HIGH, RF24_PA_MAX
+)
+from constants import (
+    ADDR_A, ADDR_B, HW_RETRY_DELAY, HW_RETRY_COUNT, CTRL_TUNE,
+    STATE_DIR, LINK_PROFILES_FILE, TUNE_DATA_RATES, TUNE_PA_LEVELS, TUNE_RETRY_OPTIONS,
+    TUNE_PROBE_FRAMES, TUNE_ABORT_FAILURES, TUNE_TOLERANCE,
+    SWITCH_QUIET, RENDEZVOUS_TIMEOUT, GLOBAL_TIMEOUT, IDLE_TIMEOUT,
+    RX_POLL_INTERVAL, DATA_BYTES, EFFECTIVE_DATA_BYTES
+)
+from frame_handler import build_control_frame, parse_frame
+from fec import is_fec_available
+
+PROFILES_PATH = pathlib.Path(STATE_DIR) / LINK_PROFILES_FILE
+
+DATA_RATES = {"1M": RF24_1MBPS, "2M": RF24_2MBPS}
+PA_LEVELS = {"MIN": RF24_PA_MIN, "LOW": RF24_PA_LOW, "HIGH": RF24_PA_HIGH, "MAX": RF24_PA_MAX}
+
+DEFAULT_PROFILE = {
+    'data_rate': "2M",
+    'pa_level': "MAX",
+    'retry_delay': HW_RETRY_DELAY,
+    'retry_count': HW_RETRY_COUNT,
+}
+
+# Operaciones de las tramas CTRL_TUNE (primer byte del payload)
+TUNE_OP_PROBE = 0    # Trama de prueba, el receptor la descarta
+TUNE_OP_RATE = 1     # Cambiar al data rate del segundo byte
+TUNE_OP_COMMIT = 2   # Igual que TUNE_OP_RATE, y guardar el perfil al confirmarse
+TUNE_OP_END = 3      # Fin de la sesión
+
+TUNE_FILE_ID = 0xFFFF
+COMMAND_ATTEMPTS = 50
+
+_RATE_CODES = {name: index for index, name in enumerate(DATA_RATES)}
+_RATE_NAMES = {index: name for name, index in _RATE_CODES.items()}
+
+
+# ============= PERFILES =============
+
+def profile_key(address: bytes) -> str:
+    """Clave del perfil: dirección del enlace en hexadecimal"""
+    return bytes(address).hex()
+
+
+def load_profiles(path: pathlib.Path = PROFILES_PATH) -> dict:
+    """Todos los perfiles guardados ({} si no hay archivo o está corrupto)"""
+    try:
+        return json.loads(pathlib.Path(path).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def load_profile(address: bytes, path: pathlib.Path = PROFILES_PATH) -> dict:
+    """
+    Perfil guardado para una dirección, completado con los valores por defecto.
+
+    Returns:
+        dict: Perfil (DEFAULT_PROFILE si nunca se ajustó el enlace)
+    """
+    profile = dict(DEFAULT_PROFILE)
+    stored = load_profiles(path).get(profile_key(address), {})
+    profile.update({key: stored[key] for key in DEFAULT_PROFILE if key in stored})
+    return profile
+
+
+def save_profile(address: bytes, profile: dict, path: pathlib.Path = PROFILES_PATH):
+    """
+    Guarda (fusiona) el perfil de una dirección.
+
+    La escritura es atómica (archivo temporal + rename).
+    """
+    path = pathlib.Path(path)
+    profiles = load_profiles(path)
+    entry = profiles.setdefault(profile_key(address), {})
+    entry.update(profile)
+    entry['updated'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(profiles, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def apply_profile(radio: RF24, profile: dict):
+    """Configura data rate, PA y auto-retransmit según el perfil"""
+    radio.data_rate = DATA_RATES[profile['data_rate']]
+    radio.set_pa_level(PA_LEVELS[profile['pa_level']])
+    radio.set_retries(profile['retry_delay'], profile['retry_count'])
+
+
+def describe_profile(profile: dict) -> str:
+    """Resumen de una línea del perfil"""
+    return (f"{profile['data_rate']}bps | PA {profile['pa_level']} | "
+            f"ARD {(profile['retry_delay'] + 1) * 250} µs x {profile['retry_count']}")
+
+
+def _set_data_rate(radio: RF24, rate: str):
+    """Cambia el data rate de un radio en RX sin perder el modo"""
+    was_listening = radio.listen
+    if was_listening:
+        radio.stop_listening()
+    radio.data_rate = DATA_RATES[rate]
+    if was_listening:
+        radio.start_listening()
+
+
+# ============= TRANSMISOR =============
+
+def _tune_frame(op: int, value: int = 0) -> bytes:
+    return build_control_frame(TUNE_FILE_ID, CTRL_TUNE, op, bytes([op, value]))
+
+
+def _send_command(radio: RF24, op: int, value: int = 0,
+                  attempts: int = COMMAND_ATTEMPTS) -> bool:
+    """Repite una trama CTRL_TUNE hasta que el hardware confirme su recepción"""
+    frame = _tune_frame(op, value)
+    for _ in range(attempts):
+        if radio.write(frame):
+            return True
+    return False
+
+
+def _link_alive(radio: RF24, timeout: float = RENDEZVOUS_TIMEOUT) -> bool:
+    """True si una trama de prueba recibe auto-ACK antes del timeout"""
+    frame = _tune_frame(TUNE_OP_PROBE)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if radio.write(frame):
+            return True
+    return False
+
+
+def switch_data_rate(radio: RF24, current: str, rate: str, commit: bool = False) -> bool:
+    """
+    Cambia el data rate de ambos extremos.
+
+    Args:
+        radio: Objeto RF24 en modo TX
+        current: Data rate actual ("1M"/"2M")
+        rate: Data rate destino
+        commit: Pedir al receptor que guarde el data rate al confirmarse
+
+    Returns:
+        bool: True si el enlace funciona en `rate`; False si volvió a `current`
+    """
+    if rate == current and not commit:
+        return True
+    op = TUNE_OP_COMMIT if commit else TUNE_OP_RATE
+    if not _send_command(radio, op, _RATE_CODES[rate]):
+        return False
+
+    radio.data_rate = DATA_RATES[rate]
+    time.sleep(SWITCH_QUIET * 2)   # El receptor cambia tras SWITCH_QUIET de silencio
+    if _link_alive(radio):
+        return True
+
+    # Sin enlace: el receptor vuelve solo tras RENDEZVOUS_TIMEOUT
+    radio.data_rate = DATA_RATES[current]
+    time.sleep(RENDEZVOUS_TIMEOUT)
+    _link_alive(radio)
+    return False
+
+
+def probe_profile(radio: RF24, profile: dict, frames: int = TUNE_PROBE_FRAMES) -> dict:
+    """
+    Mide el enlace con un perfil (el data rate ya debe estar acordado).
+
+    Returns:
+        dict: {sent, failed, arc_mean, goodput_kibps, elapsed}
+    """
+    apply_profile(radio, profile)
+    frame = _tune_frame(TUNE_OP_PROBE)
+    payload_bytes = EFFECTIVE_DATA_BYTES if is_fec_available() else DATA_BYTES
+
+    sent = failed = arc_total = consecutive = 0
+    start = time.monotonic()
+    for _ in range(frames):
+        if radio.write(frame):
+            sent += 1
+            arc_total += radio.get_arc()
+            consecutive = 0
+        else:
+            failed += 1
+            consecutive += 1
+            if consecutive >= TUNE_ABORT_FAILURES:
+                break
+    elapsed = time.monotonic() - start
+
+    return {
+        'sent': sent,
+        'failed': failed,
+        'arc_mean': arc_total / sent if sent else float(profile['retry_count']),
+        'goodput_kibps': sent * payload_bytes / elapsed / 1024 if elapsed > 0 else 0.0,
+        'elapsed': elapsed,
+    }
+
+
+def select_best(results: list) -> dict:
+    """
+    Elige el perfil de mayor goodput.
+
+    Entre los que quedan dentro de TUNE_TOLERANCE del mejor se prefiere el
+    de menor potencia y luego el de menos reintentos.
+
+    Args:
+        results: [(perfil, medición de probe_profile)]
+    """
+    best_goodput = max(stats['goodput_kibps'] for _, stats in results)
+    close = [
+        (profile, stats) for profile, stats in results
+        if stats['goodput_kibps'] >= best_goodput * (1 - TUNE_TOLERANCE)
+    ]
+    pa_order = list(PA_LEVELS)
+    profile, _ = min(close, key=lambda item: (pa_order.index(item[0]['pa_level']),
+                                              item[1]['arc_mean'],
+                                              -item[1]['goodput_kibps']))
+    return profile
+
+
+def tune_link(radio: RF24, address: bytes = ADDR_A,
+              data_rates: tuple = TUNE_DATA_RATES, pa_levels: tuple = TUNE_PA_LEVELS,
+              retry_options: tuple = TUNE_RETRY_OPTIONS,
+              frames: int = TUNE_PROBE_FRAMES,
+              path: pathlib.Path = PROFILES_PATH) -> dict:
+    """
+    Prueba todas las combinaciones y guarda el mejor perfil.
+
+    El otro extremo debe estar corriendo tune_responder().
+
+    Args:
+        radio: Objeto RF24 inicializado
+        address: Dirección del receptor (clave del perfil)
+        data_rates: Data rates a probar ("1M"/"2M")
+        pa_levels: Niveles de PA a probar
+        retry_options: Pares (delay, count) de auto-retransmit
+        frames: Tramas por combinación
+        path: Archivo de perfiles
+
+    Returns:
+        dict: Perfil elegido, o None si el receptor no respondió
+    """
+    print(f"\n{'='*50}")
+    print("AUTO-AJUSTE DEL ENLACE")
+    print(f"{'='*50}")
+
+    radio.open_rx_pipe(1, ADDR_B)
+    radio.stop_listening()
+    radio.open_tx_pipe(address)
+
+    current = load_profile(address, path)['data_rate']
+    safe = dict(DEFAULT_PROFILE, data_rate=current)
+    apply_profile(radio, safe)
+    if not _link_alive(radio, GLOBAL_TIMEOUT):
+        print("✗ El receptor de ajuste no responde")
+        return None
+
+    results = []
+    for rate in data_rates:
+        # Cambiar de velocidad con potencia y reintentos máximos
+        apply_profile(radio, dict(safe, data_rate=current))
+        if not switch_data_rate(radio, current, rate):
+            print(f"⚠ No se pudo acordar {rate}bps, se omite")
+            continue
+        current = rate
+
+        for pa_level in pa_levels:
+            for delay, count in retry_options:
+                profile = {'data_rate': rate, 'pa_level': pa_level,
+                           'retry_delay': delay, 'retry_count': count}
+                stats = probe_profile(radio, profile, frames)
+                results.append((profile, stats))
+                print(f"  {describe_profile(profile):<40} "
+                      f"{stats['goodput_kibps']:6.1f} KiB/s | "
+                      f"ARC {stats['arc_mean']:.2f} | fallos {stats['failed']}")
+                if not _link_alive(radio):
+                    # Perfil sin enlace: recuperar con potencia máxima
+                    apply_profile(radio, dict(safe, data_rate=current))
+
+    if not results:
+        return None
+
+    best = select_best(results)
+    apply_profile(radio, dict(safe, data_rate=current))
+    if not switch_data_rate(radio, current, best['data_rate'], commit=True):
+        print("⚠ El receptor no confirmó el data rate elegido")
+    _send_command(radio, TUNE_OP_END, attempts=10)
+
+    apply_profile(radio, best)
+    save_profile(address, best, path)
+    best_stats = next(stats for profile, stats in results if profile == best)
+    print(f"\n✓ Perfil elegido: {describe_profile(best)}")
+    print(f"  Goodput: {best_stats['goodput_kibps']:.1f} KiB/s | ARC promedio: {best_stats['arc_mean']:.2f}")
+    print(f"  Guardado en {path}")
+    return best
+
+
+# ============= RECEPTOR =============
+
+def tune_responder(radio: RF24, address: bytes = ADDR_A,
+                   timeout: float = GLOBAL_TIMEOUT,
+                   path: pathlib.Path = PROFILES_PATH) -> str:
+    """
+    Atiende una sesión de auto-ajuste iniciada por tune_link().
+
+    Descarta las tramas de prueba (el auto-ACK del hardware es lo que se
+    mide) y sigue los cambios de data rate del transmisor.
+
+    Returns:
+        str: Data rate guardado al final de la sesión, o None si no terminó
+    """
+    print("\n[ AUTO-AJUSTE: RECEPTOR ]")
+    radio.open_rx_pipe(1, address)
+    radio.open_tx_pipe(ADDR_B)
+    current = load_profile(address, path)['data_rate']
+    _set_data_rate(radio, current)
+    radio.start_listening()
+
+    committed = None
+    pending = None
+    pending_commit = False
+    previous = None
+    switched_at = None
+    confirm_commit = False
+    start = time.monotonic()
+    last_frame = None
+
+    try:
+        while True:
+            now = time.monotonic()
+            if last_frame is None and now - start > timeout:
+                print("✗ Timeout esperando al transmisor de ajuste")
+                break
+            if last_frame is not None and now - last_frame > IDLE_TIMEOUT and switched_at is None:
+                print("✗ El transmisor de ajuste dejó de enviar")
+                break
+
+            has_payload, _ = radio.available_pipe()
+            if has_payload:
+                size = radio.get_dynamic_payload_size()
+                packet = bytes(radio.read(size))
+                last_frame = time.monotonic()
+                switched_at = None
+                if confirm_commit:
+                    # Primera trama en la velocidad acordada: el perfil es válido
+                    save_profile(address, {'data_rate': current}, path)
+                    committed = current
+                    confirm_commit = False
+                    print(f"✓ Data rate guardado: {current}bps")
+
+                parsed = parse_frame(packet)
+                if parsed is None or parsed[6] != CTRL_TUNE or len(parsed[2]) < 2:
+                    continue
+                op, value = parsed[2][0], parsed[2][1]
+                if op in (TUNE_OP_RATE, TUNE_OP_COMMIT) and value in _RATE_NAMES:
+                    pending = _RATE_NAMES[value]
+                    pending_commit = op == TUNE_OP_COMMIT
+                elif op == TUNE_OP_END:
+                    print("✓ Sesión de ajuste terminada")
+                    break
+                continue
+
+            if pending is not None and now - last_frame > SWITCH_QUIET:
+                if pending != current:
+                    previous, current = current, pending
+                    _set_data_rate(radio, current)
+                    switched_at = now
+                    print(f"📡 Data rate: {current}bps")
+                confirm_commit = pending_commit
+                pending = None
+            elif switched_at is not None and now - switched_at > RENDEZVOUS_TIMEOUT:
+                print(f"⚠ Sin tramas en {current}bps, volviendo a {previous}bps")
+                current = previous
+                _set_data_rate(radio, current)
+                switched_at = None
+                confirm_commit = False
+                last_frame = time.monotonic()
+            time.sleep(RX_POLL_INTERVAL)
+    finally:
+        radio.stop_listening()
+
+    return committed
+
+
+# ============= ENLACE SIMULADO =============
+
+def run_simulated(range_loss: float = 0.3, frames: int = 100,
+                  path: pathlib.Path = None) -> dict:
+    """
+    Ejecuta tune_link contra tune_responder sobre el enlace simulado.
+
+    Args:
+        range_loss: Pérdida por distancia a PA máximo y 2 Mbps (ver sim_radio)
+        frames: Tramas por combinación
+        path: Archivo de perfiles (por defecto uno temporal)
+
+    Returns:
+        dict: Perfil elegido por el transmisor
+    """
+    import tempfile
+    import threading
+    from sim_radio import Ether, SimRadio
+
+    if path is None:
+        path = pathlib.Path(tempfile.mkdtemp(prefix="nrf24_tune_")) / LINK_PROFILES_FILE
+
+    ether = Ether(range_loss=range_loss)
+    tx_radio = SimRadio(ether, "tx")
+    rx_radio = SimRadio(ether, "rx")
+
+    responder = threading.Thread(
+        target=tune_responder, args=(rx_radio,), kwargs={'path': path.with_suffix(".rx.json")}
+    )
+    responder.start()
+    time.sleep(0.1)
+    best = tune_link(tx_radio, frames=frames, path=path)
+    responder.join()
+
+    rx_profile = load_profile(ADDR_A, path.with_suffix(".rx.json"))
+    print(f"  Receptor: {rx_profile['data_rate']}bps guardado")
+    return best
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Auto-ajuste del enlace nRF24L01+')
+    parser.add_argument('--role', choices=['tx', 'rx'], default='tx',
+                        help='tx: probar combinaciones; rx: atender la sesión de ajuste')
+    parser.add_argument('--frames', type=int, default=TUNE_PROBE_FRAMES,
+                        help='Tramas por combinación')
+    parser.add_argument('--sim', action='store_true',
+                        help='Ejecutar ambos extremos sobre el enlace simulado (sim_radio)')
+    parser.add_argument('--range-loss', type=float, default=0.3,
+                        help='Pérdida por distancia del enlace simulado')
+    args = parser.parse_args()
+
+    if args.sim:
+        run_simulated(args.range_loss, args.frames)
+        return
+
+    from radio_config import initialize_radio
+    radio = initialize_radio()
+    if args.role == 'tx':
+        tune_link(radio, frames=args.frames)
+    else:
+        tune_responder(radio)
+
+
+if __name__ == "__main__":
+    main()
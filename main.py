@@ -8,18 +8,26 @@ Uso:
 """
 
 import sys
-import time
 import pathlib
 
 # Importar módulos del proyecto
-from radio_config import initialize_radio
-from hardware import LEDController, ButtonController, SystemState, GPIO
+from radio_config import initialize_radio, arm_receiver
+from hardware import LEDController, ButtonController, GPIO
 from transmitter import transmit_file, transmit_multiple_files
-from receiver import receive_file
+from receiver import receive_session, finalize_reception
+from broadcast import broadcast_file, parse_nodes
+from finalizer import FinalizePool
+from link_tuner import tune_link, tune_responder
+from dispatcher import Dispatcher
+from spool import SpoolWatcher
 from constants import (
-    FRAME_SIZE, FEC_SYMBOLS, BURST_SIZE, INTER_PACKET_DELAY
+    FRAME_SIZE, FEC_SYMBOLS, BURST_SIZE, INTER_PACKET_DELAY, RESULT_DISPLAY_TIME, NODE_ID
 )
+from frame_handler import node_address
 from fec import is_fec_available
+from metrics import start_http_server, write_textfile
+import tracing
+import telemetry
 
 
 def print_banner():
@@ -77,8 +85,43 @@ Ejemplos:
   # Iniciar directamente en modo TRANSMISIÓN MÚLTIPLE:
   python3 main.py documento.pdf ./recibidos/ --mode tx-multi
   
+  # Transmitir en modo rápido (FIFO TX siempre llena):
+  python3 main.py documento.pdf ./recibidos/ --mode tx --fast
+  
+  # Enviar solo los cambios respecto a la versión previa del receptor:
+  python3 main.py config.txt ./recibidos/ --mode tx --delta
+  
+  # Sincronizar Textos/: enviar solo lo nuevo o modificado (y borrar lo que ya no está):
+  python3 main.py documento.pdf ./recibidos/ --mode tx-multi --sync --sync-delete
+  
+  # Difundir a varios receptores (cada uno en modo rx con su ID):
+  python3 main.py config.txt ./recibidos/ --mode rx --node-id 3
+  python3 main.py config.txt ./recibidos/ --mode tx --broadcast 3,5,7-9
+  
+  # Auto-ajustar data rate, PA y reintentos (perfil guardado para el próximo arranque):
+  python3 main.py documento.pdf ./recibidos/ --mode tune-rx
+  python3 main.py documento.pdf ./recibidos/ --mode tune
+  
+  # Elegir el canal más limpio (ambos extremos con --auto-channel):
+  python3 main.py documento.pdf ./recibidos/ --mode rx --auto-channel
+  python3 main.py documento.pdf ./recibidos/ --mode tx --auto-channel
+  
+  # Exponer métricas Prometheus en http://127.0.0.1:9124/metrics:
+  python3 main.py documento.pdf ./recibidos/ --metrics-port 9124
+  
+  # Trazar las etapas del pipeline (abrir en https://ui.perfetto.dev):
+  python3 main.py documento.pdf ./recibidos/ --mode tx --trace traza.json
+  python3 main.py documento.pdf ./recibidos/ --mode tx --telemetry tx.bin
+  
+  # Perfilar con cProfile o por muestreo de pilas:
+  python3 main.py documento.pdf ./recibidos/ --mode tx --profile tx.prof
+  python3 main.py documento.pdf ./recibidos/ --mode rx --sample rx.folded
+  
   # Especificar directorio de textos personalizado:
   python3 main.py documento.pdf ./recibidos/ --textos-dir ./MisTextos
+  
+  # Transmitir automáticamente lo que aparezca en un directorio spool:
+  python3 main.py documento.pdf ./recibidos/ --spool ./spool
         """
     )
     
@@ -87,14 +130,72 @@ Ejemplos:
     parser.add_argument('directorio_recepcion', 
                         help='Carpeta donde se guardarán archivos recibidos')
     parser.add_argument('--mode', 
-                        choices=['tx', 'rx', 'idle', 'tx-multi'],
+                        choices=['tx', 'rx', 'idle', 'tx-multi', 'tune', 'tune-rx'],
                         default='idle',
-                        help='Modo inicial: tx (transmisor), rx (receptor), tx-multi (transmitir múltiples), idle (esperar botón)')
+                        help='Modo inicial: tx (transmisor), rx (receptor), tx-multi (transmitir múltiples), idle (esperar botón), '
+                             'tune / tune-rx (auto-ajustar el enlace: extremo que prueba / extremo que responde)')
+    parser.add_argument('--fast',
+                        action='store_true',
+                        help='Transmitir con write_fast() manteniendo llena la FIFO TX (modo alto rendimiento)')
+    parser.add_argument('--delta',
+                        action='store_true',
+                        help='Enviar solo los bloques que cambiaron respecto a la versión del receptor')
+    parser.add_argument('--stream',
+                        action='store_true',
+                        help='Comprimir en un hilo mientras se transmiten los primeros paquetes (archivos grandes)')
+    parser.add_argument('--sync',
+                        action='store_true',
+                        help='TX-MULTI envía solo los archivos que el receptor no tiene o que cambiaron (según su manifiesto)')
+    parser.add_argument('--sync-delete',
+                        action='store_true',
+                        help='Con --sync, borrar en el receptor los .txt que ya no están en el directorio de textos')
+    parser.add_argument('--broadcast',
+                        default=None, metavar='NODOS',
+                        help='Difundir a varios receptores a la vez (IDs "3,5,7" o "3-6"); '
+                             'cada uno corre en modo rx con --node-id')
+    parser.add_argument('--node-id',
+                        type=int, default=NODE_ID,
+                        help='ID de este receptor en difusiones (1-254; default: NODE_ID)')
+    parser.add_argument('--static-burst',
+                        action='store_true',
+                        help='Usar BURST_SIZE/INTER_PACKET_DELAY fijos en lugar del control AIMD')
+    parser.add_argument('--auto-channel',
+                        action='store_true',
+                        help='Escanear el ruido (RPD) y acordar el canal más limpio con el otro extremo (usar en ambos)')
+    parser.add_argument('--metrics-port',
+                        type=int,
+                        default=0,
+                        help='Puerto HTTP local para exponer métricas Prometheus en /metrics (default: deshabilitado)')
+    parser.add_argument('--metrics-textfile',
+                        default=None,
+                        help='Archivo .prom para el textfile collector de node-exporter (se actualiza tras cada operación)')
+    parser.add_argument('--trace',
+                        default=None,
+                        help='Guardar spans de cada etapa en formato Chrome Trace/Perfetto (también: NRF24_TRACE)')
+    parser.add_argument('--telemetry',
+                        default=None,
+                        help='Registrar ARC, MAX_RT y latencias de cada trama TX en un buffer binario (también: NRF24_TELEMETRY)')
+    parser.add_argument('--profile',
+                        default=None,
+                        help='Perfilar el hilo principal con cProfile y guardar el .prof al salir')
+    parser.add_argument('--sample',
+                        default=None,
+                        help='Perfilar todos los hilos por muestreo y guardar las pilas (formato folded) al salir')
     parser.add_argument('--textos-dir',
                         default='Textos',
                         help='Directorio con archivos .txt para transmisión múltiple (default: Textos)')
+    parser.add_argument('--spool',
+                        default=None,
+                        help='Vigilar este directorio y transmitir cada archivo nuevo (alta/ y baja/ fijan la prioridad; '
+                             'los enviados pasan a enviados/)')
     
     args = parser.parse_args()
+    try:
+        broadcast_nodes = parse_nodes(args.broadcast) if args.broadcast else None
+        if args.node_id is not None:
+            node_address(args.node_id)
+    except ValueError as e:
+        parser.error(str(e))
     
     file_path = pathlib.Path(args.archivo_a_enviar)
     dest_dir = pathlib.Path(args.directorio_recepcion)
@@ -136,27 +237,132 @@ Ejemplos:
         print("  3. Permisos: sudo usermod -a -G spi,gpio $USER")
         sys.exit(1)
 
+    # Trazas y perfilado (opcionales)
+    if args.trace:
+        tracing.enable(args.trace)
+    if args.telemetry:
+        telemetry.enable(args.telemetry)
+    profilers = []
+    if args.profile:
+        profilers.append((tracing.CProfiler(), args.profile))
+    if args.sample:
+        profilers.append((tracing.SamplingProfiler(), args.sample))
+    for profiler, _ in profilers:
+        profiler.start()
+
+    # Métricas
+    if args.metrics_port:
+        try:
+            start_http_server(args.metrics_port)
+            print(f"📈 Métricas en http://127.0.0.1:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"⚠ No se pudo iniciar el endpoint de métricas: {e}")
+
+    def export_metrics():
+        """Actualiza el archivo de métricas, si se pidió"""
+        if args.metrics_textfile:
+            try:
+                write_textfile(args.metrics_textfile)
+            except OSError as e:
+                print(f"⚠ No se pudo escribir {args.metrics_textfile}: {e}")
+
     # Inicializar controladores de hardware
     led_controller = LEDController()
-    mode = {'current': args.mode}  # Usar modo inicial del argumento
+    finalizer = FinalizePool(finalize_reception)
+
+    def finish_job():
+        """Tras cada operación: métricas y radio escuchando de nuevo"""
+        export_metrics()
+        arm_receiver(radio)
+
+    def send(path: pathlib.Path) -> bool:
+        """Un archivo a un receptor o, con --broadcast, a todos los nodos"""
+        if broadcast_nodes:
+            return broadcast_file(radio, path, broadcast_nodes, led_controller)['fallidos'] == 0
+        return transmit_file(radio, path, led_controller, args.fast, args.delta,
+                             args.auto_channel, not args.static_burst, args.stream)
+
+    def run_tx(job):
+        print("\n" + "▶"*35)
+        print("MODO TRANSMISOR ACTIVADO")
+        print("▶"*35 + "\n")
+        try:
+            return send(file_path)
+        finally:
+            finish_job()
+
+    def run_tx_multi(job):
+        print("\n" + "▶"*35)
+        print("MODO TRANSMISIÓN MÚLTIPLE ACTIVADO")
+        print("▶"*35 + "\n")
+        try:
+            return transmit_multiple_files(radio, textos_dir, led_controller, args.fast, args.delta,
+                                           args.auto_channel, not args.static_burst, args.stream,
+                                           args.sync, args.sync_delete)
+        finally:
+            finish_job()
+
+    def run_rx(job):
+        print("\n" + "◀"*35)
+        print("MODO RECEPTOR ACTIVADO")
+        print("◀"*35 + "\n")
+        try:
+            # Sigue escuchando mientras el transmisor mande archivos
+            stats = receive_session(radio, dest_dir, led_controller, args.auto_channel,
+                                    finalizer=finalizer, node_id=args.node_id)
+            return stats['total'] > 0 and not stats['fallidos']
+        finally:
+            finish_job()
+
+    def run_tune(job):
+        print("\n" + "⚙"*35)
+        print("MODO AUTO-AJUSTE DEL ENLACE")
+        print("⚙"*35 + "\n")
+        try:
+            return tune_link(radio) if job.kind == 'tune' else tune_responder(radio)
+        finally:
+            arm_receiver(radio)
+
+    def run_spool(job):
+        path = job.params['path']
+        success = False
+        try:
+            if path.is_file():
+                print(f"\n📤 Spool: {path.name}")
+                success = send(path)
+            return success
+        finally:
+            spool.finish(path, success)
+            finish_job()
+
+    def on_idle():
+        led_controller.idle_after(RESULT_DISPLAY_TIME)
+        print("\n💤 Idle - Presione el botón para nueva operación\n")
+
+    dispatcher = Dispatcher({
+        'tx': run_tx,
+        'tx-multi': run_tx_multi,
+        'rx': run_rx,
+        'tune': run_tune,
+        'tune-rx': run_tune,
+        'spool': run_spool,
+    }, on_idle=on_idle)
+    spool = SpoolWatcher(pathlib.Path(args.spool), dispatcher) if args.spool else None
 
     def short_press():
         """Callback para pulsación corta -> TX"""
-        if mode['current'] == 'idle':
-            mode['current'] = 'tx'
-            print("\n BOTÓN CORTO → Iniciando TRANSMISIÓN (TX)")
+        print("\n BOTÓN CORTO → TRANSMISIÓN (TX)")
+        dispatcher.submit('tx', source='botón')
 
     def medium_press():
         """Callback para pulsación media -> RX"""
-        if mode['current'] == 'idle':
-            mode['current'] = 'rx'
-            print("\n BOTÓN MEDIO → Iniciando RECEPCIÓN (RX)")
+        print("\n BOTÓN MEDIO → RECEPCIÓN (RX)")
+        dispatcher.submit('rx', source='botón')
 
     def long_press():
         """Callback para pulsación larga -> TX-MULTI"""
-        if mode['current'] == 'idle':
-            mode['current'] = 'tx-multi'
-            print("\n BOTÓN LARGO → Iniciando TRANSMISIÓN MÚLTIPLE (TX-MULTI)")
+        print("\n BOTÓN LARGO → TRANSMISIÓN MÚLTIPLE (TX-MULTI)")
+        dispatcher.submit('tx-multi', source='botón')
 
     button_controller = ButtonController(short_press, medium_press, long_press)
 
@@ -166,6 +372,8 @@ Ejemplos:
     print(f" Archivo a transmitir: {file_path.name}")
     print(f"Directorio de recepción: {dest_dir.absolute()}")
     print(f"Directorio de textos: {textos_dir.absolute()}")
+    if spool:
+        spool.start()
     
     if args.mode == 'idle':
         print(f"\n Sistema en espera - Presione el botón para comenzar\n")
@@ -176,58 +384,36 @@ Ejemplos:
     elif args.mode == 'tx-multi':
         print(f"\n Modo inicial: TRANSMISIÓN MÚLTIPLE - Iniciando automáticamente...\n")
 
-    # Bucle principal
+    # Radio escuchando mientras se espera el primer trabajo
+    arm_receiver(radio)
+    if args.mode != 'idle':
+        dispatcher.submit(args.mode, source='--mode')
+
+    # Worker en el hilo principal: duerme en la cola hasta que haya trabajos
     try:
-        while True:
-            if mode['current'] == 'tx':
-                print("\n" + "▶"*35)
-                print("MODO TRANSMISOR ACTIVADO")
-                print("▶"*35 + "\n")
-                
-                transmit_file(radio, file_path, led_controller)
-                
-                time.sleep(3)
-                mode['current'] = 'idle'
-                led_controller.set_state(SystemState.IDLE)
-                print("\n💤 Idle - Presione el botón para nueva operación\n")
-                
-            elif mode['current'] == 'tx-multi':
-                print("\n" + "▶"*35)
-                print("MODO TRANSMISIÓN MÚLTIPLE ACTIVADO")
-                print("▶"*35 + "\n")
-                
-                transmit_multiple_files(radio, textos_dir, led_controller)
-                
-                time.sleep(3)
-                mode['current'] = 'idle'
-                led_controller.set_state(SystemState.IDLE)
-                print("\n Idle - Presione el botón para nueva operación\n")
-                
-            elif mode['current'] == 'rx':
-                print("\n" + "◀"*35)
-                print("MODO RECEPTOR ACTIVADO")
-                print("◀"*35 + "\n")
-                
-                receive_file(radio, dest_dir, led_controller)
-                
-                time.sleep(3)
-                mode['current'] = 'idle'
-                led_controller.set_state(SystemState.IDLE)
-                print("\n Idle - Presione el botón para cambiar a TX\n")
-                
-            else:
-                # Estado idle: esperar entrada del botón
-                time.sleep(0.1)
-                
+        dispatcher.run()
+        
     except KeyboardInterrupt:
         print("\n\n Sistema detenido por el usuario")
         
     finally:
         # Limpieza
         print("\n Limpiando recursos...")
+        if spool:
+            spool.stop()
+        finalizer.close()
         led_controller.cleanup()
         if GPIO:
             GPIO.cleanup()
+        for profiler, output in profilers:
+            profiler.stop(output)
+        trace_path = tracing.save()
+        if trace_path:
+            print(f"📈 Traza guardada en {trace_path}")
+        telemetry_path = telemetry.save()
+        if telemetry_path:
+            print(f"📈 Telemetría guardada en {telemetry_path} "
+                  f"(python3 telemetry.py {telemetry_path})")
         print(" Limpieza completada\n")
 
 
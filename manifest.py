@@ -0,0 +1,81 @@
+"""
+Manifiesto de directorio para la sincronización (TX-MULTI con --sync)
+
+El receptor describe lo que ya tiene con una entrada por archivo:
+clave del nombre (4 bytes) + hash del contenido (4 bytes), los mismos
+calculate_file_hash que usan el modo delta y el trailer. El transmisor
+compara ese manifiesto con su directorio y envía solo los archivos nuevos
+o modificados; con borrado, los que el receptor tiene y él no, se borran.
+
+Formato en los ACKs de control:
+    CTRL_MANIFEST índice 0 (payload = patrón) → cantidad de entradas (4)
+    CTRL_MANIFEST índice n → entradas del grupo n-1, ordenadas por clave
+"""
+
+import fnmatch
+import pathlib
+from constants import MANIFEST_ENTRIES_PER_ACK
+from frame_handler import calculate_file_hash
+
+MANIFEST_ENTRY_SIZE = 8     # name_key(4) + content_hash(4)
+MANIFEST_GROUP_SIZE = MANIFEST_ENTRIES_PER_ACK * MANIFEST_ENTRY_SIZE
+
+
+def name_key(name: str) -> bytes:
+    """Clave de 4 bytes de un nombre de archivo (la misma del modo delta)"""
+    return calculate_file_hash(name.encode('utf-8'))
+
+
+def build_manifest(directory: pathlib.Path, pattern: str) -> dict:
+    """
+    Describe los archivos de un directorio que cumplen `pattern`.
+
+    Solo mira el primer nivel y omite los ocultos (.parciales, .base y los
+    temporales de la escritura atómica). El patrón se compara con el
+    nombre, nunca se resuelve como ruta.
+
+    Returns:
+        dict: {name_key: (ruta, hash_del_contenido)}
+    """
+    manifest = {}
+    for path in sorted(directory.iterdir()):
+        if (path.name.startswith(".") or not path.is_file() or
+                not fnmatch.fnmatchcase(path.name, pattern)):
+            continue
+        manifest[name_key(path.name)] = (path, calculate_file_hash(path.read_bytes()))
+    return manifest
+
+
+def encode_manifest(manifest: dict) -> bytes:
+    """Entradas concatenadas, ordenadas por clave"""
+    return b"".join(key + manifest[key][1] for key in sorted(manifest))
+
+
+def decode_manifest(data: bytes, count: int) -> dict:
+    """
+    Lee las primeras `count` entradas de un manifiesto codificado.
+
+    Returns:
+        dict: {name_key: hash_del_contenido}
+    """
+    entries = {}
+    for start in range(0, min(len(data), count * MANIFEST_ENTRY_SIZE), MANIFEST_ENTRY_SIZE):
+        entries[data[start:start + 4]] = data[start + 4:start + MANIFEST_ENTRY_SIZE]
+    return entries
+
+
+def diff_manifest(local: dict, remote: dict) -> tuple:
+    """
+    Compara el manifiesto local con el del receptor.
+
+    Args:
+        local: build_manifest() del directorio del transmisor
+        remote: decode_manifest() de la respuesta del receptor
+
+    Returns:
+        tuple: (rutas a enviar en orden alfabético, entradas a borrar como
+                name_key + hash, cantidad de archivos sin cambios)
+    """
+    send = sorted(path for key, (path, digest) in local.items() if remote.get(key) != digest)
+    delete = [key + remote[key] for key in sorted(remote) if key not in local]
+    return send, delete, len(local) - len(send)
@@ -0,0 +1,256 @@
+"""
+Métricas en formato Prometheus
+
+Contadores e histogramas en memoria, expuestos por un endpoint HTTP local
+(/metrics) o escritos como archivo para el textfile collector de
+node-exporter. Actualizar una métrica es un incremento de atributo sin
+locks: cada serie la actualiza un solo hilo (TX, hilo de radio o RxWorker)
+y el GIL garantiza lecturas consistentes al exportar.
+
+http.server (y con él email, html, socketserver) se importa recién al
+iniciar el endpoint, para no demorar el arranque del daemon.
+"""
+
+import os
+import abc
+import bisect
+import pathlib
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    """Formatea las etiquetas de una serie: {a="x",b="y"}"""
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    """Serie de un contador (una combinación de etiquetas)"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        """Incrementa el contador"""
+        self.value += amount
+
+
+class _HistogramChild:
+    """Serie de un histograma (una combinación de etiquetas)"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Registra una observación"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric(abc.ABC):
+    """Familia de series con el mismo nombre"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Crea la serie de una combinación de etiquetas nueva"""
+
+    def labels(self, *values):
+        """
+        Serie para una combinación de etiquetas.
+
+        Conviene obtenerla una vez fuera de los bucles calientes.
+        """
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _samples(self) -> list:
+        """Líneas de muestras de todas las series de la familia"""
+
+    def render(self) -> str:
+        """Texto de la familia en formato de exposición Prometheus"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Contador monótono"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        """Incrementa un contador sin etiquetas"""
+        self._default.value += amount
+
+    def _samples(self) -> list:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+            for values, child in list(self._children.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Histograma de buckets acumulativos"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple,
+                 labelnames: tuple = ()):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        """Registra una observación en un histograma sin etiquetas"""
+        self._default.observe(value)
+
+    def _samples(self) -> list:
+        lines = []
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(float(bound))
+                labels = _format_labels(self.labelnames, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {child.sum}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en formato de exposición Prometheus"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+def write_textfile(path: pathlib.Path):
+    """
+    Escribe las métricas para el textfile collector de node-exporter.
+
+    La escritura es atómica (archivo temporal + rename) para que el
+    collector nunca lea un archivo a medias.
+    """
+    path = pathlib.Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(render_metrics())
+    os.replace(tmp, path)
+
+
+def _make_handler():
+    """Handler HTTP que sirve /metrics; cualquier otra ruta responde 404"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Los scrapes periódicos no deben llenar el log del daemon
+            pass
+
+    return _MetricsHandler
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1"):
+    """
+    Expone las métricas en http://addr:port/metrics desde un hilo daemon.
+
+    Returns:
+        ThreadingHTTPServer: Servidor en ejecución (shutdown() para detenerlo)
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((addr, port), _make_handler())
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ============= MÉTRICAS DEL SISTEMA =============
+
+FRAMES_SENT = Counter(
+    "nrf24_frames_sent_total", "Tramas de datos confirmadas por el hardware")
+WRITE_FAILURES = Counter(
+    "nrf24_write_failures_total", "Escrituras fallidas tras agotar los reintentos automáticos")
+HW_RETRIES = Counter(
+    "nrf24_hw_retries_total", "Reintentos automáticos del hardware (ARC)")
+ACKS_RECEIVED = Counter(
+    "nrf24_acks_received_total", "Payloads de ACK leídos por el transmisor")
+TX_ROUNDS = Counter(
+    "nrf24_tx_rounds_total", "Rondas de retransmisión ejecutadas")
+FRAMES_RECEIVED = Counter(
+    "nrf24_frames_received_total", "Tramas de datos recibidas (incluye duplicadas)")
+FEC_CORRECTED = Counter(
+    "nrf24_fec_corrected_symbols_total", "Símbolos corregidos por Reed-Solomon")
+DECODE_FAILURES = Counter(
+    "nrf24_decode_failures_total", "Tramas descartadas por no poder decodificarse")
+TRANSFERS = Counter(
+    "nrf24_transfers_total", "Transferencias finalizadas", ("direction", "result"))
+COMPRESS_SKIPPED = Counter(
+    "nrf24_compress_skipped_total", "Archivos enviados sin comprimir por su entropía")
+COMPRESS_SAVED_SECONDS = Counter(
+    "nrf24_compress_saved_seconds_total", "Tiempo de compresión evitado (estimado)")
+
+PREP_SECONDS = Histogram(
+    "nrf24_prep_seconds", "Tiempo de lectura, compresión y división del archivo",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+TRANSFER_SECONDS = Histogram(
+    "nrf24_transfer_seconds", "Duración de las transferencias",
+    (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0), ("direction",))
+GOODPUT_KIBPS = Histogram(
+    "nrf24_goodput_kibps", "Goodput por transferencia (KiB/s del archivo original)",
+    (1, 2, 5, 10, 20, 30, 40, 50, 75, 100, 150), ("direction",))
@@ -0,0 +1,102 @@
+"""
+Progreso de la transferencia en curso
+
+transmitter y receiver actualizan ACTIVE mientras trabajan; la API de
+control lo lee para mostrar paquetes, goodput y ETA, y pide la
+cancelación con request_cancel(). Las actualizaciones son asignaciones
+simples (sin lock) para no pesar en los bucles de radio.
+"""
+
+import time
+
+
+class TransferProgress:
+    """Estado de la transferencia activa (una a la vez: hay una sola radio)"""
+
+    def __init__(self):
+        self.direction = None
+        self.name = None
+        self.state = "idle"
+        self.done = 0
+        self.total = None
+        self.chunk_size = 0
+        self.started = None
+        self.finished = None
+        self._cancel = False
+
+    def begin(self, direction: str, name: str = None, total: int = None, chunk_size: int = 0):
+        """
+        Registra el inicio de una transferencia.
+
+        Args:
+            direction: 'tx' o 'rx'
+            name: Nombre del archivo (None si todavía no se conoce)
+            total: Paquetes totales (None si todavía no se conoce)
+            chunk_size: Bytes útiles por paquete
+        """
+        self.direction = direction
+        self.name = name
+        self.state = "waiting" if direction == "rx" else "running"
+        self.done = 0
+        self.total = total
+        self.chunk_size = chunk_size
+        self.started = time.monotonic()
+        self.finished = None
+
+    def update(self, done: int, total: int = None, name: str = None, chunk_size: int = None):
+        """Actualiza los paquetes confirmados (y lo que se haya conocido después)"""
+        if self.state == "waiting" and done:
+            self.state = "running"
+            self.started = time.monotonic()
+        self.done = done
+        if total is not None:
+            self.total = total
+        if name is not None:
+            self.name = name
+        if chunk_size:
+            self.chunk_size = chunk_size
+
+    def end(self, ok: bool):
+        """Marca el final: 'done', 'cancelled' o 'failed'"""
+        self.state = "done" if ok else ("cancelled" if self._cancel else "failed")
+        self.finished = time.monotonic()
+
+    def request_cancel(self) -> bool:
+        """Pide cancelar la transferencia activa; False si no hay ninguna"""
+        if self.state not in ("waiting", "running"):
+            return False
+        self._cancel = True
+        return True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel
+
+    def clear_cancel(self):
+        """Limpia el pedido de cancelación (al terminar cada trabajo)"""
+        self._cancel = False
+
+    def snapshot(self) -> dict:
+        """Estado actual con goodput y ETA calculados"""
+        elapsed = 0.0
+        if self.started is not None:
+            elapsed = (self.finished or time.monotonic()) - self.started
+        goodput = self.done * self.chunk_size / elapsed / 1024 if elapsed > 0 else 0.0
+        eta = None
+        if self.state == "running" and self.total and self.done and elapsed > 0:
+            eta = (self.total - self.done) * elapsed / self.done
+        return {
+            'direction': self.direction,
+            'name': self.name,
+            'state': self.state,
+            'packets': self.done,
+            'total': self.total,
+            'percent': round(100 * self.done / self.total, 1) if self.total else None,
+            'elapsed': round(elapsed, 2),
+            'goodput_kibs': round(goodput, 2),
+            'eta': None if eta is None else round(eta, 1),
+            'cancel_requested': self._cancel,
+        }
+
+
+ACTIVE = TransferProgress()
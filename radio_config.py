@@ -2,8 +2,9 @@
 Configuración del módulo nRF24L01+
 """
 
-from pyrf24 import RF24, RF24_PA_MAX, RF24_2MBPS
-from constants import CE_PIN, CSN_PIN
+from pyrf24 import RF24
+from constants import CE_PIN, CSN_PIN, RF_CHANNEL, ADDR_A, ADDR_B
+from link_tuner import load_profile, load_profiles, apply_profile, describe_profile, profile_key
 
 
 def initialize_radio() -> RF24:
@@ -21,19 +22,35 @@ def initialize_radio() -> RF24:
     if not radio.begin():
         raise RuntimeError("✗ Error al inicializar nRF24L01+. Verifica las conexiones.")
     
-    # Configuración óptima para máxima velocidad
-    radio.set_pa_level(RF24_PA_MAX)      # Máxima potencia
     radio.dynamic_payloads = True         # Payloads dinámicos
     radio.ack_payloads = True             # ACK con payload
-    radio.channel = 90                    # Canal RF (evita WiFi)
-    radio.data_rate = RF24_2MBPS          # 2 Mbps
-    radio.set_retries(5, 15)              # (delay, count)
+    radio.channel = RF_CHANNEL            # Canal RF (evita WiFi)
+    
+    # Data rate, PA y auto-retransmit: perfil ajustado para el enlace
+    # (link_tuner) o, si nunca se ajustó, 2 Mbps / PA MAX / (5, 15)
+    profile = load_profile(ADDR_A)
+    apply_profile(radio, profile)
     
     print("✓ Radio nRF24L01+ inicializado correctamente")
     print(f"  CE Pin: {CE_PIN}")
     print(f"  CSN Pin: {CSN_PIN}")
     print(f"  Canal: {radio.channel}")
-    print(f"  Data Rate: 2 MBPS")
-    print(f"  PA Level: MAX")
+    print(f"  Perfil: {describe_profile(profile)}")
+    if profile_key(ADDR_A) in load_profiles():
+        print("  (ajustado con link_tuner)")
+    
+    return radio
+
+
+def arm_receiver(radio: RF24):
+    """
+    Deja la radio escuchando en la dirección de este nodo (estado de reposo).
     
-    return radio
\ No newline at end of file
+    Se llama al arrancar y después de cada trabajo, para que un trabajo
+    nuevo encuentre la radio configurada sin esperas. Vuelve al canal de
+    encuentro por si la transferencia anterior migró de canal.
+    """
+    radio.channel = RF_CHANNEL
+    radio.open_rx_pipe(1, ADDR_A)
+    radio.open_tx_pipe(ADDR_B)
+    radio.start_listening()
@@ -1,22 +1,952 @@
 """
 Lógica de recepción de archivos
+
+La recepción se divide en dos hilos:
+  - Hilo de radio: solo vacía la FIFO RX, encola las tramas crudas y carga
+    en el hardware el último ACK publicado.
+  - RxWorker: decodifica FEC, almacena chunks, muestra progreso y publica
+    el ACK siguiente a través de AckMailbox.
 """
 
+import os
+import re
+import fnmatch
 import time
+import queue
+import shutil
+import tempfile
+import hashlib
 import pathlib
+import threading
 from pyrf24 import RF24
 from constants import (
-    ADDR_A, ADDR_B, FRAME_SIZE, GLOBAL_TIMEOUT, IDLE_TIMEOUT,
-    COMPRESS_NONE, COMPRESS_NAMES
+    ADDR_A, ADDR_B, FRAME_SIZE, STALL_TIMEOUT, IDLE_TIMEOUT, RX_SESSION_IDLE,
+    RX_POLL_INTERVAL, CHECKPOINT_INTERVAL, COMPRESS_NONE, COMPRESS_NAMES,
+    COMPRESS_DELTA, COMPRESS_CODEC_MASK, CTRL_DELTA_REQ, CTRL_SIG_REQ,
+    CTRL_TRAILER, CTRL_ANNOUNCE, CTRL_NAME, SIGS_PER_ACK, ACK_VERIFIED,
+    ACK_VERIFY_FAILED, FINAL_ACK_LINGER, ACK_FIFO_DEPTH, NAME_CHUNK_BYTES,
+    CTRL_CHANNEL, RF_CHANNEL, AUTO_CHANNEL, SWITCH_QUIET, RENDEZVOUS_TIMEOUT,
+    CHECKPOINT_DIRNAME, RX_STREAM_DECOMPRESS, CTRL_POLL, NODE_ID, NODE_PIPE,
+    POLL_ANNOUNCED, POLL_VERIFIED, POLL_BITMAP_BYTES, CTRL_MANIFEST, CTRL_DELETE,
+    CTRL_SYNC_END, RX_SYNC_PATTERN, RX_SYNC_ALLOW_DELETE, CTRL_PEER, CTRL_RESUME
+)
+from compression import adaptive_decompress, StreamDecompressor
+from frame_handler import (
+    parse_frame, build_ack_payload, build_control_ack, parse_trailer_payload,
+    parse_announce_payload, calculate_file_hash, build_poll_payload, node_address,
+    build_resume_reply, build_resume_bitmap
+)
+from checkpoint import (
+    CheckpointWriter, load_checkpoint, delete_checkpoint, checkpoint_identity, NO_IDENTITY,
+    prune_checkpoint_dir
+)
+from delta_sync import (
+    compute_signatures, apply_delta, parse_delta_header, load_base, store_base,
+    SIGNATURE_SIZE
 )
-from compression import adaptive_decompress
-from frame_handler import parse_frame, build_ack_payload
+from manifest import build_manifest, encode_manifest, MANIFEST_GROUP_SIZE
+from channel_scan import survey_channels, decode_candidates, choose_channel
 from fec import is_fec_available
+from history import record_transfer, peer_name, station_name, decode_station
+from tracing import span
+from metrics import (
+    FRAMES_RECEIVED, FEC_CORRECTED, DECODE_FAILURES, TRANSFERS,
+    TRANSFER_SECONDS, GOODPUT_KIBPS
+)
 from hardware import LEDController, SystemState
+from progress import ACTIVE
+
+
+def safe_filename(name: str) -> str:
+    """
+    Limpia un nombre recibido por radio para usarlo en el directorio destino.
+    
+    Descarta rutas, caracteres de control y puntos iniciales (que ocultarían
+    el archivo o chocarían con .parciales/.base).
+    
+    Returns:
+        str: Nombre seguro, o None si no queda nada utilizable
+    """
+    name = pathlib.PurePosixPath(name.replace("\\", "/")).name
+    name = re.sub(r'[\x00-\x1f\x7f/:*?"<>|]', "_", name).lstrip(". ")
+    return name or None
+
+
+class AckMailbox:
+    """
+    Entrega sin locks del último ACK calculado por el worker al hilo de radio.
+    
+    El worker publica siempre un objeto bytes nuevo; como la asignación de
+    una referencia es atómica en CPython, el hilo de radio lee un ACK
+    completo sin bloquearse nunca.
+    """
+    
+    __slots__ = ('current',)
+    
+    def __init__(self, initial: bytes):
+        self.current = initial
+
+    def publish(self, payload: bytes):
+        """Reemplaza el ACK que se cargará con la próxima trama recibida"""
+        self.current = payload
+
+
+class StreamingOutput:
+    """
+    Descompresión del prefijo contiguo durante la recepción.
+    
+    Los bloques descomprimidos van directo a <dest_dir>/.parciales/<id>-*.out
+    mientras se calcula su hash, así al completar la recepción solo queda
+    vaciar el códec y renombrar. El nombre es único por transferencia: un
+    reenvío del mismo archivo no pisa la salida que todavía está
+    finalizando el FinalizePool. La memoria usada no depende del tamaño
+    del archivo (STREAM_OUTPUT_BLOCK por llamada).
+    """
+    
+    def __init__(self, dest_dir: pathlib.Path, file_id: int, codec: int):
+        """
+        Args:
+            dest_dir: Directorio de recepción
+            file_id: ID de la transferencia
+            codec: Códec del flujo (COMPRESS_*, sin COMPRESS_DELTA)
+        """
+        self.decompressor = StreamDecompressor(codec)
+        directory = dest_dir / CHECKPOINT_DIRNAME
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"{file_id:05d}-", suffix=".out", dir=directory)
+        self.path = pathlib.Path(path)
+        self.file = os.fdopen(fd, "wb")
+        self.hasher = hashlib.sha256()
+        self.size = 0
+    
+    def _write(self, blocks):
+        for block in blocks:
+            self.file.write(block)
+            self.hasher.update(block)
+            self.size += len(block)
+    
+    def feed(self, data: bytes):
+        """Descomprime un chunk en orden y escribe la salida"""
+        self._write(self.decompressor.feed(data))
+    
+    def finish(self) -> pathlib.Path:
+        """
+        Descomprime la cola pendiente y cierra el archivo.
+        
+        Returns:
+            pathlib.Path: Ruta del archivo temporal completo
+            
+        Raises:
+            EOFError: Si el flujo comprimido quedó incompleto
+        """
+        self._write(self.decompressor.finish())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        return self.path
+    
+    @property
+    def file_hash(self) -> bytes:
+        """Hash del archivo descomprimido (mismo formato que el trailer)"""
+        return self.hasher.digest()[:4]
+    
+    def discard(self):
+        """Cierra y borra la salida parcial"""
+        self.file.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+class RxWorker(threading.Thread):
+    """Decodifica y reensambla las tramas que encola el hilo de radio"""
+    
+    def __init__(self, frames: queue.SimpleQueue, mailbox: AckMailbox,
+                 dest_dir: pathlib.Path, channel_survey: dict = None):
+        """
+        Args:
+            frames: Cola de tuplas (trama_cruda, instante_recepcion); None termina
+            mailbox: Buzón donde publicar el ACK actualizado
+            dest_dir: Directorio de recepción (contiene los checkpoints)
+            channel_survey: Escaneo de ruido propio; None = no negociar canal
+        """
+        super().__init__(daemon=True)
+        self.frames = frames
+        self.mailbox = mailbox
+        self.dest_dir = dest_dir
+        self.checkpoint = None
+        self.last_checkpoint = 0.0
+        self.delta_key = None   # (name_key, block_size) de las firmas calculadas
+        self.delta_signatures = b""
+        self.complete = threading.Event()
+        
+        # Estado de recepción
+        self.file_id_seen = None
+        self.chunks = {}
+        self.last_seq = None
+        self.last_seen = False
+        self.compress_mode = COMPRESS_NONE
+        self.start_time = None  # Iniciar cronómetro al recibir primer paquete
+        self.packets_received = 0
+        self.total_errors_corrected = 0
+        self.next_missing = 0   # Todas las secuencias previas están recibidas
+        
+        # Verificación incremental: hash del prefijo contiguo recibido
+        self.stream_hasher = hashlib.sha256()
+        self.stream_bytes = 0
+        self.trailer = None
+        self.verified = None
+        self.verify_failed = False
+        
+        # Descompresión en streaming del prefijo contiguo (None = al final)
+        self.stream_out = None
+        
+        # Negociación de canal: el hilo de radio aplica channel_switch
+        self.channel_survey = channel_survey
+        self.channel_nonce = None
+        self.channel_choice = None
+        self.channel_switch = None
+        
+        # Anuncio: tamaño conocido desde el inicio y nombre del archivo
+        self.announce = None
+        self.identity = NO_IDENTITY   # Valida el checkpoint (ver checkpoint_identity)
+        self.resume_from = 0          # Base del mapa CTRL_RESUME informada al transmisor
+        self.name_parts = {}
+        self.filename = None
+        
+        # Sincronización: manifiesto calculado y archivos borrados por pedido
+        self.manifest = None
+        self.manifest_pattern = None
+        self.manifest_bytes = b""
+        self.deleted = set()
+        self.sync_ended = False
+        
+        # Nombre de estación del transmisor (CTRL_PEER) para el historial
+        self.peer = None
+
+    def run(self):
+        """Consume tramas hasta recibir el centinela None"""
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            raw, now = item
+            self._process(raw, now)
+
+    def _start_transfer(self, fid: int, pkt_compress: int, announce: dict = None):
+        """
+        Fija el contexto con la primera trama de la transferencia.
+        
+        Si la primera trama es el anuncio, su identidad valida el checkpoint;
+        sin ella (el anuncio no llegó) no se reanuda.
+        """
+        self.file_id_seen = fid
+        self.compress_mode = pkt_compress
+        codec = COMPRESS_NAMES.get(self.compress_mode & COMPRESS_CODEC_MASK, 'unknown')
+        delta = " + delta" if self.compress_mode & COMPRESS_DELTA else ""
+        print(f"→ File ID: {self.file_id_seen} | Compresión: {codec}{delta}\n")
+        if announce is not None:
+            self.identity = checkpoint_identity(
+                announce['id_hash'], announce['stream_size'], announce['total_packets']
+            )
+        self._open_stream()
+        self._resume(fid, pkt_compress)
+
+    def _set_total(self):
+        """Conoce el final del archivo por el anuncio, sin esperar FLAG_LAST"""
+        if self.announce is None or self.announce['open_length']:
+            return
+        if self.last_seq is None and self.announce['total_packets']:
+            self.checkpoint.set_last(self.announce['total_packets'] - 1)
+        self.last_seq = self.announce['total_packets'] - 1
+        self.last_seen = True
+
+    def _resume(self, fid: int, pkt_compress: int):
+        """Carga el checkpoint de una transferencia interrumpida, si existe"""
+        saved = load_checkpoint(self.dest_dir, fid)
+        if saved is not None and (saved['compress_mode'] != pkt_compress or
+                                  self.identity == NO_IDENTITY or
+                                  saved['identity'] != self.identity):
+            # Mismo ID de 16 bits pero otro contenido (o no se puede comprobar)
+            if saved['chunks']:
+                print("⚠ Checkpoint de otro archivo con el mismo File ID: descartado")
+            delete_checkpoint(self.dest_dir, fid)
+            saved = None
+        
+        if saved is not None and saved['chunks']:
+            self.chunks = saved['chunks']
+            self.last_seq = saved['last_seq']
+            self.last_seen = saved['last_seq'] is not None
+            self._advance_prefix()
+            print(f"↻ Reanudando transferencia: {len(self.chunks)} paquetes ya recibidos")
+        
+        self.checkpoint = CheckpointWriter(self.dest_dir, fid, pkt_compress, self.identity)
+
+    def _open_stream(self):
+        """Prepara la descompresión en streaming (los deltas se aplican al final)"""
+        if not RX_STREAM_DECOMPRESS or self.compress_mode & COMPRESS_DELTA:
+            return
+        try:
+            self.stream_out = StreamingOutput(
+                self.dest_dir, self.file_id_seen, self.compress_mode & COMPRESS_CODEC_MASK
+            )
+        except (OSError, ValueError) as e:
+            print(f"⚠ Descompresión en streaming no disponible ({e}), se hará al final")
+            self.stream_out = None
+
+    def discard_stream(self):
+        """Abandona la salida en streaming (la finalización usará los chunks)"""
+        if self.stream_out is not None:
+            self.stream_out.discard()
+            self.stream_out = None
+
+    def _advance_prefix(self):
+        """Avanza el prefijo contiguo, lo agrega al hash y lo descomprime"""
+        while self.next_missing in self.chunks:
+            data = self.chunks[self.next_missing]
+            self.stream_hasher.update(data)
+            self.stream_bytes += len(data)
+            self.next_missing += 1
+            if self.stream_out is not None:
+                try:
+                    self.stream_out.feed(data)
+                except Exception as e:
+                    # Los chunks siguen en memoria: se descomprime todo al final
+                    print(f"⚠ Descompresión en streaming abandonada: {e}")
+                    self.discard_stream()
+
+    def _reset_transfer(self):
+        """Descarta los datos recibidos tras un hash incorrecto"""
+        self.chunks = {}
+        self.last_seq = None
+        self.last_seen = False
+        self.next_missing = 0
+        self.stream_hasher = hashlib.sha256()
+        self.stream_bytes = 0
+        self.trailer = None
+        self.verified = None
+        self.discard_stream()
+        self._open_stream()
+        delete_checkpoint(self.dest_dir, self.file_id_seen)
+        self.checkpoint = CheckpointWriter(self.dest_dir, self.file_id_seen, self.compress_mode,
+                                           self.identity)
+        self._set_total()
+
+    def _check_integrity(self):
+        """
+        Verifica el flujo contra el trailer en cuanto ambos están completos.
+        
+        El hash ya se calculó al llegar los datos en orden, así que aquí
+        solo se compara el digest.
+        """
+        if self.trailer is None or self.verified is not None:
+            return
+        if not self.last_seen or self.next_missing <= self.last_seq:
+            return
+        
+        if (self.stream_hasher.digest()[:4] == self.trailer['stream_hash'] and
+                self.stream_bytes == self.trailer['stream_size']):
+            self.verified = True
+            print("✓ Transferencia completa e íntegra (hash verificado), finalizando...")
+        else:
+            print("✗ Hash del flujo incorrecto: descartando datos y solicitando reenvío")
+            self.verify_failed = True
+            self._reset_transfer()
+
+    def close_checkpoint(self, completed: bool):
+        """Elimina el checkpoint si el archivo se guardó, o persiste lo pendiente"""
+        self.discard_stream()
+        if self.checkpoint is None:
+            return
+        if completed:
+            delete_checkpoint(self.dest_dir, self.file_id_seen)
+            prune_checkpoint_dir(self.dest_dir)
+        else:
+            self.checkpoint.flush()
+            print(f"💾 Checkpoint guardado: {len(self.chunks)} paquetes "
+                  f"(se reanudará en el próximo intento)")
+
+    def _handle_announce(self, fid: int, payload: bytes):
+        """Registra los metadatos anunciados antes de los datos"""
+        announce = parse_announce_payload(payload)
+        if announce is None:
+            return
+        if self.file_id_seen is None:
+            self._start_transfer(fid, announce['compress_mode'], announce)
+        if fid != self.file_id_seen:
+            return
+        
+        # Lo ya recibido (checkpoint) para que el transmisor no lo reenvíe
+        self.resume_from = self.next_missing
+        self.mailbox.publish(build_control_ack(
+            fid, CTRL_ANNOUNCE, 0, build_resume_reply(self.chunks, self.resume_from)
+        ))
+        if self.announce is not None:
+            return
+        
+        self.announce = announce
+        self._set_total()
+        if not announce['open_length']:
+            print(f"📣 Anuncio: {announce['total_packets']} paquetes | "
+                  f"{announce['stream_size']} → {announce['original_size']} bytes")
+        else:
+            # Compresión en paralelo en el transmisor: el final lo marca FLAG_LAST
+            print(f"📣 Anuncio: {announce['original_size']} bytes (flujo de tamaño abierto)")
+        
+        try:
+            free = shutil.disk_usage(self.dest_dir).free
+            if free < announce['original_size']:
+                print(f"⚠ Espacio insuficiente: {free} bytes libres")
+        except OSError:
+            pass
+
+    def _handle_name(self, fid: int, index: int, payload: bytes):
+        """Reensambla el nombre del archivo enviado en tramas CTRL_NAME"""
+        if self.announce is None or fid != self.file_id_seen:
+            return
+        self.mailbox.publish(build_control_ack(fid, CTRL_NAME, index))
+        
+        self.name_parts[index] = payload
+        name_len = self.announce['name_len']
+        parts = -(-name_len // NAME_CHUNK_BYTES)
+        if self.filename is None and len(self.name_parts) >= parts:
+            raw = b"".join(self.name_parts[i] for i in range(parts) if i in self.name_parts)
+            if len(raw) == name_len:
+                self.filename = safe_filename(raw.decode('utf-8', errors='ignore'))
+                if self.filename:
+                    print(f"📄 Nombre: {self.filename}")
+
+    def _handle_channel(self, fid: int, nonce: int, payload: bytes):
+        """Elige canal ante una propuesta; una trama vacía confirma el canal nuevo"""
+        if self.channel_survey is None:
+            return
+        if payload and nonce != self.channel_nonce:
+            choice = choose_channel(decode_candidates(payload), self.channel_survey)
+            if choice is None:
+                return
+            self.channel_nonce = nonce
+            self.channel_choice = choice
+            self.channel_switch = choice
+            print(f"📡 Canal acordado: {choice} "
+                  f"(ocupación local {self.channel_survey.get(choice, 0.0):.0%})")
+        if self.channel_choice is not None:
+            self.mailbox.publish(build_control_ack(
+                fid, CTRL_CHANNEL, nonce, bytes([self.channel_choice])
+            ))
+
+    def _handle_poll(self, fid: int, index: int, payload: bytes):
+        """Difusión: informa los faltantes desde la secuencia pedida"""
+        if self.file_id_seen is not None and fid != self.file_id_seen:
+            return
+        state = 0
+        first = None
+        missing = set()
+        if self.announce is not None:
+            state |= POLL_ANNOUNCED
+        if self.verified:
+            state |= POLL_VERIFIED
+        elif self.last_seq is not None:
+            seq = max(int.from_bytes(payload[:4], 'big'), self.next_missing)
+            while seq <= self.last_seq and seq in self.chunks:
+                seq += 1
+            if seq <= self.last_seq:
+                first = seq
+                end = min(self.last_seq, first + POLL_BITMAP_BYTES * 8)
+                missing = {s for s in range(first + 1, end + 1) if s not in self.chunks}
+        self.mailbox.publish(build_control_ack(
+            fid, CTRL_POLL, index, build_poll_payload(state, first, missing)
+        ))
+
+    def _handle_manifest(self, fid: int, index: int, payload: bytes):
+        """
+        Sincronización: índice 0 calcula el manifiesto, n entrega su grupo n-1.
+        
+        El patrón del transmisor solo puede acotar el manifiesto: nunca
+        incluye archivos fuera de RX_SYNC_PATTERN.
+        """
+        if index == 0:
+            pattern = payload.decode('utf-8', errors='ignore') or RX_SYNC_PATTERN
+            if pattern != self.manifest_pattern:
+                self.manifest = {
+                    key: entry
+                    for key, entry in build_manifest(self.dest_dir, pattern).items()
+                    if fnmatch.fnmatchcase(entry[0].name, RX_SYNC_PATTERN)
+                }
+                self.manifest_bytes = encode_manifest(self.manifest)
+                self.manifest_pattern = pattern
+                print(f"🗂 Manifiesto: {len(self.manifest)} archivos ({pattern})")
+            response = len(self.manifest).to_bytes(4, 'big')
+        elif self.manifest is not None:
+            start = (index - 1) * MANIFEST_GROUP_SIZE
+            response = self.manifest_bytes[start:start + MANIFEST_GROUP_SIZE]
+        else:
+            return
+        self.mailbox.publish(build_control_ack(fid, CTRL_MANIFEST, index, response))
+
+    def _handle_delete(self, fid: int, index: int, payload: bytes):
+        """
+        Sincronización: borra un archivo del manifiesto si no cambió desde entonces.
+        
+        Solo con RX_SYNC_ALLOW_DELETE; si no, responde que no se borró.
+        """
+        if self.manifest is None or len(payload) < 8:
+            return
+        key, digest = bytes(payload[0:4]), bytes(payload[4:8])
+        entry = self.manifest.get(key)
+        if not RX_SYNC_ALLOW_DELETE:
+            if entry is not None:
+                print(f"⚠ Borrado de {entry[0].name} ignorado (RX_SYNC_ALLOW_DELETE deshabilitado)")
+        elif entry is not None and entry[1] == digest:
+            try:
+                entry[0].unlink()
+                print(f"🗑 Borrado: {entry[0].name}")
+            except FileNotFoundError:
+                pass
+            del self.manifest[key]
+            self.deleted.add(key)
+            self.manifest_pattern = None   # Recalcular si se vuelve a pedir
+        self.mailbox.publish(build_control_ack(
+            fid, CTRL_DELETE, index, bytes([key in self.deleted])
+        ))
+
+    def _handle_control(self, fid: int, ctrl_type: int, index: int, payload: bytes):
+        """Responde a una trama de control publicando un ACK de control"""
+        if ctrl_type == CTRL_ANNOUNCE:
+            self._handle_announce(fid, payload)
+        elif ctrl_type == CTRL_NAME:
+            self._handle_name(fid, index, payload)
+        elif ctrl_type == CTRL_CHANNEL:
+            self._handle_channel(fid, index, payload)
+        elif ctrl_type == CTRL_POLL:
+            self._handle_poll(fid, index, payload)
+        elif ctrl_type == CTRL_MANIFEST:
+            self._handle_manifest(fid, index, payload)
+        elif ctrl_type == CTRL_DELETE:
+            self._handle_delete(fid, index, payload)
+        elif ctrl_type == CTRL_RESUME and fid == self.file_id_seen:
+            self.mailbox.publish(build_control_ack(
+                fid, ctrl_type, index, build_resume_bitmap(self.chunks, self.resume_from, index)
+            ))
+        elif ctrl_type == CTRL_PEER:
+            self.peer = decode_station(payload)
+            self.mailbox.publish(build_control_ack(fid, ctrl_type, index, station_name()))
+        elif ctrl_type == CTRL_SYNC_END and self.file_id_seen is None:
+            # Nada que enviar: la sesión termina sin datos
+            self.sync_ended = True
+            self.mailbox.publish(build_control_ack(fid, ctrl_type, index))
+            self.complete.set()
+        elif ctrl_type == CTRL_DELTA_REQ and len(payload) >= 6:
+            key = (payload[0:4], int.from_bytes(payload[4:6], 'big'))
+            if key != self.delta_key:
+                base = load_base(self.dest_dir, key[0])
+                self.delta_signatures = compute_signatures(base, key[1])
+                self.delta_key = key
+                print(f"Δ Firmas de la versión previa: "
+                      f"{len(self.delta_signatures) // SIGNATURE_SIZE} bloques")
+            block_count = len(self.delta_signatures) // SIGNATURE_SIZE
+            self.mailbox.publish(build_control_ack(
+                fid, ctrl_type, index, block_count.to_bytes(4, 'big')
+            ))
+        elif ctrl_type == CTRL_TRAILER and fid == self.file_id_seen:
+            trailer = parse_trailer_payload(payload)
+            if trailer is not None:
+                self.trailer = trailer
+                self._check_integrity()
+            self._publish_ack()
+            if self.verified:
+                self.complete.set()
+        elif ctrl_type == CTRL_SIG_REQ and self.delta_key is not None:
+            start = index * SIGS_PER_ACK * SIGNATURE_SIZE
+            self.mailbox.publish(build_control_ack(
+                fid, ctrl_type, index,
+                self.delta_signatures[start:start + SIGS_PER_ACK * SIGNATURE_SIZE]
+            ))
+
+    def _publish_ack(self):
+        """Recalcula el ACK y lo deja listo para el hilo de radio"""
+        extra_flags = 0
+        if self.verified:
+            extra_flags |= ACK_VERIFIED
+        if self.verify_failed:
+            extra_flags |= ACK_VERIFY_FAILED
+        self.mailbox.publish(build_ack_payload(
+            self.file_id_seen, self.chunks, self.last_seq, self.last_seen,
+            self.compress_mode, self.next_missing, extra_flags
+        ))
+
+    def _process(self, raw: bytes, now: float):
+        """Procesa una trama cruda recibida en el instante `now`"""
+        if len(raw) < FRAME_SIZE:
+            raw = bytes(raw) + b"\x00" * (FRAME_SIZE - len(raw))
+
+        # Parsear frame
+        with span("decode"):
+            parsed = parse_frame(raw)
+        if parsed is None:
+            DECODE_FAILURES.inc()
+            return
+
+        fid, seq_id, data_bytes, is_last, pkt_compress, errors, ctrl_type = parsed
+        if ctrl_type is not None:
+            self._handle_control(fid, ctrl_type, seq_id, data_bytes)
+            return
+        
+        self.packets_received += 1
+        FRAMES_RECEIVED.inc()
+        
+        # Iniciar cronómetro al recibir primer paquete
+        if self.start_time is None:
+            self.start_time = now
+        
+        if errors > 0:
+            self.total_errors_corrected += errors
+            FEC_CORRECTED.inc(errors)
+
+        # Primer paquete: establecer contexto
+        if self.file_id_seen is None:
+            self._start_transfer(fid, pkt_compress)
+
+        # Verificar que sea del archivo actual
+        if fid != self.file_id_seen:
+            return
+
+        # Almacenar chunk si es nuevo
+        if seq_id not in self.chunks:
+            self.chunks[seq_id] = data_bytes
+            self.checkpoint.add_chunk(seq_id, data_bytes)
+            self.verify_failed = False
+            self._advance_prefix()
+            
+            # Mostrar progreso
+            if self.packets_received % 25 == 0 or is_last:
+                progress = len(self.chunks)
+                elapsed = time.monotonic() - self.start_time
+                per_pkt = len(data_bytes)
+                throughput = (progress * per_pkt) / max(elapsed, 1e-9) / 1024
+                total = f"/{self.last_seq + 1}" if self.last_seq is not None else ""
+                print(f"  📊 {progress}{total} paquetes | {throughput:.1f} KiB/s | "
+                      f"Errores FEC: {self.total_errors_corrected}")
+
+        # Marcar si es el último paquete (si el anuncio no trajo el total)
+        if is_last and (self.announce is None or self.announce['open_length']):
+            if self.last_seq is None:
+                self.checkpoint.set_last(seq_id)
+            self.last_seq = seq_id
+            self.last_seen = True
+            print(f"\n→ Último paquete recibido: {self.last_seq}")
+            print(f"  Total recibidos: {len(self.chunks)} de {self.last_seq + 1}")
+        
+        # Verificar si ya tenemos todos los paquetes (falta el trailer para salir)
+        self._check_integrity()
+        
+        # Persistir periódicamente lo recibido
+        if now - self.last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.checkpoint.flush()
+            self.last_checkpoint = now
+
+        self._publish_ack()
+        if self.verified:
+            self.complete.set()
+
+
+def _retune(radio: RF24, channel: int, ack: bytes):
+    """Cambia el canal de escucha y recarga el ACK vigente"""
+    radio.stop_listening()
+    radio.channel = channel
+    radio.start_listening()
+    radio.write_ack_payload(1, ack)
+
+
+def _set_led(led_controller: LEDController, state: SystemState):
+    """Los LEDs solo se tocan si la finalización es síncrona"""
+    if led_controller is not None:
+        led_controller.set_state(state)
+
+
+def _write_atomic(dest_path: pathlib.Path, data: bytes):
+    """Escribe en un temporal y lo renombra: nunca queda un archivo a medias"""
+    tmp_path = dest_path.with_name(f".{dest_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, dest_path)
+
+
+def _destination_path(worker: RxWorker, dest_dir: pathlib.Path) -> pathlib.Path:
+    """Nombre final: el anunciado (solo una sincronización pisa uno existente) o uno derivado del ID"""
+    timestamp = int(time.time())
+    if worker.filename:
+        dest_path = dest_dir / worker.filename
+        if dest_path.exists() and not worker.announce['replace']:
+            dest_path = dest_dir / f"{dest_path.stem}_{timestamp}{dest_path.suffix}"
+        return dest_path
+    fid = worker.file_id_seen
+    return dest_dir / (f"file_{fid}_{timestamp}.bin" if fid else f"file_{timestamp}.bin")
+
+
+def _report_saved(worker: RxWorker, dest_path: pathlib.Path, size: int, total_packets: int,
+                  total_time: float, missing: list):
+    """Muestra el resumen de un archivo guardado"""
+    throughput = (size / max(total_time, 1e-9)) / 1024
+    TRANSFER_SECONDS.labels('rx').observe(total_time)
+    
+    print(f"✓ Archivo guardado: {dest_path.name}")
+    print(f"  Tamaño final: {size} bytes")
+    print(f"  Paquetes: {len(worker.chunks)}/{total_packets}")
+    print(f"  Tiempo: {total_time:.2f}s")
+    print(f"  Throughput: {throughput:.2f} KiB/s")
+    
+    if worker.total_errors_corrected > 0:
+        print(f"  Errores corregidos (FEC): {worker.total_errors_corrected}")
+    
+    print(f"  Faltantes: {len(missing)}")
+
+
+def _record_result(worker: RxWorker, result: str, total_time: float = None,
+                   size: int = None, error: str = None):
+    """Cuenta el resultado en las métricas y lo agrega al historial"""
+    TRANSFERS.labels('rx', result).inc()
+    if worker is None:
+        record_transfer('rx', result, peer=peer_name(ADDR_B), error=error)
+        return
+    announce = worker.announce or {}
+    total = worker.last_seq + 1 if worker.last_seq is not None else None
+    goodput = None
+    if result == 'ok' and size and total_time:
+        goodput = (size / max(total_time, 1e-9)) / 1024
+    record_transfer(
+        'rx', result, peer=peer_name(ADDR_B, worker.peer), file=worker.filename, error=error,
+        size=size if size is not None else announce.get('original_size'),
+        stream_size=announce.get('stream_size') or worker.stream_bytes or None,
+        packets=total, codec=COMPRESS_NAMES.get(worker.compress_mode & COMPRESS_CODEC_MASK),
+        seconds=total_time, goodput_kibps=goodput,
+        fec_corrected=worker.total_errors_corrected,
+        missing=total - len(worker.chunks) if total is not None else None,
+        params={'delta': bool(worker.compress_mode & COMPRESS_DELTA),
+                'replace': announce.get('replace', False)}
+    )
+
+
+def _close_reception(worker: RxWorker, complete: bool, size: int, total_time: float,
+                     led_controller: LEDController) -> bool:
+    """Cierra el checkpoint y registra el resultado de un archivo guardado"""
+    worker.close_checkpoint(completed=complete)
+
+    if not complete:
+        _record_result(worker, 'incomplete', total_time, size)
+        print(f"{'='*50}\n")
+        _set_led(led_controller, SystemState.ERROR)
+        return False
+    _record_result(worker, 'ok', total_time, size)
+    GOODPUT_KIBPS.labels('rx').observe((size / max(total_time, 1e-9)) / 1024)
+    print("✓ ¡Recepción completa sin pérdidas!")
+    print(f"{'='*50}\n")
+    _set_led(led_controller, SystemState.COMPLETED)
+    return True
+
+
+def _finalize_streamed(worker: RxWorker, dest_dir: pathlib.Path, total_time: float,
+                       led_controller: LEDController) -> bool:
+    """
+    Termina un archivo que se fue descomprimiendo durante la recepción.
+    
+    Solo queda vaciar el códec, comparar tamaño y hash (calculados al
+    escribir) con el trailer y renombrar la salida al destino.
+    """
+    stream = worker.stream_out
+    codec = worker.compress_mode & COMPRESS_CODEC_MASK
+    try:
+        with span("decompress_tail", codec=COMPRESS_NAMES.get(codec, 'unknown')):
+            out_path = stream.finish()
+    except Exception as e:
+        print(f"✗ Error al descomprimir: {e}")
+        worker.close_checkpoint(completed=True)
+        _record_result(worker, 'error', total_time, error=f"descompresión: {e}")
+        _set_led(led_controller, SystemState.ERROR)
+        return False
+    if codec != COMPRESS_NONE:
+        print(f"Descomprimido durante la recepción: {worker.stream_bytes} → {stream.size} bytes")
+
+    trailer = worker.trailer
+    if trailer is not None:
+        if stream.size != trailer['original_size'] or stream.file_hash != trailer['file_hash']:
+            print("✗ El archivo reconstruido no coincide con el trailer")
+            worker.close_checkpoint(completed=True)
+            _record_result(worker, 'error', total_time, error="no coincide con el trailer")
+            _set_led(led_controller, SystemState.ERROR)
+            return False
+    else:
+        print("⚠ Sin trailer: integridad no verificada")
+
+    dest_path = _destination_path(worker, dest_dir)
+    os.replace(out_path, dest_path)
+    worker.stream_out = None
+
+    total_packets = worker.last_seq + 1
+    _report_saved(worker, dest_path, stream.size, total_packets, total_time, [])
+    return _close_reception(worker, True, stream.size, total_time, led_controller)
+
+
+def finalize_reception(worker: RxWorker, dest_dir: pathlib.Path, total_time: float,
+                       led_controller: LEDController = None) -> bool:
+    """
+    Reconstruye, descomprime, verifica y guarda un archivo recibido.
+    
+    Se llama al terminar la recepción, directamente o desde un FinalizePool
+    (entonces sin led_controller: la radio ya puede estar en otro trabajo).
+    
+    Args:
+        worker: RxWorker terminado con los chunks y el contexto de la transferencia
+        dest_dir: Directorio donde guardar el archivo
+        total_time: Duración de la recepción (primera a última trama)
+        led_controller: Controlador de LEDs, o None
+        
+    Returns:
+        bool: True si el archivo quedó guardado y verificado
+    """
+    trailer = worker.trailer
+    chunks = worker.chunks
+    compress_mode = worker.compress_mode
+
+    try:
+        print(f"\n{'='*50}")
+        print("RECONSTRUYENDO ARCHIVO")
+        print(f"{'='*50}")
+
+        if worker.stream_out is not None:
+            if worker.last_seen and worker.next_missing > worker.last_seq:
+                return _finalize_streamed(worker, dest_dir, total_time, led_controller)
+            worker.discard_stream()
+
+        # Reconstruir archivo
+        announce = worker.announce
+        missing = []
+        with span("reassemble", packets=len(chunks)):
+            if announce is not None and not announce['open_length']:
+                # Tamaño anunciado: buffer preasignado, cada chunk en su offset
+                max_seq = announce['total_packets'] - 1
+                chunk_size = announce['chunk_size']
+                reconstructed = bytearray(announce['stream_size'])
+                for s in range(0, max_seq + 1):
+                    if s in chunks:
+                        reconstructed[s * chunk_size:s * chunk_size + len(chunks[s])] = chunks[s]
+                    else:
+                        missing.append(s)
+            else:
+                max_seq = max(chunks.keys())
+                reconstructed = bytearray()
+                for s in range(0, max_seq + 1):
+                    if s in chunks:
+                        reconstructed += chunks[s]
+                    else:
+                        missing.append(s)
+
+        if missing:
+            print(f"⚠ Paquetes faltantes: {len(missing)}")
+            head = ','.join(map(str, missing[:20]))
+            print(f"  Lista: {head}{'...' if len(missing) > 20 else ''}")
+        
+        # Sin el paquete FLAG_LAST no se sabe dónde termina el archivo
+        incomplete = bool(missing) or not worker.last_seen
+        if not worker.last_seen:
+            print("⚠ No se recibió el último paquete")
+
+        # Descomprimir si es necesario
+        original_size = len(reconstructed)
+        codec = compress_mode & COMPRESS_CODEC_MASK
+        if codec != COMPRESS_NONE:
+            print("Descomprimiendo datos...")
+            try:
+                with span("decompress", codec=COMPRESS_NAMES.get(codec, 'unknown')):
+                    decompressed = adaptive_decompress(bytes(reconstructed), codec)
+                reconstructed = bytearray(decompressed)
+                print(f"  {original_size} → {len(reconstructed)} bytes")
+            except Exception as e:
+                print(f"✗ Error al descomprimir: {e}")
+                # Sin faltantes, el error está en los datos: no reanudar desde ellos
+                worker.close_checkpoint(completed=not incomplete)
+                _record_result(worker, 'error', total_time, error=f"descompresión: {e}")
+                _set_led(led_controller, SystemState.ERROR)
+                return False
+        
+        # Reconstruir desde la versión previa si es un delta
+        if compress_mode & COMPRESS_DELTA and not incomplete:
+            try:
+                name_key, _ = parse_delta_header(reconstructed)
+                delta_size = len(reconstructed)
+                with span("apply_delta"):
+                    reconstructed = bytearray(
+                        apply_delta(load_base(dest_dir, name_key), bytes(reconstructed))
+                    )
+                store_base(dest_dir, name_key, bytes(reconstructed))
+                print(f"Δ Delta aplicado: {delta_size} → {len(reconstructed)} bytes")
+            except Exception as e:
+                print(f"✗ Error al aplicar delta: {e}")
+                worker.close_checkpoint(completed=True)
+                _record_result(worker, 'error', total_time, error=f"delta: {e}")
+                _set_led(led_controller, SystemState.ERROR)
+                return False
+
+        # Comprobar el archivo final contra el trailer
+        if trailer is not None and not incomplete:
+            with span("verify"):
+                file_ok = (len(reconstructed) == trailer['original_size'] and
+                           calculate_file_hash(bytes(reconstructed)) == trailer['file_hash'])
+            if not file_ok:
+                print("✗ El archivo reconstruido no coincide con el trailer")
+                worker.close_checkpoint(completed=True)
+                _record_result(worker, 'error', total_time, error="no coincide con el trailer")
+                _set_led(led_controller, SystemState.ERROR)
+                return False
+        elif not incomplete:
+            print("⚠ Sin trailer: integridad no verificada")
+
+        # Guardar archivo (con el nombre anunciado si lo hay)
+        dest_path = _destination_path(worker, dest_dir)
+        with span("write", size=len(reconstructed)):
+            _write_atomic(dest_path, reconstructed)
+
+        _report_saved(worker, dest_path, len(reconstructed), max_seq + 1, total_time, missing)
+        return _close_reception(worker, not incomplete, len(reconstructed), total_time,
+                                led_controller)
+
+    except Exception as e:
+        worker.close_checkpoint(completed=False)
+        _record_result(worker, 'error', total_time, error=str(e))
+        print(f"\n✗ Error finalizando la recepción: {e}")
+        import traceback
+        traceback.print_exc()
+        _set_led(led_controller, SystemState.ERROR)
+        return False
+
+
+def reception_stalled(idle: float, last_seen: bool) -> bool:
+    """
+    Decide si abandonar una recepción por falta de tramas.
+    
+    No hay un límite de duración total: una transferencia de varios MB
+    sigue mientras lleguen tramas. Antes de la última trama el transmisor
+    puede estar entre rondas, comprimiendo o cambiando de canal, así que
+    la espera es STALL_TIMEOUT; después solo faltan reenvíos y alcanza
+    con IDLE_TIMEOUT.
+    
+    Args:
+        idle: Segundos desde la última trama recibida
+        last_seen: Si ya llegó la trama marcada como última
+        
+    Returns:
+        bool: True si hay que dejar de esperar
+    """
+    return idle > (IDLE_TIMEOUT if last_seen else STALL_TIMEOUT)
 
 
 def receive_file(radio: RF24, dest_dir: pathlib.Path, 
-                 led_controller: LEDController) -> bool:
+                 led_controller: LEDController,
+                 auto_channel: bool = AUTO_CHANNEL,
+                 finalizer=None, node_id: int = NODE_ID,
+                 first_frame_timeout: float = None) -> bool:
     """
     Recibe un archivo completo usando nRF24L01+.
     
@@ -24,17 +954,39 @@ def receive_file(radio: RF24, dest_dir: pathlib.Path,
         radio: Objeto RF24 inicializado
         dest_dir: Directorio donde guardar el archivo recibido
         led_controller: Controlador de LEDs
+        auto_channel: Escanear el ruido y aceptar la negociación de canal
+        finalizer: FinalizePool que termina el archivo en segundo plano; con
+                   None se reconstruye y guarda antes de retornar
+        node_id: ID de este nodo en difusiones: abre NODE_PIPE con su
+                 dirección para responder a las reparaciones (None = no)
+        first_frame_timeout: Segundos a esperar la primera trama (None =
+                             sin límite)
         
     Returns:
-        bool: True si la recepción fue exitosa, False en caso contrario
+        bool: True si la recepción fue exitosa, False en caso contrario (con
+              finalizer: si llegaron todos los paquetes y el flujo no falló
+              la verificación; el guardado se informa después en el log).
+              None si no llegó ninguna trama en first_frame_timeout
     """
     print("\n[ MODO RECEPTOR ]")
     led_controller.set_state(SystemState.RX_ACTIVE)
+    ACTIVE.begin('rx')
     
+    worker = None
     try:
         # Configurar pipes
         radio.open_rx_pipe(1, ADDR_A)
+        if node_id is not None:
+            radio.open_rx_pipe(NODE_PIPE, node_address(node_id))
         radio.open_tx_pipe(ADDR_B)
+        
+        # Escanear el ruido antes de escuchar en el canal de encuentro
+        channel_survey = None
+        if auto_channel:
+            radio.channel = RF_CHANNEL
+            print("📡 Escaneando ruido en los canales...")
+            with span("channel_survey"):
+                channel_survey = survey_channels(radio)
         radio.start_listening()
 
         print(f"\n{'='*50}")
@@ -42,42 +994,67 @@ def receive_file(radio: RF24, dest_dir: pathlib.Path,
         print(f"{'='*50}")
         print(f"Directorio: {dest_dir.absolute()}")
         print(f"FEC: {'Habilitado' if is_fec_available() else 'Deshabilitado'}")
+        if node_id is not None:
+            print(f"Nodo de difusión: {node_id}")
         print("Esperando datos...\n")
 
-        # Estado de recepción
-        file_id_seen = None
-        chunks = {}
-        last_seq = None
-        last_seen = False
-        compress_mode = COMPRESS_NONE
-        start_time = None  # Iniciar cronómetro al recibir primer paquete
+        frames = queue.SimpleQueue()
+        mailbox = AckMailbox(build_ack_payload(None, {}, None, False))
+        worker = RxWorker(frames, mailbox, dest_dir, channel_survey)
+        worker.start()
+        
         last_packet_time = None
-        packets_received = 0
-        total_errors_corrected = 0
+        complete_since = None
+        final_acks_loaded = 0
+        channel_fallback = None   # Canal al que volver si el nuevo no funciona
+        switched_at = 0.0
+        ack_pipe = 1   # Pipe de los ACKs cargados en la FIFO
 
         # Enviar ACK inicial
-        first_ack = build_ack_payload(file_id_seen, chunks, last_seq, last_seen)
-        radio.write_ack_payload(1, first_ack)
+        radio.write_ack_payload(1, mailbox.current)
+        armed_at = time.monotonic()
 
-        # Bucle principal de recepción
+        # Hilo de radio: solo vaciar la FIFO y cargar el último ACK publicado
         while True:
             now = time.monotonic()
             
-            # Verificar timeouts (solo si ya empezó la transferencia)
-            if start_time is not None:
-                if (now - start_time) > GLOBAL_TIMEOUT:
-                    print("⏱ Timeout global alcanzado")
-                    break
+            if ACTIVE.cancelled:
+                print("⏹ Recepción cancelada")
+                break
             
-            if last_seen and last_packet_time is not None:
-                if (now - last_packet_time) > IDLE_TIMEOUT:
-                    print("⏱ Timeout de inactividad")
+            # Tras verificar, esperar a que el ACK final llegue al transmisor
+            if worker.complete.is_set():
+                if complete_since is None:
+                    complete_since = now
+                elif (now - complete_since) > FINAL_ACK_LINGER:
                     break
+            
+            # Cambiar de canal cuando el transmisor dejó de usar el anterior
+            if worker.channel_switch is not None and (
+                    last_packet_time is None or now - last_packet_time > SWITCH_QUIET):
+                channel_fallback = radio.channel
+                _retune(radio, worker.channel_switch, mailbox.current)
+                worker.channel_switch = None
+                switched_at = now
+            elif channel_fallback is not None and now - switched_at > RENDEZVOUS_TIMEOUT:
+                print(f"⚠ Sin tramas en el canal {radio.channel}, volviendo al {channel_fallback}")
+                _retune(radio, channel_fallback, mailbox.current)
+                channel_fallback = None
+            
+            if (last_packet_time is None and first_frame_timeout is not None and
+                    now - armed_at > first_frame_timeout):
+                break
+            
+            # Verificar timeouts (solo si ya empezó la transferencia)
+            if last_packet_time is not None and reception_stalled(
+                    now - last_packet_time, worker.last_seen):
+                print("⏱ Timeout de inactividad")
+                break
 
             # Verificar si hay datos disponibles
             has_payload, pipe = radio.available_pipe()
             if not has_payload:
-                time.sleep(0.001)
+                time.sleep(RX_POLL_INTERVAL)
                 continue
 
             # Leer payload
@@ -91,160 +1068,123 @@ def receive_file(radio: RF24, dest_dir: pathlib.Path,
                     radio.read(payload_size if payload_size > 0 else 32)
                 except Exception:
                     pass
-                ack_payload = build_ack_payload(
-                    file_id_seen, chunks, last_seq, last_seen, compress_mode
-                )
-                radio.write_ack_payload(1, ack_payload)
+                radio.write_ack_payload(ack_pipe, mailbox.current)
                 continue
 
-            # Leer y ajustar tamaño si es necesario
             raw = radio.read(payload_size)
-            if len(raw) < FRAME_SIZE:
-                raw += b"\x00" * (FRAME_SIZE - len(raw))
-
-            # Parsear frame
-            parsed = parse_frame(raw)
-            if parsed is None:
-                ack_payload = build_ack_payload(
-                    file_id_seen, chunks, last_seq, last_seen, compress_mode
-                )
-                radio.write_ack_payload(1, ack_payload)
-                continue
-
-            fid, seq_id, data_bytes, is_last, pkt_compress, errors = parsed
-            last_packet_time = now
-            packets_received += 1
+            if pipe != ack_pipe and pipe in (1, NODE_PIPE):
+                # Las tramas difundidas no consumen ACKs: los viejos llenan la
+                # FIFO y el ACK para el pipe propio no entraría
+                radio.flush_tx()
+                ack_pipe = pipe
+            channel_fallback = None   # El canal actual funciona
+            if final_acks_loaded > ACK_FIFO_DEPTH:
+                # La FIFO de ACKs ya se vació hasta el resultado de la verificación
+                break
             
-            # Iniciar cronómetro al recibir primer paquete
-            if start_time is None:
-                start_time = now
+            # El worker publica el ACK final antes de marcar complete
+            if worker.complete.is_set():
+                final_acks_loaded += 1
+            radio.write_ack_payload(ack_pipe, mailbox.current)
+            frames.put((raw, now))
             
-            if errors > 0:
-                total_errors_corrected += errors
-
-            # Primer paquete: establecer contexto
-            if file_id_seen is None:
-                file_id_seen = fid
-                compress_mode = pkt_compress
-                print(f"→ File ID: {file_id_seen} | "
-                      f"Compresión: {COMPRESS_NAMES.get(compress_mode, 'unknown')}\n")
-
-            # Verificar que sea del archivo actual
-            if fid != file_id_seen:
-                ack_payload = build_ack_payload(
-                    file_id_seen, chunks, last_seq, last_seen, compress_mode
-                )
-                radio.write_ack_payload(1, ack_payload)
-                continue
-
-            # Almacenar chunk si es nuevo
-            if seq_id not in chunks:
-                chunks[seq_id] = data_bytes
-                
-                # Mostrar progreso
-                if packets_received % 25 == 0 or is_last:
-                    progress = len(chunks)
-                    elapsed = time.monotonic() - start_time
-                    per_pkt = len(data_bytes)
-                    throughput = (progress * per_pkt) / max(elapsed, 1e-9) / 1024
-                    print(f"  📊 {progress} paquetes | {throughput:.1f} KiB/s | "
-                          f"Errores FEC: {total_errors_corrected}")
-
-            # Marcar si es el último paquete
-            if is_last:
-                last_seq = seq_id
-                last_seen = True
-                print(f"\n→ Último paquete recibido: {last_seq}")
-                print(f"  Total recibidos: {len(chunks)} de {last_seq + 1}")
+            # Progreso para la API de control (lo que el worker ya procesó)
+            announce = worker.announce
+            if announce is not None:
+                ACTIVE.update(len(worker.chunks), announce['total_packets'] or None,
+                              worker.filename, announce['chunk_size'])
+            else:
+                ACTIVE.update(len(worker.chunks))
             
-            # Verificar si ya tenemos todos los paquetes (salir inmediatamente)
-            if last_seen and last_seq is not None:
-                if len(chunks) == last_seq + 1:
-                    print("✓ Transferencia completa, finalizando...")
-                    break
+            last_packet_time = now
 
-            # Enviar ACK
-            ack_payload = build_ack_payload(
-                file_id_seen, chunks, last_seq, last_seen, compress_mode
-            )
-            radio.write_ack_payload(1, ack_payload)
+        # Dejar que el worker procese lo que quede en la cola
+        frames.put(None)
+        worker.join()
 
         radio.stop_listening()
-        total_time = time.monotonic() - start_time
+        # Hasta la última trama: la espera del ACK final no cuenta como transferencia
+        end_time = last_packet_time or time.monotonic()
+        total_time = end_time - (worker.start_time or end_time)
 
-        # Verificar si se recibieron datos
-        if not chunks:
+        if last_packet_time is None and not ACTIVE.cancelled:
+            # Nadie transmitió: no es un error
+            led_controller.set_state(SystemState.IDLE)
+            ACTIVE.end(True)
+            return None
+
+        if worker.sync_ended and not worker.chunks:
+            print("\n✓ Sincronización terminada: no había archivos nuevos")
+            led_controller.set_state(SystemState.COMPLETED)
+            ACTIVE.end(True)
+            return True
+
+        # Verificar si se recibieron datos (un archivo vacío anunciado no trae tramas)
+        if not worker.chunks and not worker.verified:
+            worker.discard_stream()
             print("\n✗ No se recibieron datos")
             led_controller.set_state(SystemState.ERROR)
+            ACTIVE.end(False)
             return False
 
-        print(f"\n{'='*50}")
-        print("RECONSTRUYENDO ARCHIVO")
-        print(f"{'='*50}")
+        if finalizer is None:
+            success = finalize_reception(worker, dest_dir, total_time, led_controller)
+            ACTIVE.update(len(worker.chunks))
+            ACTIVE.end(success)
+            return success
 
-        # Reconstruir archivo
-        max_seq = max(chunks.keys())
-        reconstructed = bytearray()
-        missing = []
-        
-        for s in range(0, max_seq + 1):
-            if s in chunks:
-                reconstructed += chunks[s]
-            else:
-                missing.append(s)
-
-        if missing:
-            print(f"⚠ Paquetes faltantes: {len(missing)}")
-            head = ','.join(map(str, missing[:20]))
-            print(f"  Lista: {head}{'...' if len(missing) > 20 else ''}")
-
-        # Descomprimir si es necesario
-        original_size = len(reconstructed)
-        if compress_mode != COMPRESS_NONE:
-            print("Descomprimiendo datos...")
-            try:
-                decompressed = adaptive_decompress(bytes(reconstructed), compress_mode)
-                reconstructed = bytearray(decompressed)
-                print(f"  {original_size} → {len(reconstructed)} bytes")
-            except Exception as e:
-                print(f"✗ Error al descomprimir: {e}")
-                led_controller.set_state(SystemState.ERROR)
-                return False
-
-        # Guardar archivo
-        timestamp = int(time.time())
-        filename = f"file_{file_id_seen}_{timestamp}.bin" if file_id_seen else f"file_{timestamp}.bin"
-        dest_path = dest_dir / filename
-        dest_path.write_bytes(reconstructed)
-
-        # Mostrar resultados
-        throughput = (len(reconstructed) / max(total_time, 1e-9)) / 1024
-        
-        print(f"✓ Archivo guardado: {dest_path.name}")
-        print(f"  Tamaño final: {len(reconstructed)} bytes")
-        print(f"  Paquetes: {len(chunks)}/{max_seq + 1}")
-        print(f"  Tiempo: {total_time:.2f}s")
-        print(f"  Throughput: {throughput:.2f} KiB/s")
-        
-        if total_errors_corrected > 0:
-            print(f"  Errores corregidos (FEC): {total_errors_corrected}")
-        
-        print(f"  Faltantes: {len(missing)}")
-
-        if missing:
-            print(f"{'='*50}\n")
-            led_controller.set_state(SystemState.ERROR)
-            return False
-        else:
-            print("✓ ¡Recepción completa sin pérdidas!")
-            print(f"{'='*50}\n")
-            led_controller.set_state(SystemState.COMPLETED)
-            return True
+        # La radio queda libre: reconstruir, descomprimir y escribir en segundo plano
+        complete = worker.last_seen and worker.next_missing > worker.last_seq
+        complete = complete and worker.verified is not False
+        finalizer.submit(worker, dest_dir, total_time)
+        print(f"📨 {len(worker.chunks)} paquetes en cola de finalización; la radio queda libre")
+        led_controller.set_state(SystemState.COMPLETED if complete else SystemState.ERROR)
+        ACTIVE.update(len(worker.chunks))
+        ACTIVE.end(complete)
+        return complete
 
     except Exception as e:
+        if worker is not None:
+            if worker.is_alive():
+                worker.frames.put(None)
+                worker.join()
+            worker.close_checkpoint(completed=False)
+        _record_result(worker, 'error', error=str(e))
         print(f"\n✗ Error en recepción: {e}")
         import traceback
         traceback.print_exc()
         led_controller.set_state(SystemState.ERROR)
         radio.stop_listening()
-        return False
\ No newline at end of file
+        ACTIVE.end(False)
+        return False
+
+
+def receive_session(radio: RF24, dest_dir: pathlib.Path,
+                    led_controller: LEDController,
+                    auto_channel: bool = AUTO_CHANNEL,
+                    finalizer=None, node_id: int = NODE_ID,
+                    idle: float = RX_SESSION_IDLE) -> dict:
+    """
+    Recibe archivos uno tras otro hasta que el transmisor se calla.
+    
+    Con un FinalizePool receive_file vuelve apenas termina la recepción;
+    la sesión vuelve a escuchar enseguida para que un TX-MULTI encuentre
+    el receptor armado. El primer archivo se espera sin límite (como
+    receive_file); después la sesión termina tras `idle` segundos sin
+    tramas o si se cancela el trabajo.
+    
+    Returns:
+        dict: Estadísticas {exitosos, fallidos, total}
+    """
+    stats = {'exitosos': 0, 'fallidos': 0, 'total': 0}
+    wait = None
+    while not ACTIVE.cancelled:
+        result = receive_file(radio, dest_dir, led_controller, auto_channel,
+                              finalizer=finalizer, node_id=node_id, first_frame_timeout=wait)
+        if result is None:
+            print(f"💤 {idle:.0f}s sin transmisiones: fin de la sesión de recepción")
+            break
+        stats['total'] += 1
+        stats['exitosos' if result else 'fallidos'] += 1
+        wait = idle
+    return stats
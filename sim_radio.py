@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Enlace nRF24L01+ simulado en memoria
+
+Reemplaza a RF24 para probar el protocolo sin hardware: dos SimRadio
+conectados al mismo Ether intercambian tramas, auto-ACKs y payloads de
+ACK con la misma semántica de FIFOs (3 niveles) que el chip. Las pérdidas
+por intento dependen de una pérdida base y de un modelo de ruido por canal,
+que también alimenta al RPD.
+
+Uso como banco de pruebas:
+    python3 sim_radio.py texto_prueba/vampiro.txt --ruido wifi
+"""
+
+import time
+import random
+import pathlib
+import argparse
+import tempfile
+import threading
+import collections
+
+FIFO_DEPTH = 3
+ARD_STEP = 0.00025   # Cada unidad de delay de set_retries son 250 µs
+
+# Multiplicador de la pérdida por distancia según el nivel de PA (MIN..MAX)
+PA_RANGE_FACTOR = {0: 4.0, 1: 2.5, 2: 1.6, 3: 1.0}
+# Por data rate (1M, 2M, 250K): menor velocidad, mejor sensibilidad y más tiempo de aire
+RATE_RANGE_FACTOR = {0: 0.5, 1: 1.0, 2: 0.3}
+RATE_AIRTIME_FACTOR = {0: 2.0, 1: 1.0, 2: 8.0}
+
+
+class NoiseModel:
+    """
+    Ocupación del espectro por canal nRF24 (2400 + canal MHz).
+
+    busy(canal) es la probabilidad de que un intento de transmisión choque
+    con interferencia, y también la de que el RPD detecte portadora.
+    """
+
+    def __init__(self, busy: dict = None):
+        self.levels = dict(busy or {})
+
+    def busy(self, channel: int) -> float:
+        """Probabilidad de interferencia en el canal"""
+        return self.levels.get(channel, 0.0)
+
+    def add_band(self, center: int, half_width: int, duty: float):
+        """Agrega un interferente de banda ancha centrado en `center`"""
+        for channel in range(center - half_width, center + half_width + 1):
+            if 0 <= channel <= 125:
+                edge = abs(channel - center) / (half_width + 1)
+                level = duty * (1.0 - 0.5 * edge)
+                self.levels[channel] = min(0.95, self.levels.get(channel, 0.0) + level)
+
+    @classmethod
+    def wifi(cls, wifi_channels: tuple = (1, 6, 11), duty: float = 0.5) -> "NoiseModel":
+        """Redes WiFi de 20 MHz en los canales indicados (centro 2407 + 5n MHz)"""
+        model = cls()
+        for wifi_channel in wifi_channels:
+            model.add_band(7 + 5 * wifi_channel, 10, duty)
+        return model
+
+
+class Ether:
+    """Medio compartido entre los radios simulados"""
+
+    def __init__(self, loss: float = 0.0, airtime: float = 0.0002,
+                 noise: NoiseModel = None, seed: int = 1, range_loss: float = 0.0):
+        """
+        Args:
+            loss: Probabilidad base de perder un intento
+            airtime: Segundos de aire por intento a 2 Mbps (trama + auto-ACK)
+            noise: Modelo de ruido por canal
+            seed: Semilla para resultados reproducibles
+            range_loss: Pérdida por distancia a PA máximo y 2 Mbps; crece al
+                        bajar la potencia y disminuye a 1 Mbps
+        """
+        self.nodes = []
+        self.lock = threading.RLock()
+        self.loss = loss
+        self.airtime = airtime
+        self.noise = noise or NoiseModel()
+        self.rng = random.Random(seed)
+        self.range_loss = range_loss
+
+    def attempt_loss(self, radio: "SimRadio") -> float:
+        """Probabilidad de perder un intento de `radio` en su configuración actual"""
+        weak = (self.range_loss * PA_RANGE_FACTOR[int(radio.pa_level)]
+                * RATE_RANGE_FACTOR[int(radio.data_rate)])
+        return min(0.99, self.loss + self.noise.busy(radio.channel) + weak)
+
+
+class SimRadio:
+    """Subconjunto de la API de pyrf24.RF24 usado por el proyecto"""
+
+    def __init__(self, ether: Ether, name: str = "radio"):
+        self.ether = ether
+        ether.nodes.append(self)
+        self.name = name
+        self.rx_pipes = {}
+        self.tx_addr = None
+        self.listening = False
+        self.rx_fifo = collections.deque()
+        self.ack_fifo = collections.deque()
+        self.retry_delay = 5
+        self.retry_count = 15
+        self.channel = 76
+        self.data_rate = 1
+        self.pa_level = 3
+        self.dynamic_payloads = True
+        self.ack_payloads = True
+        self.max_rt = False
+        self.arc = 0
+        self.power = True
+        # Estadísticas del banco de pruebas
+        self.writes = 0
+        self.retries = 0
+        self.failures = 0
+
+    # ---- Configuración ----
+    def begin(self) -> bool:
+        return True
+
+    def set_pa_level(self, level: int, lna_enable: bool = True):
+        self.pa_level = level
+
+    def set_retries(self, delay: int, count: int):
+        self.retry_delay, self.retry_count = delay, count
+
+    def enable_dynamic_ack(self):
+        pass
+
+    def set_auto_ack(self, *args):
+        pass
+
+    def open_rx_pipe(self, pipe: int, address: bytes):
+        self.rx_pipes[pipe] = bytes(address)
+
+    def close_rx_pipe(self, pipe: int):
+        self.rx_pipes.pop(pipe, None)
+
+    def open_tx_pipe(self, address: bytes):
+        self.tx_addr = bytes(address)
+
+    def start_listening(self):
+        with self.ether.lock:
+            self.listening = True
+            self.ack_fifo.clear()
+
+    def stop_listening(self):
+        with self.ether.lock:
+            self.listening = False
+            self.ack_fifo.clear()
+
+    @property
+    def listen(self) -> bool:
+        return self.listening
+
+    @listen.setter
+    def listen(self, enable: bool):
+        if enable:
+            self.start_listening()
+        else:
+            self.stop_listening()
+
+    @property
+    def rpd(self) -> bool:
+        return self.ether.rng.random() < self.ether.noise.busy(self.channel)
+
+    # ---- Transmisión ----
+    def _listeners(self) -> list:
+        """(nodo, pipe) que escuchan la dirección TX en el mismo canal"""
+        found = []
+        for node in self.ether.nodes:
+            if node is self or not node.listening or node.channel != self.channel:
+                continue
+            if int(node.data_rate) != int(self.data_rate):
+                continue
+            for pipe, address in node.rx_pipes.items():
+                if pipe >= 2 and node.rx_pipes.get(1) is not None:
+                    address = bytes([address[0]]) + node.rx_pipes[1][1:]
+                if address == self.tx_addr:
+                    found.append((node, pipe))
+                    break
+        return found
+
+    def write(self, buf: bytes, multicast: bool = False) -> bool:
+        buf = bytes(buf)
+        self.writes += 1
+        loss = self.ether.attempt_loss(self)
+        airtime = self.ether.airtime * RATE_AIRTIME_FACTOR[int(self.data_rate)]
+        time.sleep(airtime)
+
+        if multicast:
+            # Sin auto-ACK: cada receptor pierde la trama de forma independiente
+            with self.ether.lock:
+                for node, pipe in self._listeners():
+                    if len(node.rx_fifo) < FIFO_DEPTH and self.ether.rng.random() >= loss:
+                        node.rx_fifo.append((pipe, buf))
+            self.arc = 0
+            return True
+
+        for attempt in range(self.retry_count + 1):
+            if attempt:
+                # Espera entre reintentos (ARD) más el aire del nuevo intento
+                time.sleep((self.retry_delay + 1) * ARD_STEP + airtime)
+            self.arc = attempt
+            with self.ether.lock:
+                listeners = self._listeners()
+                if not listeners or self.ether.rng.random() < loss:
+                    continue
+                target, pipe = listeners[0]
+                if len(target.rx_fifo) >= FIFO_DEPTH:
+                    continue
+                target.rx_fifo.append((pipe, buf))
+                if target.ack_fifo:
+                    self.rx_fifo.append((0, target.ack_fifo.popleft()))
+            self.retries += attempt
+            return True
+
+        self.retries += self.retry_count
+        self.failures += 1
+        return False
+
+    def write_fast(self, buf: bytes, multicast: bool = False) -> bool:
+        if self.max_rt:
+            return False
+        if not self.write(buf, multicast):
+            self.max_rt = True
+        return True
+
+    def tx_standby(self, timeout: int = 0, start_tx: bool = True) -> bool:
+        if self.max_rt:
+            self.max_rt = False
+            return False
+        return True
+
+    def flush_tx(self):
+        self.max_rt = False
+
+    def reuse_tx(self):
+        self.max_rt = False
+
+    def clear_status_flags(self, flags: int = 0x70) -> int:
+        status = 0x10 if self.max_rt else 0
+        self.max_rt = False
+        return status
+
+    def get_arc(self) -> int:
+        return self.arc
+
+    # ---- Recepción ----
+    def flush_rx(self):
+        self.rx_fifo.clear()
+
+    def available(self) -> bool:
+        return bool(self.rx_fifo)
+
+    def available_pipe(self) -> tuple:
+        with self.ether.lock:
+            if self.rx_fifo:
+                return True, self.rx_fifo[0][0]
+            return False, 7
+
+    def get_dynamic_payload_size(self) -> int:
+        with self.ether.lock:
+            return len(self.rx_fifo[0][1]) if self.rx_fifo else 0
+
+    def read(self, length: int = None) -> bytearray:
+        with self.ether.lock:
+            if not self.rx_fifo:
+                return bytearray(length or 32)
+            return bytearray(self.rx_fifo.popleft()[1])
+
+    def write_ack_payload(self, pipe: int, buf: bytes) -> bool:
+        with self.ether.lock:
+            if len(self.ack_fifo) >= FIFO_DEPTH:
+                return False
+            self.ack_fifo.append(bytes(buf))
+            return True
+
+
+def run_transfer(ether: Ether, file_path: pathlib.Path, tx_kwargs: dict = None,
+                 rx_kwargs: dict = None, dest_dir: pathlib.Path = None) -> dict:
+    """
+    Transfiere un archivo entre dos SimRadio y mide el enlace.
+
+    dest_dir permite repetir transferencias contra el mismo receptor
+    (None = un directorio temporal nuevo).
+
+    Returns:
+        dict: {ok, tiempo, reintentos_por_trama, canal, destino}
+    """
+    from constants import RF_CHANNEL
+    from hardware import LEDController
+    from transmitter import transmit_file
+    from receiver import receive_file
+
+    tx_radio = SimRadio(ether, "tx")
+    rx_radio = SimRadio(ether, "rx")
+    tx_radio.channel = rx_radio.channel = RF_CHANNEL
+    if dest_dir is None:
+        dest_dir = pathlib.Path(tempfile.mkdtemp(prefix="nrf24_sim_"))
+
+    result = {}
+    rx_thread = threading.Thread(
+        target=lambda: result.__setitem__(
+            'rx', receive_file(rx_radio, dest_dir, LEDController(), **(rx_kwargs or {}))
+        )
+    )
+    rx_thread.start()
+    time.sleep(0.2)   # El receptor escanea y empieza a escuchar primero
+
+    start = time.monotonic()
+    result['tx'] = transmit_file(tx_radio, file_path, LEDController(), **(tx_kwargs or {}))
+    elapsed = time.monotonic() - start
+    rx_thread.join()
+    ether.nodes.clear()
+
+    return {
+        'ok': result['tx'] and result.get('rx', False),
+        'tiempo': elapsed,
+        'reintentos_por_trama': tx_radio.retries / max(tx_radio.writes, 1),
+        'canal': tx_radio.channel,
+        'destino': dest_dir,
+    }
+
+
+def main():
+    """Compara el canal fijo contra la selección automática bajo ruido simulado"""
+    parser = argparse.ArgumentParser(description='Banco de pruebas con enlace nRF24 simulado')
+    parser.add_argument('archivo', help='Archivo a transferir')
+    parser.add_argument('--ruido', choices=['ninguno', 'wifi'], default='wifi',
+                        help='Modelo de ruido (wifi: redes 1/6/11 + interferente en el canal por defecto)')
+    parser.add_argument('--perdida', type=float, default=0.0,
+                        help='Probabilidad base de perder cada intento')
+    args = parser.parse_args()
+
+    from constants import RF_CHANNEL
+
+    if args.ruido == 'wifi':
+        noise = NoiseModel.wifi()
+        noise.add_band(RF_CHANNEL, 3, 0.6)   # Interferente sobre el canal por defecto
+    else:
+        noise = NoiseModel()
+
+    results = {}
+    for label, auto_channel in (("canal fijo", False), ("canal automático", True)):
+        ether = Ether(loss=args.perdida, noise=noise)
+        results[label] = run_transfer(
+            ether, pathlib.Path(args.archivo),
+            tx_kwargs={'auto_channel': auto_channel},
+            rx_kwargs={'auto_channel': auto_channel},
+        )
+
+    print(f"\n{'='*50}")
+    print("RESULTADOS DEL ENLACE SIMULADO")
+    print(f"{'='*50}")
+    for label, r in results.items():
+        print(f"{label:>17}: canal {r['canal']:3d} | "
+              f"{r['reintentos_por_trama']:.2f} reintentos/trama | "
+              f"{r['tiempo']:.2f}s | {'OK' if r['ok'] else 'FALLÓ'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Directorio spool: transmisión automática de archivos
+
+Otros servicios dejan archivos en el spool y el SpoolWatcher los encola en
+el Dispatcher cuando terminan de escribirse; los enviados se mueven a
+SPOOL_DONE_DIR. La prioridad sale del subdirectorio:
+
+    spool/alta/   → antes que todo lo demás
+    spool/        → normal
+    spool/baja/   → cuando no queda otra cosa
+
+y dentro de una prioridad se respeta el orden de llegada. Se ignoran los
+archivos ocultos y los terminados en .tmp/.part (conviene escribir con
+ese nombre y renombrar al final).
+
+En Linux usa inotify (vía ctypes, sin dependencias): espera bloqueado
+hasta el próximo evento, sin consumir CPU. Una ráfaga de escrituras al
+mismo archivo se junta en un único envío: se encola SPOOL_SETTLE segundos
+después del último cierre. Sin inotify escanea cada SPOOL_POLL_INTERVAL
+y encola los archivos cuyo tamaño y mtime no cambiaron en ese lapso.
+"""
+
+import os
+import time
+import select
+import struct
+import pathlib
+import threading
+
+from dispatcher import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from constants import SPOOL_DONE_DIR, SPOOL_SETTLE, SPOOL_POLL_INTERVAL, SPOOL_RETRY_DELAY
+
+PRIORITY_DIRS = {"alta": PRIORITY_HIGH, "baja": PRIORITY_LOW}
+IGNORED_SUFFIXES = (".tmp", ".part")
+
+# Máscaras de inotify (<sys/inotify.h>)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _open_inotify():
+    """
+    Crea una instancia de inotify.
+
+    Returns:
+        tuple: (fd, función add_watch) o None si no está disponible
+    """
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    def add_watch(path: pathlib.Path) -> int:
+        wd = libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch({path})")
+        return wd
+
+    return fd, add_watch
+
+
+def _read_events(fd: int):
+    """Lee los eventos pendientes: [(wd, mask, nombre)]"""
+    data = os.read(fd, 64 * 1024)
+    events = []
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b"\0")
+        offset += length
+        events.append((wd, mask, os.fsdecode(name)))
+    return events
+
+
+class SpoolWatcher:
+    """
+    Vigila un directorio spool y encola cada archivo terminado.
+
+    Args:
+        directory: Directorio spool (se crea si no existe)
+        dispatcher: Dispatcher donde encolar los envíos
+        kind: Tipo de trabajo; el handler recibe job.params['path'] y debe
+              llamar a finish(path, ok) al terminar
+        log: Función de log
+    """
+
+    def __init__(self, directory: pathlib.Path, dispatcher, kind: str = "spool",
+                 log=print, settle: float = SPOOL_SETTLE,
+                 poll_interval: float = SPOOL_POLL_INTERVAL,
+                 retry_delay: float = SPOOL_RETRY_DELAY):
+        self.directory = pathlib.Path(directory)
+        self.done_dir = self.directory / SPOOL_DONE_DIR
+        self.dispatcher = dispatcher
+        self.kind = kind
+        self.log = log
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0}
+        self.backend = None
+        self._queued = set()      # Encolados o en envío
+        self._settling = {}       # Cerrados, esperando SPOOL_SETTLE: {path: deadline}
+        self._writing = set()     # Abiertos para escritura
+        self._seen = {}           # Sondeo: {path: ((tamaño, mtime), desde)}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._wake_r = self._wake_w = None
+
+    def watched_dirs(self) -> dict:
+        """Subdirectorios vigilados: {ruta: prioridad}"""
+        dirs = {self.directory: PRIORITY_NORMAL}
+        for name, priority in PRIORITY_DIRS.items():
+            dirs[self.directory / name] = priority
+        return dirs
+
+    def start(self):
+        """Crea los directorios y empieza a vigilar en un hilo propio"""
+        for directory in list(self.watched_dirs()) + [self.done_dir]:
+            directory.mkdir(parents=True, exist_ok=True)
+        self._running = True
+
+        inotify = _open_inotify()
+        if inotify is not None:
+            fd, add_watch = inotify
+            try:
+                wds = {add_watch(d): d for d in self.watched_dirs()}
+            except OSError as e:
+                self.log(f"⚠ inotify no disponible ({e}), usando sondeo")
+                os.close(fd)
+                inotify = None
+        if inotify is not None:
+            self.backend = "inotify"
+            self._wake_r, self._wake_w = os.pipe()
+            # Lo que ya estaba en el spool pasa por la misma espera
+            deadline = time.monotonic() + self.settle
+            for path in self._scan():
+                self._settling[path] = deadline
+            target, args = self._inotify_loop, (fd, wds)
+        else:
+            self.backend = "sondeo"
+            self._stop_event = threading.Event()
+            target, args = self._poll_loop, ()
+
+        self._thread = threading.Thread(target=target, args=args, name="spool", daemon=True)
+        self._thread.start()
+        self.log(f"📂 Spool: {self.directory} ({self.backend}) → {self.done_dir.name}/")
+
+    def stop(self):
+        """Deja de vigilar (los trabajos ya encolados siguen en la cola)"""
+        self._running = False
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:
+                pass   # El hilo ya terminó y cerró el pipe
+        elif self._thread is not None:
+            self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def finish(self, path: pathlib.Path, ok: bool):
+        """
+        Registra el resultado de un envío.
+
+        Enviado: se mueve a SPOOL_DONE_DIR. Fallido: se reintenta tras
+        SPOOL_RETRY_DELAY segundos. Si el archivo ya no existe, se olvida.
+        """
+        path = pathlib.Path(path)
+        if not path.exists():
+            with self._lock:
+                self._queued.discard(path)
+            return
+        if ok:
+            self.stats['sent'] += 1
+            try:
+                target = self.done_dir / path.name
+                if target.exists():
+                    target = self.done_dir / f"{time.strftime('%Y%m%d-%H%M%S')}_{path.name}"
+                os.replace(path, target)
+            except OSError as e:
+                self.log(f"⚠ No se pudo mover {path.name} a {self.done_dir.name}/: {e}")
+            with self._lock:
+                self._queued.discard(path)
+            return
+
+        self.stats['failed'] += 1
+        self.log(f"↻ {path.name}: reintento en {self.retry_delay:.0f} s")
+        timer = threading.Timer(self.retry_delay, self._retry, args=(path,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self, path: pathlib.Path):
+        with self._lock:
+            self._queued.discard(path)
+        if self._running and path.is_file():
+            self._submit([path])
+
+    def _priority(self, path: pathlib.Path) -> int:
+        return self.watched_dirs().get(path.parent, PRIORITY_NORMAL)
+
+    def _wanted(self, name: str) -> bool:
+        return bool(name) and not name.startswith(".") and not name.endswith(IGNORED_SUFFIXES)
+
+    def _scan(self) -> list:
+        """Archivos presentes en el spool, del más antiguo al más nuevo"""
+        files = []
+        for directory in self.watched_dirs():
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if self._wanted(entry.name) and entry.is_file():
+                    files.append(pathlib.Path(entry.path))
+        return sorted(files, key=self._mtime)
+
+    @staticmethod
+    def _mtime(path: pathlib.Path) -> float:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    def _submit(self, paths: list):
+        """Encola los archivos (en orden de llegada) que no estén ya en la cola"""
+        for path in sorted(paths, key=self._mtime):
+            with self._lock:
+                if path in self._queued:
+                    continue
+                self._queued.add(path)
+            self.stats['queued'] += 1
+            self.dispatcher.submit(self.kind, priority=self._priority(path),
+                                   source="spool", path=path)
+
+    def _inotify_loop(self, fd: int, wds: dict):
+        try:
+            while self._running:
+                timeout = None
+                if self._settling:
+                    timeout = max(0.0, min(self._settling.values()) - time.monotonic())
+                ready, _, _ = select.select([fd, self._wake_r], [], [], timeout)
+                if fd in ready:
+                    now = time.monotonic()
+                    for wd, mask, name in _read_events(fd):
+                        if mask & IN_ISDIR or wd not in wds or not self._wanted(name):
+                            continue
+                        path = wds[wd] / name
+                        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                            self._writing.discard(path)
+                            self._settling[path] = now + self.settle
+                        elif mask & (IN_CREATE | IN_MODIFY):
+                            self._settling.pop(path, None)
+                            self._writing.add(path)
+                        elif mask & (IN_DELETE | IN_MOVED_FROM):
+                            self._settling.pop(path, None)
+                            self._writing.discard(path)
+                now = time.monotonic()
+                ready_paths = [p for p, deadline in self._settling.items() if deadline <= now]
+                for path in ready_paths:
+                    del self._settling[path]
+                self._submit([p for p in ready_paths if p.is_file()])
+        except Exception as e:
+            self.log(f"✗ Error vigilando el spool: {e}")
+        finally:
+            os.close(fd)
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _poll_loop(self):
+        try:
+            while self._running:
+                now = time.monotonic()
+                stable = []
+                present = set()
+                for path in self._scan():
+                    present.add(path)
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    signature = (st.st_size, st.st_mtime_ns)
+                    previous = self._seen.get(path)
+                    if previous is None or previous[0] != signature:
+                        self._seen[path] = (signature, now)
+                    elif now - previous[1] >= self.settle:
+                        stable.append(path)
+                for path in set(self._seen) - present:
+                    del self._seen[path]
+                self._submit(stable)
+                self._stop_event.wait(self.poll_interval)
+        except Exception as e:
+            self.log(f"✗ Error vigilando el spool: {e}")
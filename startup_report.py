@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Latencia de arranque del daemon
+
+StartupTimer marca los hitos del arranque (radio lista para recibir,
+botón, precarga) respecto del inicio del proceso; el daemon los registra
+en el log en una sola línea.
+
+Ejecutado como script mide el tiempo de importación de cada módulo en un
+intérprete nuevo (python -X importtime), para detectar regresiones:
+    python3 startup_report.py
+    python3 startup_report.py --budget-ms 300   # exit 1 si se excede
+"""
+
+import os
+import sys
+import time
+import subprocess
+
+# Módulos que el daemon importa antes de tener la radio en RX
+CRITICAL_PATH = ("radio_config", "hardware", "dispatcher", "spool", "tracing")
+
+# Módulos que deberían cargarse solo en el primer uso o en la precarga
+DEFERRED = (
+    "transmitter", "receiver", "compression", "cost_model", "metrics", "history", "sqlite3",
+    "telemetry", "bz2", "lzma", "reedsolo", "http.server", "socketserver",
+)
+
+
+def process_uptime() -> float:
+    """
+    Segundos desde que arrancó el proceso (incluye el intérprete).
+
+    Usa /proc/self/stat; fuera de Linux devuelve 0.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimer:
+    """Hitos del arranque en milisegundos desde el inicio del proceso"""
+
+    def __init__(self):
+        self.origin = time.monotonic() - process_uptime()
+        self.marks = []
+
+    def mark(self, name: str) -> float:
+        """Registra un hito; retorna los ms transcurridos"""
+        elapsed = (time.monotonic() - self.origin) * 1000
+        self.marks.append((name, elapsed))
+        return elapsed
+
+    def summary(self) -> str:
+        """Hitos en una línea: 'radio 120 ms | rx_ready 135 ms | ...'"""
+        return " | ".join(f"{name} {elapsed:.0f} ms" for name, elapsed in self.marks)
+
+
+def measure_imports(modules: tuple) -> dict:
+    """
+    Tiempo de importación acumulado de cada módulo en un intérprete nuevo.
+
+    Returns:
+        dict: {módulo: microsegundos} (None si no se pudo importar)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = {}
+    for module in modules:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=here, capture_output=True, text=True
+        )
+        times[module] = None
+        if result.returncode != 0:
+            continue
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                times[module] = int(parts[1].split()[-1])
+    return times
+
+
+def loaded_by(modules: tuple) -> set:
+    """Módulos de DEFERRED que quedan cargados al importar `modules`"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        f"import sys\n"
+        f"for m in {list(modules)!r}: __import__(m)\n"
+        f"print('CARGADOS:', *(m for m in {list(DEFERRED)!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=here,
+                            capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("CARGADOS:"):
+            return set(line.split()[1:])
+    return set()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reporte de tiempos de importación del daemon')
+    parser.add_argument('--budget-ms', type=float, default=0,
+                        help='Falla (exit 1) si la ruta crítica supera este tiempo')
+    args = parser.parse_args()
+
+    print(f"\n{'='*50}")
+    print("TIEMPOS DE IMPORTACIÓN")
+    print(f"{'='*50}")
+    times = measure_imports(CRITICAL_PATH + DEFERRED + ("NRF4_daemon",))
+    for module, us in times.items():
+        label = "crítico " if module in CRITICAL_PATH else ""
+        value = f"{us / 1000:8.1f} ms" if us is not None else "   no disponible"
+        print(f"  {label:8}{module:<16}{value}")
+
+    critical_ms = sum(times[m] or 0 for m in CRITICAL_PATH) / 1000
+    print(f"\nRuta crítica hasta RX (suma, con dependencias repetidas): {critical_ms:.1f} ms")
+
+    eager = loaded_by(("NRF4_daemon",))
+    if eager:
+        print(f"⚠ Cargados al importar el daemon: {', '.join(sorted(eager))}")
+    else:
+        print("✓ Ningún módulo diferido se carga al importar el daemon")
+
+    if args.budget_ms and (critical_ms > args.budget_ms or eager):
+        print(f"✗ Fuera de presupuesto ({args.budget_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
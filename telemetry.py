@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Telemetría por trama del transmisor
+
+burst_stats y las métricas solo cuentan totales; para entender por qué un
+enlace es lento hace falta ver cada trama: reintentos de hardware (ARC),
+MAX_RT acumulados, latencia de write() y el tiempo hasta el ACK payload.
+
+FrameRing guarda esos valores en un buffer circular de columnas array
+(sin un objeto Python por trama): con TELEMETRY_CAPACITY = 65536 ocupa
+~1.7 MiB y registrar una trama es un puñado de asignaciones a índices, así
+que puede quedar activo en producción. Al llenarse pisa las más viejas.
+
+Se activa con la variable de entorno NRF24_TELEMETRY=<archivo.bin> o con
+enable() (--telemetry en main.py). Deshabilitada, recorder() devuelve None
+y el transmisor ni siquiera toma los tiempos. El buffer se vuelca al salir
+(o con save()) en un binario compacto para analizarlo fuera de línea:
+    python3 telemetry.py tx.bin           # resumen por archivo
+    python3 telemetry.py tx.bin --csv     # una fila por trama
+    telemetry.load("tx.bin")              # {columna: array} para numpy/pandas
+
+Formato (little-endian):
+    "NRFT" | versión (1) | columnas (1) | filas (4) | origen epoch µs (8)
+    por columna: largo del nombre (1) | nombre | typecode (1)
+    datos de cada columna, completos y en orden cronológico
+"""
+
+import os
+import sys
+import time
+import array
+import atexit
+import struct
+import pathlib
+
+from constants import TELEMETRY_CAPACITY
+
+TELEMETRY_ENV = "NRF24_TELEMETRY"   # Archivo binario del volcado
+
+MAGIC = b"NRFT"
+VERSION = 1
+HEADER = struct.Struct("<4sBBIQ")
+
+# Columnas: (nombre, typecode de array)
+FIELDS = (
+    ('t_us', 'Q'),        # Inicio del write, µs desde enable()
+    ('file_id', 'H'),
+    ('seq', 'I'),
+    ('write_us', 'I'),    # Duración de write() / write_fast()
+    ('rtt_us', 'I'),      # Desde el inicio del write hasta leer el ACK payload (0 = sin ACK)
+    ('lost', 'H'),        # MAX_RT acumulados en el archivo (como PLOS_CNT, sin saturar en 15)
+    ('arc', 'B'),         # Reintentos de hardware (ARC)
+    ('flags', 'B'),       # FLAG_*
+    ('channel', 'B'),
+)
+
+FLAG_SENT = 0x01         # write() confirmado por auto-ACK (rápido: aceptada en la FIFO)
+FLAG_ACK_PAYLOAD = 0x02  # Se leyó un ACK payload después de esta trama
+FLAG_FAST = 0x04         # Enviada con write_fast(): ARC es el de la última trama terminada
+FLAG_MAX_RT = 0x08       # Esta trama agotó los reintentos de hardware (suma a 'lost')
+FLAG_BLOCKED = 0x10      # Rápido: al cargarla, la cabeza de la FIFO ya tenía MAX_RT
+
+_MAX_U32 = 0xFFFFFFFF
+
+_ring = None             # FrameRing activo; None = telemetría deshabilitada
+_output = None
+
+
+class FrameRing:
+    """
+    Buffer circular de tramas en columnas array.
+
+    Solo el hilo que transmite llama a record(); save() copia las columnas
+    y a lo sumo puede ver a medias la última fila.
+
+    Args:
+        capacity: Tramas que se conservan (las más recientes)
+    """
+
+    def __init__(self, capacity: int = TELEMETRY_CAPACITY):
+        self.capacity = capacity
+        self.count = 0   # Tramas registradas desde el inicio (puede superar capacity)
+        self.origin_ns = time.perf_counter_ns()
+        self.origin_epoch_us = time.time_ns() // 1000
+        for name, code in FIELDS:
+            setattr(self, name, array.array(code, bytes(array.array(code).itemsize * capacity)))
+        self._file_id = None
+        self._lost = 0
+
+    def record(self, file_id: int, seq: int, start_ns: int, end_ns: int,
+               ack_ns: int, arc: int, flags: int, channel: int):
+        """
+        Registra una trama.
+
+        Args:
+            file_id: ID de la transferencia
+            seq: Número de secuencia
+            start_ns, end_ns: perf_counter_ns() antes y después del write
+            ack_ns: perf_counter_ns() al leer el ACK payload (0 = sin ACK)
+            arc: Reintentos de hardware (get_arc())
+            flags: Combinación de FLAG_*
+            channel: Canal de radio
+        """
+        if file_id != self._file_id:
+            self._file_id = file_id
+            self._lost = 0
+        if flags & FLAG_MAX_RT:
+            self._lost += 1
+        i = self.count % self.capacity
+        self.t_us[i] = (start_ns - self.origin_ns) // 1000
+        self.file_id[i] = file_id
+        self.seq[i] = seq
+        self.write_us[i] = min((end_ns - start_ns) // 1000, _MAX_U32)
+        self.rtt_us[i] = min((ack_ns - start_ns) // 1000, _MAX_U32) if ack_ns else 0
+        self.lost[i] = min(self._lost, 0xFFFF)
+        self.arc[i] = arc
+        self.flags[i] = flags
+        self.channel[i] = channel
+        self.count += 1
+
+    def columns(self) -> dict:
+        """Copia de las columnas en orden cronológico: {nombre: array}"""
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        size = min(self.count, self.capacity)
+        result = {}
+        for name, _ in FIELDS:
+            column = getattr(self, name)
+            result[name] = column[start:size] + column[:start]
+        return result
+
+    def dump(self, path: pathlib.Path):
+        """Escribe el buffer en formato binario (atómico: temporal + rename)"""
+        path = pathlib.Path(path)
+        columns = self.columns()
+        rows = len(columns['t_us'])
+        parts = [HEADER.pack(MAGIC, VERSION, len(FIELDS), rows, self.origin_epoch_us)]
+        for name, code in FIELDS:
+            encoded = name.encode('ascii')
+            parts.append(bytes([len(encoded)]) + encoded + code.encode('ascii'))
+        for name, _ in FIELDS:
+            column = columns[name]
+            if sys.byteorder == 'big':
+                column.byteswap()
+            parts.append(column.tobytes())
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(b"".join(parts))
+        os.replace(tmp, path)
+
+
+def recorder() -> FrameRing:
+    """FrameRing activo, o None si la telemetría está deshabilitada"""
+    return _ring
+
+
+def enable(output: pathlib.Path, capacity: int = TELEMETRY_CAPACITY):
+    """
+    Activa la telemetría por trama.
+
+    Args:
+        output: Archivo binario donde se volcará el buffer al salir (o con save())
+        capacity: Tramas que se conservan
+    """
+    global _ring, _output
+    if _ring is None:
+        _ring = FrameRing(capacity)
+        atexit.register(save)
+    _output = pathlib.Path(output)
+
+
+def save(output: pathlib.Path = None) -> pathlib.Path:
+    """
+    Vuelca el buffer a disco.
+
+    Returns:
+        pathlib.Path: Archivo escrito, o None si no hay nada que guardar
+    """
+    path = pathlib.Path(output) if output else _output
+    if _ring is None or path is None or not _ring.count:
+        return None
+    _ring.dump(path)
+    return path
+
+
+def load(path: pathlib.Path) -> dict:
+    """
+    Lee un volcado.
+
+    Returns:
+        dict: {columna: array} más 'origin_epoch_us'
+
+    Raises:
+        ValueError: Si el archivo no es un volcado de telemetría
+    """
+    data = pathlib.Path(path).read_bytes()
+    if len(data) < HEADER.size:
+        raise ValueError("archivo truncado")
+    magic, version, count, rows, origin = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("no es un volcado de telemetría compatible")
+    offset = HEADER.size
+    fields = []
+    for _ in range(count):
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode('ascii')
+        fields.append((name, chr(data[offset + 1 + length])))
+        offset += length + 2
+    result = {'origin_epoch_us': origin}
+    for name, code in fields:
+        column = array.array(code)
+        end = offset + column.itemsize * rows
+        if end > len(data):
+            raise ValueError("archivo truncado")
+        column.frombytes(data[offset:end])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        result[name] = column
+        offset = end
+    return result
+
+
+def summarize(columns: dict) -> dict:
+    """
+    Resumen por archivo de un volcado.
+
+    Returns:
+        dict: {file_id: {frames, sent, max_rt, blocked, ack_payloads, arc_mean,
+               arc_hist, write_p50_us, write_p99_us, rtt_p50_us, rtt_p99_us,
+               seconds, channels}}
+    """
+    from history import percentile
+
+    groups = {}
+    for i, file_id in enumerate(columns['file_id']):
+        groups.setdefault(file_id, []).append(i)
+
+    summary = {}
+    for file_id, rows in groups.items():
+        flags = [columns['flags'][i] for i in rows]
+        arcs = [columns['arc'][i] for i in rows]
+        writes = sorted(columns['write_us'][i] for i in rows)
+        rtts = sorted(columns['rtt_us'][i] for i in rows if columns['rtt_us'][i])
+        hist = [0] * 16
+        for arc in arcs:
+            hist[min(arc, 15)] += 1
+        times = [columns['t_us'][i] for i in rows]
+        summary[file_id] = {
+            'frames': len(rows),
+            'sent': sum(1 for f in flags if f & FLAG_SENT),
+            'max_rt': sum(1 for f in flags if f & FLAG_MAX_RT),
+            'blocked': sum(1 for f in flags if f & FLAG_BLOCKED),
+            'ack_payloads': sum(1 for f in flags if f & FLAG_ACK_PAYLOAD),
+            'fast': any(f & FLAG_FAST for f in flags),
+            'arc_mean': sum(arcs) / len(arcs),
+            'arc_hist': hist,
+            'write_p50_us': percentile(writes, 0.5),
+            'write_p99_us': percentile(writes, 0.99),
+            'rtt_p50_us': percentile(rtts, 0.5),
+            'rtt_p99_us': percentile(rtts, 0.99),
+            'seconds': (max(times) - min(times)) / 1e6,
+            'channels': sorted({columns['channel'][i] for i in rows}),
+        }
+    return summary
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Análisis de la telemetría por trama del transmisor nRF24')
+    parser.add_argument('archivo', help='Volcado binario (--telemetry / NRF24_TELEMETRY)')
+    parser.add_argument('--csv', action='store_true', help='Una fila por trama en CSV')
+    parser.add_argument('--file-id', type=int, help='Solo esta transferencia')
+    args = parser.parse_args()
+
+    try:
+        columns = load(args.archivo)
+    except (OSError, ValueError) as e:
+        print(f"✗ No se pudo leer {args.archivo}: {e}")
+        return 1
+    if args.file_id is not None:
+        keep = [i for i, f in enumerate(columns['file_id']) if f == args.file_id]
+        for name, _ in FIELDS:
+            if name in columns:
+                columns[name] = array.array(columns[name].typecode,
+                                            (columns[name][i] for i in keep))
+
+    if args.csv:
+        import csv
+        names = [name for name, _ in FIELDS if name in columns]
+        writer = csv.writer(sys.stdout)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name] for name in names)))
+        return 0
+
+    origin = time.strftime('%Y-%m-%d %H:%M:%S',
+                           time.localtime(columns['origin_epoch_us'] / 1e6))
+    print(f"Volcado: {args.archivo} | {len(columns['t_us'])} tramas | inicio {origin}")
+    for file_id, s in summarize(columns).items():
+        fmt = lambda v: "-" if v is None else f"{v:.0f}"
+        print(f"\nFile ID {file_id} ({'rápido' if s['fast'] else 'normal'}, "
+              f"canal {','.join(str(c) for c in s['channels'])})")
+        print(f"  Tramas: {s['frames']} | enviadas: {s['sent']} | MAX_RT: {s['max_rt']} | "
+              f"bloqueadas: {s['blocked']} | ACK payloads: {s['ack_payloads']} | {s['seconds']:.2f}s")
+        print(f"  ARC medio: {s['arc_mean']:.2f} | histograma 0-15: "
+              f"{' '.join(str(n) for n in s['arc_hist'])}")
+        print(f"  write µs p50/p99: {fmt(s['write_p50_us'])}/{fmt(s['write_p99_us'])} | "
+              f"ACK µs p50/p99: {fmt(s['rtt_p50_us'])}/{fmt(s['rtt_p99_us'])}")
+    return 0
+
+
+# Activación por variable de entorno (útil para el daemon bajo systemd)
+if os.environ.get(TELEMETRY_ENV):
+    enable(os.environ[TELEMETRY_ENV])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
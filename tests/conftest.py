@@ -0,0 +1,14 @@
+"""
+Configuración común de las pruebas
+
+Los módulos del proyecto están en la raíz del repositorio (sin paquete),
+así que se agrega al path. El estado (historial, perfiles, spool) va a un
+directorio temporal para no tocar el de la máquina.
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ["NRF24_STATE_DIR"] = tempfile.mkdtemp(prefix="nrf24_test_state_")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,81 @@
+"""Anuncio de la transferencia: total conocido, tamaño abierto y archivo vacío"""
+
+import random
+
+import pytest
+
+from constants import COMPRESS_ZLIB, NAME_CHUNK_BYTES
+from frame_handler import build_announce_payload, parse_announce_payload
+from finalizer import FinalizePool
+from receiver import finalize_reception, safe_filename
+from sim_radio import Ether, run_transfer
+
+
+@pytest.mark.parametrize("total, open_length", [(0, False), (0, True), (1, False), (70000, False)])
+def test_announce_roundtrip(total, open_length):
+    payload = build_announce_payload(total, 22, COMPRESS_ZLIB, total * 22, total * 40, 12,
+                                     id_hash=b"\x01\x02\x03\x04", open_length=open_length)
+    announce = parse_announce_payload(payload)
+    assert announce['total_packets'] == total
+    assert announce['open_length'] is open_length
+    assert announce['replace'] is False
+    assert (announce['stream_size'], announce['original_size']) == (total * 22, total * 40)
+
+
+def test_short_announce_zero_means_open():
+    # Un transmisor sin el byte de flags anunciaba el flujo abierto con 0
+    payload = build_announce_payload(0, 22, COMPRESS_ZLIB, 0, 5000, 3)
+    assert parse_announce_payload(payload[:14])['open_length'] is True
+    payload = build_announce_payload(9, 22, COMPRESS_ZLIB, 190, 5000, 3)
+    assert parse_announce_payload(payload[:14])['open_length'] is False
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_empty_file_transfer(tmp_path, background):
+    src = tmp_path / "vacio.txt"
+    src.write_bytes(b"")
+    rx_kwargs = {}
+    if background:
+        pool = FinalizePool(finalize_reception)
+        rx_kwargs['finalizer'] = pool
+    result = run_transfer(Ether(), src, rx_kwargs=rx_kwargs)
+    assert result['ok']
+    if background:
+        pool.close()
+        assert pool.stats['ok'] == 1
+
+
+def test_streamed_transfer_still_ends_on_last_frame(tmp_path):
+    # Compresión en paralelo: el anuncio sale con tamaño abierto
+    rng = random.Random(31)
+    words = [b"vampiro", b"cripta", b"noche", b"luna", b"sombra"]
+    src = tmp_path / "flujo.txt"
+    src.write_bytes(b" ".join(rng.choice(words) for _ in range(100000)))
+    result = run_transfer(Ether(), src, {'stream_mode': True})
+    assert result['ok']
+
+
+def test_malformed_announce_is_ignored():
+    assert parse_announce_payload(b"\x00" * 12) is None
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("informe.txt", "informe.txt"),
+    ("../../etc/passwd", "passwd"),
+    (".oculto", "oculto"),
+    ("a\x00b:c.txt", "a_b_c.txt"),
+    ("..", None),
+])
+def test_safe_filename(name, expected):
+    assert safe_filename(name) == expected
+
+
+def test_long_utf8_name_arrives_in_several_frames(tmp_path):
+    # Más de NAME_CHUNK_BYTES: el nombre viaja en varias tramas CTRL_NAME
+    name = "crónica_del_año_" + "ñ" * 20 + ".txt"
+    assert len(name.encode('utf-8')) > 2 * NAME_CHUNK_BYTES
+    src = tmp_path / name
+    src.write_bytes(b"contenido con nombre largo\n" * 50)
+    result = run_transfer(Ether(loss=0.1), src)
+    assert result['ok']
+    assert (result['destino'] / name).read_bytes() == src.read_bytes()
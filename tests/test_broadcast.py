@@ -0,0 +1,80 @@
+"""Difusión a varios nodos: reparación de pérdidas y nodos ausentes"""
+
+import random
+import re
+import threading
+import time
+
+import pytest
+
+import broadcast
+from broadcast import broadcast_file, parse_nodes
+from hardware import LEDController
+from receiver import receive_file
+from sim_radio import Ether, SimRadio
+
+WORDS = [b"vampiro", b"noche", b"castillo", b"sangre", b"luna", b"ataud", b"niebla"]
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = random.Random(47)
+    path = tmp_path / "difusion.txt"
+    path.write_bytes(b" ".join(rng.choice(WORDS) + b"%d" % rng.randint(0, 9999)
+                               for _ in range(3000)))
+    return path
+
+
+def run_broadcast(tmp_path, source, nodes, present, loss):
+    """Difunde `source` a `nodes`; solo los de `present` tienen un receptor"""
+    ether = Ether(loss=loss, airtime=0.00005, seed=7)
+    tx = SimRadio(ether, "tx")
+    results, threads, dests = {}, [], {}
+    for node in present:
+        radio = SimRadio(ether, f"rx{node}")
+        dests[node] = tmp_path / f"nodo{node}"
+        dests[node].mkdir()
+        thread = threading.Thread(target=lambda r=radio, n=node: results.__setitem__(
+            n, receive_file(r, dests[n], LEDController(), node_id=n)))
+        thread.start()
+        threads.append(thread)
+    # Los receptores tienen que estar escuchando antes de la difusión
+    for _ in range(200):
+        if all(radio.listening for radio in ether.nodes[1:]):
+            break
+        time.sleep(0.01)
+    out = broadcast_file(tx, source, nodes, LEDController())
+    for thread in threads:
+        thread.join(60)
+    return out, results, dests
+
+
+def test_lossy_broadcast_is_repaired(tmp_path, source, capsys):
+    out, results, dests = run_broadcast(tmp_path, source, [3, 5, 7], [3, 5, 7], loss=0.2)
+    assert out['nodos'] == {3: True, 5: True, 7: True}
+    assert results == {3: True, 5: True, 7: True}
+    for dest in dests.values():
+        assert (dest / source.name).read_bytes() == source.read_bytes()
+
+    printed = capsys.readouterr().out
+    repair = int(re.search(r"\+ (\d+) reparadas", printed).group(1))
+    assert repair > 0
+    # La unión de faltantes cuesta mucho menos que tres envíos unicast
+    assert int(re.search(r"Aire: (\d+)%", printed).group(1)) < 75
+
+
+def test_absent_node_does_not_block_the_others(tmp_path, source, monkeypatch):
+    monkeypatch.setattr(broadcast, "POLL_ATTEMPTS", 20)
+    out, results, _ = run_broadcast(tmp_path, source, [3, 5, 7], [3, 5], loss=0.1)
+    assert out == {'exitosos': 2, 'fallidos': 1, 'total': 3,
+                   'nodos': {3: True, 5: True, 7: False}}
+    assert results == {3: True, 5: True}
+
+
+def test_parse_nodes():
+    assert parse_nodes("3,5-7, 9") == [3, 5, 6, 7, 9]
+    assert parse_nodes("4,4,2") == [2, 4]
+    with pytest.raises(ValueError):
+        parse_nodes(" , ")
+    with pytest.raises(ValueError):
+        parse_nodes("x")
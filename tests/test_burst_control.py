@@ -0,0 +1,52 @@
+"""Control AIMD del tamaño de ráfaga y la pausa entre tramas"""
+
+from constants import (
+    BURST_MIN, BURST_MAX, AIMD_INCREASE, PACING_STEP, PACING_MAX, ACK_FIFO_DEPTH
+)
+from burst_control import AIMDController
+
+
+def test_clean_burst_increases_additively():
+    controller = AIMDController(burst_size=10, gap=2 * PACING_STEP)
+    controller.update(sent=10, failed=0, acks=5)
+    assert controller.burst_size == 10 + AIMD_INCREASE
+    assert controller.gap == PACING_STEP
+    assert controller.stats['increases'] == 1
+
+
+def test_failure_halves_burst_and_backs_off():
+    controller = AIMDController(burst_size=20, gap=0.0)
+    controller.update(sent=18, failed=2, acks=5)
+    assert controller.burst_size == 10
+    assert controller.gap == PACING_STEP
+    controller.update(sent=8, failed=2, acks=3)
+    assert controller.gap == 2 * PACING_STEP
+    assert controller.stats['decreases'] == 2
+
+
+def test_limits_are_respected():
+    controller = AIMDController(burst_size=BURST_MAX, gap=0.0)
+    controller.update(sent=BURST_MAX, failed=0, acks=1)
+    assert controller.burst_size == BURST_MAX
+    assert controller.gap == 0.0
+
+    controller = AIMDController(burst_size=BURST_MIN, gap=PACING_MAX)
+    controller.update(sent=1, failed=3, acks=0)
+    assert controller.burst_size == BURST_MIN
+    assert controller.gap == PACING_MAX
+
+
+def test_no_acks_holds():
+    # Sin payloads de ACK el receptor va atrasado: no acelerar
+    controller = AIMDController(burst_size=12, gap=PACING_STEP)
+    controller.update(sent=2 * ACK_FIFO_DEPTH, failed=0, acks=0)
+    assert (controller.burst_size, controller.gap) == (12, PACING_STEP)
+    assert controller.stats['holds'] == 1
+
+
+def test_static_mode_only_counts():
+    controller = AIMDController(adaptive=False, burst_size=15, gap=0.0)
+    controller.update(sent=15, failed=5, acks=0)
+    assert (controller.burst_size, controller.gap) == (15, 0.0)
+    assert controller.stats['bursts'] == 1
+    assert controller.stats['decreases'] == 0
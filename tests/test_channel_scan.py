@@ -0,0 +1,60 @@
+"""Selección automática de canal por ruido"""
+
+from channel_scan import (
+    survey_channels, rank_channels, encode_candidates, decode_candidates, choose_channel,
+    RetransmitMonitor
+)
+from constants import RF_CHANNEL
+from sim_radio import Ether, NoiseModel, SimRadio, run_transfer
+
+
+def test_neighbours_penalise_a_channel():
+    busy = {10: 0.0, 11: 0.0, 12: 0.8, 40: 0.1, 41: 0.0, 42: 0.0}
+    ranked = [channel for channel, _ in rank_channels(busy)]
+    assert ranked[:2] == [10, 42]
+    assert ranked[-1] == 12
+    assert ranked.index(11) > ranked.index(41)   # 11 tiene al lado el canal 12
+
+
+def test_candidates_roundtrip_and_exclude():
+    ranked = [(5, 0.0), (70, 0.25), (90, 3.0)]
+    payload = encode_candidates(ranked, exclude=5, count=2)
+    assert decode_candidates(payload) == [(70, 0.25), (90, 2.55)]   # Puntaje saturado
+
+
+def test_choice_combines_both_ends():
+    candidates = [(20, 0.0), (60, 0.1)]
+    assert choose_channel(candidates, {}) == 20
+    assert choose_channel(candidates, {19: 0.0, 20: 0.9, 21: 0.0, 60: 0.0}) == 60
+    assert choose_channel([], {20: 0.0}) is None
+
+
+def test_survey_restores_the_radio():
+    noise = NoiseModel({30: 1.0})
+    radio = SimRadio(Ether(noise=noise), "rx")
+    radio.channel = 76
+    radio.start_listening()
+    busy = survey_channels(radio, channels=(29, 30, 31), samples=5, dwell=0)
+    assert busy == {29: 0.0, 30: 1.0, 31: 0.0}
+    assert radio.channel == 76
+    assert radio.listen
+
+
+def test_monitor_flags_a_noisy_window():
+    monitor = RetransmitMonitor(window=10, threshold=2.0)
+    monitor.record(5, frames=5)
+    assert not monitor.should_rescan()           # Ventana incompleta
+    monitor.record(30, frames=5)
+    assert monitor.should_rescan()
+    assert monitor.average() == 3.5
+
+
+def test_auto_channel_moves_off_a_jammed_channel(tmp_path):
+    noise = NoiseModel()
+    noise.add_band(RF_CHANNEL, 3, 0.6)
+    src = tmp_path / "ruido.txt"
+    src.write_bytes(b"interferencia en el canal por defecto\n" * 300)
+    result = run_transfer(Ether(noise=noise), src, {'auto_channel': True},
+                          {'auto_channel': True})
+    assert result['ok']
+    assert abs(result['canal'] - RF_CHANNEL) > 3
@@ -0,0 +1,128 @@
+"""API de control: pedidos por el socket Unix contra un Dispatcher real"""
+
+import threading
+import time
+
+import pytest
+
+from control import ControlClient, ControlServer
+from dispatcher import Dispatcher, PRIORITY_HIGH
+from progress import ACTIVE
+
+
+@pytest.fixture
+def api(tmp_path):
+    """Servidor + cliente; los envíos bloquean hasta liberar 'release' o cancelar"""
+    release = threading.Event()
+    sent = []
+
+    def send(job):
+        ACTIVE.begin("tx", job.params['path'].name, total=10)
+        while not release.wait(0.02):
+            if ACTIVE.cancelled:
+                ACTIVE.end(False)
+                return False
+        sent.append(job.params['path'].name)
+        ACTIVE.end(True)
+        return True
+
+    def rx(job):
+        return True
+
+    dispatcher = Dispatcher({'send': send, 'rx': rx}, log=lambda *_: None)
+    dispatcher.start()
+    server = ControlServer(tmp_path / "c.sock", dispatcher, log=lambda *_: None)
+    server.start()
+    client = ControlClient(tmp_path / "c.sock")
+    yield client, dispatcher, release, sent
+    release.set()
+    client.close()
+    server.stop()
+    dispatcher.stop(wait=True)
+    ACTIVE.clear_cancel()
+
+
+def wait_current(client, job_id):
+    for _ in range(500):
+        current = client.request('status')['current']
+        if current and current['id'] == job_id:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"el trabajo #{job_id} no empezó")
+
+
+def test_send_directory_queues_one_job_per_file(api, tmp_path):
+    client, _, release, sent = api
+    lote = tmp_path / "lote"
+    lote.mkdir()
+    for name in ("b.txt", "a.txt", ".oculto"):
+        (lote / name).write_text(name)
+    response = client.request('send', path=str(lote), priority="alta")
+    assert response['ok']
+    assert [job['params']['path'] for job in response['jobs']] == [
+        str(lote / "a.txt"), str(lote / "b.txt")]
+    release.set()
+    for job in response['jobs']:
+        done = client.request('wait', id=job['id'], timeout=5)['job']
+        assert done['state'] == "done" and done['result'] == "True"
+    assert sent == ["a.txt", "b.txt"]
+
+
+def test_status_reports_current_queue_and_progress(api, tmp_path):
+    client, _, _, _ = api
+    first, second = tmp_path / "uno.bin", tmp_path / "dos.bin"
+    first.write_bytes(b"1")
+    second.write_bytes(b"2")
+    running = client.request('send', path=str(first))['jobs'][0]
+    wait_current(client, running['id'])
+    queued = client.request('send', path=str(second))['jobs'][0]
+    status = client.request('status')
+    assert status['ok']
+    assert status['current']['id'] == running['id']
+    assert status['progress']['name'] == "uno.bin"
+    assert [job['id'] for job in status['queue']] == [queued['id']]
+
+
+def test_cancel_running_and_queued(api, tmp_path):
+    client, _, _, sent = api
+    first, second = tmp_path / "uno.bin", tmp_path / "dos.bin"
+    first.write_bytes(b"1")
+    second.write_bytes(b"2")
+    running = client.request('send', path=str(first))['jobs'][0]
+    wait_current(client, running['id'])
+    queued = client.request('send', path=str(second))['jobs'][0]
+
+    assert client.request('cancel', id=queued['id']) == {'ok': True, 'cancelled': queued['id']}
+    assert not client.request('cancel', id=queued['id'])['ok']
+    assert client.request('cancel') == {'ok': True, 'cancelled': running['id']}
+    done = client.request('wait', id=running['id'], timeout=5)['job']
+    assert done['result'] == "False"
+    assert sent == []
+
+
+def test_rx_priority(api):
+    client, dispatcher, _, _ = api
+    job = client.request('rx', priority=PRIORITY_HIGH)['jobs'][0]
+    assert job['kind'] == "rx"
+    assert dispatcher.get(job['id']).priority == PRIORITY_HIGH
+
+
+@pytest.mark.parametrize("request_fields, error", [
+    ({'cmd': 'send', 'path': "relativo.txt"}, "la ruta debe ser absoluta"),
+    ({'cmd': 'send', 'path': "/no/existe"}, "no existe: /no/existe"),
+    ({'cmd': 'send'}, "falta el campo 'path'"),
+    ({'cmd': 'borrar'}, "comando desconocido: borrar"),
+    ({'cmd': 'wait', 'id': 999}, "trabajo desconocido: #999"),
+    ({'cmd': 'cancel'}, "no hay ningún trabajo en curso"),
+])
+def test_bad_requests(api, request_fields, error):
+    client, _, _, _ = api
+    assert client.request(**request_fields) == {'ok': False, 'error': error}
+
+
+def test_invalid_json_keeps_connection_open(api):
+    client, _, _, _ = api
+    client.file.write(b"{no es json\n")
+    client.file.flush()
+    assert client.file.readline().startswith(b'{"ok": false')
+    assert client.request('status')['ok']
@@ -0,0 +1,92 @@
+"""Modelo de costo: elección de códec según CPU y enlace"""
+
+import json
+
+import pytest
+
+from constants import COMPRESS_NONE, COMPRESS_ZLIB, COMPRESS_LZMA, COST_MIN_RECORD_SIZE
+from cost_model import CostModel, candidate_key
+
+SIZE = 1_200_000
+CHUNK = 30
+RATIOS = {(COMPRESS_ZLIB, 1): 0.5, (COMPRESS_LZMA, 3): 0.3}
+
+
+@pytest.fixture
+def model(tmp_path):
+    """Modelo con velocidades fijas: zlib:1 rápido (60 MB/s), lzma:3 lento (1.2 MB/s)"""
+    model = CostModel(tmp_path / "perfil.json")
+    model.speeds = {candidate_key(COMPRESS_ZLIB, 1): 60e6, candidate_key(COMPRESS_LZMA, 3): 1.2e6}
+    return model
+
+
+def test_slow_link_prefers_best_ratio(model):
+    model.packet_seconds = 1e-3
+    choice, estimates = model.choose(RATIOS, SIZE, CHUNK)
+    assert choice == (COMPRESS_LZMA, 3)
+    assert estimates[(COMPRESS_NONE, 0)] == (0.0, pytest.approx(40.0))
+    cpu, air = estimates[(COMPRESS_LZMA, 3)]
+    assert cpu == pytest.approx(1.0)
+    assert air == pytest.approx(12.0)
+
+
+def test_fast_link_prefers_fast_codec(model):
+    model.packet_seconds = 1e-5
+    choice, _ = model.choose(RATIOS, SIZE, CHUNK)
+    assert choice == (COMPRESS_ZLIB, 1)
+
+
+def test_slow_cpu_sends_uncompressed(model):
+    model.packet_seconds = 1e-5
+    model.speeds = {key: 1e5 for key in model.speeds}
+    choice, _ = model.choose(RATIOS, SIZE, CHUNK)
+    assert choice == (COMPRESS_NONE, 0)
+
+
+def test_overlap_counts_the_slower_of_cpu_and_air(model):
+    model.packet_seconds = 1e-4
+    # En serie: zlib 0.02 + 2.0 s frente a lzma 1.0 + 1.2 s
+    assert model.choose(RATIOS, SIZE, CHUNK)[0] == (COMPRESS_ZLIB, 1)
+    # Superpuestos: zlib max(0.02, 2.0) frente a lzma max(1.0, 1.2)
+    assert model.choose(RATIOS, SIZE, CHUNK, overlap=True)[0] == (COMPRESS_LZMA, 3)
+
+
+def test_uncalibrated_candidates_are_skipped(model):
+    model.packet_seconds = 1e-3
+    del model.speeds[candidate_key(COMPRESS_LZMA, 3)]
+    choice, estimates = model.choose(RATIOS, SIZE, CHUNK)
+    assert choice == (COMPRESS_ZLIB, 1)
+    assert (COMPRESS_LZMA, 3) not in estimates
+
+
+def test_default_packet_seconds_until_measured(model):
+    assert model.packet_seconds is None
+    assert model.airtime(SIZE, CHUNK) > 0
+    model.record_transfer(1000, 2.0)
+    assert model.packet_seconds == pytest.approx(2e-3)
+    model.record_transfer(1000, 1.0)
+    assert 1e-3 < model.packet_seconds < 2e-3
+
+
+def test_record_compression_ignores_small_samples(model):
+    key = candidate_key(COMPRESS_LZMA, 3)
+    model.record_compression(COMPRESS_LZMA, 3, COST_MIN_RECORD_SIZE - 1, 1e-6)
+    assert model.speeds[key] == 1.2e6
+    model.record_compression(COMPRESS_LZMA, 3, 2_400_000, 1.0)
+    assert 1.2e6 < model.speeds[key] < 2.4e6
+
+
+def test_profile_survives_reload_but_not_a_machine_change(model, tmp_path):
+    model.record_transfer(500, 1.0)
+    reloaded = CostModel(tmp_path / "perfil.json")
+    assert reloaded.speeds == model.speeds
+    assert reloaded.packet_seconds == pytest.approx(2e-3)
+    assert reloaded.transfers == 1
+
+    profile = json.loads((tmp_path / "perfil.json").read_text())
+    profile['machine'] = "otra-cpu"
+    (tmp_path / "perfil.json").write_text(json.dumps(profile))
+    moved = CostModel(tmp_path / "perfil.json")
+    assert moved.speeds == {}
+    assert moved.packet_seconds == pytest.approx(2e-3)
+    assert not moved.calibrated
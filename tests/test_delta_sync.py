@@ -0,0 +1,83 @@
+"""Sincronización delta: checksum rodante, codificación y reconstrucción"""
+
+import random
+
+import pytest
+
+from delta_sync import (
+    weak_checksum, compute_signatures, compute_delta, apply_delta, parse_delta_header,
+    store_base, load_base, DELTA_HEADER_SIZE, OP_COPY, _MOD
+)
+from sim_radio import Ether, run_transfer
+
+rng = random.Random(29)
+BASE = bytes(rng.getrandbits(8) for _ in range(8192))
+BLOCK = 64
+KEY = b"\x0a\x0b\x0c\x0d"
+
+
+def test_rolling_update_matches_full_checksum():
+    # La misma actualización que compute_delta al avanzar un byte
+    a, b = weak_checksum(BASE[0:BLOCK])
+    for i in range(len(BASE) - BLOCK):
+        out_byte, in_byte = BASE[i], BASE[i + BLOCK]
+        a = (a - out_byte + in_byte) % _MOD
+        b = (b - BLOCK * out_byte + a) % _MOD
+        assert (a, b) == weak_checksum(BASE[i + 1:i + 1 + BLOCK])
+
+
+@pytest.mark.parametrize("offset", [1, 7, BLOCK - 1])
+def test_shifted_blocks_are_found(offset):
+    # Insertar bytes al inicio corre todos los bloques: solo el rodante los encuentra
+    new = bytes(offset) + BASE
+    delta = compute_delta(new, compute_signatures(BASE, BLOCK), BLOCK, KEY)
+    assert apply_delta(BASE, delta) == new
+    assert len(delta) < DELTA_HEADER_SIZE + offset + 16
+    assert OP_COPY in delta[DELTA_HEADER_SIZE:]
+
+
+def test_edit_in_the_middle():
+    new = BASE[:3000] + b"cambio" + BASE[3100:] + b"cola"
+    delta = compute_delta(new, compute_signatures(BASE, BLOCK), BLOCK, KEY)
+    assert parse_delta_header(delta) == (KEY, BLOCK)
+    assert apply_delta(BASE, delta) == new
+    assert len(delta) < 400
+
+
+def test_no_base_sends_one_literal():
+    delta = compute_delta(BASE, b"", BLOCK, KEY)
+    assert apply_delta(b"", delta) == BASE
+
+
+def test_corrupt_deltas_raise():
+    delta = compute_delta(BASE, compute_signatures(BASE, BLOCK), BLOCK, KEY)
+    with pytest.raises(ValueError):
+        apply_delta(BASE[:BLOCK], delta)          # Bloques que la base no tiene
+    with pytest.raises(ValueError):
+        apply_delta(BASE, delta[:-1])             # Truncado
+    with pytest.raises(ValueError):
+        apply_delta(BASE, b"XXXX" + delta[4:])    # Sin encabezado
+
+
+def test_delta_transfer_sends_only_the_changes(tmp_path):
+    src = tmp_path / "notas.txt"
+    text = b"".join(b"linea %05d: %s\n" % (i, bytes(rng.choice(b"abcdefgh") for _ in range(30)))
+                    for i in range(1500))
+    src.write_bytes(text)
+    first = run_transfer(Ether(), src, {'delta_mode': True})
+    assert first['ok']
+
+    # La segunda vez el receptor tiene la base: store_base la dejó en su directorio
+    dest = first['destino']
+    (dest / src.name).unlink()
+    edited = text.replace(b"linea 00700", b"LINEA 00700")
+    src.write_bytes(edited)
+    second = run_transfer(Ether(), src, {'delta_mode': True}, dest_dir=dest)
+    assert second['ok']
+    assert (dest / src.name).read_bytes() == edited
+
+
+def test_base_store_roundtrip(tmp_path):
+    assert load_base(tmp_path, KEY) == b""
+    store_base(tmp_path, KEY, BASE)
+    assert load_base(tmp_path, KEY) == BASE
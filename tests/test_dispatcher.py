@@ -0,0 +1,92 @@
+"""Cola de trabajos del daemon: prioridad, cancelación y errores"""
+
+import threading
+import time
+
+import pytest
+
+from dispatcher import Dispatcher, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+
+def wait_running(dispatcher, job):
+    """Espera a que el worker tome el trabajo"""
+    for _ in range(500):
+        if dispatcher.current is job:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"el trabajo #{job.id} no empezó")
+
+
+@pytest.fixture
+def gated():
+    """Dispatcher cuyo primer trabajo ('gate') bloquea hasta liberar el evento"""
+    release = threading.Event()
+    order = []
+    idle = threading.Event()
+
+    def gate(job):
+        release.wait(5)
+        return "abierto"
+
+    def work(job):
+        order.append(job.params['name'])
+        return job.params['name']
+
+    def fail(job):
+        raise RuntimeError("radio ocupada")
+
+    dispatcher = Dispatcher({'gate': gate, 'work': work, 'fail': fail},
+                            on_idle=idle.set, log=lambda *_: None)
+    dispatcher.start()
+    yield dispatcher, release, order, idle
+    release.set()
+    dispatcher.stop(wait=True)
+
+
+def test_priority_then_arrival_order(gated):
+    dispatcher, release, order, idle = gated
+    gate = dispatcher.submit('gate')
+    wait_running(dispatcher, gate)
+    jobs = [dispatcher.submit('work', priority, name=name) for priority, name in [
+        (PRIORITY_LOW, "spool"), (PRIORITY_NORMAL, "tx1"), (PRIORITY_HIGH, "boton"),
+        (PRIORITY_NORMAL, "tx2"),
+    ]]
+    assert [job.params['name'] for job in dispatcher.pending()] == ["boton", "tx1", "tx2", "spool"]
+    release.set()
+    assert all(job.wait(5) for job in jobs)
+    assert gate.result == "abierto"
+    assert order == ["boton", "tx1", "tx2", "spool"]
+    assert idle.wait(5)
+
+
+def test_cancel_only_queued_jobs(gated):
+    dispatcher, release, order, _ = gated
+    gate = dispatcher.submit('gate')
+    wait_running(dispatcher, gate)
+    assert not dispatcher.cancel(gate.id)   # En curso
+    queued = dispatcher.submit('work', name="cancelado")
+    kept = dispatcher.submit('work', name="sigue")
+    assert dispatcher.cancel(queued.id)
+    assert queued.done.is_set() and queued.error == "cancelado"
+    assert not dispatcher.cancel(queued.id)
+    release.set()
+    kept.wait(5)
+    assert order == ["sigue"]
+    assert dispatcher.get(queued.id) is None
+
+
+def test_handler_errors_are_recorded(gated):
+    dispatcher, release, _, _ = gated
+    release.set()
+    job = dispatcher.submit('fail', source="api")
+    job.wait(5)
+    assert job.describe()['state'] == "error"
+    assert job.error == "radio ocupada"
+    assert dispatcher.get(job.id) is job
+    assert dispatcher.history()[-1] is job
+
+
+def test_unknown_kind_is_rejected(gated):
+    dispatcher, _, _, _ = gated
+    with pytest.raises(ValueError):
+        dispatcher.submit('nada')
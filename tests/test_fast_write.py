@@ -0,0 +1,79 @@
+"""Modo rápido: FIFO TX llena con write_fast() y tramas en vuelo"""
+
+import random
+
+import pytest
+
+from constants import TX_FIFO_DEPTH
+from sim_radio import Ether, run_transfer
+from transmitter import fast_write_burst
+
+
+class BurstRadio:
+    """FIFO TX de mentira: MAX_RT en las cargas indicadas y ACKs en cola"""
+
+    channel = 76
+
+    def __init__(self, max_rt_calls=(), standby=True, acks=()):
+        self.max_rt_calls = set(max_rt_calls)
+        self.standby = standby
+        self.acks = list(acks)
+        self.calls = 0
+
+    def write_fast(self, frame):
+        self.calls += 1
+        return self.calls not in self.max_rt_calls
+
+    def tx_standby(self):
+        return self.standby
+
+    def get_arc(self):
+        return 0
+
+    def available(self):
+        return bool(self.acks)
+
+    def get_dynamic_payload_size(self):
+        return len(self.acks[0])
+
+    def read(self, size):
+        return self.acks.pop(0)
+
+    def flush_rx(self):
+        self.acks.clear()
+
+
+FRAMES = [(seq, bytes(32)) for seq in range(10)]
+
+
+def test_clean_burst_confirms_everything():
+    radio = BurstRadio(acks=[b"\x00\x01ack"])
+    confirmed, failed, acks = fast_write_burst(radio, FRAMES)
+    assert (confirmed, failed) == (list(range(10)), [])
+    assert acks == [b"\x00\x01ack"]
+    assert radio.calls == 10
+
+
+def test_frames_still_in_fifo_fail_with_the_burst():
+    # Solo las últimas TX_FIFO_DEPTH quedan en duda si el vaciado final falla
+    confirmed, failed, _ = fast_write_burst(BurstRadio(standby=False), FRAMES)
+    assert confirmed == list(range(10 - TX_FIFO_DEPTH))
+    assert failed == list(range(10 - TX_FIFO_DEPTH, 10))
+
+
+def test_max_rt_fails_in_flight_and_retries_the_frame():
+    confirmed, failed, _ = fast_write_burst(BurstRadio(max_rt_calls={6}), FRAMES)
+    # La 6ª carga encontró MAX_RT: lo que estaba en la FIFO se reporta fallido
+    assert failed == list(range(5 - TX_FIFO_DEPTH, 5))
+    assert sorted(confirmed + failed) == list(range(10))
+
+
+@pytest.mark.parametrize("loss", [0.0, 0.2])
+def test_fast_mode_transfer(tmp_path, loss):
+    rng = random.Random(27)
+    src = tmp_path / "rapido.txt"
+    src.write_bytes(" ".join(rng.choice(["ala", "bosque", "rio", "piedra"])
+                             for _ in range(6000)).encode())
+    result = run_transfer(Ether(loss=loss), src, {'fast_mode': True})
+    assert result['ok']
+    assert (result['destino'] / src.name).read_bytes() == src.read_bytes()
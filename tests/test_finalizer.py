@@ -0,0 +1,66 @@
+"""FinalizePool: cola acotada, resultados y cierre"""
+
+import threading
+
+from finalizer import FinalizePool
+
+
+def test_full_queue_blocks_submit():
+    release = threading.Event()
+    started = threading.Event()
+    done = []
+
+    def finalize(name):
+        started.set()
+        release.wait(5)
+        done.append(name)
+        return True
+
+    pool = FinalizePool(finalize, workers=1, maxsize=2, log=lambda *_: None)
+    pool.submit("a")
+    assert started.wait(5)            # "a" en ejecución, la cola vacía
+    pool.submit("b")
+    pool.submit("c")
+    assert pool.pending() == 2
+
+    blocked = threading.Thread(target=pool.submit, args=("d",))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()         # Esperando lugar en la cola
+    assert pool.stats['waited_full'] == 1
+
+    release.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    pool.close()
+    assert done == ["a", "b", "c", "d"]
+    assert pool.stats == {'submitted': 4, 'ok': 4, 'failed': 0, 'waited_full': 1}
+
+
+def test_results_and_errors_are_counted():
+    logs = []
+
+    def finalize(value):
+        if value < 0:
+            raise ValueError("CRC inválido")
+        return value > 0
+
+    pool = FinalizePool(finalize, workers=2, maxsize=8, log=logs.append)
+    for value in (1, 0, -1, 2):
+        pool.submit(value)
+    pool.join()
+    assert pool.pending() == 0
+    assert pool.stats['ok'] == 2
+    assert pool.stats['failed'] == 2
+    assert logs == ["✗ Error en la finalización: CRC inválido"]
+    pool.close()
+
+
+def test_close_finishes_pending_tasks():
+    done = []
+    pool = FinalizePool(lambda n: done.append(n) or True, workers=3, log=lambda *_: None)
+    for n in range(20):
+        pool.submit(n)
+    pool.close()
+    assert sorted(done) == list(range(20))
+    assert not any(thread.is_alive() for thread in pool._threads)
@@ -0,0 +1,94 @@
+"""Historial de transferencias: escritura, consultas y agregados"""
+
+import sqlite3
+
+import pytest
+
+from history import (
+    HistoryStore, query, aggregate, percentile, parse_window, size_class,
+    peer_name, decode_station
+)
+
+
+def test_percentile_interpolates():
+    values = [10.0, 20.0, 30.0, 40.0]
+    assert percentile(values, 0.0) == 10.0
+    assert percentile(values, 1.0) == 40.0
+    assert percentile(values, 0.5) == pytest.approx(25.0)
+    assert percentile(values, 0.9) == pytest.approx(37.0)
+    assert percentile([7.0], 0.9) == 7.0
+    assert percentile([], 0.5) is None
+
+
+def test_parse_window_and_size_class():
+    assert parse_window("90s") == 90
+    assert parse_window("15m") == 900
+    assert parse_window(" 2W ") == 2 * 604800
+    assert parse_window("3600") == 3600
+    with pytest.raises(ValueError):
+        parse_window("ayer")
+    assert size_class(None) == "?"
+    assert size_class(1000) == "<16K"
+    assert size_class(16 * 1024) == "16K-256K"
+    assert size_class(64 * 1024 * 1024) == ">4M"
+
+
+def test_peer_identity():
+    assert peer_name(b"\xe7\xe7\xe7\xe7\xe7", "estacion-b") == "estacion-b"
+    assert peer_name(b"\xe7\xe7\xe7\xe7\xe7") == "e7e7e7e7e7"
+    assert decode_station(b"nodo\x00\x07 3 ") == "nodo 3"
+    assert decode_station(b"\x00\x01") is None
+
+
+@pytest.fixture
+def db(tmp_path):
+    store = HistoryStore(tmp_path / "historial.db", log=lambda message: None)
+    rows = [
+        ('tx', 'ok', 'pi-a', 'bz2', 10.0, 1000, 400),
+        ('tx', 'ok', 'pi-a', 'bz2', 30.0, 1000, 600),
+        ('tx', 'incomplete', 'pi-a', 'bz2', None, 1000, 1000),
+        ('tx', 'ok', 'pi-b', 'zlib', 20.0, 2000, 1000),
+        ('rx', 'ok', 'pi-c', 'bz2', 50.0, 1000, 500),
+    ]
+    for direction, result, peer, codec, goodput, size, stream_size in rows:
+        store.record(direction, result, peer=peer, codec=codec, goodput_kibps=goodput,
+                     seconds=1.0, size=size, stream_size=stream_size, rounds=2,
+                     retries_per_frame=0.5, fec_corrected=1, missing=0 if goodput else 3,
+                     params={'fast': False})
+    store.close()
+    assert store.stats == {'recorded': 5, 'dropped': 0, 'failed': 0}
+    connection = sqlite3.connect(str(store.path))
+    connection.row_factory = sqlite3.Row
+    yield connection
+    connection.close()
+
+
+def test_query_filters(db):
+    assert len(query(db)) == 5
+    assert len(query(db, direction='tx')) == 4
+    assert [row['codec'] for row in query(db, peer='pi-a')] == ['bz2'] * 3
+    assert len(query(db, since=3600, codec='zlib')) == 1
+
+
+def test_aggregate_by_peer(db):
+    groups = aggregate(query(db, direction='tx'), ['peer'])
+    assert [g['grupo'] for g in groups] == [{'peer': 'pi-a'}, {'peer': 'pi-b'}]
+    first = groups[0]
+    assert first['n'] == 3
+    assert first['ok'] == pytest.approx(2 / 3)
+    # Los agregados de goodput solo usan las transferencias exitosas
+    assert first['goodput_mean'] == pytest.approx(20.0)
+    assert first['goodput_p50'] == pytest.approx(20.0)
+    assert first['goodput_p90'] == pytest.approx(28.0)
+    assert first['goodput_min'] == 10.0
+    assert first['ratio'] == pytest.approx((0.4 + 0.6 + 1.0) / 3)
+    assert first['fec'] == 3
+    assert first['missing'] == 3
+
+
+def test_aggregate_by_two_keys(db):
+    groups = aggregate(query(db), ['direction', 'codec'])
+    assert [tuple(g['grupo'].values()) for g in groups] == [
+        ('rx', 'bz2'), ('tx', 'bz2'), ('tx', 'zlib')
+    ]
+    assert [g['n'] for g in groups] == [1, 3, 1]
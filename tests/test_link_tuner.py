@@ -0,0 +1,49 @@
+"""Auto-ajuste del enlace: perfiles, elección del mejor y sesión simulada"""
+
+from constants import ADDR_A, ADDR_B
+from link_tuner import (
+    DEFAULT_PROFILE, load_profile, load_profiles, save_profile, select_best, run_simulated
+)
+
+
+def stats(goodput, arc=0.0):
+    return {'goodput_kibps': goodput, 'arc_mean': arc}
+
+
+def profile(pa, delay=1, rate="2M"):
+    return {'data_rate': rate, 'pa_level': pa, 'retry_delay': delay, 'retry_count': 15}
+
+
+def test_profiles_are_per_address_and_merged(tmp_path):
+    path = tmp_path / "perfiles.json"
+    assert load_profile(ADDR_A, path) == DEFAULT_PROFILE
+    save_profile(ADDR_A, profile("LOW"), path)
+    save_profile(ADDR_B, profile("MAX"), path)
+    save_profile(ADDR_A, {'retry_delay': 5}, path)
+    assert load_profile(ADDR_A, path) == dict(profile("LOW"), retry_delay=5)
+    assert load_profile(ADDR_B, path)['pa_level'] == "MAX"
+    assert len(load_profiles(path)) == 2
+
+
+def test_corrupt_profiles_fall_back_to_defaults(tmp_path):
+    path = tmp_path / "perfiles.json"
+    path.write_text("{no es json")
+    assert load_profile(ADDR_A, path) == DEFAULT_PROFILE
+
+
+def test_lower_power_wins_within_tolerance():
+    results = [(profile("MAX"), stats(100.0)), (profile("LOW"), stats(97.0, arc=1.0)),
+               (profile("MIN"), stats(60.0))]
+    assert select_best(results)['pa_level'] == "LOW"
+
+
+def test_fewer_retries_break_ties():
+    results = [(profile("HIGH", 1), stats(50.0, arc=2.0)), (profile("HIGH", 3), stats(49.0))]
+    assert select_best(results)['retry_delay'] == 3
+
+
+def test_simulated_session_agrees_on_both_ends(tmp_path):
+    path = tmp_path / "perfiles.json"
+    best = run_simulated(range_loss=0.3, frames=30, path=path)
+    assert load_profile(ADDR_A, path) == best
+    assert load_profile(ADDR_A, path.with_suffix(".rx.json"))['data_rate'] == best['data_rate']
@@ -0,0 +1,58 @@
+"""Pre-chequeo de entropía antes de comprimir"""
+
+import random
+
+import pytest
+
+import compression
+import cost_model
+from constants import ENTROPY_MIN_SIZE, ENTROPY_SKIP_BITS, ENTROPY_TRIAL_RATIO
+from compression import precheck_entropy, precheck_summary, byte_entropy, PRECHECK_STATS
+
+rng = random.Random(44)
+RANDOM = bytes(rng.getrandbits(8) for _ in range(256 * 1024))
+
+
+def test_random_data_is_skipped():
+    assert precheck_entropy(RANDOM) is False
+    last = PRECHECK_STATS['last']
+    assert last['skipped']
+    assert last['entropy'] >= ENTROPY_SKIP_BITS
+    assert last['trial_ratio'] >= ENTROPY_TRIAL_RATIO
+
+
+def test_repeated_random_blocks_are_compressed():
+    # ~8 bits/byte, pero zlib encuentra la repetición entre bloques
+    data = RANDOM[:4096] * 64
+    assert byte_entropy(data) >= ENTROPY_SKIP_BITS
+    assert precheck_entropy(data) is True
+    last = PRECHECK_STATS['last']
+    assert not last['skipped']
+    assert last['trial_ratio'] < 0.5
+
+
+def test_text_skips_the_trial():
+    data = b"el vampiro salio de la cripta al caer la noche\n" * 2000
+    assert precheck_entropy(data) is True
+    assert PRECHECK_STATS['last']['trial_ratio'] is None
+
+
+def test_small_data_is_not_checked():
+    assert precheck_entropy(RANDOM[:ENTROPY_MIN_SIZE - 1]) is True
+    assert PRECHECK_STATS['last'] is None
+
+
+def test_skip_estimates_savings_on_a_fresh_node(tmp_path, monkeypatch):
+    # Sin perfil de códecs el ahorro se estima igual: se calibra la primera vez
+    monkeypatch.setattr(cost_model, "_model", cost_model.CostModel(tmp_path / "perfil.json"))
+    assert precheck_entropy(RANDOM) is False
+    assert PRECHECK_STATS['last']['saved_seconds'] > 0
+    assert "ahorrados" in precheck_summary()
+
+
+def test_numpy_entropy_matches_counter(monkeypatch):
+    pytest.importorskip("numpy")
+    sample = RANDOM[:8192] + b"a" * 4096
+    fast = byte_entropy(sample)
+    monkeypatch.setattr(compression, "NUMPY_AVAILABLE", False)
+    assert byte_entropy(sample) == pytest.approx(fast)
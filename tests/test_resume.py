@@ -0,0 +1,112 @@
+"""Reanudación: el transmisor no reenvía lo que el receptor guardó en su checkpoint"""
+
+import random
+import threading
+import time
+
+import receiver
+from checkpoint import (
+    CheckpointWriter, NO_IDENTITY, checkpoint_identity, checkpoint_path, load_checkpoint
+)
+from frame_handler import build_resume_bitmap, build_resume_reply, parse_resume_bitmap
+from hardware import LEDController
+from sim_radio import Ether, SimRadio
+from transmitter import transmit_file
+
+
+class CutRadio(SimRadio):
+    """Transmisor que se corta (excepción) tras `limit` escrituras"""
+
+    def __init__(self, ether, name, limit):
+        super().__init__(ether, name)
+        self.limit = limit
+
+    def write(self, buf, multicast=False):
+        if self.writes >= self.limit:
+            raise OSError("corte de energía simulado")
+        return super().write(buf, multicast)
+
+
+def transfer(src, dest, tx_radio):
+    ether = tx_radio.ether
+    rx_radio = SimRadio(ether, "rx")
+    result = {}
+    rx_thread = threading.Thread(target=lambda: result.__setitem__(
+        'rx', receiver.receive_file(rx_radio, dest, LEDController())))
+    rx_thread.start()
+    time.sleep(0.2)
+    result['tx'] = transmit_file(tx_radio, src, LEDController(), adaptive_burst=False)
+    rx_thread.join()
+    ether.nodes.clear()
+    return result
+
+
+def test_resume_bitmap_roundtrip():
+    chunks = dict.fromkeys([*range(10), 12, 13, 200, 250, 390])
+    reply = build_resume_reply(chunks, 10)
+    assert (int.from_bytes(reply[0:4], 'big'), int.from_bytes(reply[4:8], 'big'),
+            int.from_bytes(reply[8:12], 'big')) == (15, 10, 391)
+    received = set(range(10))
+    for index in range(2):
+        received |= parse_resume_bitmap(build_resume_bitmap(chunks, 10, index), 10, index)
+    assert received == set(chunks)
+
+
+def test_interrupted_transfer_resumes_without_resending(tmp_path, monkeypatch):
+    monkeypatch.setattr(receiver, "IDLE_TIMEOUT", 0.5)   # El anuncio ya fijó el total
+    rng = random.Random(28)
+    src = tmp_path / "datos.bin"
+    src.write_bytes(bytes(rng.randrange(256) for _ in range(12000)))   # Sin compresión
+    dest = tmp_path / "recibidos"
+    dest.mkdir()
+
+    first = transfer(src, dest, CutRadio(Ether(), "tx", 400))
+    assert first == {'tx': False, 'rx': False}
+    assert list((dest / receiver.CHECKPOINT_DIRNAME).glob("*.part"))
+
+    tx_radio = SimRadio(Ether(), "tx")
+    second = transfer(src, dest, tx_radio)
+    assert second == {'tx': True, 'rx': True}
+    # El primer intento dejó un archivo parcial: el completo se guarda aparte
+    assert any(path.read_bytes() == src.read_bytes() for path in dest.glob("datos*.bin"))
+    # Unas 550 tramas de datos: el segundo intento solo manda las que faltaban
+    assert tx_radio.writes < 300
+
+
+def test_checkpoint_roundtrip_and_truncated_tail(tmp_path):
+    identity = checkpoint_identity(b"\x01\x02\x03\x04", 440, 20)
+    writer = CheckpointWriter(tmp_path, 42, 1, identity)
+    for seq in (0, 1, 5):
+        writer.add_chunk(seq, bytes([seq]) * 22)
+    writer.set_last(19)
+    writer.flush()
+    writer.add_chunk(6, b"\x06" * 22)
+    writer.flush()
+
+    saved = load_checkpoint(tmp_path, 42)
+    assert set(saved['chunks']) == {0, 1, 5, 6}
+    assert (saved['last_seq'], saved['compress_mode'], saved['identity']) == (19, 1, identity)
+
+    # Un corte de energía a mitad del último registro lo descarta
+    path = checkpoint_path(tmp_path, 42)
+    path.write_bytes(path.read_bytes()[:-5])
+    assert set(load_checkpoint(tmp_path, 42)['chunks']) == {0, 1, 5}
+
+
+def test_checkpoint_identity_needs_the_announce():
+    assert checkpoint_identity(None, 440, 20) == NO_IDENTITY
+    assert checkpoint_identity(b"\x01\x02\x03\x04", 0, 20) == NO_IDENTITY
+    assert checkpoint_identity(b"\x01\x02\x03\x04", 440, 20) != checkpoint_identity(
+        b"\x01\x02\x03\x05", 440, 20)
+
+
+def test_checkpoint_of_another_file_is_discarded(tmp_path):
+    # Mismo file_id de 16 bits, otro contenido: no se mezclan los chunks
+    writer = CheckpointWriter(tmp_path, 42, 0, checkpoint_identity(b"AAAA", 440, 20))
+    writer.add_chunk(0, b"x" * 22)
+    writer.flush()
+    worker = receiver.RxWorker(None, receiver.AckMailbox(b""), tmp_path)
+    worker._start_transfer(42, 0, {'id_hash': b"BBBB", 'stream_size': 440, 'total_packets': 20})
+    worker.discard_stream()
+    assert worker.chunks == {}
+    assert load_checkpoint(tmp_path, 42) is None
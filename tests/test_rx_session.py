@@ -0,0 +1,49 @@
+"""Sesión RX: varios archivos seguidos contra un solo trabajo de recepción"""
+
+import threading
+import time
+
+from finalizer import FinalizePool
+from hardware import LEDController
+from receiver import finalize_reception, receive_file, receive_session
+from sim_radio import Ether, SimRadio
+from transmitter import transmit_multiple_files
+
+
+def test_session_receives_every_file_of_a_multi_transfer(tmp_path):
+    src = tmp_path / "textos"
+    dest = tmp_path / "recibidos"
+    src.mkdir()
+    dest.mkdir()
+    contents = {f"parte{i}.txt": f"archivo {i} ".encode() * (300 + 200 * i) for i in range(3)}
+    for name, data in contents.items():
+        (src / name).write_bytes(data)
+
+    ether = Ether()
+    tx_radio, rx_radio = SimRadio(ether, "tx"), SimRadio(ether, "rx")
+    pool = FinalizePool(finalize_reception)
+    result = {}
+    rx_thread = threading.Thread(target=lambda: result.__setitem__(
+        'rx', receive_session(rx_radio, dest, LEDController(), finalizer=pool, idle=1.5)))
+    rx_thread.start()
+    time.sleep(0.2)
+
+    stats = transmit_multiple_files(tx_radio, src, LEDController())
+    rx_thread.join(timeout=30)
+    pool.close()
+    ether.nodes.clear()
+
+    assert not rx_thread.is_alive()
+    assert stats == {'exitosos': 3, 'fallidos': 0, 'total': 3}
+    assert result['rx'] == {'exitosos': 3, 'fallidos': 0, 'total': 3}
+    for name, data in contents.items():
+        assert (dest / name).read_bytes() == data
+
+
+def test_reception_gives_up_when_nobody_transmits(tmp_path):
+    # Lo que usa la sesión para terminar tras RX_SESSION_IDLE sin tramas
+    rx_radio = SimRadio(Ether(), "rx")
+    start = time.monotonic()
+    assert receive_file(rx_radio, tmp_path, LEDController(), first_frame_timeout=0.3) is None
+    assert time.monotonic() - start < 5
+    assert not list(tmp_path.iterdir())
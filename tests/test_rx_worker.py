@@ -0,0 +1,93 @@
+"""RxWorker: decodificación fuera del hilo de radio y ACKs publicados en el buzón"""
+
+import queue
+
+import pytest
+
+from constants import ACK_VERIFIED, CTRL_ANNOUNCE, CTRL_NAME, CTRL_TRAILER, EFFECTIVE_DATA_BYTES
+from fec import is_fec_available
+from frame_handler import (
+    build_frame, build_control_frame, build_announce_payload, build_trailer_payload,
+    calculate_file_hash, parse_ack, parse_control_ack, ack_confirmed_seqs, ack_flags
+)
+from receiver import AckMailbox, RxWorker
+
+FID = 0x1234
+DATA = bytes(i % 251 for i in range(EFFECTIVE_DATA_BYTES * 10))
+CHUNKS = [DATA[i:i + EFFECTIVE_DATA_BYTES] for i in range(0, len(DATA), EFFECTIVE_DATA_BYTES)]
+
+
+@pytest.fixture
+def worker(tmp_path):
+    mailbox = AckMailbox(b"")
+    worker = RxWorker(queue.SimpleQueue(), mailbox, tmp_path)
+    worker.start()
+    yield worker
+    if worker.is_alive():
+        worker.frames.put(None)
+        worker.join()
+    worker.close_checkpoint(completed=True)
+
+
+def feed(worker, *frames):
+    """Encola tramas y espera a que el worker las procese todas"""
+    for frame in frames:
+        worker.frames.put((frame, 0.0))
+    worker.frames.put(None)
+    worker.join()
+
+
+def data_frame(seq):
+    return build_frame(FID, seq, CHUNKS[seq], seq == len(CHUNKS) - 1, 0, is_fec_available())
+
+
+def test_gap_is_reported_with_bitmap(worker):
+    feed(worker, *(data_frame(seq) for seq in (0, 1, 2, 4, 6)))
+    ack = worker.mailbox.current
+    assert parse_ack(ack)[:3] == (FID, 3, False)
+    assert ack_confirmed_seqs(ack) == (3, {4, 6})
+    assert worker.next_missing == 3
+
+
+def test_duplicates_are_not_counted_twice(worker):
+    feed(worker, data_frame(0), data_frame(0), data_frame(1))
+    assert len(worker.chunks) == 2
+    assert worker.packets_received == 3
+
+
+def test_complete_transfer_is_verified_by_trailer(worker):
+    announce = build_announce_payload(len(CHUNKS), EFFECTIVE_DATA_BYTES, 0, len(DATA),
+                                      len(DATA), 8, id_hash=b"\x00\x00\x12\x34")
+    trailer = build_trailer_payload(calculate_file_hash(DATA), calculate_file_hash(DATA),
+                                    len(DATA), len(DATA))
+    fec = is_fec_available()
+    worker.frames.put((build_control_frame(FID, CTRL_ANNOUNCE, 0, announce, fec), 0.0))
+    worker.frames.put((build_control_frame(FID, CTRL_NAME, 0, b"dato.bin", fec), 0.0))
+    for seq in reversed(range(len(CHUNKS))):
+        worker.frames.put((data_frame(seq), 0.0))
+    feed(worker, build_control_frame(FID, CTRL_TRAILER, 0, trailer, fec))
+
+    assert worker.filename == "dato.bin"
+    assert worker.verified is True
+    assert worker.complete.is_set()
+    ack = worker.mailbox.current
+    assert parse_ack(ack)[2] is True
+    assert ack_flags(ack) & ACK_VERIFIED
+
+
+def test_control_frame_answers_with_control_ack(worker):
+    announce = build_announce_payload(len(CHUNKS), EFFECTIVE_DATA_BYTES, 0, len(DATA),
+                                      len(DATA), 8, id_hash=b"\x00\x00\x12\x34")
+    feed(worker, build_control_frame(FID, CTRL_ANNOUNCE, 0, announce, is_fec_available()))
+    response = parse_control_ack(worker.mailbox.current)
+    assert response[:3] == (FID, CTRL_ANNOUNCE, 0)
+    assert int.from_bytes(response[3][0:4], 'big') == 0   # Nada recibido todavía
+    assert worker.last_seq == len(CHUNKS) - 1
+
+
+def test_undecodable_frame_is_dropped(worker):
+    frame = bytearray(build_frame(FID, 0, CHUNKS[0], use_fec=False))
+    frame[4] = 0x1F   # Largo imposible
+    feed(worker, bytes(frame), data_frame(1))
+    assert set(worker.chunks) == {1}
+    assert parse_ack(worker.mailbox.current)[1] == 0
@@ -0,0 +1,83 @@
+"""Números de secuencia de 19 bits en tramas y ACKs"""
+
+import pytest
+
+from constants import (
+    MAX_SEQ_PACKETS, ACK_CONTROL, ACK_COMPLETE, CTRL_ANNOUNCE, EFFECTIVE_DATA_BYTES
+)
+from frame_handler import (
+    build_frame, parse_frame, build_control_frame, build_ack_payload, build_control_ack,
+    parse_ack, parse_control_ack, ack_flags, ack_confirmed_seqs
+)
+
+SEQS = [0, 1, 0xFFFF, 0x10000, 0x5A5A5, MAX_SEQ_PACKETS - 1]
+DATA = bytes(range(EFFECTIVE_DATA_BYTES))
+
+
+@pytest.mark.parametrize("use_fec", [True, False])
+@pytest.mark.parametrize("seq", SEQS)
+def test_data_frame_roundtrip(seq, use_fec):
+    frame = build_frame(0xBEEF, seq, DATA, True, 2, use_fec)
+    assert len(frame) == 32
+    file_id, parsed_seq, data, is_last, compress_mode, _, ctrl_type = parse_frame(frame)
+    assert (file_id, parsed_seq, data, is_last, compress_mode, ctrl_type) == (
+        0xBEEF, seq, DATA, True, 2, None
+    )
+
+
+def test_seq_out_of_range_raises():
+    with pytest.raises(ValueError):
+        build_frame(1, MAX_SEQ_PACKETS, DATA)
+
+
+def test_control_index_keeps_16_bits():
+    # En las tramas de control los bits altos del largo no extienden el índice
+    frame = build_control_frame(7, CTRL_ANNOUNCE, 0xFFFF, b"\x01" * 19)
+    parsed = parse_frame(frame)
+    assert parsed[1] == 0xFFFF
+    assert parsed[6] == CTRL_ANNOUNCE
+
+
+@pytest.mark.parametrize("missing", [0, 0x1234, 0x10000, 0x4FFFC, MAX_SEQ_PACKETS - 4])
+def test_ack_missing_seq_roundtrip(missing):
+    # Lo anterior a first_missing_hint se da por recibido
+    chunks = dict.fromkeys([missing + 1, missing + 3], b"")
+    ack = build_ack_payload(9, {}, MAX_SEQ_PACKETS - 1, False, first_missing_hint=missing)
+    assert parse_ack(ack)[:3] == (9, missing, False)
+    assert ack_flags(ack) == 0
+
+    ack = build_ack_payload(9, chunks, MAX_SEQ_PACKETS - 1, False, first_missing_hint=missing)
+    assert ack_confirmed_seqs(ack) == (missing, {missing + 1, missing + 3})
+
+
+@pytest.mark.parametrize("missing", [ACK_CONTROL, 0xFFFE, 0xFFFF])
+def test_ack_never_collides_with_special_values(missing):
+    # Confirmar de menos es seguro: se reporta el anterior a los especiales
+    ack = build_ack_payload(9, {}, MAX_SEQ_PACKETS - 1, False, first_missing_hint=missing)
+    assert parse_ack(ack)[1] == ACK_CONTROL - 1
+
+
+@pytest.mark.parametrize("missing", [0x1FFFD, 0x2FFFE, 0x6FFFF])
+def test_ack_escapes_high_bit_aliases(missing):
+    # Los 16 bits bajos de un especial también se evitan con bits altos
+    ack = build_ack_payload(9, {}, MAX_SEQ_PACKETS - 1, False, first_missing_hint=missing)
+    assert parse_ack(ack)[1] == (missing & ~0xFFFF) | (ACK_CONTROL - 1)
+    assert int.from_bytes(ack[2:4], 'big') < ACK_CONTROL
+
+
+def test_data_ack_with_control_low_bits_is_not_control():
+    # Un ACK de datos armado a mano con faltante 0x1FFFD (bits bajos = ACK_CONTROL)
+    ack = b"\x00\x09\xff\xfd" + bytes([1 << 5, 0])
+    assert parse_control_ack(ack + b"\x00") is None
+    assert parse_ack(ack)[1] == 0x1FFFD
+    assert parse_control_ack(build_control_ack(9, CTRL_ANNOUNCE, 3, b"ok")) == (
+        9, CTRL_ANNOUNCE, 3, b"ok"
+    )
+
+
+def test_ack_complete_with_high_last_seq():
+    last = 0x6FFFF
+    ack = build_ack_payload(9, {last: b""}, last, True, first_missing_hint=last)
+    assert parse_ack(ack) == (9, None, True, 0)
+    assert ack_flags(ack) == ACK_COMPLETE
+    assert ack_confirmed_seqs(ack) == (MAX_SEQ_PACKETS, set())
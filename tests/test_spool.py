@@ -0,0 +1,116 @@
+"""Spool: espera de asentamiento, ráfagas de escrituras y prioridades"""
+
+import os
+import threading
+import time
+
+import pytest
+
+import spool
+from dispatcher import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+from spool import SpoolWatcher
+
+
+class RecordingDispatcher:
+    """Registra los submit() en lugar de ejecutarlos"""
+
+    def __init__(self):
+        self.jobs = []
+        self.changed = threading.Condition()
+
+    def submit(self, kind, priority=PRIORITY_NORMAL, source="", **params):
+        with self.changed:
+            self.jobs.append((kind, priority, params['path'].name))
+            self.changed.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.jobs) >= count, timeout)
+        return list(self.jobs)
+
+
+@pytest.fixture(params=["inotify", "sondeo"])
+def watcher(request, tmp_path, monkeypatch):
+    if request.param == "sondeo":
+        monkeypatch.setattr(spool, "_open_inotify", lambda: None)
+    dispatcher = RecordingDispatcher()
+    w = SpoolWatcher(tmp_path / "spool", dispatcher, log=lambda *_: None,
+                     settle=0.3, poll_interval=0.05, retry_delay=0.1)
+    w.start()
+    if request.param == "inotify" and w.backend != "inotify":
+        w.stop()
+        pytest.skip("inotify no disponible")
+    yield w, dispatcher
+    w.stop()
+
+
+def test_write_burst_is_queued_once(watcher):
+    w, dispatcher = watcher
+    path = w.directory / "lecturas.csv"
+    for i in range(5):
+        with open(path, "a") as f:
+            f.write(f"{i},{i * i}\n")
+        time.sleep(0.1)   # Menos que settle: sigue siendo la misma ráfaga
+    assert dispatcher.wait_for(1) == [("spool", PRIORITY_NORMAL, "lecturas.csv")]
+    time.sleep(0.6)
+    assert len(dispatcher.jobs) == 1
+    assert w.stats['queued'] == 1
+
+
+def test_not_queued_before_settle(watcher):
+    w, dispatcher = watcher
+    (w.directory / "foto.jpg").write_bytes(b"\xff" * 100)
+    time.sleep(0.1)
+    assert dispatcher.jobs == []
+    assert dispatcher.wait_for(1) == [("spool", PRIORITY_NORMAL, "foto.jpg")]
+
+
+def test_temporary_names_are_ignored_until_renamed(watcher):
+    w, dispatcher = watcher
+    part = w.directory / "datos.bin.part"
+    part.write_bytes(b"x" * 1000)
+    (w.directory / ".oculto").write_bytes(b"x")
+    time.sleep(0.6)
+    assert dispatcher.jobs == []
+    os.replace(part, w.directory / "datos.bin")
+    assert dispatcher.wait_for(1) == [("spool", PRIORITY_NORMAL, "datos.bin")]
+
+
+def test_priority_comes_from_subdirectory(watcher):
+    w, dispatcher = watcher
+    (w.directory / "baja" / "log.txt").write_text("bajo")
+    (w.directory / "alta" / "alarma.txt").write_text("alto")
+    jobs = dispatcher.wait_for(2)
+    assert sorted(jobs) == [("spool", PRIORITY_HIGH, "alarma.txt"),
+                            ("spool", PRIORITY_LOW, "log.txt")]
+
+
+def test_finish_moves_sent_and_retries_failed(watcher):
+    w, dispatcher = watcher
+    sent = w.directory / "a.txt"
+    failed = w.directory / "b.txt"
+    sent.write_text("a")
+    failed.write_text("b")
+    dispatcher.wait_for(2)
+
+    w.finish(sent, True)
+    assert not sent.exists()
+    assert (w.done_dir / "a.txt").read_text() == "a"
+
+    w.finish(failed, False)
+    jobs = dispatcher.wait_for(3)
+    assert [name for _, _, name in jobs].count("b.txt") == 2
+    assert w.stats == {'queued': 3, 'sent': 1, 'failed': 1}
+
+
+def test_existing_files_are_queued_on_start(tmp_path):
+    directory = tmp_path / "spool"
+    directory.mkdir()
+    (directory / "viejo.txt").write_text("ya estaba")
+    dispatcher = RecordingDispatcher()
+    w = SpoolWatcher(directory, dispatcher, log=lambda *_: None, settle=0.2, poll_interval=0.05)
+    w.start()
+    try:
+        assert dispatcher.wait_for(1) == [("spool", PRIORITY_NORMAL, "viejo.txt")]
+    finally:
+        w.stop()
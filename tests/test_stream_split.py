@@ -0,0 +1,100 @@
+"""StreamingSplit: chunks publicados mientras se comprime"""
+
+import hashlib
+import threading
+import zlib
+
+import pytest
+
+import transmitter
+from compression import StreamCompressor
+from constants import COMPRESS_NONE, COMPRESS_ZLIB, STREAM_INPUT_BLOCK
+from transmitter import StreamingSplit
+
+CHUNK = 29
+DATA = b"".join(b"registro %05d;sensor=%03d\n" % (i, i % 211) for i in range(12000))
+
+
+class GatedCompressor(StreamCompressor):
+    """Se detiene después del primer bloque hasta que se libera 'gate'"""
+
+    gate = threading.Event()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def compress(self, data):
+        self.calls += 1
+        if self.calls == 2:
+            GatedCompressor.gate.wait(5)
+        return super().compress(data)
+
+
+def run_split(data, mode=COMPRESS_ZLIB, level=6, chunk=CHUNK):
+    split = StreamingSplit(data, mode, level, chunk)
+    split.start()
+    split.join(10)
+    return split
+
+
+@pytest.mark.parametrize("mode", [COMPRESS_NONE, COMPRESS_ZLIB])
+def test_chunks_rebuild_the_stream(mode):
+    split = run_split(DATA, mode)
+    stream = b"".join(split.chunks)
+    assert split.error is None
+    assert split.total == len(split.chunks)
+    assert all(len(chunk) == CHUNK for chunk in split.chunks[:-1])
+    assert 0 < len(split.chunks[-1]) <= CHUNK
+    assert split.final_size == len(stream)
+    assert split.stream_hash == hashlib.sha256(stream).digest()[:4]
+    assert (stream if mode == COMPRESS_NONE else zlib.decompress(stream)) == DATA
+
+
+def test_exact_multiple_keeps_a_full_last_chunk():
+    # Sin compresión y tamaño múltiplo del chunk: el último se retiene y sale completo
+    data = bytes(range(256)) * CHUNK
+    split = run_split(data, COMPRESS_NONE)
+    assert split.total == len(data) // CHUNK
+    assert len(split.chunks[-1]) == CHUNK
+    assert b"".join(split.chunks) == data
+
+
+def test_chunks_available_before_compression_ends(monkeypatch):
+    monkeypatch.setattr(transmitter, "StreamCompressor", GatedCompressor)
+    GatedCompressor.gate.clear()
+    data = DATA * 2
+    assert len(data) > 2 * STREAM_INPUT_BLOCK
+    split = StreamingSplit(data, COMPRESS_NONE, 0, CHUNK)
+    split.start()
+    try:
+        available, finished = split.wait_for(0, timeout=5)
+        assert available > 0 and not finished
+        assert split.total is None
+    finally:
+        GatedCompressor.gate.set()
+    split.join(10)
+    available, finished = split.wait_for(available)
+    assert finished and available == split.total
+    assert b"".join(split.chunks) == data
+
+
+def test_stop_abandons_compression(monkeypatch):
+    monkeypatch.setattr(transmitter, "StreamCompressor", GatedCompressor)
+    GatedCompressor.gate.clear()
+    split = StreamingSplit(DATA * 2, COMPRESS_NONE, 0, CHUNK)
+    split.start()
+    split.wait_for(0, timeout=5)
+    split.stop()
+    GatedCompressor.gate.set()
+    split.join(5)
+    assert not split.is_alive()
+    assert split.total is None
+
+
+def test_error_is_raised_to_the_waiter(monkeypatch):
+    monkeypatch.setattr(transmitter, "MAX_SEQ_PACKETS", 10)
+    split = run_split(DATA, COMPRESS_NONE)
+    assert isinstance(split.error, ValueError)
+    with pytest.raises(ValueError, match="supera 10 paquetes"):
+        split.wait_for(0, timeout=1)
@@ -0,0 +1,105 @@
+"""Descompresión incremental y salida en streaming del receptor"""
+
+import os
+import bz2
+import lzma
+import zlib
+import hashlib
+
+import pytest
+
+from constants import (
+    COMPRESS_NONE, COMPRESS_ZLIB, COMPRESS_BZ2, COMPRESS_LZMA, STREAM_OUTPUT_BLOCK,
+    CHECKPOINT_DIRNAME
+)
+from checkpoint import CheckpointWriter, checkpoint_path, prune_checkpoint_dir
+from compression import StreamDecompressor
+from finalizer import FinalizePool
+from receiver import StreamingOutput, finalize_reception
+from sim_radio import Ether, run_transfer
+
+# Muy compresible: pocos bytes comprimidos se expanden en varios bloques de salida
+DATA = b"".join(b"linea %06d del archivo de prueba\n" % (i % 97) for i in range(20000))
+ENCODERS = {
+    COMPRESS_NONE: lambda data: data,
+    COMPRESS_ZLIB: lambda data: zlib.compress(data, 9),
+    COMPRESS_BZ2: lambda data: bz2.compress(data, 9),
+    COMPRESS_LZMA: lambda data: lzma.compress(data),
+}
+
+
+def chunked(data: bytes, size: int = 22):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("mode", sorted(ENCODERS))
+def test_roundtrip_with_bounded_blocks(mode):
+    decompressor = StreamDecompressor(mode)
+    blocks = []
+    for chunk in chunked(ENCODERS[mode](DATA)):
+        blocks.extend(decompressor.feed(chunk))
+    blocks.extend(decompressor.finish())
+    assert b"".join(blocks) == DATA
+    assert max(len(block) for block in blocks) <= STREAM_OUTPUT_BLOCK
+
+
+def test_single_feed_is_split():
+    # Todo el flujo de una vez: la salida igual sale en bloques acotados
+    decompressor = StreamDecompressor(COMPRESS_ZLIB)
+    blocks = list(decompressor.feed(zlib.compress(DATA * 4, 9)))
+    blocks.extend(decompressor.finish())
+    assert len(blocks) > 1
+    assert b"".join(blocks) == DATA * 4
+
+
+@pytest.mark.parametrize("mode", [COMPRESS_ZLIB, COMPRESS_BZ2, COMPRESS_LZMA])
+def test_truncated_stream_raises(mode):
+    compressed = ENCODERS[mode](DATA)
+    decompressor = StreamDecompressor(mode)
+    list(decompressor.feed(compressed[:len(compressed) // 2]))
+    with pytest.raises(EOFError):
+        list(decompressor.finish())
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        StreamDecompressor(7)
+
+
+def test_streaming_output_names_are_unique(tmp_path):
+    # Un reenvío del mismo archivo no pisa la salida que sigue finalizando
+    first = StreamingOutput(tmp_path, 1234, COMPRESS_ZLIB)
+    second = StreamingOutput(tmp_path, 1234, COMPRESS_ZLIB)
+    assert first.path != second.path
+    for chunk in chunked(zlib.compress(DATA, 9)):
+        first.feed(chunk)
+    path = first.finish()
+    assert path.read_bytes() == DATA
+    assert first.file_hash == hashlib.sha256(DATA).digest()[:4]
+    second.discard()
+    assert not second.path.exists()
+    assert os.listdir(path.parent) == [path.name]
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_successful_reception_leaves_no_partials_dir(tmp_path, background):
+    src = tmp_path / "texto.txt"
+    src.write_bytes(DATA)
+    rx_kwargs = {}
+    if background:
+        pool = FinalizePool(finalize_reception)
+        rx_kwargs['finalizer'] = pool
+    result = run_transfer(Ether(), src, rx_kwargs=rx_kwargs)
+    if background:
+        pool.close()
+    assert result['ok']
+    assert (result['destino'] / src.name).read_bytes() == DATA
+    assert not (result['destino'] / CHECKPOINT_DIRNAME).exists()
+
+
+def test_partials_dir_kept_while_other_transfers_are_pending(tmp_path):
+    writer = CheckpointWriter(tmp_path, 7, COMPRESS_ZLIB)
+    writer.add_chunk(0, b"x" * 22)
+    writer.flush()
+    prune_checkpoint_dir(tmp_path)
+    assert checkpoint_path(tmp_path, 7).exists()
@@ -0,0 +1,72 @@
+"""Anuncio con reemplazo y manifiesto de directorio (--sync)"""
+
+from frame_handler import build_announce_payload, parse_announce_payload, calculate_file_hash
+from manifest import (
+    name_key, build_manifest, encode_manifest, decode_manifest, diff_manifest
+)
+
+
+def test_announce_replace_roundtrip():
+    id_hash = bytes.fromhex("0badcafe")
+    for replace in (False, True):
+        payload = build_announce_payload(0x12345, 22, 2, 90000, 250000, 9,
+                                         replace=replace, id_hash=id_hash)
+        assert len(payload) == 19
+        assert parse_announce_payload(payload) == {
+            'total_packets': 0x12345, 'chunk_size': 22, 'compress_mode': 2,
+            'stream_size': 90000, 'original_size': 250000, 'name_len': 9,
+            'replace': replace, 'open_length': False, 'id_hash': id_hash,
+        }
+
+
+def test_announce_from_older_transmitter():
+    # Sin el byte de reemplazo (ni el hash) nunca se reemplaza
+    payload = build_announce_payload(300, 22, 1, 6000, 9000, 5, replace=True)
+    for size in (13, 14):
+        parsed = parse_announce_payload(payload[:size])
+        assert parsed['replace'] is False
+        assert parsed['id_hash'] is None
+        assert parsed['total_packets'] == 300
+    assert parse_announce_payload(payload[:12]) is None
+
+
+def write(directory, name, data):
+    path = directory / name
+    path.write_bytes(data)
+    return path
+
+
+def test_manifest_skips_hidden_and_unmatched(tmp_path):
+    write(tmp_path, "a.txt", b"uno")
+    write(tmp_path, "b.log", b"dos")
+    write(tmp_path, ".tmp.txt", b"oculto")
+    (tmp_path / "sub.txt").mkdir()
+    manifest = build_manifest(tmp_path, "*.txt")
+    assert manifest == {name_key("a.txt"): (tmp_path / "a.txt", calculate_file_hash(b"uno"))}
+
+
+def test_diff_manifest(tmp_path):
+    local_dir = tmp_path / "tx"
+    remote_dir = tmp_path / "rx"
+    local_dir.mkdir()
+    remote_dir.mkdir()
+    for name, data in [("igual.txt", b"1"), ("cambiado.txt", b"nuevo"), ("nuevo.txt", b"3")]:
+        write(local_dir, name, data)
+    for name, data in [("igual.txt", b"1"), ("cambiado.txt", b"viejo"), ("sobra.txt", b"4")]:
+        write(remote_dir, name, data)
+
+    local = build_manifest(local_dir, "*")
+    remote_manifest = build_manifest(remote_dir, "*")
+    encoded = encode_manifest(remote_manifest)
+    remote = decode_manifest(encoded, len(remote_manifest))
+    assert remote == {key: digest for key, (_, digest) in remote_manifest.items()}
+
+    send, delete, unchanged = diff_manifest(local, remote)
+    assert send == [local_dir / "cambiado.txt", local_dir / "nuevo.txt"]
+    assert delete == [name_key("sobra.txt") + calculate_file_hash(b"4")]
+    assert unchanged == 1
+
+
+def test_decode_manifest_stops_at_count():
+    data = b"".join(bytes([i]) * 8 for i in range(4))
+    assert list(decode_manifest(data, 2)) == [b"\x00" * 4, b"\x01" * 4]
@@ -0,0 +1,104 @@
+"""Telemetría por trama: buffer circular, volcado y atribución de MAX_RT"""
+
+import pytest
+
+import transmitter
+from constants import TX_FIFO_DEPTH
+from telemetry import (
+    FrameRing, load, summarize, FLAG_SENT, FLAG_FAST, FLAG_MAX_RT, FLAG_BLOCKED
+)
+
+
+def fill(ring: FrameRing, count: int, file_id: int = 1):
+    for seq in range(count):
+        start = ring.origin_ns + seq * 1000
+        ring.record(file_id, seq, start, start + 500, 0, seq % 16, FLAG_SENT, 76)
+
+
+@pytest.mark.parametrize("count", [0, 3, 8, 9, 13, 16, 21])
+def test_columns_are_chronological(count):
+    ring = FrameRing(capacity=8)
+    fill(ring, count)
+    columns = ring.columns()
+    expected = list(range(max(0, count - 8), count))
+    assert list(columns['seq']) == expected
+    assert list(columns['t_us']) == expected
+    assert all(len(column) == len(expected) for column in columns.values())
+
+
+def test_lost_counts_per_file():
+    ring = FrameRing(capacity=4)
+    ring.record(1, 0, ring.origin_ns, ring.origin_ns, 0, 15, FLAG_MAX_RT, 76)
+    ring.record(1, 1, ring.origin_ns, ring.origin_ns, 0, 0, FLAG_SENT, 76)
+    ring.record(2, 0, ring.origin_ns, ring.origin_ns, 0, 15, FLAG_MAX_RT, 76)
+    assert list(ring.columns()['lost']) == [1, 1, 1]
+
+
+def test_dump_and_load_after_wraparound(tmp_path):
+    ring = FrameRing(capacity=8)
+    fill(ring, 13)
+    path = tmp_path / "tx.bin"
+    ring.dump(path)
+    loaded = load(path)
+    assert loaded['origin_epoch_us'] == ring.origin_epoch_us
+    for name, column in ring.columns().items():
+        assert loaded[name] == column
+    summary = summarize(loaded)[1]
+    assert summary['frames'] == summary['sent'] == 8
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "otro.bin"
+    path.write_bytes(b"no es telemetria" * 4)
+    with pytest.raises(ValueError):
+        load(path)
+
+
+class FifoRadio:
+    """write_fast() con MAX_RT en las llamadas indicadas"""
+
+    channel = 76
+
+    def __init__(self, max_rt_calls: set):
+        self.max_rt_calls = max_rt_calls
+        self.calls = 0
+
+    def write_fast(self, frame: bytes) -> bool:
+        self.calls += 1
+        return self.calls not in self.max_rt_calls
+
+    def tx_standby(self) -> bool:
+        return True
+
+    def get_arc(self) -> int:
+        return 15
+
+    def available(self) -> bool:
+        return False
+
+
+def test_max_rt_is_charged_to_fifo_head(monkeypatch):
+    ring = FrameRing(capacity=32)
+    monkeypatch.setattr(transmitter, "recorder", lambda: ring)
+    frames = [(seq, bytes(32)) for seq in range(6)]
+    # La 5ª carga encuentra MAX_RT: la cabeza de la FIFO es la trama 1
+    confirmed, failed, _ = transmitter.fast_write_burst(FifoRadio({5}), frames, file_id=9)
+
+    head = 4 - TX_FIFO_DEPTH
+    assert failed == list(range(head, 4))
+    assert confirmed == [0, 4, 5]
+    rows = list(zip(ring.columns()['seq'], ring.columns()['flags']))
+    assert rows.count((head, FLAG_FAST | FLAG_MAX_RT)) == 1
+    assert (4, FLAG_FAST | FLAG_BLOCKED | FLAG_SENT) in rows
+    summary = summarize(ring.columns())[9]
+    assert summary['max_rt'] == 1
+    assert summary['blocked'] == 1
+
+
+def test_max_rt_on_empty_fifo_is_this_frame(monkeypatch):
+    ring = FrameRing(capacity=32)
+    monkeypatch.setattr(transmitter, "recorder", lambda: ring)
+    # La primera carga y su reintento fallan: no hay nada en vuelo
+    confirmed, failed, _ = transmitter.fast_write_burst(FifoRadio({1, 2}), [(0, bytes(32))])
+    assert (confirmed, failed) == ([], [0])
+    assert list(ring.columns()['flags']) == [FLAG_FAST | FLAG_BLOCKED | FLAG_MAX_RT]
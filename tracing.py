@@ -0,0 +1,208 @@
+"""
+Trazas opcionales del pipeline de transferencia
+
+Spans en formato Chrome Trace / Perfetto (abrir el JSON en
+https://ui.perfetto.dev o chrome://tracing) y perfilado opcional con
+cProfile o por muestreo de pilas.
+
+Se activa con la variable de entorno NRF24_TRACE=<archivo.json> o con
+enable(). Deshabilitado, span() devuelve un context manager vacío
+compartido: el costo es una llamada a función por span.
+
+Los perfiladores se controlan con NRF24_PROFILE / NRF24_SAMPLE (daemon)
+o con los flags --profile / --sample de main.py.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import pathlib
+import threading
+import collections
+
+TRACE_ENV = "NRF24_TRACE"       # Archivo JSON de la traza
+PROFILE_ENV = "NRF24_PROFILE"   # Archivo .prof de cProfile
+SAMPLE_ENV = "NRF24_SAMPLE"     # Archivo de pilas "folded" del perfilador por muestreo
+SAMPLE_INTERVAL = 0.005         # Segundos entre muestras
+
+_events = None                  # Lista de eventos; None = trazas deshabilitadas
+_thread_names = {}
+_output = None
+_origin_ns = 0
+
+
+class _NullSpan:
+    """Span vacío usado cuando las trazas están deshabilitadas"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Span activo: registra un evento completo ('X') al salir"""
+
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        tid = threading.get_ident()
+        if tid not in _thread_names:
+            _thread_names[tid] = threading.current_thread().name
+        event = {
+            'name': self.name, 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+            'ts': (self.start - _origin_ns) / 1000,
+            'dur': (end - self.start) / 1000,
+        }
+        if self.args:
+            event['args'] = self.args
+        _events.append(event)
+        return False
+
+
+def is_enabled() -> bool:
+    """True si se están registrando spans"""
+    return _events is not None
+
+
+def enable(output: pathlib.Path):
+    """
+    Activa el registro de spans.
+
+    Args:
+        output: Archivo JSON donde se guardará la traza al salir (o con save())
+    """
+    global _events, _output, _origin_ns
+    if _events is None:
+        _events = []
+        _origin_ns = time.perf_counter_ns()
+        atexit.register(save)
+    _output = pathlib.Path(output)
+
+
+def span(name: str, **args):
+    """
+    Context manager que mide una etapa del pipeline.
+
+    Args:
+        name: Nombre de la etapa (ej. "compress", "radio.write")
+        **args: Datos adicionales visibles en el visor (ej. seq=12)
+    """
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def save(output: pathlib.Path = None) -> pathlib.Path:
+    """
+    Escribe la traza en formato Chrome Trace (JSON).
+
+    Returns:
+        pathlib.Path: Archivo escrito, o None si no hay nada que guardar
+    """
+    path = pathlib.Path(output) if output else _output
+    if _events is None or path is None:
+        return None
+
+    pid = os.getpid()
+    meta = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+        for tid, name in list(_thread_names.items())
+    ]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': meta + list(_events), 'displayTimeUnit': 'ms'}, f)
+    return path
+
+
+class CProfiler:
+    """
+    Perfilado determinista con cProfile del hilo que llama a start().
+
+    El archivo .prof se puede abrir con snakeviz o `python -m pstats`;
+    al detenerlo se imprimen las 25 funciones con más tiempo acumulado.
+    """
+
+    def __init__(self):
+        import cProfile
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        """Comienza a perfilar el hilo actual"""
+        self.profiler.enable()
+
+    def stop(self, output: pathlib.Path):
+        """Detiene el perfilado y guarda las estadísticas"""
+        import pstats
+        self.profiler.disable()
+        self.profiler.dump_stats(str(output))
+        print(f"\n📈 Perfil guardado en {output}")
+        pstats.Stats(self.profiler).sort_stats('cumulative').print_stats(25)
+
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo: captura periódicamente la pila de cada hilo.
+
+    Tiene menos overhead que cProfile en los bucles de radio. La salida
+    está en formato "folded" (una pila por línea con su conteo), que
+    aceptan flamegraph.pl y https://www.speedscope.app.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({pathlib.Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """Inicia el muestreo en un hilo daemon"""
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, output: pathlib.Path):
+        """Detiene el muestreo y guarda las pilas en formato folded"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with open(output, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"\n📈 Muestras guardadas en {output} ({sum(self.samples.values())} muestras)")
+
+
+# Activación por variable de entorno (útil para el daemon bajo systemd)
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
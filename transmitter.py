@@ -3,69 +3,774 @@ Lógica de transmisión de archivos (OPTIMIZADO)
 Eliminados reintentos manuales - confía en auto-retransmit del hardware nRF24
 """
 
+import os
 import time
-import random
+import hashlib
 import pathlib
+import threading
+from collections import deque
+from typing import Optional
 from pyrf24 import RF24
 from constants import (
     ADDR_A, ADDR_B, MAX_ROUNDS,
-    BURST_SIZE, INTER_PACKET_DELAY, EFFECTIVE_DATA_BYTES, DATA_BYTES,
-    COMPRESS_NAMES
+    EFFECTIVE_DATA_BYTES, DATA_BYTES,
+    COMPRESS_NONE, COMPRESS_NAMES, COMPRESS_DELTA, COMPRESS_CODEC_MASK,
+    TX_FAST_MODE, TX_FIFO_DEPTH, TX_DELTA_MODE, DELTA_BLOCK_SIZE,
+    CTRL_DELTA_REQ, CTRL_SIG_REQ, CTRL_TRAILER, CONTROL_ATTEMPTS, SIGS_PER_ACK,
+    ACK_VERIFIED, ACK_VERIFY_FAILED, MAX_VERIFY_RETRIES, VERIFY_ATTEMPTS, VERIFY_INTERVAL,
+    CTRL_ANNOUNCE, CTRL_NAME, ANNOUNCE_ATTEMPTS, NAME_CHUNK_BYTES, MAX_NAME_BYTES,
+    CTRL_CHANNEL, RF_CHANNEL, AUTO_CHANNEL, TX_ADAPTIVE_BURST,
+    TX_STREAM_MODE, TX_STREAM_MIN_SIZE, STREAM_SAMPLE_SIZE, STREAM_INPUT_BLOCK, STREAM_WAIT,
+    MAX_SEQ_PACKETS, CTRL_MANIFEST, CTRL_DELETE, CTRL_SYNC_END, TX_SYNC_MODE, SYNC_DELETE,
+    MANIFEST_ENTRIES_PER_ACK, MANIFEST_ATTEMPTS, MANIFEST_INTERVAL, CTRL_PEER,
+    CTRL_RESUME, RESUME_BITMAP_BYTES
 )
-from compression import adaptive_compress
+from compression import (
+    adaptive_compress, select_codec, StreamCompressor, precheck_entropy, precheck_summary,
+    PRECHECK_STATS
+)
+from cost_model import get_model
 from frame_handler import (
-    calculate_file_hash, build_frame, parse_ack
+    calculate_file_hash, transfer_id, build_frame, build_control_frame,
+    build_trailer_payload, build_announce_payload, parse_ack, parse_control_ack,
+    ack_flags, ack_confirmed_seqs, parse_resume_bitmap
+)
+from delta_sync import compute_delta, SIGNATURE_SIZE
+from manifest import build_manifest, decode_manifest, diff_manifest
+from tracing import span
+from telemetry import (
+    recorder, FLAG_SENT, FLAG_ACK_PAYLOAD, FLAG_FAST, FLAG_MAX_RT, FLAG_BLOCKED
+)
+from burst_control import AIMDController
+from channel_scan import (
+    survey_channels, rank_channels, encode_candidates, RetransmitMonitor,
+    FAILED_WRITE_RETRIES
+)
+from metrics import (
+    FRAMES_SENT, WRITE_FAILURES, ACKS_RECEIVED, HW_RETRIES, TX_ROUNDS, TRANSFERS,
+    PREP_SECONDS, TRANSFER_SECONDS, GOODPUT_KIBPS
 )
+from history import record_transfer, peer_name, station_name, decode_station
 from fec import is_fec_available
 from hardware import LEDController, SystemState
+from progress import ACTIVE
 
 
-def split_file(file_path: pathlib.Path, use_fec: bool = True) -> tuple:
+def split_data(data: bytes, use_fec: bool = True) -> tuple:
     """
-    Lee, comprime y divide un archivo en chunks.
+    Comprime y divide datos en chunks.
     
     Args:
-        file_path: Ruta al archivo a transmitir
+        data: Datos a transmitir
         use_fec: Si usar FEC (afecta tamaño de chunks)
         
     Returns:
         tuple: (chunks, compress_mode, original_size, final_size, file_hash)
     """
-    data = file_path.read_bytes()
     original_size = len(data)
-    file_hash = calculate_file_hash(data)
+    with span("hash", size=original_size):
+        file_hash = calculate_file_hash(data)
     
     # Comprimir de forma adaptativa
-    compressed, compress_mode, ratio = adaptive_compress(data)
+    chunk_size = EFFECTIVE_DATA_BYTES if (use_fec and is_fec_available()) else DATA_BYTES
+    with span("compress", size=original_size):
+        compressed, compress_mode, ratio = adaptive_compress(data, chunk_size)
     final_size = len(compressed)
     
     # Dividir en chunks según FEC
-    chunk_size = EFFECTIVE_DATA_BYTES if (use_fec and is_fec_available()) else DATA_BYTES
-    chunks = [compressed[i:i+chunk_size] for i in range(0, len(compressed), chunk_size)]
+    with span("split", size=final_size):
+        chunks = [compressed[i:i+chunk_size] for i in range(0, len(compressed), chunk_size)]
     
     return chunks, compress_mode, original_size, final_size, file_hash
 
 
+def split_file(file_path: pathlib.Path, use_fec: bool = True) -> tuple:
+    """
+    Lee, comprime y divide un archivo en chunks.
+    
+    Args:
+        file_path: Ruta al archivo a transmitir
+        use_fec: Si usar FEC (afecta tamaño de chunks)
+        
+    Returns:
+        tuple: (chunks, compress_mode, original_size, final_size, file_hash)
+    """
+    with span("read", file=file_path.name):
+        data = file_path.read_bytes()
+    return split_data(data, use_fec)
+
+
+class StreamingSplit(threading.Thread):
+    """
+    Comprime y divide un archivo en chunks en un hilo propio.
+    
+    La radio transmite los chunks a medida que aparecen en `chunks`, así el
+    tiempo total es el mayor entre compresión y aire, no la suma. El último
+    chunk completo se retiene hasta saber si hay más datos: cuando se
+    publica el chunk final ya se conoce `total` y lleva FLAG_LAST.
+    """
+    
+    def __init__(self, data: bytes, compress_mode: int, level: int, chunk_size: int):
+        """
+        Args:
+            data: Contenido del archivo
+            compress_mode: Códec elegido de antemano (select_codec)
+            level: Nivel del códec
+            chunk_size: Bytes de datos por paquete
+        """
+        super().__init__(name="compress", daemon=True)
+        self.data = data
+        self.compress_mode = compress_mode
+        self.level = level
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.total = None       # Paquetes totales, al terminar de comprimir
+        self.final_size = 0
+        self.error = None
+        self._hasher = hashlib.sha256()
+        self._ready = threading.Condition()
+        self._cancelled = False
+
+    @property
+    def stream_hash(self) -> bytes:
+        """Hash del flujo transmitido (válido cuando total no es None)"""
+        return self._hasher.digest()[:4]
+
+    def stop(self):
+        """Abandona la compresión (transmisión cancelada)"""
+        self._cancelled = True
+
+    def wait_for(self, count: int, timeout: float = None) -> tuple:
+        """
+        Espera a que haya más de `count` chunks o a que termine la compresión.
+        
+        Returns:
+            tuple: (chunks disponibles, terminado)
+            
+        Raises:
+            Exception: El error del hilo compresor, si falló
+        """
+        with self._ready:
+            self._ready.wait_for(
+                lambda: len(self.chunks) > count or self.total is not None or self.error,
+                timeout
+            )
+            if self.error is not None:
+                raise self.error
+            return len(self.chunks), self.total is not None
+
+    def run(self):
+        compressor = StreamCompressor(self.compress_mode, self.level)
+        pending = bytearray()
+        try:
+            t0 = time.perf_counter()
+            with span("compress_stream", size=len(self.data)):
+                for offset in range(0, len(self.data), STREAM_INPUT_BLOCK):
+                    if self._cancelled:
+                        return
+                    pending += compressor.compress(self.data[offset:offset + STREAM_INPUT_BLOCK])
+                    self._publish(pending, final=False)
+                pending += compressor.flush()
+                self._publish(pending, final=True)
+            get_model().record_compression(self.compress_mode, self.level, len(self.data),
+                                           time.perf_counter() - t0)
+        except Exception as e:
+            with self._ready:
+                self.error = e
+                self._ready.notify_all()
+
+    def _publish(self, pending: bytearray, final: bool):
+        """Pasa a `chunks` los chunks completos de `pending` (y el resto si es el final)"""
+        size = self.chunk_size
+        cut = len(pending) // size * size
+        if final:
+            cut = len(pending)
+        elif cut and cut == len(pending):
+            cut -= size   # Podría ser el último: se retiene
+        if not cut and not final:
+            return
+        new = [bytes(pending[i:i + size]) for i in range(0, cut, size)]
+        if len(self.chunks) + len(new) > MAX_SEQ_PACKETS:
+            raise ValueError(f"el flujo comprimido supera {MAX_SEQ_PACKETS} paquetes")
+        del pending[:cut]
+        for chunk in new:
+            self._hasher.update(chunk)
+            self.final_size += len(chunk)
+        with self._ready:
+            self.chunks.extend(new)
+            if final:
+                self.total = len(self.chunks)
+            self._ready.notify_all()
+
+
+def start_streaming_split(file_path: pathlib.Path, use_fec: bool = True) -> tuple:
+    """
+    Lee y hashea el archivo, elige el códec con una muestra y arranca la compresión.
+    
+    Args:
+        file_path: Ruta al archivo a transmitir
+        use_fec: Si usar FEC (afecta tamaño de chunks)
+        
+    Returns:
+        tuple: (StreamingSplit en marcha, original_size, file_hash)
+    """
+    with span("read", file=file_path.name):
+        data = file_path.read_bytes()
+    with span("hash", size=len(data)):
+        file_hash = calculate_file_hash(data)
+    chunk_size = EFFECTIVE_DATA_BYTES if (use_fec and is_fec_available()) else DATA_BYTES
+    with span("select_codec"):
+        if precheck_entropy(data):
+            compress_mode, level = select_codec(data[:STREAM_SAMPLE_SIZE], len(data), chunk_size)
+        else:
+            compress_mode, level = COMPRESS_NONE, 0
+            entropy = PRECHECK_STATS['last']['entropy']
+            print(f"  ○ Sin compresión (entropía {entropy:.2f} bits/byte)")
+    producer = StreamingSplit(data, compress_mode, level, chunk_size)
+    producer.start()
+    return producer, len(data), file_hash
+
+
+def request_control(radio: RF24, file_id: int, ctrl_type: int, index: int,
+                    payload: bytes = b"", use_fec: bool = True,
+                    attempts: int = CONTROL_ATTEMPTS, interval: float = 0.0) -> bytes:
+    """
+    Envía una trama de control hasta recibir su respuesta en un ACK.
+    
+    El receptor carga la respuesta después de procesar la trama, por lo
+    que llega en el ACK de una escritura posterior. `interval` espacia las
+    escrituras si el receptor puede tardar en procesarla.
+    
+    Returns:
+        bytes: Payload de la respuesta, o None si no llegó
+    """
+    frame = build_control_frame(file_id, ctrl_type, index, payload, use_fec)
+    for attempt in range(attempts):
+        if interval and attempt:
+            time.sleep(interval)
+        radio.write(frame)
+        for ack in drain_ack_payloads(radio):
+            response = parse_control_ack(ack)
+            if response and response[:3] == (file_id, ctrl_type, index):
+                return response[3]
+    return None
+
+
+def send_announce(radio: RF24, file_id: int, announce: bytes, name: bytes,
+                  use_fec: bool = True) -> bytes:
+    """
+    Anuncia la transferencia antes de los datos y envía el nombre del archivo.
+    
+    Cada trama se repite hasta que el receptor la confirma, para que pueda
+    dimensionar la reconstrucción y reportar huecos desde el primer paquete.
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        file_id: ID de la transferencia
+        announce: Payload de build_announce_payload
+        name: Nombre del archivo en UTF-8 (máx MAX_NAME_BYTES)
+        use_fec: Si usar Forward Error Correction
+        
+    Returns:
+        bytes: Respuesta del receptor al anuncio (ver fetch_received), o
+               None si no confirmó el anuncio y el nombre completo
+    """
+    reply = request_control(radio, file_id, CTRL_ANNOUNCE, 0, announce, use_fec,
+                            attempts=ANNOUNCE_ATTEMPTS)
+    if reply is None:
+        return None
+    
+    for index, start in enumerate(range(0, len(name), NAME_CHUNK_BYTES)):
+        part = name[start:start + NAME_CHUNK_BYTES]
+        if request_control(radio, file_id, CTRL_NAME, index, part, use_fec) is None:
+            return None
+    return reply
+
+
+def fetch_received(radio: RF24, file_id: int, reply: bytes, use_fec: bool = True) -> set:
+    """
+    Obtiene los paquetes que el receptor ya tiene de un intento anterior.
+    
+    La respuesta al anuncio trae el prefijo contiguo que el receptor
+    recuperó de su checkpoint; lo que haya después se pide en grupos
+    CTRL_RESUME, como el manifiesto. Un receptor anterior responde solo la
+    cantidad: no se reanuda.
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        file_id: ID de la transferencia
+        reply: Respuesta al anuncio (send_announce)
+        use_fec: Si usar Forward Error Correction
+        
+    Returns:
+        set: Secuencias que no hace falta enviar
+    """
+    if reply is None or len(reply) < 12 or not int.from_bytes(reply[0:4], 'big'):
+        return set()
+    prefix = int.from_bytes(reply[4:8], 'big')
+    end = int.from_bytes(reply[8:12], 'big')
+    received = set(range(prefix))
+    
+    groups = -(-(end - prefix) // (RESUME_BITMAP_BYTES * 8))
+    if groups > 0:
+        bitmaps = fetch_groups(radio, file_id, CTRL_RESUME, range(groups), use_fec)
+        if bitmaps is None:
+            return received   # El prefijo alcanza; el resto se reenvía
+        for index, bitmap in bitmaps.items():
+            received |= parse_resume_bitmap(bitmap, prefix, index)
+    return received
+
+
+def exchange_station(radio: RF24, file_id: int, use_fec: bool = True) -> str:
+    """
+    Intercambia nombres de estación con el receptor (CTRL_PEER).
+    
+    El nombre propio va en la trama y el del receptor vuelve en su ACK de
+    control: así el historial de cada lado identifica al otro aunque todas
+    las instalaciones usen las mismas direcciones de radio.
+    
+    Returns:
+        str: Nombre del receptor, o None si no respondió (versión anterior)
+    """
+    response = request_control(radio, file_id, CTRL_PEER, 0, station_name(), use_fec)
+    return decode_station(response) if response is not None else None
+
+
+def negotiate_channel(radio: RF24, file_id: int, use_fec: bool = True,
+                      exclude: int = None) -> int:
+    """
+    Acuerda con el receptor el canal menos ruidoso y cambia a él.
+    
+    Escanea el RPD, propone los mejores canales en el canal actual y, con
+    la respuesta, cambia de canal y confirma el enlace. Si el receptor no
+    responde en el canal nuevo, vuelve al anterior (el receptor hace lo
+    mismo tras RENDEZVOUS_TIMEOUT sin tramas).
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        file_id: ID de la transferencia
+        use_fec: Si usar Forward Error Correction
+        exclude: Canal a no proponer (el actual, si se está escaneando por ruido)
+        
+    Returns:
+        int: Canal en uso al terminar
+    """
+    with span("channel_survey"):
+        busy = survey_channels(radio)
+    candidates = encode_candidates(rank_channels(busy), exclude)
+    nonce = int.from_bytes(os.urandom(2), 'big')
+    
+    response = request_control(radio, file_id, CTRL_CHANNEL, nonce, candidates, use_fec)
+    if not response:
+        print(f"⚠ El receptor no respondió la negociación de canal, sigo en {radio.channel}")
+        return radio.channel
+    
+    previous = radio.channel
+    radio.channel = response[0]
+    if request_control(radio, file_id, CTRL_CHANNEL, nonce, b"", use_fec,
+                       attempts=ANNOUNCE_ATTEMPTS) is None:
+        print(f"⚠ Sin enlace en el canal {response[0]}, volviendo al {previous}")
+        radio.channel = previous
+        return previous
+    
+    print(f"📡 Canal {response[0]} (ocupación local {busy.get(response[0], 0.0):.0%})")
+    return response[0]
+
+
+def fetch_groups(radio: RF24, file_id: int, ctrl_type: int, indices,
+                 use_fec: bool = True) -> dict:
+    """
+    Pide una respuesta larga repartida en grupos, un ACK de control por grupo.
+    
+    Las solicitudes se encadenan: cada escritura trae la respuesta a una
+    solicitud anterior, y los grupos perdidos se piden de nuevo en la
+    siguiente pasada.
+    
+    Returns:
+        dict: {índice: payload}, o None si faltó algún grupo
+    """
+    indices = list(indices)
+    received = {}
+    
+    for _ in range(CONTROL_ATTEMPTS):
+        missing = [i for i in indices if i not in received]
+        if not missing:
+            break
+        # Repetir la última solicitud para recoger su respuesta
+        for index in missing + missing[-1:]:
+            radio.write(build_control_frame(file_id, ctrl_type, index, b"", use_fec))
+            for ack in drain_ack_payloads(radio):
+                resp = parse_control_ack(ack)
+                if resp and resp[:2] == (file_id, ctrl_type):
+                    received[resp[2]] = resp[3]
+    
+    if any(i not in received for i in indices):
+        return None
+    return received
+
+
+def fetch_signatures(radio: RF24, file_id: int, name_key: bytes,
+                     block_size: int, use_fec: bool = True) -> bytes:
+    """
+    Obtiene del receptor las firmas de su versión previa del archivo.
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        file_id: ID usado para emparejar respuestas
+        name_key: Clave de 4 bytes del nombre del archivo
+        block_size: Tamaño de bloque de las firmas
+        use_fec: Si usar FEC en las tramas de control
+        
+    Returns:
+        bytes: Firmas concatenadas (b"" si no hay versión previa),
+               o None si el receptor no respondió
+    """
+    response = request_control(
+        radio, file_id, CTRL_DELTA_REQ, 0,
+        name_key + block_size.to_bytes(2, 'big'), use_fec
+    )
+    if response is None or len(response) < 4:
+        return None
+    
+    block_count = int.from_bytes(response[0:4], 'big')
+    groups = -(-block_count // SIGS_PER_ACK)
+    received = fetch_groups(radio, file_id, CTRL_SIG_REQ, range(groups), use_fec)
+    if received is None:
+        return None
+    signatures = b"".join(received[g] for g in range(groups))
+    return signatures[:block_count * SIGNATURE_SIZE]
+
+
+def fetch_manifest(radio: RF24, file_id: int, pattern: str, use_fec: bool = True) -> dict:
+    """
+    Obtiene del receptor el manifiesto de los archivos que cumplen `pattern`.
+    
+    El receptor hashea sus archivos al recibir el pedido, así que la
+    primera respuesta se espera con escrituras espaciadas.
+    
+    Returns:
+        dict: {name_key: hash_del_contenido}, o None si el receptor no respondió
+    """
+    response = request_control(radio, file_id, CTRL_MANIFEST, 0, pattern.encode('utf-8'),
+                               use_fec, MANIFEST_ATTEMPTS, MANIFEST_INTERVAL)
+    if response is None or len(response) < 4:
+        return None
+    
+    count = int.from_bytes(response[0:4], 'big')
+    groups = -(-count // MANIFEST_ENTRIES_PER_ACK)
+    received = fetch_groups(radio, file_id, CTRL_MANIFEST, range(1, groups + 1), use_fec)
+    if received is None:
+        return None
+    return decode_manifest(b"".join(received[g] for g in range(1, groups + 1)), count)
+
+
+def plan_sync(radio: RF24, directory: pathlib.Path, pattern: str,
+              delete: bool = SYNC_DELETE, use_fec: bool = True) -> dict:
+    """
+    Compara el directorio con el manifiesto del receptor y aplica los borrados.
+    
+    Si no queda nada que enviar, avisa al receptor (CTRL_SYNC_END) para que
+    cierre la sesión sin esperar datos.
+    
+    Args:
+        radio: Objeto RF24 inicializado
+        directory: Directorio a sincronizar
+        pattern: Patrón de nombres (el mismo en ambos extremos)
+        delete: Borrar en el receptor los archivos que ya no están aquí
+        use_fec: Si usar FEC en las tramas de control
+        
+    Returns:
+        dict: {enviar, sin_cambios, sobrantes, borrados}, o None si el
+              receptor no envió su manifiesto
+    """
+    radio.open_rx_pipe(1, ADDR_B)
+    radio.stop_listening()
+    radio.open_tx_pipe(ADDR_A)
+    
+    with span("manifest", dir=directory.name):
+        local = build_manifest(directory, pattern)
+        file_id = int.from_bytes(os.urandom(2), 'big')
+        remote = fetch_manifest(radio, file_id, pattern, use_fec)
+    if remote is None:
+        return None
+    send, stale, unchanged = diff_manifest(local, remote)
+    
+    deleted = 0
+    if delete:
+        for index, entry in enumerate(stale):
+            response = request_control(radio, file_id, CTRL_DELETE, index, entry, use_fec)
+            deleted += bool(response and response[0])
+    if not send:
+        request_control(radio, file_id, CTRL_SYNC_END, 0, b"", use_fec)
+    return {'enviar': send, 'sin_cambios': unchanged, 'sobrantes': len(stale),
+            'borrados': deleted}
+
+
+def split_delta(radio: RF24, file_path: pathlib.Path, use_fec: bool = True) -> tuple:
+    """
+    Codifica un archivo como delta respecto a la versión que tiene el receptor.
+    
+    Args:
+        radio: Objeto RF24 en modo TX (se usa para pedir las firmas)
+        file_path: Ruta al archivo a transmitir
+        use_fec: Si usar FEC (afecta tamaño de chunks)
+        
+    Returns:
+        tuple: (chunks, compress_mode, original_size, final_size, file_hash,
+                delta_hash) o None si el receptor no envió sus firmas
+    """
+    with span("read", file=file_path.name):
+        data = file_path.read_bytes()
+    file_hash = calculate_file_hash(data)
+    name_key = calculate_file_hash(file_path.name.encode())
+    
+    with span("fetch_signatures"):
+        signatures = fetch_signatures(
+            radio, transfer_id(file_hash), name_key, DELTA_BLOCK_SIZE, use_fec
+        )
+    if signatures is None:
+        return None
+    
+    with span("compute_delta", size=len(data)):
+        delta = compute_delta(data, signatures, DELTA_BLOCK_SIZE, name_key)
+    print(f"  Δ Delta: {len(data)} → {len(delta)} bytes "
+          f"({len(signatures) // SIGNATURE_SIZE} bloques en el receptor)")
+    
+    chunks, compress_mode, _, final_size, delta_hash = split_data(delta, use_fec)
+    return (chunks, compress_mode | COMPRESS_DELTA, len(data), final_size,
+            file_hash, delta_hash)
+
+
+def apply_ack(ack_payload: bytes, file_id: int, pending: set,
+              ack_state: dict) -> bool:
+    """
+    Descarta de `pending` los paquetes que el ACK confirma como recibidos.
+    
+    Args:
+        ack_payload: ACK recibido del receptor
+        file_id: ID de la transferencia en curso
+        pending: Conjunto de secuencias pendientes (se modifica)
+        ack_state: {'below': confirmadas hasta, 'total': total de paquetes}
+        
+    Returns:
+        bool: True si el receptor confirma la recepción completa
+    """
+    ack_file_id, _, is_complete, _ = parse_ack(ack_payload)
+    if ack_file_id != file_id:
+        return False
+    
+    if is_complete:
+        pending.clear()
+        return True
+    
+    below, extra = ack_confirmed_seqs(ack_payload)
+    below = min(below, ack_state['total'])
+    if below > ack_state['below']:
+        for seq in range(ack_state['below'], below):
+            pending.discard(seq)
+        ack_state['below'] = below
+    pending.difference_update(extra)
+    return False
+
+
+def confirm_integrity(radio: RF24, file_id: int, trailer_frame: bytes,
+                      pending: set, ack_state: dict,
+                      attempts: int = VERIFY_ATTEMPTS,
+                      interval: float = VERIFY_INTERVAL) -> Optional[bool]:
+    """
+    Envía el trailer hasta que el receptor reporte el resultado de la verificación.
+    
+    El RxWorker publica el ACK con el resultado después de procesar el
+    trailer, así que llega con una escritura posterior: `interval` le da
+    tiempo entre intentos (igual que en request_control).
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        file_id: ID de la transferencia
+        trailer_frame: Trama CTRL_TRAILER ya construida
+        pending: Conjunto de secuencias pendientes (se actualiza con los ACKs)
+        ack_state: Estado de confirmaciones (ver apply_ack)
+        attempts: Escrituras máximas del trailer
+        interval: Segundos entre escrituras
+        
+    Returns:
+        Optional[bool]: True si el hash coincide, False si no coincide,
+                        None si el receptor no confirmó
+    """
+    for attempt in range(attempts):
+        if interval and attempt:
+            time.sleep(interval)
+        radio.write(trailer_frame)
+        for ack_payload in drain_ack_payloads(radio):
+            if parse_ack(ack_payload)[0] != file_id:
+                continue
+            flags = ack_flags(ack_payload)
+            if flags & ACK_VERIFY_FAILED:
+                return False
+            if flags & ACK_VERIFIED:
+                return True
+            apply_ack(ack_payload, file_id, pending, ack_state)
+    return None
+
+
+def drain_ack_payloads(radio: RF24) -> list:
+    """
+    Lee todos los ACK payloads acumulados en la FIFO RX.
+    
+    Si la FIFO RX se llena, el nRF24 descarta los ACK siguientes y el
+    hardware los trata como perdidos (reintentos), por eso se vacía
+    después de cada carga en modo rápido.
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        
+    Returns:
+        list: Payloads de ACK leídos (bytes)
+    """
+    acks = []
+    while radio.available():
+        size = radio.get_dynamic_payload_size()
+        if not 0 < size <= 32:
+            radio.flush_rx()
+            break
+        acks.append(bytes(radio.read(size)))
+    return acks
+
+
+def fast_write_burst(radio: RF24, frames: list, file_id: int = 0) -> tuple:
+    """
+    Transmite una ráfaga manteniendo llena la FIFO TX con write_fast().
+    
+    write_fast() no espera el auto-ACK: solo se bloquea mientras la FIFO
+    está llena. Una trama que ya salió de la FIFO fue confirmada por el
+    hardware, así que solo las últimas TX_FIFO_DEPTH cargadas quedan en
+    duda. Ante MAX_RT, tx_standby() limpia la bandera y vacía la FIFO, y
+    esas tramas en vuelo se reportan como fallidas.
+    
+    Con la telemetría activa se registra cada write_fast(); su ARC es el
+    de la última trama que terminó el hardware, no necesariamente esta.
+    Un MAX_RT se atribuye a la cabeza de la FIFO, que es la que agotó los
+    reintentos; la trama que lo encontró al cargarse lleva FLAG_BLOCKED.
+    
+    Args:
+        radio: Objeto RF24 en modo TX
+        frames: Lista de tuplas (seq_id, trama)
+        file_id: ID de la transferencia (solo para la telemetría)
+        
+    Returns:
+        tuple: (confirmados, fallidos, acks) con listas de seq_id y payloads
+    """
+    in_flight = deque()
+    confirmed = []
+    failed = []
+    acks = []
+    ring = recorder()
+    channel = radio.channel if ring else 0
+    start = end = 0
+
+    for seq_id, frame in frames:
+        flags = FLAG_FAST
+        if ring:
+            start = time.perf_counter_ns()
+        if not radio.write_fast(frame):
+            # MAX_RT: la cabeza de la FIFO agotó los reintentos de hardware
+            if ring:
+                flags |= FLAG_BLOCKED
+                if in_flight:
+                    now = time.perf_counter_ns()
+                    ring.record(file_id, in_flight[0], now, now, 0, radio.get_arc(),
+                                FLAG_FAST | FLAG_MAX_RT, channel)
+            radio.tx_standby()
+            failed.extend(in_flight)
+            in_flight.clear()
+            if not radio.write_fast(frame):
+                # Con la FIFO vacía, el MAX_RT es de esta trama
+                radio.tx_standby()
+                failed.append(seq_id)
+                if ring:
+                    ring.record(file_id, seq_id, start, time.perf_counter_ns(), 0,
+                                radio.get_arc(), flags | FLAG_MAX_RT, channel)
+                continue
+        if ring:
+            end = time.perf_counter_ns()
+
+        in_flight.append(seq_id)
+        if len(in_flight) > TX_FIFO_DEPTH:
+            confirmed.append(in_flight.popleft())
+        drained = drain_ack_payloads(radio)
+        acks.extend(drained)
+        if ring:
+            if drained:
+                flags |= FLAG_ACK_PAYLOAD
+            ring.record(file_id, seq_id, start, end, time.perf_counter_ns() if drained else 0,
+                        radio.get_arc(), flags | FLAG_SENT, channel)
+
+    # Esperar a que la FIFO se vacíe (False si hubo MAX_RT)
+    if radio.tx_standby():
+        confirmed.extend(in_flight)
+    else:
+        failed.extend(in_flight)
+    acks.extend(drain_ack_payloads(radio))
+
+    return confirmed, failed, acks
+
+
 def transmit_multiple_files(radio: RF24, directory: pathlib.Path,
-                           led_controller: LEDController) -> dict:
+                           led_controller: LEDController,
+                           fast_mode: bool = TX_FAST_MODE,
+                           delta_mode: bool = TX_DELTA_MODE,
+                           auto_channel: bool = AUTO_CHANNEL,
+                           adaptive_burst: bool = TX_ADAPTIVE_BURST,
+                           stream_mode: bool = TX_STREAM_MODE,
+                           sync_mode: bool = TX_SYNC_MODE,
+                           sync_delete: bool = SYNC_DELETE) -> dict:
     """
     Transmite múltiples archivos .txt desde un directorio.
     
+    Con sync_mode solo se envían los archivos que el receptor no tiene o
+    que cambiaron (según su manifiesto), y reemplazan a su versión previa.
+    
     Args:
         radio: Objeto RF24 inicializado
         directory: Directorio con archivos .txt
         led_controller: Controlador de LEDs
+        fast_mode: Usar write_fast() para mantener llena la FIFO TX
+        delta_mode: Enviar solo las diferencias con la versión del receptor
+        auto_channel: Negociar el canal menos ruidoso antes de cada archivo
+        adaptive_burst: Ajustar ráfaga y pausa con el control AIMD
+        stream_mode: Comprimir en paralelo con la transmisión
+        sync_mode: Enviar solo lo nuevo o modificado respecto al receptor
+        sync_delete: En sync_mode, borrar en el receptor los .txt que ya no
+                     están en el directorio
         
     Returns:
-        dict: Estadísticas de transmisión {exitosos, fallidos, total}
+        dict: Estadísticas de transmisión {exitosos, fallidos, total} (con
+              sync_mode también {sin_cambios, borrados})
     """
     print(f"\n{'='*50}")
-    print("TRANSMISIÓN MÚLTIPLE DE ARCHIVOS")
+    print("SINCRONIZACIÓN DE DIRECTORIO" if sync_mode else "TRANSMISIÓN MÚLTIPLE DE ARCHIVOS")
     print(f"{'='*50}")
     print(f"Directorio: {directory.absolute()}\n")
     
     # Buscar archivos .txt
-    txt_files = sorted(directory.glob("*.txt"))
+    pattern = "*.txt"
+    txt_files = sorted(directory.glob(pattern))
+    
+    sync = None
+    if sync_mode:
+        sync = plan_sync(radio, directory, pattern, sync_delete, is_fec_available())
+        if sync is None:
+            print("✗ El receptor no envió su manifiesto")
+            return {'exitosos': 0, 'fallidos': len(txt_files), 'total': len(txt_files),
+                    'sin_cambios': 0, 'borrados': 0}
+        txt_files = sync['enviar']
+        print(f"🗂 Manifiesto del receptor: {sync['sin_cambios']} sin cambios, "
+              f"{len(txt_files)} nuevos o modificados, {sync['sobrantes']} que ya no están aquí"
+              + (f" ({sync['borrados']} borrados)" if sync_delete else ""))
+        if not txt_files:
+            print("✓ El receptor ya tiene todos los archivos")
+            return {'exitosos': 0, 'fallidos': 0, 'total': 0,
+                    'sin_cambios': sync['sin_cambios'], 'borrados': sync['borrados']}
     
     if not txt_files:
         print(f"⚠ No se encontraron archivos .txt en {directory}")
@@ -78,13 +783,19 @@ def transmit_multiple_files(radio: RF24, directory: pathlib.Path,
     print(f"\n{'='*50}\n")
     
     stats = {'exitosos': 0, 'fallidos': 0, 'total': len(txt_files)}
+    if sync is not None:
+        stats.update(sin_cambios=sync['sin_cambios'], borrados=sync['borrados'])
     
     # Transmitir cada archivo
     for i, file_path in enumerate(txt_files, 1):
+        if ACTIVE.cancelled:
+            print("⏹ Transmisión múltiple cancelada")
+            break
         print(f"\n📤 Transmitiendo archivo {i}/{len(txt_files)}: {file_path.name}")
         print(f"{'─'*50}")
         
-        success = transmit_file(radio, file_path, led_controller)
+        success = transmit_file(radio, file_path, led_controller, fast_mode, delta_mode,
+                                auto_channel, adaptive_burst, stream_mode, replace=sync_mode)
         
         if success:
             stats['exitosos'] += 1
@@ -92,11 +803,6 @@ def transmit_multiple_files(radio: RF24, directory: pathlib.Path,
         else:
             stats['fallidos'] += 1
             print(f"✗ Error al transmitir {file_path.name}")
-        
-        # Pequeña pausa entre archivos
-        if i < len(txt_files):
-            print("\n⏸ Pausa de 2 segundos antes del siguiente archivo...")
-            time.sleep(2)
     
     # Resumen final
     print(f"\n{'='*50}")
@@ -105,13 +811,21 @@ def transmit_multiple_files(radio: RF24, directory: pathlib.Path,
     print(f"✓ Exitosos: {stats['exitosos']}/{stats['total']}")
     print(f"✗ Fallidos: {stats['fallidos']}/{stats['total']}")
     print(f"Tasa de éxito: {(stats['exitosos']/stats['total']*100):.1f}%")
+    if sync is not None:
+        print(f"Sin cambios (no enviados): {stats['sin_cambios']} | Borrados: {stats['borrados']}")
     print(f"{'='*50}\n")
     
     return stats
 
 
 def transmit_file(radio: RF24, file_path: pathlib.Path, 
-                  led_controller: LEDController) -> bool:
+                  led_controller: LEDController,
+                  fast_mode: bool = TX_FAST_MODE,
+                  delta_mode: bool = TX_DELTA_MODE,
+                  auto_channel: bool = AUTO_CHANNEL,
+                  adaptive_burst: bool = TX_ADAPTIVE_BURST,
+                  stream_mode: bool = TX_STREAM_MODE,
+                  replace: bool = False) -> bool:
     """
     Transmite un archivo completo usando nRF24L01+.
     
@@ -119,139 +833,396 @@ def transmit_file(radio: RF24, file_path: pathlib.Path,
         radio: Objeto RF24 inicializado
         file_path: Ruta al archivo a transmitir
         led_controller: Controlador de LEDs
+        fast_mode: Usar write_fast() para mantener llena la FIFO TX
+        delta_mode: Enviar solo las diferencias con la versión del receptor
+        auto_channel: Negociar el canal menos ruidoso y volver a escanear
+                      si los reintentos por trama se mantienen altos
+        adaptive_burst: Ajustar tamaño de ráfaga y pausa entre tramas con
+                        el control AIMD (False = BURST_SIZE/INTER_PACKET_DELAY)
+        stream_mode: Comprimir en un hilo mientras se transmiten los primeros
+                     chunks (archivos desde TX_STREAM_MIN_SIZE, sin delta)
+        replace: Pedir al receptor que reemplace su archivo del mismo nombre
         
     Returns:
         bool: True si la transmisión fue exitosa, False en caso contrario
     """
     print("\n[ MODO TRANSMISOR ]")
     led_controller.set_state(SystemState.TX_ACTIVE)
+    ACTIVE.begin('tx', file_path.name)
+    producer = None
     
     try:
         # Configurar pipes
         radio.open_rx_pipe(1, ADDR_B)
         radio.stop_listening()
         radio.open_tx_pipe(ADDR_A)
-        radio.set_retries(5, 5)
+        if auto_channel:
+            # Toda negociación empieza en el canal de encuentro
+            radio.channel = RF_CHANNEL
 
-        file_id = random.randint(0, 65535)
-        
         print(f"\n{'='*50}")
         print("MODO TRANSMISOR (OPTIMIZADO)")
         print(f"{'='*50}")
         print(f"Archivo: {file_path.name}")
-        print(f"File ID: {file_id}")
         print(f"Tamaño original: {file_path.stat().st_size} bytes")
 
         # Preparar archivo
         start_prep = time.time()
-        chunks, compress_mode, original_size, final_size, file_hash = split_file(
-            file_path, use_fec=is_fec_available()
-        )
-        prep_time = time.time() - start_prep
+        if delta_mode:
+            prepared = split_delta(radio, file_path, use_fec=is_fec_available())
+            if prepared is None:
+                print("✗ El receptor no envió las firmas para el modo delta")
+                TRANSFERS.labels('tx', 'error').inc()
+                record_transfer('tx', 'error', peer=peer_name(ADDR_A), file=file_path.name,
+                                error="sin firmas delta del receptor")
+                ACTIVE.end(False)
+                led_controller.set_state(SystemState.ERROR)
+                return False
+            chunks, compress_mode, original_size, final_size, file_hash, id_hash = prepared
+        elif stream_mode and file_path.stat().st_size >= TX_STREAM_MIN_SIZE:
+            producer, original_size, file_hash = start_streaming_split(
+                file_path, use_fec=is_fec_available()
+            )
+            chunks, compress_mode, id_hash = producer.chunks, producer.compress_mode, file_hash
+        else:
+            chunks, compress_mode, original_size, final_size, file_hash = split_file(
+                file_path, use_fec=is_fec_available()
+            )
+            id_hash = file_hash
 
-        total_packets = len(chunks)
+        # ID derivado del contenido: un reintento reanuda el checkpoint del receptor
+        file_id = transfer_id(id_hash)
         chunk_size = EFFECTIVE_DATA_BYTES if is_fec_available() else DATA_BYTES
+        
+        if producer is not None:
+            # Empezar con los primeros chunks; el total y el trailer llegan al final
+            total_packets, finished = producer.wait_for(0)
+            streaming = not finished
+            final_size = producer.final_size if finished else 0
+        else:
+            total_packets = len(chunks)
+            streaming = False
+            if total_packets > MAX_SEQ_PACKETS:
+                print(f"✗ Archivo demasiado grande: {total_packets} paquetes "
+                      f"(máximo {MAX_SEQ_PACKETS}, {MAX_SEQ_PACKETS * chunk_size // 1024} KiB "
+                      f"procesados)")
+                TRANSFERS.labels('tx', 'error').inc()
+                record_transfer('tx', 'error', peer=peer_name(ADDR_A), file=file_path.name,
+                                size=original_size, error=f"{total_packets} paquetes")
+                ACTIVE.end(False)
+                led_controller.set_state(SystemState.ERROR)
+                return False
+        
+        # Trailer de integridad: hash de lo transmitido y del archivo final
+        trailer_frame = None
+        if not streaming:
+            with span("hash_stream"):
+                stream_hash = (producer.stream_hash if producer is not None
+                               else calculate_file_hash(b"".join(chunks)))
+            trailer_frame = build_control_frame(
+                file_id, CTRL_TRAILER, 0,
+                build_trailer_payload(stream_hash, file_hash, original_size, final_size),
+                is_fec_available()
+            )
+        prep_time = time.time() - start_prep
+        PREP_SECONDS.observe(prep_time)
 
-        print(f"Tamaño procesado: {final_size} bytes")
-        print(f"Compresión: {COMPRESS_NAMES.get(compress_mode, 'unknown')}")
-        print(f"Total paquetes: {total_packets}")
+        if streaming:
+            print("Tamaño procesado: en curso (compresión en paralelo)")
+        else:
+            print(f"Tamaño procesado: {final_size} bytes")
+        print(f"Compresión: {COMPRESS_NAMES.get(compress_mode & COMPRESS_CODEC_MASK, 'unknown')}")
+        print(f"Delta: {'Sí' if compress_mode & COMPRESS_DELTA else 'No'}")
+        print(f"Total paquetes: {'en curso' if streaming else total_packets}")
         print(f"Bytes por paquete: {chunk_size}")
         print(f"FEC: {'Habilitado' if is_fec_available() else 'Deshabilitado'}")
+        print(f"Modo rápido (write_fast): {'Sí' if fast_mode else 'No'}")
+        print(f"File ID: {file_id}")
         print(f"Hash (4B): {file_hash.hex()}")
         print(f"Tiempo preparación: {prep_time:.3f}s")
+        precheck = precheck_summary()
+        if precheck:
+            print(precheck)
+
+        if auto_channel:
+            negotiate_channel(radio, file_id, is_fec_available())
+
+        # Anunciar tamaño, códec y nombre antes de los datos
+        name = file_path.name.encode('utf-8')[:MAX_NAME_BYTES]
+        # En streaming el total todavía no se conoce: el receptor espera FLAG_LAST
+        announce = build_announce_payload(
+            0 if streaming else total_packets, chunk_size, compress_mode,
+            final_size, original_size, len(name), replace, id_hash, open_length=streaming
+        )
+        with span("announce"):
+            reply = send_announce(radio, file_id, announce, name, is_fec_available())
+            announced = reply is not None
+            peer = exchange_station(radio, file_id, is_fec_available()) if announced else None
+            received = fetch_received(radio, file_id, reply, is_fec_available())
+        if announced:
+            print(f"✓ Anuncio confirmado por el receptor{f' ({peer})' if peer else ''}")
+        else:
+            print("⚠ Anuncio sin confirmar: el receptor esperará el último paquete")
 
-        pending = set(range(total_packets))
+        pending = set(range(total_packets)) - received
+        if received:
+            print(f"↻ El receptor ya tiene {len(received)} paquetes de un intento anterior: "
+                  f"quedan {len(pending)}")
         sent_count = 0
         success_count = 0
         start_time = time.time()
+        ACTIVE.begin('tx', file_path.name, None if streaming else total_packets,
+                     chunk_size)   # Sin contar la preparación
         burst_stats = {'sent': 0, 'ack': 0, 'fail': 0}
+        controller = AIMDController(adaptive_burst)
+        ack_state = {'below': 0, 'total': total_packets}
+        monitor = RetransmitMonitor()
+        verified = None
+        verify_failures = 0
 
-        # Bucle principal de transmisión
-        for round_num in range(MAX_ROUNDS):
+        # Bucle principal de transmisión (la última iteración solo verifica)
+        for round_num in range(MAX_ROUNDS + 1):
+            if ACTIVE.cancelled:
+                print("⏹ Transmisión cancelada")
+                break
             if not pending:
                 print("✓ Todos los paquetes confirmados!")
+                with span("confirm_integrity"):
+                    verified = confirm_integrity(
+                        radio, file_id, trailer_frame, pending, ack_state
+                    )
+                if verified is False and verify_failures < MAX_VERIFY_RETRIES:
+                    # El receptor descartó los datos: reenviar todo
+                    verify_failures += 1
+                    print("✗ El receptor reporta hash incorrecto, reenviando archivo...")
+                    pending = set(range(total_packets))
+                    ack_state['below'] = 0
+                    continue
+                if verified is None and round_num < MAX_ROUNDS:
+                    # Sin respuesta: la próxima iteración reintenta el trailer
+                    print("⚠ El receptor no confirmó la integridad, reintentando el trailer...")
+                    continue
+                break
+            
+            if round_num == MAX_ROUNDS:
                 break
 
             print(f"\n--- Ronda {round_num + 1} ---")
-            print(f"Pendientes: {len(pending)}")
+            print(f"Pendientes: {len(pending)} | Ráfaga: {controller.burst_size} | "
+                  f"Pausa: {controller.gap * 1000:.2f} ms")
+            TX_ROUNDS.inc()
             pending_list = sorted(pending)
 
-            # Transmitir en ráfagas
-            for burst_start in range(0, len(pending_list), BURST_SIZE):
-                burst_end = min(burst_start + BURST_SIZE, len(pending_list))
-                burst = pending_list[burst_start:burst_end]
-
-                for seq_id in burst:
-                    is_last = (seq_id == total_packets - 1)
-                    frame = build_frame(
-                        file_id, seq_id, chunks[seq_id], 
-                        is_last, compress_mode, is_fec_available()
-                    )
+            with span("round", round=round_num + 1, pending=len(pending)):
+                # Transmitir en ráfagas (tamaño y pausa según el control AIMD)
+                position = 0
+                while position < len(pending_list) or streaming:
+                    if streaming:
+                        # Sumar lo que el compresor produjo; sin nada para enviar, esperarlo
+                        idle = position >= len(pending_list)
+                        available, finished = producer.wait_for(
+                            total_packets, STREAM_WAIT if idle else 0
+                        )
+                        fresh = range(total_packets, available)
+                        pending.update(fresh)
+                        pending_list.extend(fresh)
+                        total_packets = ack_state['total'] = available
+                        if finished:
+                            streaming = False
+                            final_size = producer.final_size
+                            trailer_frame = build_control_frame(
+                                file_id, CTRL_TRAILER, 0,
+                                build_trailer_payload(producer.stream_hash, file_hash,
+                                                      original_size, final_size),
+                                is_fec_available()
+                            )
+                            print(f"✓ Compresión terminada: {final_size} bytes, "
+                                  f"{total_packets} paquetes")
+                        if position >= len(pending_list):
+                            continue
+                    ACTIVE.update(total_packets - len(pending),
+                                  None if streaming else total_packets)
+                    if ACTIVE.cancelled:
+                        break
+                    burst = pending_list[position:position + controller.burst_size]
+                    position += len(burst)
+                    
+                    if auto_channel and monitor.should_rescan():
+                        print(f"⚠ {monitor.window_rate:.1f} reintentos/trama en el canal "
+                              f"{radio.channel}: buscando otro canal")
+                        negotiate_channel(radio, file_id, is_fec_available(),
+                                          exclude=radio.channel)
 
-                    # Enviar frame (hardware maneja reintentos automáticamente)
-                    if radio.write(frame):
-                        burst_stats['sent'] += 1
-                        sent_count += 1
-                        success_count += 1
-                        pending.discard(seq_id)
+                    if fast_mode:
+                        with span("build_frames", count=len(burst)):
+                            frames = [
+                                (seq_id, build_frame(
+                                    file_id, seq_id, chunks[seq_id],
+                                    seq_id == total_packets - 1 and not streaming,
+                                    compress_mode, is_fec_available()
+                                ))
+                                for seq_id in burst if seq_id in pending
+                            ]
+                        prev_sent = sent_count
+                        with span("fast_write_burst", count=len(frames)):
+                            confirmed, failed, acks = fast_write_burst(radio, frames, file_id)
+                        
+                        burst_stats['sent'] += len(confirmed)
+                        burst_stats['fail'] += len(failed)
+                        burst_stats['ack'] += len(acks)
+                        FRAMES_SENT.inc(len(confirmed))
+                        WRITE_FAILURES.inc(len(failed))
+                        ACKS_RECEIVED.inc(len(acks))
+                        controller.update(len(confirmed), len(failed), len(acks))
+                        if controller.gap:
+                            time.sleep(controller.gap * len(frames))
+                        # ARC solo refleja la última trama: se toma como muestra de la ráfaga
+                        retries = radio.get_arc() * len(confirmed) + FAILED_WRITE_RETRIES * len(failed)
+                        monitor.record(retries, len(confirmed) + len(failed))
+                        HW_RETRIES.inc(retries)
+                        sent_count += len(confirmed)
+                        success_count += len(confirmed)
+                        pending.difference_update(confirmed)
+                        
+                        for ack_payload in acks:
+                            if apply_ack(ack_payload, file_id, pending, ack_state):
+                                break
                         
-                        # Leer ACK inmediatamente (necesario para confirmar recepción)
-                        if radio.available():
-                            try:
-                                size = radio.get_dynamic_payload_size()
-                                if 0 < size <= 32:
-                                    ack_payload = radio.read(size)
-                                    burst_stats['ack'] += 1
-                                    
-                                    # Procesar ACK
-                                    _, missing_seq, is_complete, _ = parse_ack(ack_payload)
-                                    if is_complete:
-                                        pending.clear()
-                                        break
-                            except Exception:
-                                pass
-
                         # Mostrar progreso
-                        if sent_count % 25 == 0 or is_last:
+                        if sent_count // 25 != prev_sent // 25 or not pending:
                             progress = (sent_count / total_packets) * 100
                             elapsed = time.time() - start_time
                             throughput_kibs = (sent_count * chunk_size) / max(elapsed, 1e-9) / 1024
                             print(f"  📊 {progress:.1f}% | {sent_count}/{total_packets} | "
                                   f"{throughput_kibs:.1f} KiB/s")
-                    else:
-                        burst_stats['fail'] += 1
-
-                if not pending:
-                    break
-
-            # Ping final para verificar estado
-            if pending:
-                time.sleep(0.3)
-                last_seq = total_packets - 1
-                frame = build_frame(
-                    file_id, last_seq, chunks[last_seq], 
-                    True, compress_mode, is_fec_available()
-                )
-                if radio.write(frame) and radio.available():
-                    try:
-                        size = radio.get_dynamic_payload_size()
-                        if 0 < size <= 32:
-                            ack_payload = radio.read(size)
-                            _, missing_seq, is_complete, _ = parse_ack(ack_payload)
-                            if is_complete:
-                                print("✓ Receptor confirma recepción completa!")
-                                pending.clear()
+                        
+                        if not pending and not streaming:
+                            break
+                        continue
+
+                    burst_counts = {'sent': 0, 'ack': 0, 'fail': 0}
+                    ring = recorder()
+                    channel = radio.channel if ring else 0
+                    for seq_id in burst:
+                        # Puede haberse confirmado por el bitmap de un ACK previo
+                        if seq_id not in pending:
+                            continue
+                        if controller.gap:
+                            time.sleep(controller.gap)
+                        
+                        is_last = (seq_id == total_packets - 1) and not streaming
+                        with span("build_frame"):
+                            frame = build_frame(
+                                file_id, seq_id, chunks[seq_id], 
+                                is_last, compress_mode, is_fec_available()
+                            )
+
+                        # Enviar frame (hardware maneja reintentos automáticamente)
+                        write_start = time.perf_counter_ns() if ring else 0
+                        with span("radio.write", seq=seq_id):
+                            written = radio.write(frame)
+                        write_end = time.perf_counter_ns() if ring else 0
+                        ack_ns = 0
+                        if written:
+                            burst_stats['sent'] += 1
+                            burst_counts['sent'] += 1
+                            FRAMES_SENT.inc()
+                            arc = radio.get_arc()
+                            monitor.record(arc)
+                            HW_RETRIES.inc(arc)
+                            sent_count += 1
+                            success_count += 1
+                            pending.discard(seq_id)
+                            
+                            # Leer ACK inmediatamente (necesario para confirmar recepción)
+                            done = False
+                            if radio.available():
+                                try:
+                                    size = radio.get_dynamic_payload_size()
+                                    if 0 < size <= 32:
+                                        ack_payload = radio.read(size)
+                                        ack_ns = time.perf_counter_ns() if ring else 0
+                                        burst_stats['ack'] += 1
+                                        burst_counts['ack'] += 1
+                                        ACKS_RECEIVED.inc()
+                                        
+                                        # Procesar ACK
+                                        with span("ack"):
+                                            done = apply_ack(ack_payload, file_id, pending, ack_state)
+                                except Exception:
+                                    pass
+                            if ring:
+                                ring.record(file_id, seq_id, write_start, write_end, ack_ns, arc,
+                                            FLAG_SENT | (FLAG_ACK_PAYLOAD if ack_ns else 0), channel)
+                            if done:
                                 break
-                            elif missing_seq is not None:
-                                pending = set([s for s in pending if s >= missing_seq])
-                    except Exception:
-                        pass
+
+                            # Mostrar progreso
+                            if sent_count % 25 == 0 or is_last:
+                                progress = (sent_count / total_packets) * 100
+                                elapsed = time.time() - start_time
+                                throughput_kibs = (sent_count * chunk_size) / max(elapsed, 1e-9) / 1024
+                                print(f"  📊 {progress:.1f}% | {sent_count}/{total_packets} | "
+                                      f"{throughput_kibs:.1f} KiB/s")
+                        else:
+                            burst_stats['fail'] += 1
+                            burst_counts['fail'] += 1
+                            WRITE_FAILURES.inc()
+                            monitor.record(FAILED_WRITE_RETRIES)
+                            HW_RETRIES.inc(FAILED_WRITE_RETRIES)
+                            if ring:
+                                ring.record(file_id, seq_id, write_start, write_end, 0,
+                                            radio.get_arc(), FLAG_MAX_RT, channel)
+
+                    controller.update(burst_counts['sent'], burst_counts['fail'], burst_counts['ack'])
+                    if not pending and not streaming:
+                        break
+
+                # Ping final para verificar estado
+                if pending and not ACTIVE.cancelled:
+                    time.sleep(0.3)
+                    last_seq = total_packets - 1
+                    frame = build_frame(
+                        file_id, last_seq, chunks[last_seq], 
+                        True, compress_mode, is_fec_available()
+                    )
+                    if radio.write(frame) and radio.available():
+                        try:
+                            size = radio.get_dynamic_payload_size()
+                            if 0 < size <= 32:
+                                ack_payload = radio.read(size)
+                                if apply_ack(ack_payload, file_id, pending, ack_state):
+                                    # La próxima iteración envía el trailer
+                                    print("✓ Receptor confirma recepción completa!")
+                                    continue
+                        except Exception:
+                            pass
 
         total_time = time.time() - start_time
+        TRANSFER_SECONDS.labels('tx').observe(total_time)
+        if producer is not None:
+            producer.stop()   # Cancelada a mitad de la compresión
+        record = {
+            'peer': peer_name(ADDR_A, peer), 'file': file_path.name, 'size': original_size,
+            'stream_size': final_size, 'packets': total_packets,
+            'codec': COMPRESS_NAMES.get(compress_mode & COMPRESS_CODEC_MASK, 'unknown'),
+            'seconds': total_time, 'rounds': round_num, 'frames_sent': sent_count,
+            'retries_per_frame': monitor.average(), 'missing': len(pending),
+            'channel': radio.channel,
+            'params': {'fast': fast_mode, 'delta': bool(compress_mode & COMPRESS_DELTA),
+                       'stream': producer is not None, 'fec': is_fec_available(),
+                       'adaptive_burst': adaptive_burst, 'replace': replace},
+        }
 
         # Mostrar resultados
-        if not pending:
+        if not pending and verified:
             throughput_orig = (original_size / max(total_time, 1e-9)) / 1024
+            TRANSFERS.labels('tx', 'ok').inc()
+            if producer is None:
+                # En streaming el tiempo incluye esperas al compresor: no mide el enlace
+                get_model().record_transfer(total_packets, total_time)
+            GOODPUT_KIBPS.labels('tx').observe(throughput_orig)
+            record_transfer('tx', 'ok', goodput_kibps=throughput_orig, **record)
             efficiency = (success_count / sent_count * 100) if sent_count > 0 else 0
             compression_ratio = final_size / original_size if original_size > 0 else 1.0
             
@@ -264,29 +1235,52 @@ def transmit_file(radio: RF24, file_path: pathlib.Path,
             print(f"Eficiencia: {efficiency:.1f}%")
             print(f"Ratio compresión: {compression_ratio:.2%}")
             print(f"Bytes ahorrados: {original_size - final_size}")
+            print("Integridad: Verificada")
+            print(f"Canal: {radio.channel} | Reintentos/trama: {monitor.average():.2f}")
             print("Estadísticas burst:")
             print(f"  - Enviados: {burst_stats['sent']}")
             print(f"  - ACKs: {burst_stats['ack']}")
             print(f"  - Fallos: {burst_stats['fail']}")
+            print(f"  - {controller.summary()}")
             if is_fec_available():
                 print(f"FEC: Activo (RS corrección)")
             print(f"{'='*50}\n")
             
+            ACTIVE.update(total_packets)
+            ACTIVE.end(True)
             led_controller.set_state(SystemState.COMPLETED)
             return True
         else:
+            ACTIVE.update(total_packets - len(pending))
+            ACTIVE.end(False)
             print(f"\n{'='*50}")
+            TRANSFERS.labels('tx', 'incomplete').inc()
+            if verified is False:
+                error = "hash incorrecto en el receptor"
+            elif not pending:
+                error = "integridad sin confirmar por el receptor"
+            else:
+                error = None
+            record_transfer('tx', 'incomplete', **record, error=error)
             print("✗ TRANSMISIÓN INCOMPLETA")
             print(f"Faltantes: {len(pending)}")
+            if error:
+                print(f"Integridad: {error}")
             print(f"Tiempo: {total_time:.2f}s")
+            print(controller.summary())
             print(f"{'='*50}\n")
             
             led_controller.set_state(SystemState.ERROR)
             return False
 
     except Exception as e:
+        if producer is not None:
+            producer.stop()
+        TRANSFERS.labels('tx', 'error').inc()
+        record_transfer('tx', 'error', peer=peer_name(ADDR_A), file=file_path.name, error=str(e))
         print(f"\n✗ Error en transmisión: {e}")
         import traceback
         traceback.print_exc()
+        ACTIVE.end(False)
         led_controller.set_state(SystemState.ERROR)
         return False
\ No newline at end of file
@@ -102,6 +102,7 @@ errors=0
 check_module "pyrf24" "RF24" || ((errors++))
 check_module "reedsolo" "reedsolo" || ((errors++))
 check_module "RPi.GPIO" "RPi.GPIO" || ((errors++))
+check_module "numpy" "numpy" || echo -e "  ${YELLOW}(opcional: solo acelera el pre-chequeo de entropía)${NC}\n"
 
 echo -e "${GREEN}▶ Verificando acceso a hardware...${NC}\n"
 